@@ -0,0 +1,4 @@
+"""
+أدوات قياس الأداء بدون شبكة (بيانات تجريبية + خوادم بريد وهمية)
+Offline benchmark suite - run with: python -m benchmarks.run
+"""
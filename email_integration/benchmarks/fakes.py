@@ -0,0 +1,357 @@
+"""
+خوادم بريد وهمية محلية لإعادة تشغيل المزامنة بدون شبكة
+Local Graph / IMAP fakes for offline sync replay
+
+- FakeGraphSession: بديل requests.Session لـ core.ms_mail_reader يخدم
+  messages/delta (صفحات + deltaLink)، /me/messages?$search=participants
+  و $batch لتحميل المحتوى من قائمة رسائل بتنسيق Graph
+- FakeIMAPServer: بديل اتصال imaplib لـ core.imap_reader يخدم UID SEARCH /
+  UID FETCH (BODYSTRUCTURE + BODY[HEADER] + BODY[section]) من رسائل RFC822
+- fake_graph() / fake_imap(): تركيب الخادم الوهمي مؤقتاً (with)
+
+latency: تأخير اختياري لكل طلب بالثواني لمحاكاة زمن الشبكة
+"""
+import email
+import json
+import re
+import time
+from contextlib import contextmanager
+from email import policy
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+from core import imap_reader, ms_mail_reader
+from core.text_normalize import html_to_text
+
+GRAPH_BASE = ms_mail_reader.GRAPH_BASE
+BODY_PREVIEW_LENGTH = 255
+
+
+# =========================
+# Graph
+# =========================
+class FakeResponse:
+    """الحد الأدنى من requests.Response الذي تستخدمه ms_mail_reader"""
+
+    def __init__(self, status_code: int, payload: Dict, headers: Optional[Dict] = None):
+        self.status_code = status_code
+        self._payload = payload
+        self.headers = headers or {}
+
+    def json(self):
+        return self._payload
+
+    @property
+    def text(self):
+        return json.dumps(self._payload, ensure_ascii=False)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} fake error", response=self)
+
+
+def _address(entry) -> str:
+    return ((entry or {}).get("emailAddress") or {}).get("address", "").lower()
+
+
+class FakeGraphSession:
+    """
+    صندوق بريد Graph وهمي
+
+    Args:
+        messages: رسائل بتنسيق Graph (مع body) - الأحدث أولاً كما يعيدها Graph
+        latency: تأخير كل طلب بالثواني
+    """
+
+    def __init__(self, messages: List[Dict], latency: float = 0.0):
+        self.messages = list(messages)
+        self.by_id = {m["id"]: m for m in self.messages}
+        self.latency = latency
+        self.requests = 0
+
+    def _view(self, message: Dict, fields: Optional[List[str]]) -> Dict:
+        """الرسالة بالحقول المطلوبة في $select (bodyPreview محسوب من المحتوى)"""
+        item = dict(message)
+        body = item.get("body") or {}
+        if "bodyPreview" not in item:
+            content = body.get("content", "")
+            if (body.get("contentType") or "").lower() == "html":
+                content = html_to_text(content)
+            item["bodyPreview"] = content[:BODY_PREVIEW_LENGTH]
+        if fields:
+            item = {key: value for key, value in item.items() if key in fields}
+        return item
+
+    def request(self, method, url, headers=None, json=None, timeout=None):
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        parts = urlsplit(url)
+        path = parts.path
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        fields = query["$select"].split(",") if "$select" in query else None
+
+        if method == "POST" and path.endswith("/$batch"):
+            return self._batch(json or {})
+        if path.endswith("/messages/delta"):
+            page_size = 100
+            prefer = (headers or {}).get("Prefer", "")
+            match = re.search(r"maxpagesize=(\d+)", prefer)
+            if match:
+                page_size = int(match.group(1))
+            return self._delta(query, fields, page_size)
+        if path.endswith("/messages"):
+            return self._list(query, fields)
+        if "/messages/" in path:
+            message = self.by_id.get(path.rsplit("/", 1)[-1])
+            if message is not None:
+                return FakeResponse(200, self._view(message, fields))
+        return FakeResponse(404, {"error": {"code": "NotFound", "message": path}})
+
+    def _page(self, items: List[Dict], start: int, size: int, fields) -> List[Dict]:
+        return [self._view(m, fields) for m in items[start:start + size]]
+
+    def _delta(self, query: Dict, fields, page_size: int) -> FakeResponse:
+        base = f"{GRAPH_BASE}/me/mailFolders/inbox/messages/delta"
+        # $deltatoken = عدد الرسائل المعروفة للعميل؛ الجديدة فقط بعده
+        known = int(query.get("$deltatoken", 0))
+        start = int(query.get("$skiptoken", known))
+        select = f"&$select={','.join(fields)}" if fields else ""
+        # الرسائل القديمة أولاً حتى تبقى الإضافات في نهاية القائمة
+        ordered = self.messages[::-1]
+        payload = {"value": self._page(ordered, start, page_size, fields)}
+        if start + page_size < len(ordered):
+            payload["@odata.nextLink"] = f"{base}?$skiptoken={start + page_size}{select}"
+        else:
+            payload["@odata.deltaLink"] = f"{base}?$deltatoken={len(ordered)}{select}"
+        return FakeResponse(200, payload)
+
+    def _list(self, query: Dict, fields) -> FakeResponse:
+        items = self.messages
+        search = query.get("$search", "").strip('"')
+        if search.startswith("participants:"):
+            address = search.split(":", 1)[1].split(" AND ", 1)[0].strip().lower()
+            items = [
+                m for m in items
+                if _address(m.get("from")) == address
+                or address in (_address(r) for r in m.get("toRecipients", []))
+            ]
+        page_size = int(query.get("$top", 100))
+        skip = int(query.get("$skip", 0))
+        payload = {"value": self._page(items, skip, page_size, fields)}
+        if skip + page_size < len(items):
+            next_query = "&".join(
+                f"{key}={value}" for key, value in query.items() if key != "$skip"
+            )
+            payload["@odata.nextLink"] = f"{GRAPH_BASE}/me/messages?{next_query}&$skip={skip + page_size}"
+        return FakeResponse(200, payload)
+
+    def _batch(self, payload: Dict) -> FakeResponse:
+        responses = []
+        for item in payload.get("requests", []):
+            message_id = urlsplit(item.get("url", "")).path.rsplit("/", 1)[-1]
+            message = self.by_id.get(message_id)
+            if message is None:
+                responses.append({"id": item.get("id"), "status": 404, "body": {}})
+            else:
+                responses.append({"id": item.get("id"), "status": 200,
+                                  "body": {"body": message.get("body") or {}}})
+        return FakeResponse(200, {"responses": responses})
+
+
+@contextmanager
+def fake_graph(messages: List[Dict], latency: float = 0.0):
+    """with fake_graph(messages) as session: read_messages_delta("token") ..."""
+    session = FakeGraphSession(messages, latency)
+    previous = ms_mail_reader._session
+    ms_mail_reader._session = session
+    try:
+        yield session
+    finally:
+        ms_mail_reader._session = previous
+
+
+# =========================
+# IMAP
+# =========================
+def _quote(value) -> str:
+    if value is None:
+        return "NIL"
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _split_message(raw: bytes):
+    """RFC822 -> (الرؤوس مع السطر الفارغ, المحتوى)"""
+    for separator in (b"\r\n\r\n", b"\n\n"):
+        index = raw.find(separator)
+        if index >= 0:
+            return raw[:index + len(separator)], raw[index + len(separator):]
+    return raw, b""
+
+
+def _structure(part) -> str:
+    """BODYSTRUCTURE لجزء (message.Message) بصيغة IMAP"""
+    if part.is_multipart():
+        children = "".join(_structure(child) for child in part.get_payload())
+        return f"({children} {_quote(part.get_content_subtype().upper())})"
+    payload = _part_bytes(part)
+    params = " ".join(f"{_quote(key.upper())} {_quote(value)}" for key, value in part.get_params()[1:]) \
+        if part.get_params() else ""
+    encoding = part.get("Content-Transfer-Encoding", "7bit").upper()
+    disposition = part.get_content_disposition()
+    disposition = f"({_quote(disposition.upper())} NIL)" if disposition else "NIL"
+    lines = payload.count(b"\n")
+    return (
+        f"({_quote(part.get_content_maintype().upper())} {_quote(part.get_content_subtype().upper())} "
+        f"({params or 'NIL'}) NIL NIL {_quote(encoding)} {len(payload)} {lines} "
+        f"NIL {disposition} NIL)"
+    )
+
+
+def _part_bytes(part) -> bytes:
+    """المحتوى المرمَّز كما هو على الخادم (base64 / quoted-printable بدون فك)"""
+    payload = part.get_payload()
+    if isinstance(payload, bytes):
+        return payload
+    return (payload or "").encode("utf-8", "surrogateescape")
+
+
+def _section_part(message, section: str):
+    part = message
+    for index in section.split("."):
+        if part.is_multipart():
+            part = part.get_payload()[int(index) - 1]
+        elif index != "1":
+            return None
+    return part
+
+
+def _parse_message_set(message_set: str, last_uid: int) -> List[int]:
+    uids = []
+    for chunk in message_set.split(","):
+        if ":" in chunk:
+            start, end = chunk.split(":")
+            start = int(start)
+            end = last_uid if end == "*" else int(end)
+            uids.extend(range(min(start, end), max(start, end) + 1))
+        else:
+            uids.append(int(chunk))
+    return uids
+
+
+class FakeIMAPConnection:
+    """اتصال imaplib وهمي للقراءة فقط (الأوامر التي تستخدمها imap_reader)"""
+
+    def __init__(self, server: "FakeIMAPServer"):
+        self.server = server
+
+    def _tick(self):
+        self.server.commands += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+    def login(self, username, password):
+        self._tick()
+        return "OK", [b"LOGIN completed"]
+
+    def select(self, folder="INBOX", readonly=False):
+        self._tick()
+        return "OK", [str(len(self.server.messages)).encode()]
+
+    def response(self, name):
+        name = name.upper()
+        if name == "UIDVALIDITY":
+            return name, [str(self.server.uidvalidity).encode()]
+        if name == "UIDNEXT":
+            return name, [str(self.server.last_uid + 1).encode()]
+        return name, [None]
+
+    def uid(self, command, *args):
+        self._tick()
+        command = command.upper()
+        if command == "SEARCH":
+            criteria = args[-1]
+            start = int(criteria.split()[1].split(":")[0])
+            uids = [uid for uid in self.server.messages if uid >= start]
+            if not uids and self.server.messages:
+                uids = [self.server.last_uid]  # n:* يعيد آخر UID دائماً
+            return "OK", [" ".join(str(uid) for uid in uids).encode()]
+        if command == "FETCH":
+            return self._fetch(args[0], args[1])
+        return "NO", [b"unsupported"]
+
+    def _fetch(self, message_set: str, spec: str):
+        data = []
+        section = None
+        match = re.search(r"BODY\.PEEK\[([\d.]+)\]", spec)
+        if match:
+            section = match.group(1)
+        for sequence, uid in enumerate(_parse_message_set(message_set, self.server.last_uid), 1):
+            entry = self.server.messages.get(uid)
+            if entry is None:
+                continue
+            raw, parsed = entry
+            if section is None:
+                header, _ = _split_message(raw)
+                prefix = (f"{sequence} (UID {uid} BODYSTRUCTURE {_structure(parsed)} "
+                          f"BODY[HEADER] {{{len(header)}}}").encode("utf-8")
+                data.append((prefix, header))
+            else:
+                part = _section_part(parsed, section)
+                body = _part_bytes(part) if part is not None else b""
+                prefix = f"{sequence} (UID {uid} BODY[{section}] {{{len(body)}}}".encode()
+                data.append((prefix, body))
+            data.append(b")")
+        return "OK", data
+
+    def close(self):
+        return "OK", [b"CLOSE completed"]
+
+    def logout(self):
+        return "BYE", [b"LOGOUT"]
+
+
+class FakeIMAPServer:
+    """
+    مجلد IMAP وهمي
+
+    Args:
+        raw_messages: رسائل RFC822 (bytes) بترتيب الوصول؛ UID = الترتيب + 1
+        uidvalidity: قيمة UIDVALIDITY للمجلد
+        latency: تأخير كل أمر بالثواني
+    """
+
+    def __init__(self, raw_messages: List[bytes], uidvalidity: int = 1, latency: float = 0.0):
+        self.uidvalidity = uidvalidity
+        self.latency = latency
+        self.commands = 0
+        self.messages = {}
+        for raw in raw_messages:
+            self.append(raw)
+
+    @property
+    def last_uid(self) -> int:
+        return max(self.messages) if self.messages else 0
+
+    def append(self, raw: bytes):
+        """رسالة جديدة في المجلد (لمحاكاة مزامنة تزايدية)"""
+        parsed = email.message_from_bytes(raw, policy=policy.compat32)
+        self.messages[self.last_uid + 1] = (raw, parsed)
+
+    def connect(self) -> FakeIMAPConnection:
+        return FakeIMAPConnection(self)
+
+
+@contextmanager
+def fake_imap(raw_messages: List[bytes], uidvalidity: int = 1, latency: float = 0.0):
+    """with fake_imap(raw) as server: read_new_messages_from_imap("imap.fake", 993, ...) ..."""
+    server = FakeIMAPServer(raw_messages, uidvalidity, latency)
+    previous = imap_reader._connect
+    imap_reader._connect = lambda *args, **kwargs: server.connect()
+    try:
+        yield server
+    finally:
+        imap_reader._connect = previous
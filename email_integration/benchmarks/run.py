@@ -0,0 +1,414 @@
+"""
+أداة قياس الأداء: بيانات تجريبية + إعادة تشغيل المزامنة + أزمنة الدوال الأساسية
+Reproducible offline benchmark suite
+
+    cd email_integration
+    python -m benchmarks.run                                  # 10k عميل في قاعدة مؤقتة
+    python -m benchmarks.run --clients 200000 --db bench.db   # يُعاد استخدام bench.db لاحقاً
+    python -m benchmarks.run --json results.json
+    python -m benchmarks.run --compare results.json           # تراجع p95 > 20% = exit 1
+                                                              # (بنفس البيانات والإعدادات فقط)
+    python -m benchmarks.run --graph-payload delta.json --imap-mbox inbox.mbox
+
+- لا شبكة: Graph و IMAP من الخوادم الوهمية في benchmarks.fakes
+- نفس --seed = نفس البيانات ونفس الرسائل
+- النتائج: عدد الاستدعاءات، الإنتاجية، p50 / p95 / max لكل قياس، مراحل
+  المزامنة (fetch / parse / filter / score / db_write / commit)، وأبطأ دوال core.db
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime
+from time import perf_counter
+from typing import Callable, Dict, List, Optional
+
+import core.db as db
+from core.instrumentation import SYNC_PHASES
+
+# نسبة تراجع p95 (مقارنة بملف --compare) التي تُعتبر فشلاً
+REGRESSION_THRESHOLD = 0.20
+# القياسات الأسرع من هذا لا تُقارن (ضوضاء التوقيت أكبر من الفرق)
+COMPARE_MIN_MS = 1.0
+DB_FUNCTIONS_REPORTED = 15
+# مفاتيح meta التي يجب أن تتطابق مع ملف --compare حتى تكون المقارنة ذات معنى
+COMPARE_META_KEYS = (
+    "rows", "seed", "clients", "messages_per_client", "repeat",
+    "mailbox", "latency", "graph_payload", "imap_mbox",
+)
+
+
+def _percentile(samples: List[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(p * len(ordered)) - 1)]
+
+
+def measure(name: str, func: Callable, repeat: int, items: int = 1, warmup: bool = True) -> Dict:
+    """
+    تشغيل func عدة مرات وحساب الإحصائيات
+
+    Args:
+        items: عدد العناصر في كل استدعاء (للإنتاجية: عنصر/ثانية)
+    """
+    if warmup:
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        samples.append((perf_counter() - start) * 1000.0)
+    total = sum(samples) / 1000.0
+    result = {
+        "calls": repeat,
+        "throughput": round(items * repeat / total, 1) if total else 0.0,
+        "mean_ms": round(sum(samples) / repeat, 3),
+        "p50_ms": round(_percentile(samples, 0.50), 3),
+        "p95_ms": round(_percentile(samples, 0.95), 3),
+        "max_ms": round(max(samples), 3),
+    }
+    print(f"  {name:<36}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+          f"{result['max_ms']:>10.2f}{result['throughput']:>12.1f}/s")
+    return result
+
+
+def _header(title: str):
+    print(f"\n{title}")
+    print(f"  {'':<36}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'throughput':>14}")
+
+
+# =========================
+# Suites
+# =========================
+def bench_queries(repeat: int, seed: int) -> Dict[str, Dict]:
+    """قائمة العملاء، البحث، الإحصائيات، المتابعات"""
+    from core.advanced_search import search_all_advanced, search_clients_advanced, search_messages_advanced
+    from core.client_search import ClientSearchIndex
+    from core.dashboard import get_actions_needed, get_dashboard_stats, get_monthly_comparison
+    from core.sales import get_pipeline_statistics
+    from core.statistics import get_comprehensive_statistics
+    from core.tasks import get_overdue_tasks
+
+    rng = random.Random(seed)
+    conn = db.get_connection()
+    try:
+        client_ids = [row[0] for row in conn.execute("SELECT id FROM clients")]
+        classification = (conn.execute(
+            "SELECT classification FROM clients GROUP BY classification ORDER BY COUNT(*) DESC LIMIT 1"
+        ).fetchone() or ("",))[0]
+    finally:
+        conn.close()
+    if not client_ids:
+        print("  (no clients - skipped)")
+        return {}
+
+    rows = db.get_all_clients()
+    index = ClientSearchIndex()
+    index.update(rows)
+    queries = ["foods", "nordic", "germ", "spices 1", "gmbh", "trading", "hassan", "al noor"]
+
+    def build_index():
+        ClientSearchIndex().update(rows)
+
+    def search_index():
+        index.search(rng.choice(queries) + str(rng.randint(0, 9)))
+
+    def client_timeline():
+        db.get_client_messages(rng.choice(client_ids))
+
+    results = {}
+    _header(f"Queries ({len(client_ids)} clients)")
+    suite = [
+        ("grid.get_all_clients", db.get_all_clients, max(3, repeat // 4), len(client_ids)),
+        ("grid.filter_classification",
+         lambda: db.get_filtered_client_ids(class_filter=classification), repeat, 1),
+        ("grid.filter_requested_price",
+         lambda: db.get_filtered_client_ids(status_filter="Requested Price"), repeat, 1),
+        ("grid.search_index_build", build_index, max(3, repeat // 4), len(rows)),
+        ("grid.search_index_query", search_index, repeat * 5, 1),
+        ("grid.followup_clients", db.get_clients_needing_followup, repeat, 1),
+        ("timeline.client_messages", client_timeline, repeat * 5, 1),
+        ("search.clients_advanced",
+         lambda: search_clients_advanced("foods", country="Germany"), repeat, 1),
+        ("search.messages_en", lambda: search_messages_advanced("sample"), repeat, 1),
+        ("search.messages_ar", lambda: search_messages_advanced("عينة"), repeat, 1),
+        ("search.all", lambda: search_all_advanced("price"), repeat, 1),
+        ("stats.comprehensive", get_comprehensive_statistics, repeat, 1),
+        ("stats.dashboard", get_dashboard_stats, repeat, 1),
+        ("stats.actions_needed", get_actions_needed, repeat, 1),
+        ("stats.monthly_comparison", get_monthly_comparison, repeat, 1),
+        ("stats.pipeline", get_pipeline_statistics, repeat, 1),
+        ("tasks.overdue", get_overdue_tasks, repeat, 1),
+    ]
+    for name, func, calls, items in suite:
+        results[name] = measure(name, func, calls, items)
+    return results
+
+
+def _sync_result(name: str, run, fetched: int, result: Dict) -> Dict:
+    seconds = run.duration
+    phases = {
+        key: round(run.phases[key][0], 4) for key in SYNC_PHASES if key in run.phases
+    }
+    print(f"  {name:<36}{fetched:>8} msgs{seconds:>9.2f}s"
+          f"{fetched / seconds if seconds else 0:>10.1f} msgs/s  "
+          f"saved={result.get('linked', 0)} filtered={result.get('filtered', 0)} "
+          f"new_clients={result.get('created', 0)}")
+    print("    " + "  ".join(f"{key}={value:.3f}s" for key, value in phases.items()))
+    return {
+        "messages": fetched,
+        "seconds": round(seconds, 4),
+        "throughput": round(fetched / seconds, 1) if seconds else 0.0,
+        "phases": phases,
+        "saved": result.get("linked", 0),
+        "filtered": result.get("filtered", 0),
+        "created_clients": result.get("created", 0),
+    }
+
+
+def bench_sync(graph_messages: List[Dict], imap_raw: List[bytes], latency: float,
+               profile: bool) -> Dict[str, Dict]:
+    """إعادة تشغيل المزامنة (قراءة من الخادم الوهمي + process_messages)"""
+    from core.imap_reader import read_new_messages_from_imap
+    from core.instrumentation import sync_run
+    from core.message_filter import should_fetch_full_body
+    from core.ms_mail_reader import read_messages_delta
+    from core.sync_engine import process_messages
+
+    from .fakes import fake_graph, fake_imap
+
+    results = {}
+    print(f"\nSync replay (latency {latency * 1000:.0f} ms/request)")
+
+    if graph_messages:
+        with fake_graph(graph_messages, latency) as session:
+            with sync_run("bench.graph_delta", profile=profile, trace_memory=False, store=False) as run:
+                start = perf_counter()
+                fetched, delta_link = read_messages_delta("bench-token", body_filter=should_fetch_full_body)
+                run.add_phase("fetch", perf_counter() - start)
+                result = process_messages(fetched, "outlook")
+            results["sync.graph_delta"] = _sync_result("sync.graph_delta", run, len(fetched), result)
+            results["sync.graph_delta"]["requests"] = session.requests
+            if run.profile:
+                print(run.profile)
+
+            # الجولة التالية بدون رسائل جديدة (deltaLink فقط)
+            results["sync.graph_no_changes"] = measure(
+                "sync.graph_no_changes",
+                lambda: read_messages_delta("bench-token", delta_link=delta_link,
+                                            body_filter=should_fetch_full_body),
+                5, warmup=False,
+            )
+
+            # نفس الرسائل مرة ثانية: كلها مكررة (البصمة) ولا يُحفظ شيء
+            with sync_run("bench.graph_duplicates", profile=False, trace_memory=False, store=False) as run:
+                result = process_messages(fetched, "outlook")
+            results["sync.graph_duplicates"] = _sync_result(
+                "sync.graph_duplicates", run, len(fetched), result)
+
+    if imap_raw:
+        with fake_imap(imap_raw, latency=latency) as server:
+            with sync_run("bench.imap", profile=profile, trace_memory=False, store=False) as run:
+                start = perf_counter()
+                fetched, _state = read_new_messages_from_imap(
+                    "imap.bench.local", 993, "bench", "bench", max_messages=None
+                )
+                run.add_phase("fetch", perf_counter() - start)
+                result = process_messages(fetched, "imap")
+            results["sync.imap"] = _sync_result("sync.imap", run, len(fetched), result)
+            results["sync.imap"]["commands"] = server.commands
+            if run.profile:
+                print(run.profile)
+
+    return results
+
+
+def db_function_timings() -> Dict[str, Dict]:
+    """أبطأ دوال core.db خلال التشغيل (هيستوغرامات instrument_module)"""
+    from core.instrumentation import get_timings
+
+    timings = sorted(get_timings().items(), key=lambda item: item[1]["total_ms"], reverse=True)
+    print("\ncore.db functions (by total time, p50/p95 = histogram bucket bounds)")
+    print(f"  {'':<36}{'calls':>8}{'p50 ms':>10}{'p95 ms':>10}{'total ms':>12}")
+    for name, stats in timings[:DB_FUNCTIONS_REPORTED]:
+        print(f"  {name:<36}{stats['calls']:>8}{stats['p50_ms']:>10.2f}"
+              f"{stats['p95_ms']:>10.2f}{stats['total_ms']:>12.1f}")
+    return dict(timings)
+
+
+def compare(results: Dict, meta: Dict, baseline_path: str, threshold: float) -> List[str]:
+    """
+    مقارنة p95 (أو مدة المزامنة) مع ملف نتائج سابق؛ يعيد القياسات المتراجعة
+
+    إذا اختلفت البيانات أو الإعدادات (COMPARE_META_KEYS) تُعرض المقارنة للاطلاع
+    فقط مع تحذير، ولا تُعاد تراجعات (لا exit 1)
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    baseline = data.get("results", {})
+    baseline_meta = data.get("meta", {})
+
+    mismatches = [
+        key for key in COMPARE_META_KEYS
+        if baseline_meta.get(key) != meta.get(key)
+    ]
+    if mismatches:
+        print(f"\nWARNING: {baseline_path} was produced with different data/settings;"
+              " comparison is informational only (exit code not affected)")
+        for key in mismatches:
+            print(f"  {key}: baseline={baseline_meta.get(key, '(missing)')} current={meta.get(key)}")
+
+    regressions = []
+    print(f"\nCompared with {baseline_path} (threshold +{threshold:.0%})")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        key = "p95_ms" if "p95_ms" in current else "seconds"
+        old, new = previous.get(key), current.get(key)
+        if not old or new is None:
+            continue
+        if key == "p95_ms" and max(old, new) < COMPARE_MIN_MS:
+            continue
+        change = (new - old) / old
+        marker = ""
+        if change > threshold:
+            marker = "  << REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            marker = "  improved"
+        print(f"  {name:<36}{old:>10.2f} -> {new:>10.2f} {key}  {change:+.0%}{marker}")
+    return [] if mismatches else regressions
+
+
+# =========================
+# Main
+# =========================
+def _prepare_database(path: Optional[str]) -> str:
+    if not path:
+        path = os.path.join(tempfile.mkdtemp(prefix="efm_bench_"), "bench.db")
+    db.DB_PATH = os.path.abspath(path)
+    db.init_db()
+    return db.DB_PATH
+
+
+def _row_count(table: str) -> int:
+    conn = db.get_connection()
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmark suite for the CRM core")
+    parser.add_argument("--db", help="قاعدة بيانات القياس (افتراضياً ملف مؤقت جديد)")
+    parser.add_argument("--clients", type=int, default=10000)
+    parser.add_argument("--messages-per-client", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=20, help="عدد مرات تشغيل كل قياس")
+    parser.add_argument("--mailbox", type=int, default=2000, help="عدد رسائل إعادة تشغيل المزامنة")
+    parser.add_argument("--graph-payload", help="حمولة Graph مسجلة (JSON) بدلاً من المولدة")
+    parser.add_argument("--imap-mbox", help="ملف mbox مسجل بدلاً من الرسائل المولدة")
+    parser.add_argument("--save-payloads", help="مجلد لحفظ الحمولات المولدة (graph.json / inbox.mbox)")
+    parser.add_argument("--latency", type=float, default=0.0, help="تأخير كل طلب وهمي بالثواني")
+    parser.add_argument("--profile", action="store_true", help="cProfile لجولات المزامنة")
+    parser.add_argument("--skip-queries", action="store_true")
+    parser.add_argument("--skip-sync", action="store_true")
+    parser.add_argument("--json", help="حفظ النتائج في ملف JSON")
+    parser.add_argument("--compare", help="ملف نتائج سابق للمقارنة")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    from .synthetic_data import (
+        dataset_client_emails, generate_dataset, generate_mailbox, load_graph_payload,
+        load_mbox, save_graph_payload, save_mbox, to_rfc822,
+    )
+
+    path = _prepare_database(args.db)
+    print(f"Database: {path}")
+
+    results = {}
+    meta = {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "clients": args.clients,
+        "messages_per_client": args.messages_per_client,
+        "repeat": args.repeat,
+        "mailbox": args.mailbox,
+        "latency": args.latency,
+        "graph_payload": os.path.basename(args.graph_payload) if args.graph_payload else None,
+        "imap_mbox": os.path.basename(args.imap_mbox) if args.imap_mbox else None,
+    }
+
+    # ---------- Dataset ----------
+    if _row_count("clients") == 0:
+        print(f"Generating {args.clients} clients x {args.messages_per_client} messages (seed {args.seed})...")
+        start = perf_counter()
+        counts = generate_dataset(
+            clients=args.clients, messages_per_client=args.messages_per_client,
+            seed=args.seed, progress=lambda text: print(f"  {text}", end="\r"),
+        )
+        seconds = perf_counter() - start
+        rows = sum(counts.values())
+        print()
+        print(f"  generated {counts} in {seconds:.1f}s ({rows / seconds:.0f} rows/s)")
+        results["dataset.generate"] = {
+            "seconds": round(seconds, 3), "rows": rows, "throughput": round(rows / seconds, 1),
+        }
+    else:
+        print("  using existing data (delete the file or use a new --db to regenerate)")
+    meta["rows"] = {
+        table: _row_count(table)
+        for table in ("clients", "messages", "requests", "tasks", "sales_deals")
+    }
+
+    # ---------- Queries ----------
+    if not args.skip_queries:
+        results.update(bench_queries(args.repeat, args.seed))
+
+    # ---------- Sync replay ----------
+    if not args.skip_sync:
+        if args.graph_payload:
+            graph_messages = load_graph_payload(args.graph_payload)
+        else:
+            graph_messages = generate_mailbox(
+                args.mailbox, seed=args.seed + 1, known_emails=dataset_client_emails(5000)
+            )
+        if args.imap_mbox:
+            imap_raw = load_mbox(args.imap_mbox)
+        else:
+            imap_raw = [to_rfc822(m) for m in reversed(generate_mailbox(
+                args.mailbox, seed=args.seed + 2, known_emails=dataset_client_emails(5000)
+            ))]
+        if args.save_payloads:
+            os.makedirs(args.save_payloads, exist_ok=True)
+            save_graph_payload(os.path.join(args.save_payloads, "graph.json"), graph_messages)
+            save_mbox(os.path.join(args.save_payloads, "inbox.mbox"), imap_raw)
+        results.update(bench_sync(graph_messages, imap_raw, args.latency, args.profile))
+
+    db_functions = db_function_timings()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results, "db_functions": db_functions},
+                      f, ensure_ascii=False, indent=2)
+        print(f"\nResults saved to {args.json}")
+
+    if args.compare:
+        regressions = compare(results, meta, args.compare, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
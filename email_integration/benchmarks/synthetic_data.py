@@ -0,0 +1,511 @@
+"""
+مولد بيانات CRM وصندوق بريد تجريبية (نفس seed = نفس البيانات)
+Synthetic CRM / mailbox generator
+
+- generate_dataset(): عملاء ورسائل وطلبات ومهام وصفقات (10 آلاف - مليون صف)
+  مباشرة بـ executemany في معاملة واحدة لكل دفعة؛ المحفزات (الملخصات، FTS،
+  آخر تواصل) تعمل كما في الاستخدام الحقيقي
+- الرسائل من مجموعة نصوص عربية وإنجليزية (HTML ونص عادي) تُحلَّل مرة واحدة
+  لكل قالب (analyze_message) وتُنسخ أعمدة التحليل لكل رسالة تستخدمه
+- generate_mailbox(): رسائل بتنسيق Graph (عملاء معروفون + جدد + نشرات/إشعارات
+  تفلترها المزامنة) و to_rfc822() لنفس الرسائل كـ IMAP
+- save/load_graph_payload و save/load_mbox: حفظ الحمولات أو تحميل حمولات مسجلة
+"""
+import json
+import mailbox
+import random
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import format_datetime, make_msgid
+from typing import Callable, Dict, List, Optional
+
+from core.db import get_connection
+from core.message_analysis import MESSAGE_ANALYSIS_COLUMNS, analyze_message, message_fingerprint
+from core.models import classify_client
+from core.sales import SALES_STAGES, STAGE_PROBABILITY
+from core.tasks import PRIORITIES, TASK_TYPES, STATUS_PENDING, STATUS_COMPLETED, STATUS_IN_PROGRESS
+
+# كل التواريخ نسبية لهذا اليوم حتى تتطابق البيانات بين التشغيلات
+BASE_DATE = datetime(2025, 1, 1)
+DATASET_DAYS = 730
+
+# عدد القوالب المختلفة لمحتوى الرسائل (كل قالب يُحلَّل مرة واحدة)
+BODY_POOL_SIZE = 400
+INSERT_BATCH_SIZE = 5000
+
+PRODUCTS = [
+    ("dried onion", "بصل مجفف"),
+    ("dehydrated leek", "كرات مجفف"),
+    ("garlic powder", "ثوم بودرة"),
+    ("dried parsley", "بقدونس مجفف"),
+    ("dill tips", "شبت مجفف"),
+    ("red chili crushed", "فلفل أحمر مجروش"),
+    ("dried mint", "نعناع مجفف"),
+    ("basil leaves", "ريحان مجفف"),
+    ("dehydrated carrots", "جزر مجفف"),
+    ("onion powder", "بصل بودرة"),
+]
+SPECS = ["flakes 10x10mm", "granules 1-3mm", "powder 80-100 mesh", "minced 3-5mm", "kibbled 8-15mm"]
+INCOTERMS = ["FOB Alexandria", "CIF Hamburg", "CFR Jebel Ali", "CIF Rotterdam", "EXW Cairo"]
+
+COUNTRIES = [
+    "Germany", "Netherlands", "Poland", "United Kingdom", "USA", "Canada", "Saudi Arabia",
+    "UAE", "Kuwait", "Jordan", "Morocco", "Turkey", "Italy", "Spain", "France", "Japan",
+    "South Africa", "Brazil", "India", "Egypt",
+]
+COMPANY_PREFIXES = [
+    "Nordic", "Global", "Al Noor", "Delta", "Golden", "Green Valley", "Atlas", "Royal",
+    "Euro", "Pacific", "Al Rawabi", "Sahara", "Blue Ocean", "Prime", "Orient", "Hanse",
+]
+COMPANY_CORES = ["Foods", "Spices", "Ingredients", "Trading", "Import Export", "Agro", "Herbs", "Fine Foods"]
+COMPANY_SUFFIXES = ["GmbH", "LLC", "B.V.", "Ltd", "Co.", "S.A.", "Sp. z o.o.", "FZE", ""]
+FIRST_NAMES = [
+    "Anna", "Lukas", "Mohamed", "Sara", "Piotr", "Emma", "Ahmed", "Fatima", "John", "Maria",
+    "Khaled", "Noor", "Hans", "Olga", "Yusuf", "Laila", "David", "Mona", "Omar", "Julia",
+]
+LAST_NAMES = [
+    "Schmidt", "Hassan", "Kowalski", "Smith", "Al Sayed", "Jansen", "Rossi", "Ibrahim",
+    "Garcia", "Nowak", "Mahmoud", "Müller", "Haddad", "Brown", "Yilmaz", "Farouk",
+]
+CLIENT_STATUSES = ["New", "Contacted", "Requested Price", "Samples Requested", "Negotiating", "No Reply"]
+
+EN_SUBJECTS = [
+    "Price request for {product}",
+    "Inquiry: {product} {spec} - {qty} MT",
+    "Quotation needed for {product} ({incoterm})",
+    "Re: Sample of {product}",
+    "Re: Re: Offer {product} {spec}",
+    "MOQ and payment terms for {product}",
+    "Follow up on our order of {product}",
+    "Meeting next week about {product} supply",
+]
+AR_SUBJECTS = [
+    "طلب عرض سعر {product_ar}",
+    "استفسار عن {product_ar} - {qty} طن",
+    "طلب عينة من {product_ar}",
+    "رد: عرض {product_ar} {incoterm}",
+    "متابعة طلب {product_ar}",
+]
+EN_PARAGRAPHS = [
+    "We are interested in {product} {spec} and would like to receive your best price {incoterm} for {qty} MT.",
+    "Could you please send us a sample of {product}? Our QC team needs to check color, moisture and microbiology.",
+    "Please advise the MOQ, lead time and payment terms. We usually work with 30% advance and balance against documents.",
+    "Thank you for your offer. The price is a bit high compared to other suppliers, can you improve it for a 12 month contract?",
+    "Attached you will find our specification sheet. The product must be steam sterilized and free from foreign matter.",
+    "We received the samples and our customer approved the quality. Please send the proforma invoice for the first container.",
+    "Our current supplier had delays, so we are looking for a reliable partner for {product} in Egypt.",
+    "Kindly confirm the packing: 20 kg cartons with PE liner, {qty} MT per 40ft container.",
+]
+AR_PARAGRAPHS = [
+    "نحن مهتمون بشراء {product_ar} بمواصفات {spec} ونرجو إرسال أفضل سعر {incoterm} لكمية {qty} طن.",
+    "برجاء إرسال عينة من {product_ar} لفحص اللون ونسبة الرطوبة قبل تأكيد الطلب.",
+    "ما هو الحد الأدنى للطلب ومدة التوريد وشروط الدفع؟",
+    "شكراً على العرض، السعر مرتفع قليلاً مقارنة بالموردين الآخرين، هل يمكن تحسينه لعقد سنوي؟",
+    "تم استلام العينات ووافق العميل على الجودة، برجاء إرسال الفاتورة المبدئية للحاوية الأولى.",
+    "نبحث عن مورد موثوق لـ {product_ar} من مصر بكميات شهرية ثابتة.",
+]
+EN_CLOSINGS = ["Best regards,", "Kind regards,", "Thanks and regards,", "Looking forward to your reply,"]
+AR_CLOSINGS = ["مع خالص التحية،", "وتفضلوا بقبول فائق الاحترام،", "شكراً لكم،"]
+# رسائل تفلترها المزامنة (نشرات، إشعارات آلية)
+NOISE_MESSAGES = [
+    ("newsletter@{domain}", "Weekly newsletter: {month} market update",
+     "Unsubscribe from this newsletter at any time. This week's market update and offers."),
+    ("noreply@{domain}", "Your password will expire soon",
+     "This is an automated message, please do not reply. Your password expires in 3 days."),
+    ("notifications@{domain}", "Delivery status notification",
+     "Mail delivery failed: returning message to sender. This is an automatically generated message."),
+]
+
+
+def _fill(template: str, rng: random.Random) -> str:
+    product, product_ar = rng.choice(PRODUCTS)
+    return template.format(
+        product=product,
+        product_ar=product_ar,
+        spec=rng.choice(SPECS),
+        incoterm=rng.choice(INCOTERMS),
+        qty=rng.choice([5, 10, 12, 18, 20, 24, 40, 100]),
+        month=rng.choice(["January", "March", "June", "September", "November"]),
+    )
+
+
+def _signature(name: str, company: str, phone: str) -> List[str]:
+    return [name, company, f"Tel: {phone}"]
+
+
+def make_message_text(rng: random.Random, name: str = "", company: str = "",
+                      phone: str = "", arabic: Optional[bool] = None, html: Optional[bool] = None):
+    """
+    موضوع + محتوى رسالة واقعية
+
+    Returns:
+        (subject, body, is_html)
+    """
+    if arabic is None:
+        arabic = rng.random() < 0.3
+    if html is None:
+        html = rng.random() < 0.7
+    subjects, paragraphs, closings = (
+        (AR_SUBJECTS, AR_PARAGRAPHS, AR_CLOSINGS) if arabic
+        else (EN_SUBJECTS, EN_PARAGRAPHS, EN_CLOSINGS)
+    )
+    greeting = "السادة المحترمين،" if arabic else rng.choice(["Dear Sir/Madam,", "Hello,", "Dear Team,"])
+    lines = [greeting]
+    lines.extend(_fill(p, rng) for p in rng.sample(paragraphs, rng.randint(1, 3)))
+    lines.append(rng.choice(closings))
+    lines.extend(_signature(name or "Purchasing", company or "Purchasing Dept.", phone or "+49 40 000000"))
+    if rng.random() < 0.25:
+        quoted = _fill(rng.choice(EN_PARAGRAPHS), rng)
+        lines.append(f"> On {BASE_DATE:%d %b %Y}, EFM Export wrote:")
+        lines.append(f"> {quoted}")
+
+    subject = _fill(rng.choice(subjects), rng)
+    if html:
+        direction = ' dir="rtl"' if arabic else ""
+        body = f"<html><body{direction}>" + "".join(
+            f"<p>{line}</p>" for line in lines
+        ) + "</body></html>"
+    else:
+        body = "\n\n".join(lines)
+    return subject, body, html
+
+
+def _company_name(rng: random.Random, index: int) -> str:
+    suffix = rng.choice(COMPANY_SUFFIXES)
+    name = f"{rng.choice(COMPANY_PREFIXES)} {rng.choice(COMPANY_CORES)}"
+    # الرقم يضمن أسماء مختلفة مع بقاء الشكل واقعياً
+    return f"{name} {index}" + (f" {suffix}" if suffix else "")
+
+
+def _domain(company: str) -> str:
+    slug = "".join(ch for ch in company.lower() if ch.isalnum())
+    return f"{slug[:24]}.example.com"
+
+
+def _phone(rng: random.Random) -> str:
+    return f"+{rng.randint(20, 998)} {rng.randint(10, 99)} {rng.randint(1000000, 9999999)}"
+
+
+def _date(rng: random.Random, days: int = DATASET_DAYS) -> datetime:
+    return BASE_DATE - timedelta(days=rng.randint(0, days), minutes=rng.randint(0, 1439))
+
+
+def _build_body_pool(rng: random.Random, size: int) -> List[Dict]:
+    """قوالب الرسائل مع نتيجة التحليل (مرة واحدة لكل قالب)"""
+    pool = []
+    for _ in range(size):
+        subject, body, html = make_message_text(
+            rng, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            _company_name(rng, rng.randint(1, 999)), _phone(rng)
+        )
+        analysis = analyze_message(subject, body, is_plain_text=not html)
+        pool.append({"subject": subject, "body": body, "analysis": analysis})
+    return pool
+
+
+def generate_dataset(clients: int = 10000, messages_per_client: float = 5.0,
+                     requests_per_client: float = 0.4, tasks_per_client: float = 0.5,
+                     deals_per_client: float = 0.2, seed: int = 42,
+                     progress: Optional[Callable[[str], None]] = None) -> Dict[str, int]:
+    """
+    توليد بيانات CRM في قاعدة البيانات الحالية (core.db.DB_PATH)
+
+    Args:
+        clients: عدد العملاء
+        messages_per_client / requests_per_client / tasks_per_client / deals_per_client:
+            متوسط عدد الصفوف لكل عميل (التوزيع غير متساوٍ: قلة من العملاء لديهم معظم الرسائل)
+        seed: نفس seed = نفس البيانات
+        progress: دالة اختيارية لرسائل التقدم
+
+    Returns:
+        عدد الصفوف المضافة لكل جدول
+    """
+    rng = random.Random(seed)
+    report = progress or (lambda text: None)
+    counts = {"clients": 0, "messages": 0, "requests": 0, "tasks": 0, "sales_deals": 0}
+
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM clients")
+        first_id = cur.fetchone()[0] + 1
+
+        # ---------- Clients ----------
+        classifications = {}
+        client_rows = []
+        client_emails = []
+        for n in range(clients):
+            company = _company_name(rng, first_id + n)
+            contact = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            email = f"{contact.split()[0].lower()}.{first_id + n}@{_domain(company)}"
+            score = max(0, int(rng.gauss(25, 20)))
+            if score not in classifications:
+                classifications[score] = classify_client(score)
+            client_emails.append(email)
+            client_rows.append((
+                company, rng.choice(COUNTRIES), contact, email, _phone(rng),
+                f"https://www.{_domain(company)}", _date(rng).strftime("%d/%m/%Y"),
+                rng.choice(CLIENT_STATUSES), score, classifications[score],
+                1 if rng.random() < 0.03 else 0,
+            ))
+        for i in range(0, len(client_rows), INSERT_BATCH_SIZE):
+            cur.executemany("""
+                INSERT INTO clients (
+                    company_name, country, contact_person, email, phone, website,
+                    date_added, status, seriousness_score, classification, is_focus
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, client_rows[i:i + INSERT_BATCH_SIZE])
+        counts["clients"] = len(client_rows)
+        report(f"clients: {len(client_rows)}")
+        del client_rows
+
+        def pick_client() -> int:
+            # random()^2: توزيع منحاز (بعض العملاء نشطون جداً)
+            return first_id + int(clients * rng.random() ** 2)
+
+        # ---------- Messages ----------
+        pool = _build_body_pool(rng, BODY_POOL_SIZE)
+        total_messages = int(clients * messages_per_client)
+        columns = ", ".join(MESSAGE_ANALYSIS_COLUMNS)
+        marks = ", ".join("?" * (len(MESSAGE_ANALYSIS_COLUMNS) + 10))
+        sql = f"""
+            INSERT INTO messages (
+                client_id, message_date, actual_date, message_type, channel,
+                client_response, notes, score_effect, internet_message_id, fingerprint,
+                {columns}
+            )
+            VALUES ({marks})
+            ON CONFLICT DO NOTHING
+        """
+        batch = []
+        for n in range(total_messages):
+            template = pool[rng.randrange(len(pool))]
+            analysis = template["analysis"]
+            client_id = pick_client()
+            sent = _date(rng)
+            sent_str = sent.strftime("%d/%m/%Y")
+            reference = f"\n\nRef: PO-{seed}-{n}"
+            analysis_columns = analysis.columns()
+            body_text = analysis_columns[0] + reference
+            batch.append((
+                client_id, sent_str, sent_str, "Email",
+                rng.choice(("Outlook", "Outlook", "IMAP", "WhatsApp")),
+                template["subject"], template["body"] + reference, analysis.score_effect,
+                f"bench-{seed}-{first_id}-{n}@synthetic.local",
+                message_fingerprint(client_id, sent_str, template["subject"], body_text),
+                body_text,
+            ) + analysis_columns[1:])
+            if len(batch) >= INSERT_BATCH_SIZE:
+                cur.executemany(sql, batch)
+                conn.commit()
+                batch = []
+                report(f"messages: {n + 1}/{total_messages}")
+        if batch:
+            cur.executemany(sql, batch)
+        counts["messages"] = total_messages
+
+        # ---------- Requests ----------
+        request_types = ["Price Request", "Sample Request", "Price Request, Sample Request",
+                         "MOQ Request", "General Inquiry"]
+        rows = []
+        for _ in range(int(clients * requests_per_client)):
+            client_id = pick_client()
+            subject, body, _html = make_message_text(rng, html=False)
+            rows.append((
+                client_id, client_emails[client_id - first_id], rng.choice(request_types),
+                body[:500], subject,
+                "open" if rng.random() < 0.6 else "closed",
+                "pending" if rng.random() < 0.5 else "replied",
+                _date(rng, 365).strftime("%Y-%m-%d %H:%M:%S"),
+            ))
+        cur.executemany("""
+            INSERT INTO requests (
+                client_id, client_email, request_type, extracted_text, notes,
+                status, reply_status, created_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        counts["requests"] = len(rows)
+
+        # ---------- Tasks ----------
+        task_statuses = [STATUS_PENDING, STATUS_PENDING, STATUS_IN_PROGRESS, STATUS_COMPLETED]
+        rows = []
+        for _ in range(int(clients * tasks_per_client)):
+            client_id = pick_client()
+            due = BASE_DATE + timedelta(days=rng.randint(-60, 60))
+            task_type = rng.choice(list(TASK_TYPES))
+            rows.append((
+                client_id, f"{task_type.replace('_', ' ').title()} - {rng.choice(PRODUCTS)[0]}",
+                "", task_type, rng.choice(list(PRIORITIES)), rng.choice(task_statuses),
+                due.strftime("%d/%m/%Y"), (due - timedelta(days=1)).strftime("%d/%m/%Y"),
+                (due - timedelta(days=14)).strftime("%Y-%m-%d %H:%M:%S"), "",
+            ))
+        cur.executemany("""
+            INSERT INTO tasks (
+                client_id, title, description, task_type, priority, status,
+                due_date, reminder_date, created_at, notes
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        counts["tasks"] = len(rows)
+
+        # ---------- Deals ----------
+        rows = []
+        for _ in range(int(clients * deals_per_client)):
+            client_id = pick_client()
+            stage = rng.choice(SALES_STAGES)
+            product = rng.choice(PRODUCTS)[0]
+            created = _date(rng, 365)
+            status = {"Closed Won": "won", "Closed Lost": "lost"}.get(stage, "active")
+            rows.append((
+                client_id, f"{product.title()} - {rng.choice(INCOTERMS)}", product, stage,
+                round(rng.uniform(2000, 120000), 2), rng.choice(("USD", "USD", "EUR")),
+                STAGE_PROBABILITY[stage],
+                (created + timedelta(days=rng.randint(15, 120))).strftime("%d/%m/%Y"),
+                status, created.strftime("%d/%m/%Y %H:%M"), created.strftime("%d/%m/%Y %H:%M"),
+                "Benchmark",
+            ))
+        cur.executemany("""
+            INSERT INTO sales_deals (
+                client_id, deal_name, product_name, stage, value, currency,
+                probability, expected_close_date, status, created_date, updated_date, created_by
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        counts["sales_deals"] = len(rows)
+
+        conn.commit()
+        return counts
+
+    except Exception:
+        conn.rollback()
+        raise
+
+    finally:
+        conn.close()
+
+
+def dataset_client_emails(limit: Optional[int] = None) -> List[str]:
+    """بريد العملاء الموجودين (لتوليد رسائل من عملاء معروفين)"""
+    conn = get_connection()
+    try:
+        sql = "SELECT email FROM clients WHERE email IS NOT NULL AND email != '' ORDER BY id"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [row[0] for row in conn.execute(sql)]
+    finally:
+        conn.close()
+
+
+# =========================
+# Mailbox payloads
+# =========================
+def generate_mailbox(count: int = 1000, seed: int = 7, known_emails: Optional[List[str]] = None,
+                     known_ratio: float = 0.6, noise_ratio: float = 0.15) -> List[Dict]:
+    """
+    رسائل صندوق وارد بتنسيق Microsoft Graph (الأحدث أولاً)
+
+    Args:
+        count: عدد الرسائل
+        known_emails: بريد عملاء موجودين (نسبة known_ratio من الرسائل منهم)
+        noise_ratio: نسبة النشرات والإشعارات الآلية (تُفلتر في المزامنة)
+    """
+    rng = random.Random(seed)
+    known_emails = list(known_emails or [])
+    new_senders = []
+    for n in range(max(1, count // 4)):
+        company = _company_name(rng, 900000 + n)
+        contact = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        new_senders.append((f"{contact.split()[0].lower()}.{n}@{_domain(company)}", contact, company))
+
+    messages = []
+    for n in range(count):
+        received = BASE_DATE + timedelta(minutes=n * 7)
+        roll = rng.random()
+        if roll < noise_ratio:
+            sender, subject, body = rng.choice(NOISE_MESSAGES)
+            domain = _domain(_company_name(rng, n))
+            address, name = sender.format(domain=domain), "Mailer"
+            subject, body, html = _fill(subject, rng), _fill(body, rng), False
+        else:
+            if known_emails and roll < noise_ratio + known_ratio * (1 - noise_ratio):
+                address = rng.choice(known_emails)
+                name = address.split("@")[0].split(".")[0].title()
+                company = address.split("@")[1].split(".")[0].title()
+            else:
+                address, name, company = rng.choice(new_senders)
+            subject, body, html = make_message_text(rng, name, company, _phone(rng))
+        messages.append({
+            "id": f"AAMk-bench-{seed}-{n}",
+            "internetMessageId": f"<bench-mail-{seed}-{n}@synthetic.local>",
+            "subject": subject,
+            "from": {"emailAddress": {"name": name, "address": address}},
+            "toRecipients": [{"emailAddress": {"name": "EFM Export", "address": "sales@efm-export.example.com"}}],
+            "receivedDateTime": received.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "sentDateTime": received.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "body": {"contentType": "html" if html else "text", "content": body},
+        })
+    messages.reverse()
+    return messages
+
+
+def to_rfc822(message: Dict) -> bytes:
+    """رسالة بتنسيق Graph -> RFC822 (لخادم IMAP الوهمي)"""
+    sender = message["from"]["emailAddress"]
+    recipient = message["toRecipients"][0]["emailAddress"]
+    msg = EmailMessage()
+    msg["Subject"] = message.get("subject", "")
+    msg["From"] = f'{sender.get("name", "")} <{sender["address"]}>'
+    msg["To"] = f'{recipient.get("name", "")} <{recipient["address"]}>'
+    received = datetime.strptime(message["receivedDateTime"], "%Y-%m-%dT%H:%M:%SZ")
+    msg["Date"] = format_datetime(received)
+    msg["Message-ID"] = message.get("internetMessageId") or make_msgid()
+    body = message.get("body") or {}
+    subtype = "html" if (body.get("contentType") or "").lower() == "html" else "plain"
+    msg.set_content(body.get("content", ""), subtype=subtype, charset="utf-8")
+    return msg.as_bytes()
+
+
+def save_graph_payload(path: str, messages: List[Dict]):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"value": messages}, f, ensure_ascii=False)
+
+
+def load_graph_payload(path: str) -> List[Dict]:
+    """
+    حمولة Graph مسجلة: {"value": [...]} أو قائمة رسائل أو قائمة صفحات
+    (كما تُحفظ ردود messages/delta كما هي)
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("value", [])
+    messages = []
+    for item in data:
+        if isinstance(item, dict) and "value" in item and "id" not in item:
+            messages.extend(m for m in item["value"] if "@removed" not in m)
+        elif isinstance(item, dict) and "@removed" not in item:
+            messages.append(item)
+    return messages
+
+
+def save_mbox(path: str, raw_messages: List[bytes]):
+    box = mailbox.mbox(path)
+    try:
+        box.lock()
+        for raw in raw_messages:
+            box.add(raw)
+        box.flush()
+    finally:
+        box.unlock()
+        box.close()
+
+
+def load_mbox(path: str) -> List[bytes]:
+    """رسائل RFC822 من ملف mbox (تصدير أي عميل بريد) بالترتيب"""
+    box = mailbox.mbox(path, create=False)
+    try:
+        return [message.as_bytes() for message in box]
+    finally:
+        box.close()
@@ -6,6 +6,8 @@ import sqlite3
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple
 from .db import get_connection
+from .fulltext import fts_query, fulltext_available, snippet_sql
+from .text_normalize import normalize_text
 
 
 def search_clients_advanced(
@@ -35,19 +37,32 @@ def search_clients_advanced(
     conn = get_connection()
     cur = conn.cursor()
     
+    match = fts_query(search_text) if search_text else ""
+    use_fts = bool(match) and fulltext_available(cur, "clients_fts")
+    
     query = """
         SELECT
             id, company_name, country, contact_person, email,
             phone, website, date_added, status, seriousness_score,
             classification, is_focus
         FROM clients
-        WHERE 1=1
     """
     
     params = []
     
-    # البحث النصي
-    if search_text:
+    # البحث النصي (فهرس FTS5 مرتب بـ bm25، أو LIKE إن لم يتوفر الفهرس)
+    if use_fts:
+        query = """
+            WITH hits AS (
+                SELECT rowid AS hit_id, bm25(clients_fts) AS hit_rank
+                FROM clients_fts
+                WHERE clients_fts MATCH ?
+            )
+        """ + query + " JOIN hits ON hits.hit_id = clients.id"
+        params.append(match)
+    query += " WHERE 1=1"
+    
+    if search_text and not use_fts:
         search_pattern = f'%{search_text.lower()}%'
         query += """
             AND (
@@ -88,7 +103,10 @@ def search_clients_advanced(
         else:
             query += " AND is_focus = 0"
     
-    query += " ORDER BY is_focus DESC, seriousness_score DESC"
+    if use_fts:
+        query += " ORDER BY is_focus DESC, hit_rank, seriousness_score DESC"
+    else:
+        query += " ORDER BY is_focus DESC, seriousness_score DESC"
     
     cur.execute(query, tuple(params))
     rows = cur.fetchall()
@@ -103,7 +121,9 @@ def search_messages_advanced(
     channel: str = None,
     message_type: str = None,
     date_from: str = None,
-    date_to: str = None
+    date_to: str = None,
+    language: str = None,
+    request_type: str = None
 ) -> List[Dict]:
     """
     بحث متقدم في الرسائل
@@ -115,32 +135,48 @@ def search_messages_advanced(
         message_type: نوع الرسالة
         date_from: تاريخ البداية (dd/mm/yyyy)
         date_to: تاريخ النهاية (dd/mm/yyyy)
+        language: لغة الرسالة المكتشفة (arabic, english, ...)
+        request_type: نوع الطلب المكتشف (مثل "Price Request")
     
     Returns:
         قائمة من الرسائل مع معلومات العميل
+        (مع snippet: مقتطف يميّز الكلمات المطابقة عند البحث النصي بالفهرس)
     """
     conn = get_connection()
     cur = conn.cursor()
     
-    query = """
+    match = fts_query(search_text) if search_text else ""
+    use_fts = bool(match) and fulltext_available(cur, "messages_fts")
+    
+    query = f"""
         SELECT
             m.id, m.client_id, c.company_name, m.message_date,
             m.message_type, m.channel, m.client_response,
-            m.notes, m.score_effect
+            m.notes, m.score_effect,
+            m.body_text, m.language, m.request_type,
+            {snippet_sql("messages_fts") if use_fts else "NULL"}
         FROM messages m
         LEFT JOIN clients c ON m.client_id = c.id
-        WHERE 1=1
     """
     
     params = []
     
-    # البحث النصي
-    if search_text:
-        search_pattern = f'%{search_text.lower()}%'
+    # البحث النصي (فهرس FTS5 مرتب بـ bm25، أو LIKE على body_text إن لم يتوفر الفهرس)
+    if use_fts:
+        query += """
+            JOIN messages_fts ON messages_fts.rowid = m.id
+            WHERE messages_fts MATCH ?
+        """
+        params.append(match)
+    else:
+        query += " WHERE 1=1"
+    
+    if search_text and not use_fts:
+        search_pattern = f'%{normalize_text(search_text).lower()}%'
         query += """
             AND (
                 LOWER(m.client_response) LIKE ? OR
-                LOWER(m.notes) LIKE ?
+                LOWER(COALESCE(m.body_text, m.notes)) LIKE ?
             )
         """
         params.extend([search_pattern] * 2)
@@ -158,25 +194,37 @@ def search_messages_advanced(
         query += " AND m.message_type = ?"
         params.append(message_type)
     
+    # نتائج التحليل المخزنة مع الرسالة
+    if language:
+        query += " AND m.language = ?"
+        params.append(language)
+    
+    if request_type:
+        query += " AND m.request_type LIKE ?"
+        params.append(f"%{request_type}%")
+    
     # البحث حسب التاريخ
     if date_from:
         try:
             # تحويل التاريخ إلى تنسيق قابل للمقارنة
             date_from_obj = datetime.strptime(date_from, "%d/%m/%Y")
-            query += " AND m.message_date >= ?"
-            params.append(date_from)
+            query += " AND m.message_date_iso >= ?"
+            params.append(date_from_obj.strftime("%Y-%m-%d"))
         except ValueError:
             pass
     
     if date_to:
         try:
             date_to_obj = datetime.strptime(date_to, "%d/%m/%Y")
-            query += " AND m.message_date <= ?"
-            params.append(date_to)
+            query += " AND m.message_date_iso <= ?"
+            params.append(date_to_obj.strftime("%Y-%m-%d"))
         except ValueError:
             pass
     
-    query += " ORDER BY m.message_date DESC"
+    if use_fts:
+        query += " ORDER BY bm25(messages_fts), m.message_date_iso DESC"
+    else:
+        query += " ORDER BY m.message_date_iso DESC"
     
     cur.execute(query, tuple(params))
     rows = cur.fetchall()
@@ -194,7 +242,11 @@ def search_messages_advanced(
             'channel': row[5],
             'client_response': row[6],
             'notes': row[7],
-            'score_effect': row[8]
+            'score_effect': row[8],
+            'body_text': row[9],
+            'language': row[10],
+            'request_type': row[11],
+            'snippet': row[12]
         })
     
     return messages
@@ -223,24 +275,55 @@ def search_requests_advanced(
     
     Returns:
         قائمة من الطلبات
+        (مع snippet: مقتطف يميّز الكلمات المطابقة عند البحث النصي بالفهرس)
     """
     conn = get_connection()
     cur = conn.cursor()
     
-    query = """
-        SELECT
-            r.id, r.client_id, c.company_name, r.client_email,
-            r.request_type, r.status, r.reply_status,
-            r.extracted_text, r.notes, r.created_at
-        FROM requests r
-        LEFT JOIN clients c ON r.client_id = c.id
-        WHERE 1=1
-    """
+    match = fts_query(search_text) if search_text else ""
+    use_fts = (
+        bool(match)
+        and fulltext_available(cur, "requests_fts")
+        and fulltext_available(cur, "clients_fts")
+    )
     
     params = []
     
+    if use_fts:
+        # الطلبات المطابقة مرتبة بـ bm25 + طلبات العملاء الذين يطابق اسم شركتهم
+        query = f"""
+            WITH hits AS (
+                SELECT rowid AS id, bm25(requests_fts) AS rank,
+                       {snippet_sql("requests_fts")} AS snippet
+                FROM requests_fts
+                WHERE requests_fts MATCH ?
+            )
+            SELECT
+                r.id, r.client_id, c.company_name, r.client_email,
+                r.request_type, r.status, r.reply_status,
+                r.extracted_text, r.notes, r.created_at, hits.snippet
+            FROM requests r
+            LEFT JOIN clients c ON r.client_id = c.id
+            LEFT JOIN hits ON hits.id = r.id
+            WHERE (
+                hits.id IS NOT NULL OR
+                r.client_id IN (SELECT rowid FROM clients_fts WHERE clients_fts MATCH ?)
+            )
+        """
+        params.extend([match, fts_query(search_text, ["company_name"])])
+    else:
+        query = """
+            SELECT
+                r.id, r.client_id, c.company_name, r.client_email,
+                r.request_type, r.status, r.reply_status,
+                r.extracted_text, r.notes, r.created_at, NULL
+            FROM requests r
+            LEFT JOIN clients c ON r.client_id = c.id
+            WHERE 1=1
+        """
+    
     # البحث النصي
-    if search_text:
+    if search_text and not use_fts:
         search_pattern = f'%{search_text.lower()}%'
         query += """
             AND (
@@ -279,7 +362,10 @@ def search_requests_advanced(
         query += " AND r.created_at <= ?"
         params.append(date_to)
     
-    query += " ORDER BY r.created_at DESC"
+    if use_fts:
+        query += " ORDER BY COALESCE(hits.rank, 0), r.created_at DESC"
+    else:
+        query += " ORDER BY r.created_at DESC"
     
     cur.execute(query, tuple(params))
     rows = cur.fetchall()
@@ -298,7 +384,8 @@ def search_requests_advanced(
             'reply_status': row[6],
             'extracted_text': row[7],
             'notes': row[8],
-            'created_at': row[9]
+            'created_at': row[9],
+            'snippet': row[10]
         })
     
     return requests
@@ -343,7 +430,8 @@ def search_all_advanced(
             channel=filters.get('channel'),
             message_type=filters.get('message_type'),
             date_from=filters.get('date_from'),
-            date_to=filters.get('date_to')
+            date_to=filters.get('date_to'),
+            language=filters.get('language')
         )
     
     if 'requests' in search_in:
@@ -3,92 +3,146 @@
 Advanced AI-based Scoring System
 """
 import re
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
+from .keyword_engine import MessageHits, register_keywords, scan_message
 
-def detect_positive_reply(body: str) -> int:
+
+# الكلمات الإيجابية (عربي + إنجليزي)
+POSITIVE_KEYWORDS = [
+    # English
+    "interested", "please send", "price", "quotation", "quote",
+    "samples", "sample", "details", "specification", "moq",
+    "quantity", "packing", "delivery", "yes", "ok", "sounds good",
+    "looking forward", "need", "require", "want", "please share",
+    "could you", "would you", "send me", "i need", "i want",
+    "purchase", "buy", "order", "catalog", "brochure",
+    # Arabic
+    "مهتم", "يرجى", "أرسل", "السعر", "عرض سعر", "اقتباس",
+    "عينات", "عينة", "التفاصيل", "المواصفات", "الحد الأدنى",
+    "الكمية", "التعبئة", "التسليم", "نعم", "حسناً", "جيد",
+    "أحتاج", "أريد", "يرجى مشاركة", "هل يمكنك", "أرسل لي",
+    "شراء", "شرا", "طلب", "كتالوج", "بروشور", "معني",
+    "ممكن", "يرجى الإرسال", "أنا مهتم", "نحن مهتمون"
+]
+
+# الكلمات السلبية (عربي + إنجليزي)
+NEGATIVE_KEYWORDS = [
+    # English
+    "not interested", "no longer", "stop", "unsubscribe", "remove",
+    "not now", "not at this time", "maybe later", "no thanks",
+    "not right now", "decline", "refuse", "reject",
+    # Arabic
+    "غير مهتم", "لست مهتماً", "لا شكراً", "ليس الآن",
+    "ربما لاحقاً", "رفض", "لا أريد", "توقف", "ألغاء الاشتراك"
+]
+
+# الكلمات عالية الأهمية (نقاط إضافية)
+HIGH_PRIORITY_KEYWORDS = [
+    # English
+    "urgent", "asap", "immediate", "quick", "fast", "now",
+    "ready to buy", "ready to order", "placing order", "purchase order",
+    "po number", "po#", "ready to proceed", "let's proceed",
+    # Arabic
+    "عاجل", "فوري", "سريع", "الآن", "جاهز للشراء", "جاهز للطلب",
+    "أريد الشراء", "أريد الطلب", "طلب شراء", "أمر شراء"
+]
+
+# الكلمات المتوسطة (نقاط متوسطة)
+MEDIUM_PRIORITY_KEYWORDS = [
+    # English
+    "information", "info", "more info", "tell me more", "explain",
+    "how much", "what is the price", "cost", "pricing",
+    # Arabic
+    "معلومات", "مزيد من المعلومات", "أخبرني أكثر", "اشرح",
+    "كم السعر", "ما هو السعر", "التكلفة", "التسعير"
+]
+
+# العبارات الإيجابية المحددة
+POSITIVE_PHRASES = [
+    "thank you", "thanks", "شكراً", "شكرا لك",
+    "looking forward", "أتطلع", "نتطلع",
+    "best regards", "مع تحياتي", "تحياتي",
+    "waiting for", "في انتظار", "ننتظر"
+]
+
+# مؤشرات المشاعر (analyze_sentiment)
+SENTIMENT_POSITIVE = [
+    "thank", "appreciate", "excellent", "great", "good", "perfect",
+    "interested", "excited", "happy", "pleased", "satisfied",
+    "شكر", "ممتاز", "رائع", "جيد", "مثالي", "مهتم", "سعيد", "راض"
+]
+
+SENTIMENT_NEGATIVE = [
+    "not interested", "disappointed", "bad", "poor", "terrible",
+    "unhappy", "dissatisfied", "reject", "refuse", "decline",
+    "غير مهتم", "خيبة أمل", "سيء", "رفض", "مرفوض"
+]
+
+# مؤشرات نية الشراء (detect_purchase_intent)
+PURCHASE_INDICATORS = [
+    # English
+    "ready to buy", "ready to order", "place order", "purchase",
+    "placing order", "po number", "po#", "purchase order",
+    "how to order", "how to buy", "order now", "buy now",
+    "proceed with", "move forward", "let's proceed",
+    # Arabic
+    "جاهز للشراء", "جاهز للطلب", "طلب شراء", "أمر شراء",
+    "كيف أطلب", "كيف أشتري", "الطلب الآن", "الشراء الآن",
+    "المضي قدماً", "المتابعة", "نريد المتابعة"
+]
+
+register_keywords({
+    "reply.positive": POSITIVE_KEYWORDS,
+    "reply.negative": NEGATIVE_KEYWORDS,
+    "reply.high_priority": HIGH_PRIORITY_KEYWORDS,
+    "reply.medium_priority": MEDIUM_PRIORITY_KEYWORDS,
+    "reply.phrases": POSITIVE_PHRASES,
+    "sentiment.positive": SENTIMENT_POSITIVE,
+    "sentiment.negative": SENTIMENT_NEGATIVE,
+    "purchase_intent": PURCHASE_INDICATORS,
+})
+
+
+def detect_positive_reply(body: str, hits: Optional[MessageHits] = None) -> int:
     """
     تحليل رد العميل المتقدم وإرجاع تأثير النقاط
     دعم اللغة العربية والإنجليزية مع تحليل متقدم
     
+    Args:
+        body: محتوى الرد
+        hits: نتيجة scan_message(subject, body) إن كانت محسوبة مسبقاً
+              (تُستخدم كلمات المحتوى فقط)
+    
     Returns:
         int: تأثير النقاط (+ values = positive, - values = negative, 0 = neutral)
     """
     if not body:
         return 0
 
-    text = body.lower()
-    
-    # الكلمات الإيجابية (عربي + إنجليزي)
-    positive_keywords = [
-        # English
-        "interested", "please send", "price", "quotation", "quote",
-        "samples", "sample", "details", "specification", "moq",
-        "quantity", "packing", "delivery", "yes", "ok", "sounds good",
-        "looking forward", "need", "require", "want", "please share",
-        "could you", "would you", "send me", "i need", "i want",
-        "purchase", "buy", "order", "catalog", "brochure",
-        # Arabic
-        "مهتم", "يرجى", "أرسل", "السعر", "عرض سعر", "اقتباس",
-        "عينات", "عينة", "التفاصيل", "المواصفات", "الحد الأدنى",
-        "الكمية", "التعبئة", "التسليم", "نعم", "حسناً", "جيد",
-        "أحتاج", "أريد", "يرجى مشاركة", "هل يمكنك", "أرسل لي",
-        "شراء", "شرا", "طلب", "كتالوج", "بروشور", "معني",
-        "ممكن", "يرجى الإرسال", "أنا مهتم", "نحن مهتمون"
-    ]
-
-    # الكلمات السلبية (عربي + إنجليزي)
-    negative_keywords = [
-        # English
-        "not interested", "no longer", "stop", "unsubscribe", "remove",
-        "not now", "not at this time", "maybe later", "no thanks",
-        "not right now", "decline", "refuse", "reject",
-        # Arabic
-        "غير مهتم", "لست مهتماً", "لا شكراً", "ليس الآن",
-        "ربما لاحقاً", "رفض", "لا أريد", "توقف", "ألغاء الاشتراك"
-    ]
-
-    # الكلمات عالية الأهمية (نقاط إضافية)
-    high_priority_keywords = [
-        # English
-        "urgent", "asap", "immediate", "quick", "fast", "now",
-        "ready to buy", "ready to order", "placing order", "purchase order",
-        "po number", "po#", "ready to proceed", "let's proceed",
-        # Arabic
-        "عاجل", "فوري", "سريع", "الآن", "جاهز للشراء", "جاهز للطلب",
-        "أريد الشراء", "أريد الطلب", "طلب شراء", "أمر شراء"
-    ]
-
-    # الكلمات المتوسطة (نقاط متوسطة)
-    medium_priority_keywords = [
-        # English
-        "information", "info", "more info", "tell me more", "explain",
-        "how much", "what is the price", "cost", "pricing",
-        # Arabic
-        "معلومات", "مزيد من المعلومات", "أخبرني أكثر", "اشرح",
-        "كم السعر", "ما هو السعر", "التكلفة", "التسعير"
-    ]
-
+    if hits is None:
+        hits = scan_message("", body)
+    text = hits.body_text
+    
     # تحليل النص
     score = 0
     
     # 1. فحص الكلمات السلبية (أولوية عالية)
-    for keyword in negative_keywords:
-        if keyword in text:
-            return -25  # كلمة سلبية واحدة = رفض فوري
+    if hits.has("reply.negative", "body"):
+        return -25  # كلمة سلبية واحدة = رفض فوري
     
     # 2. فحص الكلمات عالية الأهمية
-    high_priority_count = sum(1 for keyword in high_priority_keywords if keyword in text)
+    high_priority_count = hits.count("reply.high_priority", "body")
     if high_priority_count > 0:
         score += 20 * min(high_priority_count, 2)  # حد أقصى 40 نقطة
     
     # 3. فحص الكلمات الإيجابية
-    positive_count = sum(1 for keyword in positive_keywords if keyword in text)
+    positive_count = hits.count("reply.positive", "body")
     if positive_count > 0:
         score += 10 * min(positive_count, 3)  # حد أقصى 30 نقطة
     
     # 4. فحص الكلمات المتوسطة
-    medium_count = sum(1 for keyword in medium_priority_keywords if keyword in text)
+    medium_count = hits.count("reply.medium_priority", "body")
     if medium_count > 0:
         score += 5 * min(medium_count, 2)  # حد أقصى 10 نقاط
     
@@ -116,14 +170,7 @@ def detect_positive_reply(body: str) -> int:
         score += 3 * min(question_count, 3)  # حد أقصى 9 نقاط
     
     # 8. فحص العبارات الإيجابية المحددة
-    positive_phrases = [
-        "thank you", "thanks", "شكراً", "شكرا لك",
-        "looking forward", "أتطلع", "نتطلع",
-        "best regards", "مع تحياتي", "تحياتي",
-        "waiting for", "في انتظار", "ننتظر"
-    ]
-    
-    phrase_count = sum(1 for phrase in positive_phrases if phrase in text)
+    phrase_count = hits.count("reply.phrases", "body")
     if phrase_count > 0:
         score += 5 * phrase_count
     
@@ -133,7 +180,7 @@ def detect_positive_reply(body: str) -> int:
     return score
 
 
-def analyze_sentiment(body: str) -> Tuple[str, float]:
+def analyze_sentiment(body: str, hits: Optional[MessageHits] = None) -> Tuple[str, float]:
     """
     تحليل المشاعر في الرسالة
     
@@ -145,22 +192,11 @@ def analyze_sentiment(body: str) -> Tuple[str, float]:
     if not body:
         return 'neutral', 0.0
     
-    text = body.lower()
-    
-    positive_indicators = [
-        "thank", "appreciate", "excellent", "great", "good", "perfect",
-        "interested", "excited", "happy", "pleased", "satisfied",
-        "شكر", "ممتاز", "رائع", "جيد", "مثالي", "مهتم", "سعيد", "راض"
-    ]
+    if hits is None:
+        hits = scan_message("", body)
     
-    negative_indicators = [
-        "not interested", "disappointed", "bad", "poor", "terrible",
-        "unhappy", "dissatisfied", "reject", "refuse", "decline",
-        "غير مهتم", "خيبة أمل", "سيء", "رفض", "مرفوض"
-    ]
-    
-    positive_count = sum(1 for word in positive_indicators if word in text)
-    negative_count = sum(1 for word in negative_indicators if word in text)
+    positive_count = hits.count("sentiment.positive", "body")
+    negative_count = hits.count("sentiment.negative", "body")
     
     total = positive_count + negative_count
     if total == 0:
@@ -176,7 +212,7 @@ def analyze_sentiment(body: str) -> Tuple[str, float]:
         return 'neutral', 0.5
 
 
-def detect_purchase_intent(body: str) -> Tuple[bool, float]:
+def detect_purchase_intent(body: str, hits: Optional[MessageHits] = None) -> Tuple[bool, float]:
     """
     اكتشاف نية الشراء في الرسالة
     
@@ -186,21 +222,10 @@ def detect_purchase_intent(body: str) -> Tuple[bool, float]:
     if not body:
         return False, 0.0
     
-    text = body.lower()
-    
-    purchase_indicators = [
-        # English
-        "ready to buy", "ready to order", "place order", "purchase",
-        "placing order", "po number", "po#", "purchase order",
-        "how to order", "how to buy", "order now", "buy now",
-        "proceed with", "move forward", "let's proceed",
-        # Arabic
-        "جاهز للشراء", "جاهز للطلب", "طلب شراء", "أمر شراء",
-        "كيف أطلب", "كيف أشتري", "الطلب الآن", "الشراء الآن",
-        "المضي قدماً", "المتابعة", "نريد المتابعة"
-    ]
-    
-    intent_count = sum(1 for phrase in purchase_indicators if phrase in text)
+    if hits is None:
+        hits = scan_message("", body)
+    
+    intent_count = hits.count("purchase_intent", "body")
     
     if intent_count > 0:
         confidence = min(1.0, 0.5 + (intent_count * 0.2))
@@ -6,6 +6,7 @@ from core.db import (
     add_client,
     add_message
 )
+from core.keyword_engine import MessageHits, register_keywords, scan_message
 
 
 def extract_company_from_email(email: str) -> str:
@@ -26,24 +27,33 @@ def extract_company_from_sender(sender_name: str) -> str:
     return sender_name.title()
 
 
-def detect_status_and_score(subject: str, body: str):
-    text = f"{subject} {body}".lower()
+register_keywords({
+    "status.price": ["price", "quotation", "offer"],
+    "status.sample": ["sample"],
+    "status.spec": ["spec", "specification"],
+    "status.thanks": ["thank"],
+})
+
+
+def detect_status_and_score(subject: str, body: str, hits: MessageHits = None):
+    if hits is None:
+        hits = scan_message(subject, body)
 
     status = "Replied"
     score = 0
 
-    if "price" in text or "quotation" in text or "offer" in text:
+    if hits.has("status.price"):
         status = "Requested Price"
         score += 15
 
-    if "sample" in text:
+    if hits.has("status.sample"):
         status = "Samples Requested"
         score += 25
 
-    if "spec" in text or "specification" in text:
+    if hits.has("status.spec"):
         score += 10
 
-    if "thank" in text:
+    if hits.has("status.thanks"):
         score += 5
 
     return status, score
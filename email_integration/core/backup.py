@@ -1,21 +1,65 @@
 """
 نظام النسخ الاحتياطي التلقائي
 Backup and Restore System for EFM
+
+- النسخ أثناء عمل التطبيق عبر SQLite Online Backup API
+  (sqlite3.Connection.backup) على دفعات من الصفحات، فالكتابة من الاتصالات
+  الأخرى تستمر بين الدفعات وتكون النسخة لقطة متسقة (بدون نسخ ملف حي)
+- الملف مضغوط: zstd إذا كانت مكتبة zstandard مثبتة وإلا gzip
+- اختياري (page_dedup): نسخة تزايدية تحتوي فقط الصفحات التي تغيرت منذ آخر
+  نسخة كاملة؛ نسخة كاملة جديدة كل full_backup_every نسخ
+- SHA-256 لقاعدة البيانات الكاملة يُحفظ في ملف .info ويُتحقق منه قبل
+  الاستعادة أو التصدير
+
+الملفات لكل نسخة (efm_backup_YYYY-MM-DD_HH-MM-SS-ffffff):
+    .db.zst / .db.gz   نسخة كاملة مضغوطة
+    .delta.zst / .gz   الصفحات المتغيرة مقارنة بالنسخة الكاملة (base)
+    .pages             sha1 لكل صفحة في النسخة الكاملة (لحساب النسخ التزايدية)
+    .info              المعلومات (JSON)
+النسخ القديمة (.db غير مضغوط) ما زالت تُعرض وتُستعاد.
 """
 import os
-import shutil
 import json
+import gzip
+import hashlib
 import sqlite3
+import struct
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
 
 from .db import DB_PATH, BASE_DIR
+from .connection_pool import restore_database
 
 # مسار مجلد النسخ الاحتياطية
 BACKUP_DIR = os.path.join(BASE_DIR, "backups")
 CONFIG_FILE = os.path.join(BASE_DIR, "database", "backup_config.json")
 
+BACKUP_PREFIX = "efm_backup_"
+BACKUP_FORMAT_VERSION = "2.0"
+
+# عدد الصفحات في كل خطوة من backup() والانتظار بينها (يسمح للكتابة بالاستمرار)
+BACKUP_STEP_PAGES = 256
+BACKUP_STEP_SLEEP = 0.005
+
+# امتداد الملف -> (نوع النسخة, الضغط)
+BACKUP_EXTENSIONS = {
+    ".db": ("full", "none"),
+    ".db.gz": ("full", "gzip"),
+    ".db.zst": ("full", "zstd"),
+    ".delta.gz": ("delta", "gzip"),
+    ".delta.zst": ("delta", "zstd"),
+}
+_COMPRESSION_SUFFIX = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+_COPY_CHUNK = 1024 * 1024
+_PAGE_INDEX = struct.Struct(">I")
+
 
 def ensure_backup_dir():
     """إنشاء مجلد النسخ الاحتياطية إن لم يكن موجوداً"""
@@ -33,6 +77,9 @@ def get_backup_config() -> Dict:
         "backup_time": "02:00",  # وقت النسخ اليومي
         "keep_backups": 30,  # عدد النسخ المحفوظة
         "backup_on_startup": True,
+        "compression": "auto",  # auto (zstd ثم gzip), zstd, gzip, none
+        "page_dedup": False,  # نسخ تزايدية (الصفحات المتغيرة فقط)
+        "full_backup_every": 7,  # نسخة كاملة كل N نسخ عند تفعيل page_dedup
         "last_backup": None
     }
     
@@ -54,41 +101,268 @@ def save_backup_config(config: Dict):
         json.dump(config, f, indent=2, ensure_ascii=False)
 
 
+# =========================
+# Files / Compression
+# =========================
+def _split_backup_name(filename: str) -> Optional[Tuple[str, str]]:
+    """efm_backup_<ts><ext> -> (stem, ext) أو None إذا لم يكن ملف نسخة"""
+    if not filename.startswith(BACKUP_PREFIX):
+        return None
+    for ext in sorted(BACKUP_EXTENSIONS, key=len, reverse=True):
+        if filename.endswith(ext):
+            return filename[:-len(ext)], ext
+    return None
+
+
+def _sidecar_path(backup_path: str, suffix: str) -> str:
+    """مسار ملف .info / .pages المرتبط بالنسخة"""
+    directory, filename = os.path.split(backup_path)
+    parsed = _split_backup_name(filename)
+    stem = parsed[0] if parsed else os.path.splitext(filename)[0]
+    return os.path.join(directory, stem + suffix)
+
+
+def _stem_in_use(stem: str) -> bool:
+    """أي ملف (نسخة / .info / .pages / .tmp) يحمل نفس الاسم"""
+    return any(
+        name.startswith(stem + ".") for name in os.listdir(BACKUP_DIR)
+    )
+
+
+def _new_backup_stem() -> str:
+    """
+    اسم نسخة جديد لا يستخدمه أي ملف موجود
+    (نسختان في نفس الثانية - مثل نسخة ما قبل الاستعادة - لا تكتب فوق بعضهما)
+    """
+    stem = f"{BACKUP_PREFIX}{datetime.now().strftime('%Y-%m-%d_%H-%M-%S-%f')}"
+    candidate, counter = stem, 1
+    while _stem_in_use(candidate):
+        candidate = f"{stem}_{counter}"
+        counter += 1
+    return candidate
+
+
+def _read_info(backup_path: str) -> Dict:
+    info_path = _sidecar_path(backup_path, ".info")
+    if not os.path.exists(info_path):
+        return {}
+    try:
+        with open(info_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _choose_compression(config: Dict) -> str:
+    compression = config.get("compression", "auto")
+    if compression == "auto" or (compression == "zstd" and not ZSTD_AVAILABLE):
+        return "zstd" if ZSTD_AVAILABLE else "gzip"
+    return compression if compression in _COMPRESSION_SUFFIX else "gzip"
+
+
+def _open_compressed(path: str, mode: str, compression: str):
+    """فتح ملف للقراءة (rb) أو الكتابة (wb) مع الضغط المحدد"""
+    if compression == "gzip":
+        return gzip.open(path, mode, compresslevel=6)
+    if compression == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("zstandard غير مثبت - لا يمكن قراءة نسخة .zst")
+        if "r" in mode:
+            return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        return zstandard.ZstdCompressor(level=10).stream_writer(open(path, "wb"), closefd=True)
+    return open(path, mode)
+
+
+def _read_exact(f, size: int) -> bytes:
+    """قراءة size بايت بالضبط (تيارات الضغط قد تعيد أقل)"""
+    chunks = []
+    while size > 0:
+        chunk = f.read(size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _copy_stream(src, dst):
+    while True:
+        chunk = src.read(_COPY_CHUNK)
+        if not chunk:
+            break
+        dst.write(chunk)
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_COPY_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# =========================
+# Snapshot
+# =========================
+def _online_snapshot(dest_path: str):
+    """
+    لقطة متسقة من قاعدة البيانات الحية عبر Online Backup API
+    (يشمل محتوى ملف WAL بدون checkpoint ولا يمنع الكتابة)
+    """
+    src = sqlite3.connect(DB_PATH, timeout=30)
+    dst = sqlite3.connect(dest_path)
+    try:
+        src.backup(dst, pages=BACKUP_STEP_PAGES, sleep=BACKUP_STEP_SLEEP)
+    finally:
+        dst.close()
+        src.close()
+
+
+def _scan_pages(path: str) -> Tuple[int, List[bytes], str]:
+    """(page_size, sha1 لكل صفحة, sha256 للملف كاملاً)"""
+    with open(path, "rb") as f:
+        header = f.read(100)
+        # حجم الصفحة في الـ header (offset 16, big-endian) - القيمة 1 تعني 65536
+        page_size = struct.unpack(">H", header[16:18])[0]
+        if page_size == 1:
+            page_size = 65536
+        f.seek(0)
+
+        whole = hashlib.sha256()
+        digests = []
+        for page in iter(lambda: f.read(page_size), b""):
+            whole.update(page)
+            digests.append(hashlib.sha1(page).digest())
+    return page_size, digests, whole.hexdigest()
+
+
+def _load_page_digests(backup_path: str) -> Optional[List[bytes]]:
+    pages_path = _sidecar_path(backup_path, ".pages")
+    if not os.path.exists(pages_path):
+        return None
+    with open(pages_path, "rb") as f:
+        data = f.read()
+    return [data[i:i + 20] for i in range(0, len(data), 20)]
+
+
+def _find_delta_base(page_size: int, config: Dict) -> Optional[Dict]:
+    """
+    آخر نسخة كاملة يمكن بناء نسخة تزايدية عليها
+    (None إذا وصل عدد النسخ التزايدية عليها إلى full_backup_every - 1)
+    """
+    full_every = max(1, int(config.get("full_backup_every", 7)))
+    deltas = 0
+    for backup in list_backups():
+        if backup["format"] == "delta":
+            deltas += 1
+            continue
+        if (backup.get("page_size") != page_size
+                or not os.path.exists(_sidecar_path(backup["path"], ".pages"))):
+            return None
+        return backup if deltas < full_every - 1 else None
+    return None
+
+
+def _write_full(snapshot_path: str, backup_path: str, compression: str, digests: List[bytes]):
+    with open(snapshot_path, "rb") as src, _open_compressed(backup_path, "wb", compression) as dst:
+        _copy_stream(src, dst)
+    with open(_sidecar_path(backup_path, ".pages"), "wb") as f:
+        f.write(b"".join(digests))
+
+
+def _write_delta(snapshot_path: str, backup_path: str, compression: str,
+                 page_size: int, digests: List[bytes], base_digests: List[bytes]) -> int:
+    """
+    الصفحات المختلفة عن النسخة الأساسية فقط:
+    [طول الـ header][header JSON] ثم ([رقم الصفحة][محتوى الصفحة]) لكل صفحة
+
+    Returns:
+        عدد الصفحات المكتوبة
+    """
+    changed = [
+        index for index, digest in enumerate(digests)
+        if index >= len(base_digests) or base_digests[index] != digest
+    ]
+    header = json.dumps({"page_size": page_size, "page_count": len(digests)}).encode("utf-8")
+    with open(snapshot_path, "rb") as src, _open_compressed(backup_path, "wb", compression) as dst:
+        dst.write(_PAGE_INDEX.pack(len(header)))
+        dst.write(header)
+        for index in changed:
+            src.seek(index * page_size)
+            dst.write(_PAGE_INDEX.pack(index))
+            dst.write(src.read(page_size))
+    return len(changed)
+
+
+def _refuse_existing(backup_path: str):
+    """لا كتابة فوق نسخة موجودة أو ملفاتها (قد تكون base لنسخ تزايدية)"""
+    for path in (backup_path, _sidecar_path(backup_path, ".info"),
+                 _sidecar_path(backup_path, ".pages")):
+        if os.path.exists(path):
+            raise FileExistsError(f"النسخة موجودة مسبقاً: {os.path.basename(path)}")
+
+
 def create_backup(description: str = "") -> Optional[str]:
     """
-    إنشاء نسخة احتياطية من قاعدة البيانات
+    إنشاء نسخة احتياطية من قاعدة البيانات (أثناء عمل التطبيق)
     
     Returns:
         مسار الملف الاحتياطي أو None في حالة الفشل
     """
+    snapshot_path = None
     try:
         ensure_backup_dir()
         
         if not os.path.exists(DB_PATH):
             return None
         
-        # اسم الملف: efm_backup_YYYY-MM-DD_HH-MM-SS.db
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        backup_filename = f"efm_backup_{timestamp}.db"
-        backup_path = os.path.join(BACKUP_DIR, backup_filename)
+        config = get_backup_config()
+        compression = _choose_compression(config)
         
-        # نسخ قاعدة البيانات
-        shutil.copy2(DB_PATH, backup_path)
+        # اسم الملف: efm_backup_YYYY-MM-DD_HH-MM-SS-ffffff.<ext>
+        stem = _new_backup_stem()
+        snapshot_path = os.path.join(BACKUP_DIR, stem + ".tmp")
         
-        # إنشاء ملف معلومات عن النسخة
-        info_filename = f"efm_backup_{timestamp}.info"
-        info_path = os.path.join(BACKUP_DIR, info_filename)
+        _online_snapshot(snapshot_path)
+        page_size, digests, checksum = _scan_pages(snapshot_path)
+        
+        base = _find_delta_base(page_size, config) if config.get("page_dedup") else None
+        base_digests = _load_page_digests(base["path"]) if base else None
+        
+        suffix = _COMPRESSION_SUFFIX[compression]
+        if base_digests is not None:
+            backup_filename = f"{stem}.delta{suffix or '.gz'}"
+            if not suffix:
+                compression = "gzip"  # النسخ التزايدية مضغوطة دائماً
+            backup_path = os.path.join(BACKUP_DIR, backup_filename)
+            _refuse_existing(backup_path)
+            changed_pages = _write_delta(
+                snapshot_path, backup_path, compression, page_size, digests, base_digests
+            )
+        else:
+            backup_filename = f"{stem}.db{suffix}"
+            backup_path = os.path.join(BACKUP_DIR, backup_filename)
+            _refuse_existing(backup_path)
+            _write_full(snapshot_path, backup_path, compression, digests)
+            changed_pages = len(digests)
         
-        db_size = os.path.getsize(DB_PATH)
+        # إنشاء ملف معلومات عن النسخة
         info = {
             "backup_file": backup_filename,
             "created_at": datetime.now().isoformat(),
             "description": description,
-            "db_size": db_size,
-            "version": "1.0"
+            "db_size": os.path.getsize(snapshot_path),
+            "version": BACKUP_FORMAT_VERSION,
+            "format": "delta" if base_digests is not None else "full",
+            "compression": compression,
+            "sha256": checksum,
+            "page_size": page_size,
+            "page_count": len(digests),
+            "changed_pages": changed_pages,
+            "base": base["filename"] if base_digests is not None else None
         }
         
-        with open(info_path, "w", encoding="utf-8") as f:
+        with open(_sidecar_path(backup_path, ".info"), "w", encoding="utf-8") as f:
             json.dump(info, f, indent=2, ensure_ascii=False)
         
         # تحديث الإعدادات
@@ -104,6 +378,32 @@ def create_backup(description: str = "") -> Optional[str]:
     except Exception as e:
         print(f"خطأ في النسخ الاحتياطي: {e}")
         return None
+    finally:
+        if snapshot_path and os.path.exists(snapshot_path):
+            try:
+                os.remove(snapshot_path)
+            except OSError:
+                pass
+
+
+def delete_backup(backup_path: str) -> bool:
+    """
+    حذف نسخة مع ملفاتها المرتبطة (.info / .pages)
+    
+    Returns:
+        False إذا كانت نسخ تزايدية تعتمد عليها أو فشل الحذف
+    """
+    filename = os.path.basename(backup_path)
+    if any(b.get("base") == filename for b in list_backups()):
+        return False
+    try:
+        for path in (backup_path, _sidecar_path(backup_path, ".info"),
+                     _sidecar_path(backup_path, ".pages")):
+            if os.path.exists(path):
+                os.remove(path)
+        return True
+    except OSError:
+        return False
 
 
 def cleanup_old_backups():
@@ -112,34 +412,23 @@ def cleanup_old_backups():
         config = get_backup_config()
         keep_count = config.get("keep_backups", 30)
         
-        if not os.path.exists(BACKUP_DIR):
+        # الأحدث أولاً
+        backups = list_backups()
+        if len(backups) <= keep_count:
             return
         
-        # الحصول على جميع ملفات النسخ الاحتياطي
-        backup_files = []
-        for filename in os.listdir(BACKUP_DIR):
-            if filename.startswith("efm_backup_") and filename.endswith(".db"):
-                file_path = os.path.join(BACKUP_DIR, filename)
-                backup_files.append({
-                    "path": file_path,
-                    "name": filename,
-                    "created": os.path.getctime(file_path)
-                })
-        
-        # ترتيب حسب التاريخ (الأحدث أولاً)
-        backup_files.sort(key=lambda x: x["created"], reverse=True)
-        
-        # حذف النسخ الزائدة
-        if len(backup_files) > keep_count:
-            for backup in backup_files[keep_count:]:
-                try:
-                    os.remove(backup["path"])
-                    # حذف ملف المعلومات المرتبط
-                    info_path = backup["path"].replace(".db", ".info")
-                    if os.path.exists(info_path):
-                        os.remove(info_path)
-                except Exception:
-                    pass
+        # النسخ الكاملة التي تعتمد عليها نسخ تزايدية محفوظة لا تُحذف
+        needed = {b["base"] for b in backups[:keep_count] if b.get("base")}
+        for backup in backups[keep_count:]:
+            if backup["filename"] in needed:
+                continue
+            try:
+                for path in (backup["path"], _sidecar_path(backup["path"], ".info"),
+                             _sidecar_path(backup["path"], ".pages")):
+                    if os.path.exists(path):
+                        os.remove(path)
+            except Exception:
+                pass
                     
     except Exception as e:
         print(f"خطأ في تنظيف النسخ القديمة: {e}")
@@ -154,29 +443,36 @@ def list_backups() -> List[Dict]:
     
     try:
         for filename in os.listdir(BACKUP_DIR):
-            if filename.startswith("efm_backup_") and filename.endswith(".db"):
-                file_path = os.path.join(BACKUP_DIR, filename)
-                info_path = file_path.replace(".db", ".info")
-                
-                backup_info = {
-                    "filename": filename,
-                    "path": file_path,
-                    "size": os.path.getsize(file_path),
-                    "created": datetime.fromtimestamp(os.path.getctime(file_path)),
-                    "description": ""
-                }
-                
-                # قراءة معلومات إضافية من ملف info
-                if os.path.exists(info_path):
-                    try:
-                        with open(info_path, "r", encoding="utf-8") as f:
-                            info = json.load(f)
-                            backup_info["description"] = info.get("description", "")
-                            backup_info["created"] = datetime.fromisoformat(info.get("created_at", backup_info["created"].isoformat()))
-                    except Exception:
-                        pass
-                
-                backups.append(backup_info)
+            parsed = _split_backup_name(filename)
+            if not parsed:
+                continue
+            backup_format, compression = BACKUP_EXTENSIONS[parsed[1]]
+            file_path = os.path.join(BACKUP_DIR, filename)
+            
+            backup_info = {
+                "filename": filename,
+                "path": file_path,
+                "size": os.path.getsize(file_path),
+                "created": datetime.fromtimestamp(os.path.getctime(file_path)),
+                "description": "",
+                "format": backup_format,
+                "compression": compression,
+                "base": None,
+                "page_size": None
+            }
+            
+            # قراءة معلومات إضافية من ملف info
+            info = _read_info(file_path)
+            if info:
+                try:
+                    backup_info["description"] = info.get("description", "")
+                    backup_info["base"] = info.get("base")
+                    backup_info["page_size"] = info.get("page_size")
+                    backup_info["created"] = datetime.fromisoformat(info.get("created_at", backup_info["created"].isoformat()))
+                except Exception:
+                    pass
+            
+            backups.append(backup_info)
         
         # ترتيب حسب التاريخ (الأحدث أولاً)
         backups.sort(key=lambda x: x["created"], reverse=True)
@@ -187,6 +483,83 @@ def list_backups() -> List[Dict]:
     return backups
 
 
+# =========================
+# Restore / Verify
+# =========================
+def _materialize_backup(backup_path: str, dest_path: str):
+    """
+    كتابة قاعدة البيانات الكاملة من النسخة إلى dest_path والتحقق منها
+    
+    Raises:
+        ValueError إذا لم يطابق SHA-256 المحفوظ أو لم يكن الملف قاعدة بيانات صالحة
+    """
+    parsed = _split_backup_name(os.path.basename(backup_path))
+    if not parsed:
+        raise ValueError(f"ليس ملف نسخة احتياطية: {backup_path}")
+    backup_format, compression = BACKUP_EXTENSIONS[parsed[1]]
+    info = _read_info(backup_path)
+    
+    if backup_format == "delta":
+        base_path = os.path.join(os.path.dirname(backup_path), info.get("base") or "")
+        if not info.get("base") or not os.path.exists(base_path):
+            raise ValueError("النسخة الكاملة الأساسية لهذه النسخة التزايدية غير موجودة")
+        _materialize_backup(base_path, dest_path)
+        
+        with _open_compressed(backup_path, "rb", compression) as src, open(dest_path, "r+b") as out:
+            header_size = _PAGE_INDEX.unpack(_read_exact(src, _PAGE_INDEX.size))[0]
+            header = json.loads(_read_exact(src, header_size).decode("utf-8"))
+            page_size = header["page_size"]
+            while True:
+                index = _read_exact(src, _PAGE_INDEX.size)
+                if not index:
+                    break
+                out.seek(_PAGE_INDEX.unpack(index)[0] * page_size)
+                out.write(_read_exact(src, page_size))
+            out.truncate(header["page_count"] * page_size)
+    else:
+        with _open_compressed(backup_path, "rb", compression) as src, open(dest_path, "wb") as out:
+            _copy_stream(src, out)
+    
+    expected = info.get("sha256")
+    if expected and _file_sha256(dest_path) != expected:
+        raise ValueError(f"SHA-256 غير مطابق: {os.path.basename(backup_path)}")
+    
+    # النسخ القديمة بدون checksum: التحقق من أنها قاعدة بيانات صالحة
+    conn = sqlite3.connect(dest_path)
+    try:
+        conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
+    except sqlite3.DatabaseError as e:
+        raise ValueError(f"ملف قاعدة البيانات غير صالح: {e}")
+    finally:
+        conn.close()
+
+
+def verify_backup(backup_path: str) -> bool:
+    """التحقق من سلامة نسخة (فك الضغط + تطبيق الصفحات + SHA-256)"""
+    temp_path = backup_path + ".verify.tmp"
+    try:
+        _materialize_backup(backup_path, temp_path)
+        return True
+    except Exception as e:
+        print(f"فشل التحقق من النسخة: {e}")
+        return False
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def export_backup(backup_path: str, dest_path: str) -> bool:
+    """تصدير نسخة كملف قاعدة بيانات عادي (.db) بعد التحقق منها"""
+    try:
+        _materialize_backup(backup_path, dest_path)
+        return True
+    except Exception as e:
+        print(f"خطأ في تصدير النسخة: {e}")
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        return False
+
+
 def restore_backup(backup_path: str) -> bool:
     """
     استعادة قاعدة البيانات من نسخة احتياطية
@@ -197,32 +570,36 @@ def restore_backup(backup_path: str) -> bool:
     Returns:
         True في حالة النجاح، False في حالة الفشل
     """
+    temp_path = backup_path + ".restore.tmp"
     try:
         if not os.path.exists(backup_path):
             return False
         
-        # التحقق من صحة ملف النسخة الاحتياطية
+        # فك الضغط والتحقق من SHA-256 قبل لمس قاعدة البيانات الحالية
         try:
-            conn = sqlite3.connect(backup_path)
-            conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            conn.close()
-        except Exception:
+            _materialize_backup(backup_path, temp_path)
+        except Exception as e:
+            print(f"فشل التحقق من النسخة: {e}")
             return False
         
         # إنشاء نسخة احتياطية من الملف الحالي قبل الاستعادة
         current_backup = create_backup("قبل الاستعادة من نسخة قديمة")
         
-        # إغلاق أي اتصالات مفتوحة بقاعدة البيانات
-        # (في حالة الاستخدام الحقيقي، قد نحتاج لإغلاق التطبيق أولاً)
-        
-        # استعادة النسخة
-        shutil.copy2(backup_path, DB_PATH)
+        # استعادة النسخة عبر Online Backup API على اتصال المجمّع (بدون نسخ الملف
+        # فوق قاعدة بيانات مفتوحة في خيوط أخرى ولا حذف ملفات WAL / SHM)
+        restore_database(DB_PATH, temp_path, pages=BACKUP_STEP_PAGES)
         
         return True
         
     except Exception as e:
         print(f"خطأ في الاستعادة: {e}")
         return False
+    finally:
+        if os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
 
 
 def should_run_auto_backup() -> bool:
@@ -266,6 +643,58 @@ def run_auto_backup_if_needed():
     return None
 
 
+def run_startup_backup() -> Optional[str]:
+    """النسخ عند بدء التشغيل ثم النسخ التلقائي إن لزم (من خيط المهام الخلفية)"""
+    backup_path = None
+    if get_backup_config().get("backup_on_startup", False):
+        backup_path = create_backup("نسخ احتياطي عند بدء التشغيل")
+    return run_auto_backup_if_needed() or backup_path
+
+
+def run_scheduled_backup() -> Optional[str]:
+    """
+    النسخ التلقائي المجدول (يُستدعى دورياً من خيط المهام الخلفية)
+
+    Returns:
+        مسار النسخة إذا تم إنشاؤها
+    """
+    config = get_backup_config()
+    
+    if not config.get("auto_backup_enabled", False):
+        return None
+    
+    frequency = config.get("backup_frequency", "daily")
+    
+    # التحقق من الوقت المحدد
+    if frequency == "daily":
+        try:
+            backup_hour, backup_minute = map(int, config.get("backup_time", "02:00").split(":"))
+        except (ValueError, AttributeError):
+            return None
+        
+        now = datetime.now()
+        # في نفس ساعة النسخ، تحقق من النسخ كل 10 دقائق
+        if now.hour != backup_hour or now.minute % 10 != 0:
+            return None
+        
+        # التحقق من أننا لم نقم بالنسخ اليوم
+        last_backup_str = config.get("last_backup")
+        if last_backup_str:
+            try:
+                if datetime.fromisoformat(last_backup_str).date() == now.date():
+                    return None
+            except (ValueError, TypeError):
+                pass
+        
+        return create_backup("نسخ احتياطي تلقائي مجدول")
+    
+    # التحقق من النسخ الأسبوعي
+    if frequency == "weekly" and should_run_auto_backup():
+        return create_backup("نسخ احتياطي أسبوعي تلقائي")
+    
+    return None
+
+
 def get_backup_statistics() -> Dict:
     """الحصول على إحصائيات النسخ الاحتياطية"""
     backups = list_backups()
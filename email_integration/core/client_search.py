@@ -0,0 +1,125 @@
+"""
+فهرس بحث العملاء في الذاكرة (Trigram Index)
+In-memory client search index
+
+- يُحدَّث مع نتائج get_all_clients() بشكل تزايدي (فقط العملاء الجدد أو المعدَّلون)
+- الاستعلامات من 3 أحرف فأكثر تبدأ من أقصر قائمة trigram بدلاً من فحص كل العملاء
+- إذا كان النص الجديد امتداداً للنص السابق يتم التضييق على النتائج السابقة فقط
+- نفس سلوك البحث القديم: جزء من النص (substring) بدون حساسية لحالة الأحرف
+  في company_name أو country أو email
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+# مواضع الحقول في صفوف get_all_clients()
+SEARCH_FIELDS = (1, 2, 4)  # company_name, country, email
+
+# فاصل بين الحقول حتى لا يطابق البحث نصاً يمتد عبر حقلين
+_FIELD_SEPARATOR = "\x1f"
+
+
+def _haystack(row) -> str:
+    return _FIELD_SEPARATOR.join((row[i] or "") for i in SEARCH_FIELDS).lower()
+
+
+def _trigrams(text: str) -> Set[tuple]:
+    return set(zip(text, text[1:], text[2:]))
+
+
+class ClientSearchIndex:
+    """فهرس trigram لأعمدة البحث في قائمة العملاء"""
+
+    def __init__(self):
+        self._haystacks: Dict[int, str] = {}
+        self._postings: Dict[tuple, List[int]] = defaultdict(list)
+        # عدد الإدخالات القديمة في _postings (تُهمل عند التحقق ثم تُنظف بإعادة البناء)
+        self._stale = 0
+        self._last_query = ""
+        self._last_result: Optional[Set[int]] = None
+
+    def __len__(self):
+        return len(self._haystacks)
+
+    def update(self, rows: Iterable[tuple]):
+        """
+        مزامنة الفهرس مع صفوف get_all_clients()
+        فقط العملاء الجدد أو الذين تغيّر اسمهم/دولتهم/بريدهم تتم فهرستهم من جديد
+        """
+        old = self._haystacks
+        new = {row[0]: _haystack(row) for row in rows}
+
+        changed = []
+        for client_id, text in new.items():
+            previous = old.get(client_id)
+            if previous == text:
+                continue
+            if previous is not None:
+                self._stale += 1
+            changed.append((client_id, text))
+        self._stale += sum(1 for client_id in old if client_id not in new)
+
+        self._haystacks = new
+        self._last_query = ""
+        self._last_result = None
+
+        if self._stale > len(new):
+            self._rebuild()
+        else:
+            self._add(changed)
+
+    def _add(self, items):
+        postings = self._postings
+        for client_id, text in items:
+            for gram in _trigrams(text):
+                postings[gram].append(client_id)
+
+    def _rebuild(self):
+        self._postings = defaultdict(list)
+        self._stale = 0
+        self._add(self._haystacks.items())
+
+    def search(self, query: str) -> Optional[Set[int]]:
+        """
+        Returns:
+            مجموعة client_id المطابقة، أو None إذا كان البحث فارغاً (لا فلترة)
+        """
+        query = (query or "").strip().lower()
+        if not query:
+            self._last_query = ""
+            self._last_result = None
+            return None
+
+        candidates = None
+
+        # التضييق التزايدي: النص الجديد يحتوي النص السابق
+        if self._last_result is not None and self._last_query in query:
+            candidates = self._last_result
+
+        if len(query) >= 3:
+            lists = []
+            for gram in _trigrams(query):
+                ids = self._postings.get(gram)
+                if not ids:
+                    lists = None
+                    break
+                lists.append(ids)
+            if lists is None:
+                return self._remember(query, set())
+            shortest = min(lists, key=len)
+            if candidates is None or len(shortest) < len(candidates):
+                candidates = shortest
+
+        if candidates is None:
+            candidates = self._haystacks
+
+        haystacks = self._haystacks
+        result = {
+            client_id for client_id in candidates
+            if query in haystacks.get(client_id, "")
+        }
+        return self._remember(query, result)
+
+    def _remember(self, query: str, result: Set[int]) -> Set[int]:
+        self._last_query = query
+        self._last_result = result
+        return result
@@ -7,6 +7,7 @@ from typing import Dict, List, Optional
 from enum import Enum
 
 from .db import get_connection, get_client_by_id, add_message as db_add_message
+from .message_analysis import MESSAGE_ANALYSIS_COLUMNS, analyze_message, message_fingerprint
 
 
 # أنواع قنوات التواصل
@@ -97,20 +98,26 @@ def add_unified_message(
         "score_effect": score_effect
     }
     
+    # نتائج التحليل والبصمة تُحفظ مع الرسالة (مثل add_message)
+    analysis = analyze_message(subject, content)
+    fingerprint = message_fingerprint(client_id, data["message_date"], subject, analysis.text)
+
     # إضافة الحقول الإضافية
     conn = get_connection()
     cur = conn.cursor()
     
-    cur.execute("""
+    cur.execute(f"""
         INSERT INTO messages (
             client_id, message_date, message_type, channel,
             client_response, notes, score_effect,
-            external_message_id, message_status, attachments
+            external_message_id, message_status, attachments,
+            fingerprint, {", ".join(MESSAGE_ANALYSIS_COLUMNS)}
         )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {", ".join("?" * len(MESSAGE_ANALYSIS_COLUMNS))})
+        ON CONFLICT DO NOTHING
     """, (
         client_id,
-        datetime.now().strftime("%d/%m/%Y"),
+        data["message_date"],
         message_type,
         channel,
         subject or "",
@@ -118,8 +125,16 @@ def add_unified_message(
         score_effect,
         external_message_id,
         status,
-        attachments
-    ))
+        attachments,
+        fingerprint
+    ) + analysis.columns())
+    
+    if cur.rowcount == 0:
+        # نفس الرسالة محفوظة مسبقاً
+        cur.execute("SELECT id FROM messages WHERE fingerprint = ?", (fingerprint,))
+        existing = cur.fetchone()
+        conn.close()
+        return existing[0] if existing else None
     
     message_id = cur.lastrowid
     
@@ -160,7 +175,7 @@ def get_client_messages_unified(client_id: int, channel: str = None) -> List:
                 external_message_id, message_status, attachments
             FROM messages
             WHERE client_id = ? AND channel = ?
-            ORDER BY message_date DESC, id DESC
+            ORDER BY message_date_iso DESC, id DESC
         """
         cur.execute(query, (client_id, channel))
     else:
@@ -171,7 +186,7 @@ def get_client_messages_unified(client_id: int, channel: str = None) -> List:
                 external_message_id, message_status, attachments
             FROM messages
             WHERE client_id = ?
-            ORDER BY message_date DESC, id DESC
+            ORDER BY message_date_iso DESC, id DESC
         """
         cur.execute(query, (client_id,))
     
@@ -195,7 +210,7 @@ def get_messages_by_channel(channel: str) -> List:
         FROM messages m
         LEFT JOIN clients c ON m.client_id = c.id
         WHERE m.channel = ?
-        ORDER BY m.message_date DESC, m.id DESC
+        ORDER BY m.message_date_iso DESC, m.id DESC
     """, (channel,))
     
     rows = cur.fetchall()
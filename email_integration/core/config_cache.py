@@ -0,0 +1,87 @@
+"""
+ذاكرة مؤقتة لملفات الإعدادات (JSON)
+Process-wide cache for JSON config files, invalidated by file mtime
+
+- يُقرأ الملف ويُدمج مع القيم الافتراضية مرة واحدة ثم تُعاد النسخة المخزنة
+- os.stat() على الأكثر مرة كل CHECK_INTERVAL ثانية لاكتشاف تعديل الملف من
+  خارج التطبيق (mtime / الحجم)، وبين الفحصين القراءة مجرد وصول لقاموس
+- store() بعد الحفظ تحدّث النسخة المخزنة مباشرة فلا حاجة لإعادة القراءة
+- القيمة المخزنة مشتركة: للقراءة فقط، ومن يريد تعديلها يأخذ نسخة (copy())
+"""
+import copy
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Optional
+
+# أقصى مدة (ثوانٍ) قبل التحقق من تعديل الملف على القرص
+CHECK_INTERVAL = 1.0
+
+
+class CachedJsonFile:
+    """
+    ملف JSON مع نسخة محللة في الذاكرة
+
+    Args:
+        path: مسار الملف
+        build: دالة تستقبل محتوى الملف (أو None إذا لم يوجد / تالف)
+               وتعيد الإعدادات النهائية (بعد دمج القيم الافتراضية)
+    """
+
+    def __init__(self, path: str, build: Callable[[Optional[Any]], Any],
+                 check_interval: float = CHECK_INTERVAL):
+        self.path = path
+        self._build = build
+        self._check_interval = check_interval
+        self._lock = threading.Lock()
+        self._value = None
+        self._signature = None
+        self._checked_at = None
+
+    def _file_signature(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def get(self):
+        """الإعدادات المخزنة (للقراءة فقط) - تُعاد قراءتها فقط إذا تغير الملف"""
+        now = time.monotonic()
+        checked_at = self._checked_at
+        if checked_at is not None and now - checked_at < self._check_interval:
+            return self._value
+
+        with self._lock:
+            signature = self._file_signature()
+            if self._checked_at is None or signature != self._signature:
+                self._value = self._build(self._read())
+                self._signature = signature
+            self._checked_at = now
+            return self._value
+
+    def copy(self):
+        """نسخة مستقلة قابلة للتعديل"""
+        return copy.deepcopy(self.get())
+
+    def store(self, value):
+        """تحديث النسخة المخزنة بعد كتابة الملف (بدون إعادة قراءته)"""
+        with self._lock:
+            self._value = self._build(copy.deepcopy(value))
+            self._signature = self._file_signature()
+            self._checked_at = time.monotonic()
+
+    def invalidate(self):
+        """إجبار إعادة القراءة عند الطلب التالي"""
+        with self._lock:
+            self._checked_at = None
@@ -0,0 +1,178 @@
+"""
+مدير اتصالات قاعدة البيانات (Thread-local Connection Pool)
+SQLite Connection Manager for EFM and the legacy CRM pages
+
+- اتصال واحد دائم لكل (خيط، قاعدة بيانات) بدلاً من فتح اتصال جديد في كل دالة
+- وضع WAL حتى تستطيع خيوط المزامنة وواجهة Qt القراءة والكتابة في نفس الوقت
+- synchronous=NORMAL + ذاكرة تخزين مؤقت + mmap + busy_timeout لتجنب "database is locked"
+
+ملاحظة: هذا الملف لا يعتمد على أي وحدة أخرى في core حتى يمكن استيراده من pages/*.
+"""
+import os
+import sqlite3
+import threading
+from typing import Dict
+
+# إعدادات الاتصال
+BUSY_TIMEOUT_MS = 15000
+CACHE_SIZE_KB = 20000            # ~20MB page cache (القيمة السالبة في PRAGMA تعني KB)
+MMAP_SIZE = 256 * 1024 * 1024    # 256MB
+
+_local = threading.local()
+
+
+def _normalize_path(db_path: str) -> str:
+    return os.path.normcase(os.path.abspath(db_path))
+
+
+def _configure(conn: sqlite3.Connection):
+    """تطبيق إعدادات الأداء على اتصال جديد"""
+    cur = conn.cursor()
+    try:
+        cur.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        # journal_mode=WAL يُحفظ داخل ملف قاعدة البيانات نفسه (يكفي تفعيله مرة واحدة)
+        cur.execute("PRAGMA journal_mode = WAL")
+        cur.execute("PRAGMA synchronous = NORMAL")
+        cur.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
+        cur.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        cur.execute("PRAGMA temp_store = MEMORY")
+    except sqlite3.OperationalError:
+        # قاعدة البيانات مقفلة مؤقتاً أو للقراءة فقط: نستمر بالإعدادات الافتراضية
+        pass
+    finally:
+        cur.close()
+
+
+class _PoolEntry:
+    """اتصال خام مع عدّاد الاستخدامات المفتوحة في نفس الخيط"""
+
+    __slots__ = ("conn", "leases")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.leases = 0
+
+
+def _get_entry(db_path: str) -> _PoolEntry:
+    entries: Dict[str, _PoolEntry] = getattr(_local, "entries", None)
+    if entries is None:
+        entries = _local.entries = {}
+
+    key = _normalize_path(db_path)
+    entry = entries.get(key)
+
+    if entry is None:
+        os.makedirs(os.path.dirname(key), exist_ok=True)
+        conn = sqlite3.connect(key, timeout=BUSY_TIMEOUT_MS / 1000)
+        _configure(conn)
+        entry = _PoolEntry(conn)
+        entries[key] = entry
+    return entry
+
+
+class PooledConnection:
+    """
+    غلاف خفيف حول اتصال الخيط المشترك.
+
+    يتصرف مثل sqlite3.Connection تماماً بالنسبة للكود الحالي
+    (cursor / execute / commit / rollback / close)، لكن close() لا يغلق الاتصال
+    الحقيقي بل يعيده للمجمّع. إذا أُغلق آخر استخدام مفتوح دون commit
+    يتم rollback تماماً كما كان يحدث عند إغلاق اتصال مستقل.
+    """
+
+    def __init__(self, entry: _PoolEntry):
+        self._entry = entry
+        self._conn = entry.conn
+        self._closed = False
+        # row_factory خاص بهذا الاستخدام فقط حتى لا يتسرب لباقي الكود
+        self.row_factory = None
+        entry.leases += 1
+
+    # ----- واجهة sqlite3.Connection -----
+    def cursor(self, *args, **kwargs):
+        if self._closed:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        cur = self._conn.cursor(*args, **kwargs)
+        cur.row_factory = self.row_factory
+        return cur
+
+    def execute(self, sql, parameters=()):
+        cur = self.cursor()
+        cur.execute(sql, parameters)
+        return cur
+
+    def executemany(self, sql, seq_of_parameters):
+        cur = self.cursor()
+        cur.executemany(sql, seq_of_parameters)
+        return cur
+
+    def executescript(self, script):
+        cur = self.cursor()
+        cur.executescript(script)
+        return cur
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._entry.leases -= 1
+        if self._entry.leases <= 0:
+            self._entry.leases = 0
+            if self._conn.in_transaction:
+                try:
+                    self._conn.rollback()
+                except sqlite3.Error:
+                    pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # نفس سلوك sqlite3.Connection: commit عند النجاح و rollback عند الخطأ (بدون إغلاق)
+        if exc_type is None:
+            self._conn.commit()
+        else:
+            self._conn.rollback()
+        return False
+
+    def __del__(self):
+        # حماية من الدوال التي تخرج بخطأ قبل استدعاء close()
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def __getattr__(self, name):
+        # in_transaction / total_changes / create_function ... إلخ
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self._conn, name)
+
+
+def get_pooled_connection(db_path: str) -> PooledConnection:
+    """الحصول على اتصال من مجمّع الخيط الحالي لقاعدة البيانات المحددة"""
+    return PooledConnection(_get_entry(db_path))
+
+
+def restore_database(db_path: str, source_path: str, pages: int = -1):
+    """
+    استبدال محتوى قاعدة البيانات بمحتوى ملف آخر عبر Online Backup API
+    على اتصال المجمّع في الخيط الحالي.
+
+    SQLite يكتب الصفحات داخل معاملة كتابة على قاعدة البيانات الحية، فالاتصالات
+    المفتوحة في الخيوط الأخرى (المهام المجدولة، التصدير...) تنتظر القفل ثم ترى
+    المحتوى الجديد بدلاً من ملف يُستبدل تحتها.
+    """
+    src = sqlite3.connect(source_path)
+    conn = get_pooled_connection(db_path)
+    try:
+        src.backup(conn._conn, pages=pages)
+    finally:
+        conn.close()
+        src.close()
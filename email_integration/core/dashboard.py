@@ -3,75 +3,50 @@
 Enhanced Dashboard Module
 """
 import sqlite3
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, List
 from .db import get_connection
+from .dates import iso_today
+from .summary import get_summary_counts, sum_daily_counts
 
 
 def get_dashboard_stats() -> Dict:
     """
     الحصول على إحصائيات اللوحة الرئيسية
     
+    العدّادات تُقرأ من summary_counts (تحدّثها triggers) بدلاً من COUNT(*)
+    على الجداول كاملة.
+    
     Returns:
         Dictionary يحتوي على جميع الإحصائيات
     """
     conn = get_connection()
     cur = conn.cursor()
     
-    stats = {}
-    
-    # إحصائيات العملاء
-    cur.execute("SELECT COUNT(*) FROM clients")
-    stats['total_clients'] = cur.fetchone()[0]
-    
-    cur.execute("SELECT COUNT(*) FROM clients WHERE classification LIKE '🔥%'")
-    stats['serious_clients'] = cur.fetchone()[0]
-    
-    cur.execute("SELECT COUNT(*) FROM clients WHERE classification LIKE '👍%'")
-    stats['potential_clients'] = cur.fetchone()[0]
-    
-    cur.execute("SELECT COUNT(*) FROM clients WHERE is_focus = 1")
-    stats['focus_clients'] = cur.fetchone()[0]
-    
-    # إحصائيات الرسائل
-    cur.execute("SELECT COUNT(*) FROM messages")
-    stats['total_messages'] = cur.fetchone()[0]
-    
-    # إحصائيات الطلبات
-    cur.execute("SELECT COUNT(*) FROM requests WHERE status = 'open'")
-    stats['open_requests'] = cur.fetchone()[0]
-    
-    cur.execute("SELECT COUNT(*) FROM requests WHERE reply_status = 'pending'")
-    stats['pending_requests'] = cur.fetchone()[0]
-    
-    # إحصائيات المهام
-    try:
-        cur.execute("SELECT COUNT(*) FROM tasks WHERE status = 'pending'")
-        stats['pending_tasks'] = cur.fetchone()[0]
-        
-        cur.execute("SELECT COUNT(*) FROM tasks WHERE status = 'pending' AND due_date <= ?",
-                   (datetime.now().strftime("%d/%m/%Y"),))
-        stats['overdue_tasks'] = cur.fetchone()[0]
-        
-        cur.execute("SELECT COUNT(*) FROM tasks WHERE status = 'pending' AND due_date = ?",
-                   (datetime.now().strftime("%d/%m/%Y"),))
-        stats['tasks_due_today'] = cur.fetchone()[0]
-    except Exception:
-        stats['pending_tasks'] = 0
-        stats['overdue_tasks'] = 0
-        stats['tasks_due_today'] = 0
-    
-    # إحصائيات المبيعات
-    try:
-        cur.execute("SELECT COUNT(*) FROM sales_deals WHERE stage != 'closed_won' AND stage != 'closed_lost'")
-        stats['active_deals'] = cur.fetchone()[0]
-    except Exception:
-        stats['active_deals'] = 0
-    
-    # إحصائيات النمو (آخر 30 يوم)
-    thirty_days_ago = (datetime.now() - timedelta(days=30)).strftime("%d/%m/%Y")
-    cur.execute("SELECT COUNT(*) FROM clients WHERE date_added >= ?", (thirty_days_ago,))
-    stats['new_clients_30d'] = cur.fetchone()[0]
+    counts = get_summary_counts(cur)
+    today = iso_today()
+    tomorrow = iso_today(1)
+    
+    stats = {
+        # إحصائيات العملاء
+        'total_clients': counts.get('clients', 0),
+        'serious_clients': counts.get('clients.serious', 0),
+        'potential_clients': counts.get('clients.potential', 0),
+        'focus_clients': counts.get('clients.focus', 0),
+        # إحصائيات الرسائل
+        'total_messages': counts.get('messages', 0),
+        # إحصائيات الطلبات
+        'open_requests': counts.get('requests.open', 0),
+        'pending_requests': counts.get('requests.pending', 0),
+        # إحصائيات المهام
+        'pending_tasks': counts.get('tasks.pending', 0),
+        'overdue_tasks': sum_daily_counts(cur, 'tasks.pending_due', end=tomorrow),
+        'tasks_due_today': sum_daily_counts(cur, 'tasks.pending_due', start=today, end=tomorrow),
+        # إحصائيات المبيعات
+        'active_deals': counts.get('deals.active', 0),
+        # إحصائيات النمو (آخر 30 يوم)
+        'new_clients_30d': sum_daily_counts(cur, 'clients.added', start=iso_today(-30)),
+    }
     
     conn.close()
     return stats
@@ -136,10 +111,10 @@ def get_actions_needed() -> List[Dict]:
             FROM tasks t
             JOIN clients c ON t.client_id = c.id
             WHERE t.status = 'pending' 
-              AND t.due_date < ?
-            ORDER BY t.due_date ASC
+              AND t.due_date_iso < ?
+            ORDER BY t.due_date_iso ASC
             LIMIT 5
-        """, (datetime.now().strftime("%d/%m/%Y"),))
+        """, (iso_today(),))
         for row in cur.fetchall():
             task_id, title, due_date, company = row
             actions.append({
@@ -161,7 +136,7 @@ def get_actions_needed() -> List[Dict]:
             FROM tasks t
             JOIN clients c ON t.client_id = c.id
             WHERE t.status = 'pending' 
-              AND t.due_date = ?
+              AND t.due_date_iso = ?
             ORDER BY 
                 CASE t.priority
                     WHEN 'urgent' THEN 1
@@ -170,7 +145,7 @@ def get_actions_needed() -> List[Dict]:
                     WHEN 'low' THEN 4
                 END
             LIMIT 5
-        """, (datetime.now().strftime("%d/%m/%Y"),))
+        """, (iso_today(),))
         for row in cur.fetchall():
             task_id, title, company = row
             actions.append({
@@ -276,39 +251,30 @@ def get_monthly_comparison() -> Dict:
     cur = conn.cursor()
     
     now = datetime.now()
-    current_month_start = now.replace(day=1).strftime("%d/%m/%Y")
+    current_month_start = now.replace(day=1)
     
     # الشهر الماضي
     if now.month == 1:
-        last_month_start = now.replace(year=now.year-1, month=12, day=1).strftime("%d/%m/%Y")
+        last_month_start = now.replace(year=now.year-1, month=12, day=1)
     else:
-        last_month_start = now.replace(month=now.month-1, day=1).strftime("%d/%m/%Y")
+        last_month_start = now.replace(month=now.month-1, day=1)
     
-    comparison = {}
-    
-    # عملاء جدد
-    cur.execute("SELECT COUNT(*) FROM clients WHERE date_added >= ?", (current_month_start,))
-    comparison['clients_this_month'] = cur.fetchone()[0]
+    # نطاقات ISO: [بداية الشهر, بداية الشهر التالي) حتى تُستخدم الفهارس
+    current_month_iso = current_month_start.strftime("%Y-%m-%d")
+    last_month_iso = last_month_start.strftime("%Y-%m-%d")
     
-    cur.execute("SELECT COUNT(*) FROM clients WHERE date_added >= ? AND date_added < ?",
-               (last_month_start, current_month_start))
-    comparison['clients_last_month'] = cur.fetchone()[0]
-    
-    # رسائل
-    cur.execute("""
-        SELECT COUNT(*) FROM messages 
-        WHERE SUBSTR(message_date, 7, 4) || '-' || SUBSTR(message_date, 4, 2) = ?
-    """, (f"{now.year}-{now.month:02d}",))
-    comparison['messages_this_month'] = cur.fetchone()[0]
+    comparison = {}
     
-    last_month_year = now.year if now.month > 1 else now.year - 1
-    last_month_num = now.month - 1 if now.month > 1 else 12
+    # عملاء جدد ورسائل (من العدّادات اليومية في summary_counts)
+    comparison['clients_this_month'] = sum_daily_counts(cur, 'clients.added', start=current_month_iso)
+    comparison['clients_last_month'] = sum_daily_counts(
+        cur, 'clients.added', start=last_month_iso, end=current_month_iso
+    )
     
-    cur.execute("""
-        SELECT COUNT(*) FROM messages 
-        WHERE SUBSTR(message_date, 7, 4) || '-' || SUBSTR(message_date, 4, 2) = ?
-    """, (f"{last_month_year}-{last_month_num:02d}",))
-    comparison['messages_last_month'] = cur.fetchone()[0]
+    comparison['messages_this_month'] = sum_daily_counts(cur, 'messages.daily', start=current_month_iso)
+    comparison['messages_last_month'] = sum_daily_counts(
+        cur, 'messages.daily', start=last_month_iso, end=current_month_iso
+    )
     
     conn.close()
     
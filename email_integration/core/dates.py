@@ -0,0 +1,119 @@
+"""
+أدوات التواريخ: تخزين ISO للاستعلامات + عرض dd/mm/yyyy للواجهة
+Date helpers: ISO-8601 for storage/queries, dd/mm/yyyy for display
+
+الأعمدة الأصلية (message_date, due_date, ...) تبقى بصيغة العرض dd/mm/yyyy
+حتى لا يتغير شيء في الواجهة أو في ملفات التصدير. بجانب كل عمود يوجد عمود
+<column>_iso (YYYY-MM-DD) تملؤه triggers تلقائياً، وعليه تعمل جميع
+فلاتر وترتيب التواريخ (index range scan بدلاً من مقارنة نصية خاطئة).
+"""
+from datetime import datetime, timedelta, date
+from typing import Optional
+
+DISPLAY_FORMAT = "%d/%m/%Y"
+ISO_FORMAT = "%Y-%m-%d"
+
+# الصيغ المقبولة عند تحويل نص إلى ISO
+_INPUT_FORMATS = (
+    "%d/%m/%Y",
+    "%d/%m/%Y %H:%M",
+    "%d/%m/%Y %H:%M:%S",
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%d-%m-%Y",
+)
+
+
+def to_iso_date(value) -> Optional[str]:
+    """تحويل أي تاريخ (نص بصيغة معروفة أو datetime/date) إلى YYYY-MM-DD"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.strftime(ISO_FORMAT)
+
+    text = str(value).strip()
+    for fmt in _INPUT_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime(ISO_FORMAT)
+        except ValueError:
+            continue
+    # صيغ ISO الكاملة من Graph (مثل 2025-01-02T10:00:00Z)
+    try:
+        return datetime.fromisoformat(text.replace("Z", "+00:00")).strftime(ISO_FORMAT)
+    except ValueError:
+        return None
+
+
+def to_display_date(value) -> str:
+    """تحويل تاريخ ISO (أو أي صيغة معروفة) إلى dd/mm/yyyy للعرض"""
+    iso = to_iso_date(value)
+    if not iso:
+        return value or ""
+    return datetime.strptime(iso, ISO_FORMAT).strftime(DISPLAY_FORMAT)
+
+
+def parse_iso_date(value: str) -> Optional[datetime]:
+    """قراءة تاريخ ISO من قاعدة البيانات إلى datetime"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value[:10], ISO_FORMAT)
+    except ValueError:
+        return None
+
+
+def iso_today(offset_days: int = 0) -> str:
+    """تاريخ اليوم (مع إزاحة اختيارية بالأيام) بصيغة ISO"""
+    return (datetime.now() + timedelta(days=offset_days)).strftime(ISO_FORMAT)
+
+
+def iso_month(value: datetime = None) -> str:
+    """الشهر بصيغة YYYY-MM (للمقارنة مع SUBSTR(column_iso, 1, 7))"""
+    value = value or datetime.now()
+    return value.strftime("%Y-%m")
+
+
+def iso_date_sql(expr: str) -> str:
+    """
+    تعبير SQL خالص يحوّل عموداً نصياً إلى YYYY-MM-DD.
+    لا يعتمد على دوال Python حتى تعمل الـ triggers من أي اتصال (حتى السكربتات القديمة).
+    """
+    return f"""(CASE
+        WHEN {expr} GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'
+            THEN SUBSTR({expr}, 1, 10)
+        WHEN {expr} GLOB '[0-9][0-9]/[0-9][0-9]/[0-9][0-9][0-9][0-9]*'
+            THEN SUBSTR({expr}, 7, 4) || '-' || SUBSTR({expr}, 4, 2) || '-' || SUBSTR({expr}, 1, 2)
+        WHEN {expr} GLOB '[0-9]/[0-9][0-9]/[0-9][0-9][0-9][0-9]*'
+            THEN SUBSTR({expr}, 6, 4) || '-' || SUBSTR({expr}, 3, 2) || '-0' || SUBSTR({expr}, 1, 1)
+        WHEN {expr} GLOB '[0-9][0-9]/[0-9]/[0-9][0-9][0-9][0-9]*'
+            THEN SUBSTR({expr}, 6, 4) || '-0' || SUBSTR({expr}, 4, 1) || '-' || SUBSTR({expr}, 1, 2)
+        WHEN {expr} GLOB '[0-9]/[0-9]/[0-9][0-9][0-9][0-9]*'
+            THEN SUBSTR({expr}, 5, 4) || '-0' || SUBSTR({expr}, 3, 1) || '-0' || SUBSTR({expr}, 1, 1)
+        ELSE NULL
+    END)"""
+
+
+def iso_datetime_sql(expr: str) -> str:
+    """
+    مثل iso_date_sql لكن يحتفظ بالوقت إن وُجد: YYYY-MM-DD HH:MM:SS
+    (التاريخ بدون وقت يبقى YYYY-MM-DD فيكون مستحقاً من بداية اليوم عند
+    المقارنة مع iso_now())
+    """
+    date_part = f"SUBSTR({expr}, 7, 4) || '-' || SUBSTR({expr}, 4, 2) || '-' || SUBSTR({expr}, 1, 2)"
+    return f"""(CASE
+        WHEN {expr} GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9][ T][0-9][0-9]:[0-9][0-9]:[0-9][0-9]*'
+            THEN SUBSTR({expr}, 1, 10) || ' ' || SUBSTR({expr}, 12, 8)
+        WHEN {expr} GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9][ T][0-9][0-9]:[0-9][0-9]*'
+            THEN SUBSTR({expr}, 1, 10) || ' ' || SUBSTR({expr}, 12, 5) || ':00'
+        WHEN {expr} GLOB '[0-9][0-9]/[0-9][0-9]/[0-9][0-9][0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9]*'
+            THEN {date_part} || ' ' || SUBSTR({expr}, 12, 8)
+        WHEN {expr} GLOB '[0-9][0-9]/[0-9][0-9]/[0-9][0-9][0-9][0-9] [0-9][0-9]:[0-9][0-9]*'
+            THEN {date_part} || ' ' || SUBSTR({expr}, 12, 5) || ':00'
+        ELSE {iso_date_sql(expr)}
+    END)"""
+
+
+def iso_now() -> str:
+    """الوقت الحالي بصيغة YYYY-MM-DD HH:MM:SS (للمقارنة مع أعمدة iso_datetime_sql)"""
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -3,6 +3,9 @@ import os
 import re
 from datetime import datetime
 
+from .connection_pool import get_pooled_connection
+from .instrumentation import instrument_module, phase
+
 # استخدام قاعدة بيانات CRM الحالية بدلاً من efm.db
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
 DB_PATH = os.path.join(BASE_DIR, "database", "crm.db")
@@ -12,8 +15,11 @@ DB_PATH = os.path.join(BASE_DIR, "database", "crm.db")
 # Connection
 # =========================
 def get_connection():
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    return sqlite3.connect(DB_PATH)
+    """
+    اتصال من مجمّع الاتصالات المشترك (اتصال واحد لكل خيط، WAL).
+    conn.close() يعيد الاتصال للمجمّع ولا يغلقه فعلياً.
+    """
+    return get_pooled_connection(DB_PATH)
 
 
 # =========================
@@ -169,6 +175,13 @@ def init_db():
     except Exception:
         pass
 
+    # ترحيلات المخطط ذات الإصدارات (أعمدة التواريخ ISO ...)
+    try:
+        from core.migrations import run_migrations
+        run_migrations()
+    except Exception:
+        pass
+
 
 def ensure_custom_sync_clients_table():
     """
@@ -544,6 +557,115 @@ def get_all_clients():
     return rows
 
 
+# فلاتر الحالة التي تعتمد على جدول requests
+# (اسم الفلتر في الواجهة -> شرط EXISTS على الفهارس المركبة)
+REQUEST_STATUS_FILTERS = {
+    "Requested Price": (
+        "EXISTS (SELECT 1 FROM requests r WHERE r.client_id = c.id "
+        "AND r.status = 'open' AND r.request_type LIKE ?)",
+        "%Price Request%",
+    ),
+    "Samples Requested": (
+        "EXISTS (SELECT 1 FROM requests r WHERE r.client_id = c.id "
+        "AND r.status = 'open' AND r.request_type LIKE ?)",
+        "%Sample Request%",
+    ),
+    "Replied": (
+        "EXISTS (SELECT 1 FROM requests r WHERE r.client_id = c.id "
+        "AND r.reply_status = ?)",
+        "replied",
+    ),
+    "No Reply": (
+        "EXISTS (SELECT 1 FROM requests r WHERE r.client_id = c.id "
+        "AND r.reply_status = ?)",
+        "pending",
+    ),
+}
+
+
+def build_client_filter_query(search: str = "",
+                              class_filter: str = "All Classifications",
+                              status_filter: str = "All Status"):
+    """
+    بناء استعلام واحد لقائمة العملاء من جميع تركيبات الفلاتر
+
+    Returns:
+        (sql, params) بنفس أعمدة get_all_clients وترتيبها
+    """
+    where = []
+    params = []
+
+    # ---------- Search ----------
+    search = (search or "").strip().lower()
+    if search:
+        # instr بدلاً من LIKE حتى لا تُفسَّر % و _ في نص البحث
+        where.append(
+            "(instr(lower(COALESCE(c.company_name, '')), ?) > 0"
+            " OR instr(lower(COALESCE(c.country, '')), ?) > 0"
+            " OR instr(lower(COALESCE(c.email, '')), ?) > 0)"
+        )
+        params.extend([search, search, search])
+
+    # ---------- Classification ----------
+    if class_filter and class_filter != "All Classifications":
+        if class_filter == "⭐ Focus":
+            where.append("(c.classification = ? OR c.is_focus = 1)")
+        else:
+            where.append("c.classification = ?")
+        params.append(class_filter)
+
+    # ---------- Status / Requests ----------
+    if status_filter and status_filter != "All Status":
+        if status_filter in REQUEST_STATUS_FILTERS:
+            clause, value = REQUEST_STATUS_FILTERS[status_filter]
+            where.append(clause)
+            params.append(value)
+        else:
+            where.append("c.status = ?")
+            params.append(status_filter)
+
+    sql = """
+        SELECT
+            c.id,
+            c.company_name,
+            c.country,
+            c.contact_person,
+            c.email,
+            c.phone,
+            c.website,
+            c.date_added,
+            c.status,
+            c.seriousness_score,
+            COALESCE(c.classification, 'Unclassified') AS classification,
+            c.is_focus
+        FROM clients c
+    """
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY c.is_focus DESC, c.seriousness_score DESC"
+    return sql, params
+
+
+def get_filtered_client_ids(class_filter: str = "All Classifications",
+                            status_filter: str = "All Status"):
+    """
+    معرفات العملاء المطابقين لفلتر التصنيف والحالة (بدون البحث النصي)
+    None يعني عدم وجود فلتر (كل العملاء)
+    """
+    if class_filter in ("", "All Classifications") and status_filter in ("", "All Status"):
+        return None
+
+    sql, params = build_client_filter_query("", class_filter, status_filter)
+    sql = f"SELECT id FROM ({sql})"
+
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(sql, params)
+    ids = {row[0] for row in cur.fetchall()}
+    conn.close()
+    return ids
+
+
 def get_client_by_id(client_id: int):
     conn = get_connection()
     cur = conn.cursor()
@@ -591,6 +713,12 @@ def get_focus_emails():
 # Messages
 # =========================
 def add_message(data: dict):
+    """
+    إضافة رسالة وتحديث نقاط العميل وتصنيفه
+
+    Returns:
+        ID الرسالة (أو ID الرسالة الموجودة إن كانت مكررة)
+    """
     # تأكد أن الأعمدة المطلوبة موجودة قبل الإدخال (خاصة بعد ترحيل قاعدة بيانات قديمة)
     try:
         ensure_messages_columns()
@@ -600,48 +728,23 @@ def add_message(data: dict):
     conn = get_connection()
     cur = conn.cursor()
 
-    # فحص التكرار: التحقق من وجود رسالة مكررة
-    # نفحص بناءً على: client_id, actual_date/message_date, client_response (الموضوع)
     actual_date = data.get("actual_date")
     message_date = data.get("message_date")
     client_response = data.get("client_response") or ""
     notes = data.get("notes") or ""
-    
-    # استخدام التاريخ الفعلي إن وجد، وإلا استخدام message_date
-    check_date = actual_date or message_date
-    
-    if check_date:
-        # فحص التكرار بناءً على التاريخ والموضوع
-        cur.execute("""
-            SELECT id FROM messages
-            WHERE client_id = ? 
-            AND (actual_date = ? OR (actual_date IS NULL AND message_date = ?))
-            AND client_response = ?
-            LIMIT 1
-        """, (data["client_id"], check_date, check_date, client_response))
-        
-        existing = cur.fetchone()
-        if existing:
-            # رسالة مكررة موجودة بالفعل
-            conn.close()
-            return existing[0]  # إرجاع ID الرسالة الموجودة
-    
-    # إذا لم يكن هناك تكرار، نفحص أيضاً بناءً على جزء من المحتوى (أول 100 حرف)
-    if notes:
-        notes_preview = notes[:100] if len(notes) > 100 else notes
-        cur.execute("""
-            SELECT id FROM messages
-            WHERE client_id = ? 
-            AND client_response = ?
-            AND (notes LIKE ? OR notes = ?)
-            LIMIT 1
-        """, (data["client_id"], client_response, f"{notes_preview}%", notes))
-        
-        existing = cur.fetchone()
-        if existing:
-            # رسالة مكررة موجودة بالفعل
-            conn.close()
-            return existing[0]  # إرجاع ID الرسالة الموجودة
+
+    # نتائج التحليل (محسوبة مسبقاً من المزامنة أو تُحسب هنا مرة واحدة)
+    from core.message_analysis import (
+        MESSAGE_ANALYSIS_COLUMNS, analyze_message, message_fingerprint, normalize_message_id
+    )
+    analysis = data.get("analysis") or analyze_message(client_response, notes)
+
+    # فحص التكرار: بصمة المحتوى (العميل + التاريخ + الموضوع + hash للنص) و
+    # Internet-Message-ID إن وُجد، وكلاهما عليه فهرس UNIQUE فيكفي ON CONFLICT DO NOTHING
+    fingerprint = message_fingerprint(
+        data["client_id"], actual_date or message_date, client_response, analysis.text
+    )
+    internet_message_id = normalize_message_id(data.get("internet_message_id"))
 
     # الحصول على النقاط الحالية للعميل قبل التحديث
     cur.execute("SELECT seriousness_score, classification FROM clients WHERE id = ?", (data["client_id"],))
@@ -650,25 +753,41 @@ def add_message(data: dict):
     old_classification = old_data[1] if old_data else ""
 
     # إضافة الرسالة
-    cur.execute("""
+    cur.execute(f"""
     INSERT INTO messages (
         client_id, message_date, actual_date,
         message_type, channel,
         client_response, notes,
-        score_effect
+        score_effect, fingerprint, internet_message_id,
+        {", ".join(MESSAGE_ANALYSIS_COLUMNS)}
     )
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {", ".join("?" * len(MESSAGE_ANALYSIS_COLUMNS))})
+    ON CONFLICT DO NOTHING
     """, (
         data["client_id"],
-        data["message_date"],
+        message_date,
         actual_date,  # التاريخ الفعلي للرسالة من البريد
         data["message_type"],
         data["channel"],
         client_response,
         notes,
-        data["score_effect"]
-    ))
-    
+        data["score_effect"],
+        fingerprint,
+        internet_message_id
+    ) + analysis.columns())
+
+    if cur.rowcount == 0:
+        # رسالة مكررة موجودة بالفعل - إرجاع ID الرسالة الموجودة
+        cur.execute("""
+            SELECT id FROM messages
+            WHERE fingerprint = ? OR (client_id = ? AND internet_message_id = ?)
+            ORDER BY id
+            LIMIT 1
+        """, (fingerprint, data["client_id"], internet_message_id))
+        existing = cur.fetchone()
+        conn.close()
+        return existing[0] if existing else None
+
     message_id = cur.lastrowid
 
     # تحديث النقاط
@@ -733,132 +852,403 @@ def add_message(data: dict):
     except Exception:
         pass
 
+    return message_id
+
+
+# =========================
+# Batched Ingestion (Sync)
+# =========================
+# حد أقصى لعدد المعاملات في استعلام IN (...) الواحد (حد SQLite القديم 999)
+_SQL_IN_CHUNK = 500
 
-def get_client_messages(client_id: int):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT message_date, actual_date, message_type, channel,
-               client_response, notes, score_effect
-        FROM messages
-        WHERE client_id=?
-        ORDER BY COALESCE(actual_date, message_date) DESC, id DESC
-    """, (client_id,))
-    rows = cur.fetchall()
-    conn.close()
-    
-    # إزالة التكرارات من النتائج (بناءً على التاريخ والموضوع)
-    seen = set()
-    unique_rows = []
-    for row in rows:
-        (message_date, actual_date, message_type, channel, 
-         client_response, notes, score_effect) = row
-        
-        # استخدام التاريخ الفعلي إن وجد
-        date_key = actual_date or message_date or ""
-        subject_key = client_response or ""
-        
-        # إنشاء مفتاح فريد للرسالة
-        message_key = (date_key, subject_key)
-        
-        if message_key not in seen:
-            seen.add(message_key)
-            unique_rows.append(row)
-    
-    return unique_rows
 
+def _chunked(items, size=_SQL_IN_CHUNK):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
 
-def remove_duplicate_messages(client_id: int = None):
+
+def _status_for_request_type(request_type: str):
+    """نفس قواعد save_request لتحديث حالة العميل حسب نوع الطلب"""
+    rt = (request_type or "").lower()
+    if "price" in rt:
+        return "Requested Price"
+    if "sample" in rt:
+        return "Samples Requested"
+    if "spec" in rt:
+        return "Specs Requested"
+    return None
+
+
+def ingest_messages(batch: list, cur=None) -> dict:
     """
-    إزالة الرسائل المكررة من قاعدة البيانات
-    إذا تم تمرير client_id، يتم إزالة التكرارات لهذا العميل فقط
-    إذا لم يتم تمرير client_id، يتم إزالة التكرارات لجميع العملاء
+    حفظ دفعة رسائل من المزامنة في معاملة واحدة (commit واحد لكل دفعة)
+    بدلاً من find_client_by_email / add_client / save_request / add_message لكل رسالة.
+
+    cur: cursor اختياري من معاملة المستدعي (مثل الاستيراد)؛ عندها لا commit
+         ولا rollback هنا والمستدعي يُنهي المعاملة
+
+    كل عنصر في batch هو dict:
+      email            : بريد العميل (مطلوب إلا إذا وُجد client_id)
+      client_id        : معرف العميل اختياري إن كان محلولاً مسبقاً (مثل الاستيراد)؛
+                         يُستخدم بدلاً من البحث بالبريد (بدون بريد لا يُنشأ طلب)
+      client           : dict اختياري لبيانات إنشاء العميل إن لم يكن موجوداً
+                         (company_name, country, contact_person, phone, website, is_focus)
+      client_only      : True لإنشاء/ربط العميل فقط بدون حفظ رسالة
+      message_date, actual_date, message_type, channel,
+      client_response, notes, score_effect  : نفس مفاتيح add_message
+      request_type     : نوع الطلب المكتشف (يُتجاهل إذا كان None أو "General Inquiry")
+      extracted_text   : نص الطلب (افتراضياً notes)
+      analysis         : MessageAnalysis اختياري (analyze_message) يُخزن مع الرسالة؛
+                         إن لم يُمرَّر يُحسب من client_response + notes
+      internet_message_id : Internet-Message-ID اختياري (يُفحص للتكرار بجانب بصمة المحتوى)
+
+    Returns:
+        dict: created_clients, inserted, duplicates, requests, client_ids (email -> id)
     """
-    conn = get_connection()
-    cur = conn.cursor()
-    
+    stats = {
+        "created_clients": 0,
+        "inserted": 0,
+        "duplicates": 0,
+        "requests": 0,
+        "client_ids": {},
+    }
+    items = [
+        item for item in batch or []
+        if item.get("client_id") or (item.get("email") and "@" in item.get("email"))
+    ]
+    if not items:
+        return stats
+
+    own_transaction = cur is None
+    if own_transaction:
+        # (تستخدم اتصالاً و commit خاصاً بها فلا تُستدعى داخل معاملة المستدعي)
+        try:
+            ensure_messages_columns()
+            ensure_requests_email_column()
+        except Exception:
+            pass
+
+    from core.message_analysis import (
+        MESSAGE_ANALYSIS_COLUMNS, analyze_message, message_fingerprint, normalize_message_id
+    )
+
+    today_str = datetime.now().strftime("%d/%m/%Y")
+    if own_transaction:
+        conn = get_connection()
+        cur = conn.cursor()
+
+    def _email(item) -> str:
+        return (item.get("email") or "").strip().lower()
+
     try:
-        if client_id:
-            # إزالة التكرارات لعميل محدد
-            # نحتفظ بأحدث رسالة (أكبر id) لكل مجموعة مكررة
-            cur.execute("""
-                DELETE FROM messages
-                WHERE id NOT IN (
-                    SELECT MAX(id)
-                    FROM messages
-                    WHERE client_id = ?
-                    GROUP BY 
-                        client_id,
-                        COALESCE(actual_date, message_date),
-                        client_response
+        # 1) حل العملاء دفعة واحدة
+        emails = {_email(item) for item in items if "@" in _email(item)}
+        clients = {}  # email -> [id, score, classification]
+        by_id = {}    # id -> [id, score, classification]
+
+        # العناصر التي تحمل client_id: تحميلها بالمعرف مباشرة
+        for chunk in _chunked({item["client_id"] for item in items if item.get("client_id")}):
+            placeholders = ",".join("?" * len(chunk))
+            cur.execute(f"""
+                SELECT id, seriousness_score, classification
+                FROM clients
+                WHERE id IN ({placeholders})
+            """, chunk)
+            for cid, score, classification in cur.fetchall():
+                by_id[cid] = [cid, score or 0, classification]
+
+        def _client_id(item):
+            if item.get("client_id") in by_id:
+                return item["client_id"]
+            return clients[_email(item)][0]
+
+        def _load_clients(email_set):
+            for chunk in _chunked(email_set):
+                placeholders = ",".join("?" * len(chunk))
+                cur.execute(f"""
+                    SELECT id, LOWER(email), seriousness_score, classification
+                    FROM clients
+                    WHERE LOWER(email) IN ({placeholders})
+                    ORDER BY id
+                """, chunk)
+                for cid, email, score, classification in cur.fetchall():
+                    clients.setdefault(email, [cid, score or 0, classification])
+
+        # العناصر بدون client_id صالح يلزمها بريد
+        items = [item for item in items if item.get("client_id") in by_id or "@" in _email(item)]
+        _load_clients({_email(item) for item in items if item.get("client_id") not in by_id})
+
+        missing = {}
+        for item in items:
+            email = _email(item)
+            if item.get("client_id") in by_id:
+                continue
+            if email not in clients and email not in missing:
+                info = item.get("client") or {}
+                missing[email] = (
+                    info.get("company_name") or email.split("@")[0],
+                    info.get("country"),
+                    info.get("contact_person"),
+                    info.get("email") or item["email"].strip(),
+                    info.get("phone"),
+                    info.get("website"),
+                    info.get("date_added") or today_str,
+                    "New",
+                    0,
+                    None,
+                    info.get("is_focus", 0),
                 )
-                AND client_id = ?
-            """, (client_id, client_id))
-        else:
-            # إزالة التكرارات لجميع العملاء
-            cur.execute("""
-                DELETE FROM messages
-                WHERE id NOT IN (
-                    SELECT MAX(id)
-                    FROM messages
-                    GROUP BY 
+        if missing:
+            cur.executemany("""
+                INSERT INTO clients (
+                    company_name, country, contact_person,
+                    email, phone, website,
+                    date_added, status,
+                    seriousness_score, classification, is_focus
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, list(missing.values()))
+            stats["created_clients"] = len(missing)
+            _load_clients(set(missing))
+
+        stats["client_ids"] = {email: data[0] for email, data in clients.items()}
+        for data in clients.values():
+            by_id.setdefault(data[0], data)
+
+        # 2) التحليل والبصمة لكل رسالة ثم البصمات والمعرفات الموجودة مسبقاً (فهارس UNIQUE)
+        prepared = {}  # index -> (analysis, fingerprint, (client_id, internet_message_id) أو None)
+        for index, item in enumerate(items):
+            if item.get("client_only"):
+                continue
+            client_id = _client_id(item)
+            client_response = item.get("client_response") or ""
+            notes = item.get("notes") or ""
+            analysis = item.get("analysis") or analyze_message(client_response, notes)
+            fingerprint = message_fingerprint(
+                client_id,
+                item.get("actual_date") or item.get("message_date") or today_str,
+                client_response,
+                analysis.text,
+            )
+            message_id = normalize_message_id(item.get("internet_message_id"))
+            prepared[index] = (analysis, fingerprint, (client_id, message_id) if message_id else None)
+
+        seen_fingerprints = set()
+        for chunk in _chunked({fp for _, fp, _ in prepared.values()}):
+            placeholders = ",".join("?" * len(chunk))
+            cur.execute(
+                f"SELECT fingerprint FROM messages WHERE fingerprint IN ({placeholders})",
+                chunk
+            )
+            seen_fingerprints.update(r[0] for r in cur.fetchall())
+
+        seen_message_ids = set()
+        for chunk in _chunked({key[1] for _, _, key in prepared.values() if key}):
+            placeholders = ",".join("?" * len(chunk))
+            cur.execute(
+                f"""SELECT client_id, internet_message_id FROM messages
+                    WHERE internet_message_id IN ({placeholders})""",
+                chunk
+            )
+            seen_message_ids.update(cur.fetchall())
+
+        # 3) الطلبات المفتوحة الموجودة
+        open_requests = set()
+        for chunk in _chunked(emails):
+            placeholders = ",".join("?" * len(chunk))
+            cur.execute(f"""
+                SELECT LOWER(client_email), request_type
+                FROM requests
+                WHERE LOWER(client_email) IN ({placeholders})
+                  AND status='open'
+            """, chunk)
+            open_requests.update(cur.fetchall())
+
+        # 4) تجهيز الصفوف بالترتيب الأصلي
+        message_rows = []
+        request_rows = []
+        status_updates = {}
+        score_deltas = {}
+        message_counts = {}
+        created_at = datetime.now().strftime("%d/%m/%Y %H:%M")
+
+        for index, item in enumerate(items):
+            email = _email(item)
+            client_id = _client_id(item)
+
+            if item.get("client_only"):
+                continue
+
+            request_type = item.get("request_type")
+            if email and request_type and request_type != "General Inquiry":
+                key = (email, request_type)
+                if key not in open_requests:
+                    open_requests.add(key)
+                    request_rows.append((
                         client_id,
-                        COALESCE(actual_date, message_date),
-                        client_response
+                        item["email"].strip(),
+                        request_type,
+                        item.get("extracted_text", item.get("notes")),
+                        "",
+                        "open",
+                        created_at,
+                    ))
+                    new_status = _status_for_request_type(request_type)
+                    if new_status:
+                        status_updates[client_id] = new_status
+
+            analysis, fingerprint, message_key = prepared[index]
+            if fingerprint in seen_fingerprints or message_key in seen_message_ids:
+                stats["duplicates"] += 1
+                continue
+            seen_fingerprints.add(fingerprint)
+            if message_key:
+                seen_message_ids.add(message_key)
+
+            score_effect = item.get("score_effect") or 0
+            message_rows.append((
+                client_id,
+                item.get("message_date") or today_str,
+                item.get("actual_date"),
+                item.get("message_type", "Email"),
+                item.get("channel"),
+                item.get("client_response") or "",
+                item.get("notes") or "",
+                score_effect,
+                fingerprint,
+                message_key[1] if message_key else None,
+            ) + analysis.columns())
+            score_deltas[client_id] = score_deltas.get(client_id, 0) + score_effect
+            message_counts[client_id] = message_counts.get(client_id, 0) + 1
+
+        # 5) الكتابة المجمعة
+        if request_rows:
+            cur.executemany("""
+                INSERT INTO requests (
+                    client_id, client_email, request_type,
+                    extracted_text, notes, status, created_at
                 )
-            """)
-        
-        deleted_count = cur.rowcount
-        conn.commit()
-        conn.close()
-        return deleted_count
-    except Exception as e:
-        conn.rollback()
-        conn.close()
-        raise e
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, request_rows)
+            stats["requests"] = len(request_rows)
 
+        if status_updates:
+            cur.executemany(
+                "UPDATE clients SET status=? WHERE id=?",
+                [(status, cid) for cid, status in status_updates.items()]
+            )
 
-# =========================
-# Follow-Up
-# =========================
-def get_clients_needing_followup():
-    from core.models import followup_days
+        if message_rows:
+            cur.executemany(f"""
+                INSERT INTO messages (
+                    client_id, message_date, actual_date,
+                    message_type, channel,
+                    client_response, notes,
+                    score_effect, fingerprint, internet_message_id,
+                    {", ".join(MESSAGE_ANALYSIS_COLUMNS)}
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {", ".join("?" * len(MESSAGE_ANALYSIS_COLUMNS))})
+                ON CONFLICT DO NOTHING
+            """, message_rows)
+            stats["inserted"] = len(message_rows)
+
+        # 6) تحديث النقاط والتصنيف: UPDATE واحد لكل عميل
+        score_changes = []
+        if score_deltas:
+            from core.models import classify_client
+
+            updates = []
+            for cid, delta in score_deltas.items():
+                _, old_score, old_classification = by_id[cid]
+                new_score = (old_score or 0) + delta
+                new_classification = classify_client(new_score)
+                updates.append((delta, new_classification, cid))
+                score_changes.append((cid, old_score or 0, new_score, old_classification, new_classification))
+            cur.executemany("""
+                UPDATE clients
+                SET seriousness_score = COALESCE(seriousness_score, 0) + ?,
+                    classification = ?
+                WHERE id = ?
+            """, updates)
 
-    conn = get_connection()
-    cur = conn.cursor()
+        # 7) سجل النقاط داخل نفس المعاملة (بدلاً من record_score_change لكل رسالة)
+        if score_changes:
+            try:
+                from core.scoring_config import is_trend_analysis_enabled
+                trend_enabled = is_trend_analysis_enabled()
+            except Exception:
+                trend_enabled = False
+
+            if trend_enabled:
+                last_ids = {}
+                for chunk in _chunked(list(score_deltas)):
+                    placeholders = ",".join("?" * len(chunk))
+                    cur.execute(f"""
+                        SELECT client_id, MAX(id) FROM messages
+                        WHERE client_id IN ({placeholders})
+                        GROUP BY client_id
+                    """, chunk)
+                    last_ids.update(cur.fetchall())
+
+                now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                history_rows = []
+                for cid, old_score, new_score, old_classification, new_classification in score_changes:
+                    history_rows.append((
+                        cid, now_str, new_score, new_classification,
+                        f"رسائل مزامنة: {message_counts.get(cid, 0)}", last_ids.get(cid)
+                    ))
+                    if (old_classification or "❌ Not Serious") != new_classification:
+                        history_rows.append((
+                            cid, now_str, new_score, new_classification,
+                            "رسالة: Email", last_ids.get(cid)
+                        ))
+                try:
+                    cur.executemany("""
+                        INSERT INTO score_history (
+                            client_id, date, score, classification,
+                            change_reason, message_id
+                        )
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    """, history_rows)
+                except sqlite3.OperationalError:
+                    pass  # جدول score_history غير موجود
+
+        if own_transaction:
+            with phase("commit"):
+                conn.commit()
+        return stats
 
-    cur.execute("""
-        SELECT
-            c.id,
-            c.company_name,
-            c.status,
-            c.classification,
-            MAX(m.message_date)
-        FROM clients c
-        LEFT JOIN messages m ON c.id = m.client_id
-        GROUP BY c.id
-    """)
-    rows = cur.fetchall()
-    conn.close()
+    except Exception:
+        if own_transaction:
+            conn.rollback()
+        raise
 
-    today = datetime.now()
-    due = []
+    finally:
+        if own_transaction:
+            conn.close()
 
-    for cid, company, status, classification, last_date in rows:
-        if last_date:
-            try:
-                last_dt = datetime.strptime(last_date, "%d/%m/%Y")
-                days = (today - last_dt).days
-            except ValueError:
-                days = 999
-        else:
-            days = 999
 
-        wait = followup_days(status if status else classification)
-        if days >= wait:
-            due.append(company)
+def get_client_messages(client_id: int, with_analysis: bool = False):
+    """
+    رسائل العميل (الأحدث أولاً)
 
-    return due
+    with_analysis=True يضيف لكل صف (body_text, request_tags) المخزنين من التحليل
+    """
+    analysis_columns = ", body_text, request_tags" if with_analysis else ""
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT message_date, actual_date, message_type, channel,
+               client_response, notes, score_effect{analysis_columns}
+        FROM messages
+        WHERE client_id=?
+        ORDER BY sort_date_iso DESC, id DESC
+    """, (client_id,))
+    rows = cur.fetchall()
+    conn.close()
+    # التكرار ممنوع عند الإدخال (فهرس UNIQUE على fingerprint) فلا حاجة لتصفية هنا
+    return rows
 
 
 # =========================
@@ -1164,46 +1554,26 @@ def get_clients_needing_followup():
     """
     Return list of company names that require follow-up
     (safe wrapper – never crashes UI)
+
+    next_followup_at (آخر تواصل + أيام المتابعة) تحدّثه triggers عند إضافة
+    الرسائل أو تغيير الحالة، فالاستعلام مجرد نطاق على فهرس.
     """
-    try:
-        from core.models import followup_days
-    except Exception:
-        return []
+    from core.dates import iso_today
 
     conn = get_connection()
     cur = conn.cursor()
-
-    cur.execute("""
-        SELECT
-            c.company_name,
-            c.status,
-            c.classification,
-            MAX(m.message_date)
-        FROM clients c
-        LEFT JOIN messages m ON c.id = m.client_id
-        GROUP BY c.id
-    """)
-    rows = cur.fetchall()
-    conn.close()
-
-    today = datetime.now()
-    due = []
-
-    for company, status, classification, last_date in rows:
-        if last_date:
-            try:
-                last_dt = datetime.strptime(last_date, "%d/%m/%Y")
-                days = (today - last_dt).days
-            except Exception:
-                days = 999
-        else:
-            days = 999
-
-        wait = followup_days(status or classification)
-        if days >= wait:
-            due.append(company)
-
-    return due
+    try:
+        cur.execute("""
+            SELECT company_name
+            FROM clients
+            WHERE next_followup_at <= ?
+            ORDER BY next_followup_at, id
+        """, (iso_today(),))
+        return [r[0] for r in cur.fetchall()]
+    except sqlite3.Error:
+        return []
+    finally:
+        conn.close()
 
 
 def find_client_by_domain(domain: str):
@@ -1473,10 +1843,30 @@ def delete_document(doc_id: int):
 
 
 def search_documents(search_text: str, client_id: int = None):
-    """البحث في المستندات"""
+    """البحث في المستندات (فهرس FTS5 مرتب بـ bm25، أو LIKE إن لم يتوفر الفهرس)"""
+    from core.fulltext import fts_query, fulltext_available
+
     conn = get_connection()
     cur = conn.cursor()
     
+    match = fts_query(search_text)
+    if match and fulltext_available(cur, "documents_fts"):
+        query = """
+            SELECT d.*
+            FROM documents d
+            JOIN documents_fts ON documents_fts.rowid = d.id
+            WHERE documents_fts MATCH ?
+        """
+        params = [match]
+        if client_id:
+            query += " AND d.client_id = ?"
+            params.append(client_id)
+        query += " ORDER BY bm25(documents_fts), d.uploaded_date DESC"
+        cur.execute(query, params)
+        results = cur.fetchall()
+        conn.close()
+        return results
+    
     search_pattern = f'%{search_text.lower()}%'
     
     if client_id:
@@ -1885,10 +2275,20 @@ def search_buyers_by_product(product_name: str, countries: list = None):
     Returns:
         قائمة من العملاء الذين لديهم طلبات/رسائل متعلقة بالمنتج في الدول المحددة
     """
+    from core.fulltext import fts_query, fulltext_available
+
     conn = get_connection()
     cur = conn.cursor()
     
     product_pattern = f'%{product_name.lower()}%'
+
+    def _product_condition(fts_table, alias, fts_columns, like_columns):
+        """شرط المنتج: فهرس FTS5 إن وُجد، وإلا LIKE على الأعمدة"""
+        match = fts_query(product_name, fts_columns)
+        if match and fulltext_available(cur, fts_table):
+            return f"{alias}.id IN (SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH ?)", [match]
+        condition = " OR ".join(f"LOWER({alias}.{col}) LIKE ?" for col in like_columns)
+        return condition, [product_pattern] * len(like_columns)
     
     # بناء شروط البحث عن الدول
     if not countries or len(countries) == 0:
@@ -1909,19 +2309,20 @@ def search_buyers_by_product(product_name: str, countries: list = None):
     all_results = {}
     
     # 1. البحث في الطلبات
+    product_condition, product_params = _product_condition(
+        "requests_fts", "r",
+        ["extracted_text", "notes", "request_type"],
+        ["extracted_text", "notes", "request_type"]
+    )
     query1 = f"""
         SELECT DISTINCT c.*
         FROM clients c
         INNER JOIN requests r ON c.id = r.client_id
-        WHERE (
-            LOWER(r.extracted_text) LIKE ? 
-            OR LOWER(r.notes) LIKE ?
-            OR LOWER(r.request_type) LIKE ?
-        )
+        WHERE ({product_condition})
         AND ({country_conditions})
     """
     
-    params1 = [product_pattern, product_pattern, product_pattern] + country_params
+    params1 = product_params + country_params
     cur.execute(query1, params1)
     for row in cur.fetchall():
         all_results[row[0]] = row
@@ -1935,18 +2336,18 @@ def search_buyers_by_product(product_name: str, countries: list = None):
         ids_condition = ""
         params2_base = []
     
+    product_condition, product_params = _product_condition(
+        "messages_fts", "m", None, ["notes", "client_response"]
+    )
     query2 = f"""
         SELECT DISTINCT c.*
         FROM clients c
         INNER JOIN messages m ON c.id = m.client_id
-        WHERE (
-            LOWER(m.notes) LIKE ?
-            OR LOWER(m.client_response) LIKE ?
-        )
+        WHERE ({product_condition})
         AND ({country_conditions}){ids_condition}
     """
     
-    params2 = [product_pattern, product_pattern] + country_params + params2_base
+    params2 = product_params + country_params + params2_base
     cur.execute(query2, params2)
     for row in cur.fetchall():
         all_results[row[0]] = row
@@ -1961,22 +2362,26 @@ def search_buyers_by_product(product_name: str, countries: list = None):
         ids_condition = ""
         params3_base = []
     
+    product_condition, product_params = _product_condition(
+        "clients_fts", "c",
+        ["company_name", "email", "website"],
+        ["company_name", "email", "website"]
+    )
     query3 = f"""
         SELECT DISTINCT c.*
         FROM clients c
-        WHERE (
-            LOWER(c.company_name) LIKE ?
-            OR LOWER(c.email) LIKE ?
-            OR LOWER(c.website) LIKE ?
-        )
+        WHERE ({product_condition})
         AND ({country_conditions}){ids_condition}
     """
     
-    params3 = [product_pattern, product_pattern, product_pattern] + country_params + params3_base
+    params3 = product_params + country_params + params3_base
     cur.execute(query3, params3)
     for row in cur.fetchall():
         all_results[row[0]] = row
 
+    conn.close()
+    return list(all_results.values())
+
 
 # =========================
 # Outlook Accounts Management
@@ -2128,6 +2533,90 @@ def delete_outlook_account(account_id):
     conn.close()
 
 
+# نوع المزامنة -> (عمود رابط delta, عمود وقت آخر جولة ISO UTC)
+# لكل نوع رابط مستقل حتى لا تستهلك مزامنة تغييرات لم ترها الأخرى
+DELTA_LINK_COLUMNS = {
+    "sync": ("delta_link", "delta_synced_at"),
+    "focus": ("focus_delta_link", "focus_delta_synced_at"),
+}
+
+
+def get_account_delta_state(account_id, kind="sync"):
+    """
+    رابط Graph delta المحفوظ للحساب ووقت آخر جولة
+
+    Returns:
+        (delta_link, synced_at) أو (None, None) إذا لم تتم مزامنة بعد
+    """
+    link_col, synced_col = DELTA_LINK_COLUMNS[kind]
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(f"""
+            SELECT {link_col}, {synced_col}
+            FROM outlook_accounts
+            WHERE id = ?
+        """, (account_id,))
+        row = cur.fetchone()
+    except sqlite3.OperationalError:
+        row = None  # الترحيل لم يُنفَّذ بعد
+    conn.close()
+    return (row[0], row[1]) if row else (None, None)
+
+
+def save_account_delta_state(account_id, delta_link, synced_at, kind="sync"):
+    """حفظ رابط delta الجديد بعد نجاح معالجة الرسائل (None = البدء من جديد)"""
+    link_col, synced_col = DELTA_LINK_COLUMNS[kind]
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(f"""
+        UPDATE outlook_accounts
+        SET {link_col} = ?, {synced_col} = ?
+        WHERE id = ?
+    """, (delta_link, synced_at, account_id))
+    conn.commit()
+    conn.close()
+
+
+def get_imap_sync_state(account_id, folder="INBOX", kind="sync"):
+    """
+    حالة مزامنة IMAP المحفوظة
+
+    Returns:
+        (uidvalidity, last_uid) أو (None, 0) إذا لم تتم مزامنة بعد
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT uidvalidity, last_uid
+            FROM imap_sync_state
+            WHERE account_id = ? AND folder = ? AND kind = ?
+        """, (account_id, folder, kind))
+        row = cur.fetchone()
+    except sqlite3.OperationalError:
+        row = None  # الترحيل لم يُنفَّذ بعد
+    conn.close()
+    return (row[0], row[1] or 0) if row else (None, 0)
+
+
+def save_imap_sync_state(account_id, uidvalidity, last_uid, folder="INBOX", kind="sync"):
+    """حفظ آخر UID بعد نجاح معالجة الرسائل"""
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO imap_sync_state (account_id, folder, kind, uidvalidity, last_uid, synced_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(account_id, folder, kind) DO UPDATE SET
+            uidvalidity = excluded.uidvalidity,
+            last_uid = excluded.last_uid,
+            synced_at = excluded.synced_at
+    """, (account_id, folder, kind, uidvalidity, last_uid,
+          datetime.now().strftime("%d/%m/%Y %H:%M:%S")))
+    conn.commit()
+    conn.close()
+
+
 def update_account_last_sync(account_id):
     """تحديث تاريخ آخر مزامنة للحساب"""
     conn = get_connection()
@@ -2139,3 +2628,10 @@ def update_account_last_sync(account_id):
     """, (datetime.now().strftime("%d/%m/%Y %H:%M:%S"), account_id))
     conn.commit()
     conn.close()
+
+
+# =========================
+# Instrumentation
+# =========================
+# هيستوغرام زمن لكل دالة عامة (db.<name>) - تعرضه نافذة الأداء
+instrument_module(globals(), "db.", exclude=("get_connection", "init_db"))
@@ -1,14 +1,24 @@
 """
 نظام تصدير البيانات
 Data Export System for EFM
+
+التصدير يعمل كتدفق (streaming) بذاكرة ثابتة مهما كان حجم البيانات:
+- الصفوف تُقرأ من cursor على دفعات (fetchmany) بدلاً من fetchall()
+- Excel عبر openpyxl في وضع write-only (الصفوف تُكتب مباشرة ولا تُحفظ في الذاكرة)؛
+  openpyxl يستخدم lxml تلقائياً إن كانت مثبتة (أسرع بعدة مرات)
+- CSV يُكتب صفاً بصف
+- progress(done, total) لعرض التقدم و is_cancelled() للإلغاء (يرفع ExportCancelled
+  ويحذف الملف الجزئي) فيمكن التشغيل في خيط خلفي من الواجهة
 """
 import csv
 import os
+import re
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Callable, Iterable, List, Dict, Optional
 
 try:
     import openpyxl
+    from openpyxl.cell import WriteOnlyCell
     from openpyxl.styles import Font, PatternFill, Alignment
     from openpyxl.utils import get_column_letter
     EXCEL_AVAILABLE = True
@@ -16,617 +26,490 @@ except ImportError:
     EXCEL_AVAILABLE = False
     print("Warning: openpyxl not installed. Excel export will not be available.")
 
-from .db import (
-    get_connection,
-    get_all_clients,
-    get_client_messages,
-    get_clients_needing_followup
-)
+from .db import get_connection
+
+# عدد الصفوف في كل دفعة fetchmany (وكل تحديث للتقدم)
+EXPORT_CHUNK_SIZE = 2000
+
+ProgressCallback = Callable[[int, int], None]
+
+
+class ExportCancelled(Exception):
+    """أوقف المستخدم التصدير"""
+
+
+# =========================
+# Sheets
+# =========================
+CLIENT_HEADERS = [
+    'ID', 'Company Name', 'Country', 'Contact Person',
+    'Email', 'Phone', 'Website', 'Date Added',
+    'Status', 'Score', 'Classification', 'Focus'
+]
+MESSAGE_HEADERS = ['ID', 'Client', 'Date', 'Type', 'Channel', 'Subject', 'Score Effect']
+REQUEST_HEADERS = ['ID', 'Client', 'Email', 'Request Type', 'Status', 'Reply Status', 'Created At']
+
+# نفس أعمدة get_all_clients() وترتيبها
+CLIENTS_QUERY = """
+    SELECT
+        id, company_name, country, contact_person, email,
+        phone, website, date_added, status, seriousness_score,
+        COALESCE(classification, 'Unclassified') AS classification,
+        is_focus
+    FROM clients
+    ORDER BY is_focus DESC, seriousness_score DESC
+"""
+
+MESSAGES_QUERY = """
+    SELECT
+        m.id, c.company_name, m.message_date, m.message_type,
+        m.channel, m.client_response, m.score_effect
+    FROM messages m
+    JOIN clients c ON m.client_id = c.id
+    {where}
+    ORDER BY m.message_date_iso DESC
+"""
+
+REQUESTS_QUERY = """
+    SELECT
+        r.id, c.company_name, r.client_email, r.request_type,
+        r.status, r.reply_status, r.created_at
+    FROM requests r
+    LEFT JOIN clients c ON r.client_id = c.id
+    ORDER BY r.id DESC
+"""
+
+
+class ExportSheet:
+    """
+    ورقة تصدير: رأس الجدول + مصدر الصفوف (استعلام أو قائمة جاهزة) + تنسيق الصف
+
+    Args:
+        query / params: مصدر الصفوف من قاعدة البيانات (يُقرأ بـ fetchmany)
+        rows: صفوف جاهزة في الذاكرة بدلاً من الاستعلام
+        row_format: صف قاعدة البيانات -> قيم الأعمدة
+        styled_rows: تنسيق خلايا البيانات (خط + التفاف) في Excel
+    """
+
+    def __init__(self, title: str, headers: List[str], column_widths: List[int],
+                 header_color: str, header_font_color: str = "FFFFFF",
+                 query: str = None, params: tuple = (), rows: Iterable = None,
+                 row_format: Callable = None, styled_rows: bool = False):
+        self.title = title
+        self.headers = headers
+        self.column_widths = column_widths
+        self.header_color = header_color
+        self.header_font_color = header_font_color
+        self.query = query
+        self.params = params
+        self.rows = rows
+        self.row_format = row_format or list
+        self.styled_rows = styled_rows
+
+    def count(self, cur) -> int:
+        if self.rows is not None:
+            return len(self.rows) if hasattr(self.rows, "__len__") else 0
+        cur.execute(f"SELECT COUNT(*) FROM ({self.query})", self.params)
+        return cur.fetchone()[0]
+
+    def chunks(self, cur, chunk_size: int = EXPORT_CHUNK_SIZE):
+        """الصفوف المنسقة على دفعات"""
+        if self.rows is not None:
+            rows = list(self.rows)
+            for start in range(0, len(rows), chunk_size):
+                yield [self.row_format(row) for row in rows[start:start + chunk_size]]
+            return
+
+        cur.execute(self.query, self.params)
+        while True:
+            batch = cur.fetchmany(chunk_size)
+            if not batch:
+                break
+            yield [self.row_format(row) for row in batch]
+
+
+def _client_row(client) -> list:
+    (
+        client_id, company, country, contact, email,
+        phone, website, date_added, status, score,
+        classification, is_focus
+    ) = client
+    return [
+        client_id, company or '', country or '', contact or '',
+        email or '', phone or '', website or '', date_added or '',
+        status or '', score or 0, classification or '', 'Yes' if is_focus else 'No'
+    ]
+
+
+def _message_row(msg) -> list:
+    msg_id, company, msg_date, msg_type, channel, subject, score_effect = msg
+    return [
+        msg_id, company or '', msg_date or '', msg_type or '',
+        channel or '', subject or '', score_effect or 0
+    ]
+
+
+def _request_row(req) -> list:
+    req_id, company, email, req_type, status, reply_status, created_at = req
+    return [
+        req_id, company or '', email or '', req_type or '',
+        status or '', reply_status or '', created_at or ''
+    ]
+
+
+def _clients_sheet(clients: Optional[List] = None) -> ExportSheet:
+    return ExportSheet(
+        "Clients", CLIENT_HEADERS,
+        [8, 35, 18, 22, 30, 20, 35, 14, 12, 10, 18, 10],
+        "366092",
+        query=CLIENTS_QUERY if clients is None else None,
+        rows=clients,
+        row_format=_client_row,
+        styled_rows=True
+    )
+
+
+def _messages_sheet(client_id: Optional[int] = None) -> ExportSheet:
+    if client_id:
+        query, params = MESSAGES_QUERY.format(where="WHERE m.client_id = ?"), (client_id,)
+    else:
+        query, params = MESSAGES_QUERY.format(where=""), ()
+    return ExportSheet(
+        "Messages", MESSAGE_HEADERS, [6, 25, 12, 12, 12, 40, 12], "70AD47",
+        query=query, params=params, row_format=_message_row
+    )
+
+
+def _requests_sheet() -> ExportSheet:
+    return ExportSheet(
+        "Requests", REQUEST_HEADERS, [6, 25, 30, 20, 12, 15, 18], "FFC000",
+        header_font_color="000000", query=REQUESTS_QUERY, row_format=_request_row
+    )
+
+
+def _statistics_sheet(cur) -> ExportSheet:
+    """ملخص التقرير الشامل (COUNT في SQL بدلاً من تحميل الجداول)"""
+    cur.execute("""
+        SELECT
+            COUNT(*),
+            SUM(CASE WHEN classification LIKE '%🔥%' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN classification LIKE '%👍%' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN is_focus = 1 THEN 1 ELSE 0 END)
+        FROM clients
+    """)
+    total_clients, serious_count, potential_count, focus_count = cur.fetchone()
+    cur.execute("SELECT COUNT(*) FROM messages m JOIN clients c ON m.client_id = c.id")
+    total_messages = cur.fetchone()[0]
+    cur.execute("SELECT COUNT(*) FROM requests")
+    total_requests = cur.fetchone()[0]
+
+    stats_data = [
+        ('Total Clients', total_clients or 0),
+        ('Serious Buyers', serious_count or 0),
+        ('Potential Clients', potential_count or 0),
+        ('Focus Clients', focus_count or 0),
+        ('Total Messages', total_messages),
+        ('Total Requests', total_requests),
+        ('Export Date', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+    ]
+    return ExportSheet("Statistics", ['Metric', 'Value'], [25, 20], "366092", rows=stats_data)
+
+
+# =========================
+# Writers
+# =========================
+class _Progress:
+    """تجميع التقدم عبر الأوراق + فحص الإلغاء بين الدفعات"""
+
+    def __init__(self, progress: Optional[ProgressCallback], is_cancelled: Optional[Callable[[], bool]]):
+        self.callback = progress
+        self.is_cancelled = is_cancelled
+        self.done = 0
+        self.total = 0
+
+    def advance(self, count: int):
+        self.done += count
+        if self.callback:
+            self.callback(self.done, self.total)
+        if self.is_cancelled and self.is_cancelled():
+            raise ExportCancelled()
+
+
+_NEWLINES_RE = re.compile(r'[\r\n]')
+# أحرف التحكم (عدا tab) غير مسموحة في Excel
+_CONTROL_CHARS_RE = re.compile(r'[\x00-\x08\x0b-\x1f]')
+
+
+def _clean_value(value):
+    """تنظيف النصوص من الأحرف الخاصة التي قد تسبب مشاكل في Excel"""
+    if not isinstance(value, str):
+        return value
+    return _CONTROL_CHARS_RE.sub('', _NEWLINES_RE.sub(' ', value)).strip()
+
+
+def _run_export(file_path: str, sheets_factory: Callable, writer: Callable,
+                progress: Optional[ProgressCallback], is_cancelled) -> None:
+    """
+    فتح اتصال واحد، حساب الإجمالي للتقدم ثم الكتابة
+    عند الإلغاء أو الخطأ يُحذف الملف الجزئي
+    """
+    tracker = _Progress(progress, is_cancelled)
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        sheets = sheets_factory(cur)
+        if progress:
+            tracker.total = sum(sheet.count(cur) for sheet in sheets)
+            progress(0, tracker.total)
+        writer(file_path, sheets, conn, tracker)
+    except BaseException:
+        if os.path.exists(file_path):
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+        raise
+    finally:
+        conn.close()
+
+
+def _write_csv(file_path: str, sheets: List[ExportSheet], conn, tracker: _Progress):
+    sheet = sheets[0]
+    with open(file_path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(sheet.headers)
+        for chunk in sheet.chunks(conn.cursor()):
+            writer.writerows(chunk)
+            tracker.advance(len(chunk))
+
+
+def _write_xlsx(file_path: str, sheets: List[ExportSheet], conn, tracker: _Progress):
+    # write-only: الصفوف تُكتب إلى ملف مؤقت مباشرة ولا تبقى في الذاكرة
+    wb = openpyxl.Workbook(write_only=True)
+    data_font = Font(size=10, name="Arial")
+    data_alignment = Alignment(horizontal="left", vertical="center", wrap_text=True)
+    header_alignment = Alignment(horizontal="center", vertical="center")
+
+    try:
+        for sheet in sheets:
+            _write_xlsx_sheet(wb, sheet, tracker, conn.cursor(),
+                              data_font, data_alignment, header_alignment)
+    except BaseException:
+        # إغلاق الأوراق المفتوحة حتى لا تكتب إلى ملفات مؤقتة مغلقة عند التنظيف
+        for ws in wb.worksheets:
+            try:
+                ws.close()
+            except Exception:
+                pass
+        raise
+
+    # حفظ الملف
+    wb.save(file_path)
 
 
-def export_clients_to_csv(file_path: str, clients: Optional[List] = None) -> bool:
+def _write_xlsx_sheet(wb, sheet: ExportSheet, tracker: _Progress, cur,
+                      data_font, data_alignment, header_alignment):
+    ws = wb.create_sheet(sheet.title)
+
+    # ضبط عرض الأعمدة وتجميد الصف الأول (قبل كتابة أي صف)
+    for col_num, width in enumerate(sheet.column_widths, 1):
+        ws.column_dimensions[get_column_letter(col_num)].width = width
+    ws.freeze_panes = 'A2'
+
+    # رأس الجدول
+    header_fill = PatternFill(start_color=sheet.header_color, end_color=sheet.header_color, fill_type="solid")
+    header_font = Font(bold=True, color=sheet.header_font_color, size=11)
+    header_row = []
+    for header in sheet.headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = header_alignment
+        header_row.append(cell)
+    ws.append(header_row)
+
+    # البيانات
+    for chunk in sheet.chunks(cur):
+        for values in chunk:
+            values = [_clean_value(value) for value in values]
+            if sheet.styled_rows:
+                row = []
+                for value in values:
+                    cell = WriteOnlyCell(ws, value=value)
+                    cell.font = data_font
+                    cell.alignment = data_alignment
+                    row.append(cell)
+                ws.append(row)
+            else:
+                ws.append(values)
+        tracker.advance(len(chunk))
+
+
+def _require_excel():
+    if not EXCEL_AVAILABLE:
+        raise ImportError("openpyxl is required for Excel export. Install it using: pip install openpyxl")
+
+
+# =========================
+# Public API
+# =========================
+def export_clients_to_csv(file_path: str, clients: Optional[List] = None,
+                          progress: ProgressCallback = None, is_cancelled=None) -> bool:
     """
     تصدير قائمة العملاء إلى ملف CSV
-    
+
     Args:
         file_path: مسار ملف CSV
         clients: قائمة العملاء (إذا كانت None، سيتم جلب جميع العملاء)
-    
+        progress: progress(done, total) بعد كل دفعة
+        is_cancelled: إذا أعادت True يتوقف التصدير (ExportCancelled)
+
     Returns:
         True في حالة النجاح، False في حالة الفشل
     """
     try:
-        if clients is None:
-            clients = get_all_clients()
-        
-        with open(file_path, 'w', newline='', encoding='utf-8-sig') as f:
-            writer = csv.writer(f)
-            
-            # رأس الجدول
-            writer.writerow([
-                'ID', 'Company Name', 'Country', 'Contact Person',
-                'Email', 'Phone', 'Website', 'Date Added',
-                'Status', 'Score', 'Classification', 'Focus'
-            ])
-            
-            # البيانات
-            for client in clients:
-                (
-                    client_id, company, country, contact, email,
-                    phone, website, date_added, status, score,
-                    classification, is_focus
-                ) = client
-                
-                writer.writerow([
-                    client_id, company or '', country or '', contact or '',
-                    email or '', phone or '', website or '', date_added or '',
-                    status or '', score or 0, classification or '', 'Yes' if is_focus else 'No'
-                ])
-        
+        _run_export(file_path, lambda cur: [_clients_sheet(clients)], _write_csv, progress, is_cancelled)
         return True
-        
+    except ExportCancelled:
+        raise
     except Exception as e:
         print(f"خطأ في تصدير CSV: {e}")
         return False
 
 
-def export_clients_to_excel(file_path: str, clients: Optional[List] = None) -> bool:
+def export_clients_to_excel(file_path: str, clients: Optional[List] = None,
+                            progress: ProgressCallback = None, is_cancelled=None) -> bool:
     """
     تصدير قائمة العملاء إلى ملف Excel
-    
+
     Args:
         file_path: مسار ملف Excel (.xlsx)
         clients: قائمة العملاء (إذا كانت None، سيتم جلب جميع العملاء)
-    
+
     Returns:
         True في حالة النجاح، False في حالة الفشل
     """
-    if not EXCEL_AVAILABLE:
-        raise ImportError("openpyxl is required for Excel export. Install it using: pip install openpyxl")
-    
+    _require_excel()
+
     try:
-        if clients is None:
-            clients = get_all_clients()
-        
-        # إنشاء workbook جديد
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Clients"
-        
-        # تنسيق الرأس
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF", size=11)
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        
-        # رأس الجدول
-        headers = [
-            'ID', 'Company Name', 'Country', 'Contact Person',
-            'Email', 'Phone', 'Website', 'Date Added',
-            'Status', 'Score', 'Classification', 'Focus'
-        ]
-        
-        for col_num, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col_num, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = header_alignment
-        
-        # البيانات مع تنظيف وتحسين
-        data_font = Font(size=10, name="Arial")
-        data_alignment = Alignment(horizontal="left", vertical="center", wrap_text=True)
-        
-        def clean_value(value):
-            """تنظيف القيم من الأحرف الخاصة التي قد تسبب مشاكل في Excel"""
-            if value is None:
-                return ''
-            value_str = str(value).strip()
-            # إزالة الأحرف الخاصة التي قد تسبب مشاكل في Excel
-            value_str = value_str.replace('\x00', '').replace('\r', ' ').replace('\n', ' ')
-            # إزالة أحرف التحكم الأخرى
-            value_str = ''.join(char for char in value_str if ord(char) >= 32 or char in '\t')
-            return value_str
-        
-        for row_num, client in enumerate(clients, 2):
-            (
-                client_id, company, country, contact, email,
-                phone, website, date_added, status, score,
-                classification, is_focus
-            ) = client
-            
-            ws.cell(row=row_num, column=1, value=clean_value(client_id))
-            ws.cell(row=row_num, column=2, value=clean_value(company))
-            ws.cell(row=row_num, column=3, value=clean_value(country))
-            ws.cell(row=row_num, column=4, value=clean_value(contact))
-            ws.cell(row=row_num, column=5, value=clean_value(email))
-            ws.cell(row=row_num, column=6, value=clean_value(phone))
-            ws.cell(row=row_num, column=7, value=clean_value(website))
-            ws.cell(row=row_num, column=8, value=clean_value(date_added))
-            ws.cell(row=row_num, column=9, value=clean_value(status))
-            ws.cell(row=row_num, column=10, value=score if score else 0)
-            ws.cell(row=row_num, column=11, value=clean_value(classification))
-            ws.cell(row=row_num, column=12, value='Yes' if is_focus else 'No')
-            
-            # تطبيق التنسيق على الصف
-            for col_num in range(1, 13):
-                cell = ws.cell(row=row_num, column=col_num)
-                cell.font = data_font
-                cell.alignment = data_alignment
-        
-        # ضبط عرض الأعمدة (محسّن)
-        column_widths = [8, 35, 18, 22, 30, 20, 35, 14, 12, 10, 18, 10]
-        for col_num, width in enumerate(column_widths, 1):
-            ws.column_dimensions[get_column_letter(col_num)].width = width
-        
-        # تجميد الصف الأول
-        ws.freeze_panes = 'A2'
-        
-        # حفظ الملف
-        wb.save(file_path)
+        _run_export(file_path, lambda cur: [_clients_sheet(clients)], _write_xlsx, progress, is_cancelled)
         return True
-        
+    except ExportCancelled:
+        raise
     except Exception as e:
         print(f"خطأ في تصدير Excel: {e}")
         return False
 
 
-def export_messages_to_csv(file_path: str, client_id: Optional[int] = None) -> bool:
+def export_messages_to_csv(file_path: str, client_id: Optional[int] = None,
+                           progress: ProgressCallback = None, is_cancelled=None) -> bool:
     """
     تصدير الرسائل إلى ملف CSV
-    
+
     Args:
         file_path: مسار ملف CSV
         client_id: معرف العميل (إذا كان None، سيتم تصدير جميع الرسائل)
-    
+
     Returns:
         True في حالة النجاح، False في حالة الفشل
     """
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        
-        if client_id:
-            query = """
-                SELECT 
-                    m.id, c.company_name, m.message_date, m.message_type,
-                    m.channel, m.client_response, m.score_effect
-                FROM messages m
-                JOIN clients c ON m.client_id = c.id
-                WHERE m.client_id = ?
-                ORDER BY m.message_date DESC
-            """
-            cur.execute(query, (client_id,))
-        else:
-            query = """
-                SELECT 
-                    m.id, c.company_name, m.message_date, m.message_type,
-                    m.channel, m.client_response, m.score_effect
-                FROM messages m
-                JOIN clients c ON m.client_id = c.id
-                ORDER BY m.message_date DESC
-            """
-            cur.execute(query)
-        
-        messages = cur.fetchall()
-        conn.close()
-        
-        with open(file_path, 'w', newline='', encoding='utf-8-sig') as f:
-            writer = csv.writer(f)
-            
-            # رأس الجدول
-            writer.writerow([
-                'ID', 'Client', 'Date', 'Type', 'Channel', 'Subject', 'Score Effect'
-            ])
-            
-            # البيانات
-            for msg in messages:
-                msg_id, company, msg_date, msg_type, channel, subject, score_effect = msg
-                
-                writer.writerow([
-                    msg_id, company or '', msg_date or '', msg_type or '',
-                    channel or '', subject or '', score_effect or 0
-                ])
-        
+        _run_export(file_path, lambda cur: [_messages_sheet(client_id)], _write_csv, progress, is_cancelled)
         return True
-        
+    except ExportCancelled:
+        raise
     except Exception as e:
         print(f"خطأ في تصدير الرسائل CSV: {e}")
         return False
 
 
-def export_messages_to_excel(file_path: str, client_id: Optional[int] = None) -> bool:
+def export_messages_to_excel(file_path: str, client_id: Optional[int] = None,
+                             progress: ProgressCallback = None, is_cancelled=None) -> bool:
     """
     تصدير الرسائل إلى ملف Excel
-    
+
     Args:
         file_path: مسار ملف Excel (.xlsx)
         client_id: معرف العميل (إذا كان None، سيتم تصدير جميع الرسائل)
-    
+
     Returns:
         True في حالة النجاح، False في حالة الفشل
     """
-    if not EXCEL_AVAILABLE:
-        raise ImportError("openpyxl is required for Excel export. Install it using: pip install openpyxl")
-    
+    _require_excel()
+
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        
-        if client_id:
-            query = """
-                SELECT 
-                    m.id, c.company_name, m.message_date, m.message_type,
-                    m.channel, m.client_response, m.score_effect
-                FROM messages m
-                JOIN clients c ON m.client_id = c.id
-                WHERE m.client_id = ?
-                ORDER BY m.message_date DESC
-            """
-            cur.execute(query, (client_id,))
-        else:
-            query = """
-                SELECT 
-                    m.id, c.company_name, m.message_date, m.message_type,
-                    m.channel, m.client_response, m.score_effect
-                FROM messages m
-                JOIN clients c ON m.client_id = c.id
-                ORDER BY m.message_date DESC
-            """
-            cur.execute(query)
-        
-        messages = cur.fetchall()
-        conn.close()
-        
-        # إنشاء workbook جديد
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Messages"
-        
-        # تنسيق الرأس
-        header_fill = PatternFill(start_color="70AD47", end_color="70AD47", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF", size=11)
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        
-        # رأس الجدول
-        headers = ['ID', 'Client', 'Date', 'Type', 'Channel', 'Subject', 'Score Effect']
-        
-        for col_num, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col_num, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = header_alignment
-        
-        # البيانات
-        for row_num, msg in enumerate(messages, 2):
-            msg_id, company, msg_date, msg_type, channel, subject, score_effect = msg
-            
-            ws.cell(row=row_num, column=1, value=msg_id)
-            ws.cell(row=row_num, column=2, value=company or '')
-            ws.cell(row=row_num, column=3, value=msg_date or '')
-            ws.cell(row=row_num, column=4, value=msg_type or '')
-            ws.cell(row=row_num, column=5, value=channel or '')
-            ws.cell(row=row_num, column=6, value=subject or '')
-            ws.cell(row=row_num, column=7, value=score_effect or 0)
-        
-        # ضبط عرض الأعمدة
-        column_widths = [6, 25, 12, 12, 12, 40, 12]
-        for col_num, width in enumerate(column_widths, 1):
-            ws.column_dimensions[get_column_letter(col_num)].width = width
-        
-        # تجميد الصف الأول
-        ws.freeze_panes = 'A2'
-        
-        # حفظ الملف
-        wb.save(file_path)
+        _run_export(file_path, lambda cur: [_messages_sheet(client_id)], _write_xlsx, progress, is_cancelled)
         return True
-        
+    except ExportCancelled:
+        raise
     except Exception as e:
         print(f"خطأ في تصدير الرسائل Excel: {e}")
         return False
 
 
-def export_requests_to_csv(file_path: str) -> bool:
+def export_requests_to_csv(file_path: str, progress: ProgressCallback = None, is_cancelled=None) -> bool:
     """
     تصدير الطلبات إلى ملف CSV
-    
+
     Args:
         file_path: مسار ملف CSV
-    
+
     Returns:
         True في حالة النجاح، False في حالة الفشل
     """
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        
-        query = """
-            SELECT 
-                r.id, c.company_name, r.client_email, r.request_type,
-                r.status, r.reply_status, r.created_at
-            FROM requests r
-            LEFT JOIN clients c ON r.client_id = c.id
-            ORDER BY r.id DESC
-        """
-        cur.execute(query)
-        requests = cur.fetchall()
-        conn.close()
-        
-        with open(file_path, 'w', newline='', encoding='utf-8-sig') as f:
-            writer = csv.writer(f)
-            
-            # رأس الجدول
-            writer.writerow([
-                'ID', 'Client', 'Email', 'Request Type', 'Status', 'Reply Status', 'Created At'
-            ])
-            
-            # البيانات
-            for req in requests:
-                req_id, company, email, req_type, status, reply_status, created_at = req
-                
-                writer.writerow([
-                    req_id, company or '', email or '', req_type or '',
-                    status or '', reply_status or '', created_at or ''
-                ])
-        
+        _run_export(file_path, lambda cur: [_requests_sheet()], _write_csv, progress, is_cancelled)
         return True
-        
+    except ExportCancelled:
+        raise
     except Exception as e:
         print(f"خطأ في تصدير الطلبات CSV: {e}")
         return False
 
 
-def export_requests_to_excel(file_path: str) -> bool:
+def export_requests_to_excel(file_path: str, progress: ProgressCallback = None, is_cancelled=None) -> bool:
     """
     تصدير الطلبات إلى ملف Excel
-    
+
     Args:
         file_path: مسار ملف Excel (.xlsx)
-    
+
     Returns:
         True في حالة النجاح، False في حالة الفشل
     """
-    if not EXCEL_AVAILABLE:
-        raise ImportError("openpyxl is required for Excel export. Install it using: pip install openpyxl")
-    
+    _require_excel()
+
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        
-        query = """
-            SELECT 
-                r.id, c.company_name, r.client_email, r.request_type,
-                r.status, r.reply_status, r.created_at
-            FROM requests r
-            LEFT JOIN clients c ON r.client_id = c.id
-            ORDER BY r.id DESC
-        """
-        cur.execute(query)
-        requests = cur.fetchall()
-        conn.close()
-        
-        # إنشاء workbook جديد
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Requests"
-        
-        # تنسيق الرأس
-        header_fill = PatternFill(start_color="FFC000", end_color="FFC000", fill_type="solid")
-        header_font = Font(bold=True, color="000000", size=11)
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        
-        # رأس الجدول
-        headers = ['ID', 'Client', 'Email', 'Request Type', 'Status', 'Reply Status', 'Created At']
-        
-        for col_num, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col_num, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = header_alignment
-        
-        # البيانات
-        for row_num, req in enumerate(requests, 2):
-            req_id, company, email, req_type, status, reply_status, created_at = req
-            
-            ws.cell(row=row_num, column=1, value=req_id)
-            ws.cell(row=row_num, column=2, value=company or '')
-            ws.cell(row=row_num, column=3, value=email or '')
-            ws.cell(row=row_num, column=4, value=req_type or '')
-            ws.cell(row=row_num, column=5, value=status or '')
-            ws.cell(row=row_num, column=6, value=reply_status or '')
-            ws.cell(row=row_num, column=7, value=created_at or '')
-        
-        # ضبط عرض الأعمدة
-        column_widths = [6, 25, 30, 20, 12, 15, 18]
-        for col_num, width in enumerate(column_widths, 1):
-            ws.column_dimensions[get_column_letter(col_num)].width = width
-        
-        # تجميد الصف الأول
-        ws.freeze_panes = 'A2'
-        
-        # حفظ الملف
-        wb.save(file_path)
+        _run_export(file_path, lambda cur: [_requests_sheet()], _write_xlsx, progress, is_cancelled)
         return True
-        
+    except ExportCancelled:
+        raise
     except Exception as e:
         print(f"خطأ في تصدير الطلبات Excel: {e}")
         return False
 
 
-def export_full_report_to_excel(file_path: str) -> bool:
+def export_full_report_to_excel(file_path: str, progress: ProgressCallback = None, is_cancelled=None) -> bool:
     """
     تصدير تقرير شامل يحتوي على جميع البيانات في ملف Excel واحد
-    
+    (العملاء، الرسائل، الطلبات، الإحصائيات)
+
     Args:
         file_path: مسار ملف Excel (.xlsx)
-    
+
     Returns:
         True في حالة النجاح، False في حالة الفشل
     """
-    if not EXCEL_AVAILABLE:
-        raise ImportError("openpyxl is required for Excel export. Install it using: pip install openpyxl")
-    
+    _require_excel()
+
+    def sheets(cur):
+        return [_clients_sheet(), _messages_sheet(), _requests_sheet(), _statistics_sheet(cur)]
+
     try:
-        wb = openpyxl.Workbook()
-        
-        # حذف الورقة الافتراضية
-        if 'Sheet' in wb.sheetnames:
-            wb.remove(wb['Sheet'])
-        
-        # 1. ورقة العملاء
-        clients = get_all_clients()
-        ws_clients = wb.create_sheet("Clients")
-        
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF", size=11)
-        
-        headers = [
-            'ID', 'Company Name', 'Country', 'Contact Person',
-            'Email', 'Phone', 'Website', 'Date Added',
-            'Status', 'Score', 'Classification', 'Focus'
-        ]
-        
-        for col_num, header in enumerate(headers, 1):
-            cell = ws_clients.cell(row=1, column=col_num, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-        
-        for row_num, client in enumerate(clients, 2):
-            (
-                client_id, company, country, contact, email,
-                phone, website, date_added, status, score,
-                classification, is_focus
-            ) = client
-            
-            ws_clients.cell(row=row_num, column=1, value=client_id)
-            ws_clients.cell(row=row_num, column=2, value=company or '')
-            ws_clients.cell(row=row_num, column=3, value=country or '')
-            ws_clients.cell(row=row_num, column=4, value=contact or '')
-            ws_clients.cell(row=row_num, column=5, value=email or '')
-            ws_clients.cell(row=row_num, column=6, value=phone or '')
-            ws_clients.cell(row=row_num, column=7, value=website or '')
-            ws_clients.cell(row=row_num, column=8, value=date_added or '')
-            ws_clients.cell(row=row_num, column=9, value=status or '')
-            ws_clients.cell(row=row_num, column=10, value=score or 0)
-            ws_clients.cell(row=row_num, column=11, value=classification or '')
-            ws_clients.cell(row=row_num, column=12, value='Yes' if is_focus else 'No')
-        
-        column_widths = [6, 25, 15, 20, 30, 15, 25, 12, 18, 8, 20, 8]
-        for col_num, width in enumerate(column_widths, 1):
-            ws_clients.column_dimensions[get_column_letter(col_num)].width = width
-        ws_clients.freeze_panes = 'A2'
-        
-        # 2. ورقة الرسائل
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT 
-                m.id, c.company_name, m.message_date, m.message_type,
-                m.channel, m.client_response, m.score_effect
-            FROM messages m
-            JOIN clients c ON m.client_id = c.id
-            ORDER BY m.message_date DESC
-        """)
-        messages = cur.fetchall()
-        
-        ws_messages = wb.create_sheet("Messages")
-        
-        header_fill2 = PatternFill(start_color="70AD47", end_color="70AD47", fill_type="solid")
-        headers2 = ['ID', 'Client', 'Date', 'Type', 'Channel', 'Subject', 'Score Effect']
-        
-        for col_num, header in enumerate(headers2, 1):
-            cell = ws_messages.cell(row=1, column=col_num, value=header)
-            cell.fill = header_fill2
-            cell.font = header_font
-        
-        for row_num, msg in enumerate(messages, 2):
-            msg_id, company, msg_date, msg_type, channel, subject, score_effect = msg
-            ws_messages.cell(row=row_num, column=1, value=msg_id)
-            ws_messages.cell(row=row_num, column=2, value=company or '')
-            ws_messages.cell(row=row_num, column=3, value=msg_date or '')
-            ws_messages.cell(row=row_num, column=4, value=msg_type or '')
-            ws_messages.cell(row=row_num, column=5, value=channel or '')
-            ws_messages.cell(row=row_num, column=6, value=subject or '')
-            ws_messages.cell(row=row_num, column=7, value=score_effect or 0)
-        
-        column_widths2 = [6, 25, 12, 12, 12, 40, 12]
-        for col_num, width in enumerate(column_widths2, 1):
-            ws_messages.column_dimensions[get_column_letter(col_num)].width = width
-        ws_messages.freeze_panes = 'A2'
-        
-        # 3. ورقة الطلبات
-        cur.execute("""
-            SELECT 
-                r.id, c.company_name, r.client_email, r.request_type,
-                r.status, r.reply_status, r.created_at
-            FROM requests r
-            LEFT JOIN clients c ON r.client_id = c.id
-            ORDER BY r.id DESC
-        """)
-        requests = cur.fetchall()
-        conn.close()
-        
-        ws_requests = wb.create_sheet("Requests")
-        
-        header_fill3 = PatternFill(start_color="FFC000", end_color="FFC000", fill_type="solid")
-        headers3 = ['ID', 'Client', 'Email', 'Request Type', 'Status', 'Reply Status', 'Created At']
-        
-        for col_num, header in enumerate(headers3, 1):
-            cell = ws_requests.cell(row=1, column=col_num, value=header)
-            cell.fill = header_fill3
-            cell.font = header_font
-        
-        for row_num, req in enumerate(requests, 2):
-            req_id, company, email, req_type, status, reply_status, created_at = req
-            ws_requests.cell(row=row_num, column=1, value=req_id)
-            ws_requests.cell(row=row_num, column=2, value=company or '')
-            ws_requests.cell(row=row_num, column=3, value=email or '')
-            ws_requests.cell(row=row_num, column=4, value=req_type or '')
-            ws_requests.cell(row=row_num, column=5, value=status or '')
-            ws_requests.cell(row=row_num, column=6, value=reply_status or '')
-            ws_requests.cell(row=row_num, column=7, value=created_at or '')
-        
-        column_widths3 = [6, 25, 30, 20, 12, 15, 18]
-        for col_num, width in enumerate(column_widths3, 1):
-            ws_requests.column_dimensions[get_column_letter(col_num)].width = width
-        ws_requests.freeze_panes = 'A2'
-        
-        # 4. ورقة الإحصائيات
-        ws_stats = wb.create_sheet("Statistics")
-        
-        stats_headers = ['Metric', 'Value']
-        for col_num, header in enumerate(stats_headers, 1):
-            cell = ws_stats.cell(row=1, column=col_num, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-        
-        # حساب الإحصائيات
-        total_clients = len(clients)
-        serious_count = sum(1 for c in clients if c[10] and '🔥' in str(c[10]))
-        potential_count = sum(1 for c in clients if c[10] and '👍' in str(c[10]))
-        focus_count = sum(1 for c in clients if c[11] == 1)
-        total_messages = len(messages)
-        total_requests = len(requests)
-        
-        stats_data = [
-            ('Total Clients', total_clients),
-            ('Serious Buyers', serious_count),
-            ('Potential Clients', potential_count),
-            ('Focus Clients', focus_count),
-            ('Total Messages', total_messages),
-            ('Total Requests', total_requests),
-            ('Export Date', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-        ]
-        
-        for row_num, (metric, value) in enumerate(stats_data, 2):
-            ws_stats.cell(row=row_num, column=1, value=metric)
-            ws_stats.cell(row=row_num, column=2, value=value)
-        
-        ws_stats.column_dimensions['A'].width = 25
-        ws_stats.column_dimensions['B'].width = 20
-        
-        # حفظ الملف
-        wb.save(file_path)
+        _run_export(file_path, sheets, _write_xlsx, progress, is_cancelled)
         return True
-        
+    except ExportCancelled:
+        raise
     except Exception as e:
         print(f"خطأ في تصدير التقرير الشامل: {e}")
         return False
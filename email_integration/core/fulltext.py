@@ -0,0 +1,179 @@
+"""
+فهارس البحث النصي الكامل (SQLite FTS5)
+Full-text search indexes for messages, requests, clients and documents
+
+- جدول FTS5 لكل جدول مصدر (rowid = id في الجدول الأصلي) تحدّثه triggers
+  عند INSERT / UPDATE / DELETE فلا يحتاج الكود الذي يكتب البيانات لأي تغيير
+- tokenizer: unicode61 remove_diacritics 2 (é -> e ...) والتشكيل العربي
+  والتطويل يُحذفان في الـ trigger نفسه (SQL فقط بدون دوال Python) حتى تعمل
+  الكتابة من أي اتصال
+- fts_query() تحوّل نص المستخدم إلى استعلام prefix آمن ("onio"* يطابق onion)
+- الترتيب بـ bm25() والمقتطفات بـ snippet() مع تمييز الكلمات المطابقة
+
+إذا كانت نسخة SQLite بدون FTS5 لا تُنشأ الجداول وتعود دوال البحث إلى LIKE.
+"""
+import sqlite3
+from typing import Iterable, Optional, Sequence
+
+from .text_normalize import normalize_text
+
+FTS_TOKENIZER = "unicode61 remove_diacritics 2"
+
+# جدول FTS -> (الجدول المصدر, ((عمود FTS, أعمدة المصدر - أول قيمة غير NULL), ...))
+FTS_INDEXES = {
+    "messages_fts": ("messages", (
+        ("subject", ("client_response",)),
+        ("body", ("body_text", "notes")),
+    )),
+    "requests_fts": ("requests", (
+        ("request_type", ("request_type",)),
+        ("extracted_text", ("extracted_text",)),
+        ("notes", ("notes",)),
+        ("client_email", ("client_email",)),
+    )),
+    "clients_fts": ("clients", (
+        ("company_name", ("company_name",)),
+        ("country", ("country",)),
+        ("email", ("email",)),
+        ("contact_person", ("contact_person",)),
+        ("phone", ("phone",)),
+        ("website", ("website",)),
+    )),
+    "documents_fts": ("documents", (
+        ("file_name", ("file_name",)),
+        ("description", ("description",)),
+        ("document_type", ("document_type",)),
+    )),
+}
+
+# تمييز الكلمات المطابقة في snippet()
+SNIPPET_OPEN = "["
+SNIPPET_CLOSE = "]"
+SNIPPET_ELLIPSIS = "…"
+SNIPPET_TOKENS = 12
+
+# التطويل + التشكيل (تنوين، فتحة، ضمة، كسرة، شدة، سكون) + الألف الخنجرية
+# (نفس ما يحذفه normalize_text من نص البحث)
+_ARABIC_FOLD_CODEPOINTS = (0x0640,) + tuple(range(0x064B, 0x0653)) + (0x0670,)
+
+
+def _fold_sql(expr: str) -> str:
+    """حذف التشكيل العربي والتطويل داخل SQL"""
+    for codepoint in _ARABIC_FOLD_CODEPOINTS:
+        expr = f"REPLACE({expr}, char({codepoint}), '')"
+    return expr
+
+
+def _source_sql(prefix: str, source_columns: Sequence[str]) -> str:
+    values = [f"{prefix}{col}" for col in source_columns]
+    value = values[0] if len(values) == 1 else f"COALESCE({', '.join(values)})"
+    return _fold_sql(value)
+
+
+def _index_values_sql(fts_table: str, prefix: str) -> str:
+    """(rowid, col1, col2 ...) VALUES/SELECT من صف المصدر"""
+    _, columns = FTS_INDEXES[fts_table]
+    return ", ".join(
+        [f"{prefix}id"] + [_source_sql(prefix, sources) for _, sources in columns]
+    )
+
+
+def _table_exists(cur, table: str) -> bool:
+    cur.execute("SELECT 1 FROM sqlite_master WHERE name=?", (table,))
+    return cur.fetchone() is not None
+
+
+def ensure_fulltext_index(cur, fts_table: str) -> bool:
+    """
+    إنشاء جدول FTS5 + triggers المزامنة + فهرسة الصفوف الموجودة
+
+    Returns:
+        False إذا كان الجدول المصدر غير موجود أو SQLite بدون FTS5
+    """
+    source, columns = FTS_INDEXES[fts_table]
+    if not _table_exists(cur, source):
+        return False
+
+    fts_columns = [name for name, _ in columns]
+    try:
+        cur.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table}
+            USING fts5({", ".join(fts_columns)}, tokenize='{FTS_TOKENIZER}')
+        """)
+    except sqlite3.OperationalError as e:
+        if "fts5" in str(e).lower():
+            return False
+        raise
+
+    column_list = ", ".join(["rowid"] + fts_columns)
+    watched = sorted({col for _, sources in columns for col in sources})
+
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {source} BEGIN
+            INSERT INTO {fts_table}({column_list}) VALUES ({_index_values_sql(fts_table, "new.")});
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {source} BEGIN
+            DELETE FROM {fts_table} WHERE rowid = old.id;
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_au
+        AFTER UPDATE OF {", ".join(watched)} ON {source} BEGIN
+            DELETE FROM {fts_table} WHERE rowid = old.id;
+            INSERT INTO {fts_table}({column_list}) VALUES ({_index_values_sql(fts_table, "new.")});
+        END
+    """)
+
+    cur.execute(f"DELETE FROM {fts_table}")
+    cur.execute(f"""
+        INSERT INTO {fts_table}({column_list})
+        SELECT {_index_values_sql(fts_table, "")} FROM {source}
+    """)
+    return True
+
+
+def ensure_fulltext_indexes(cur):
+    for fts_table in FTS_INDEXES:
+        ensure_fulltext_index(cur, fts_table)
+
+
+def fulltext_available(cur, fts_table: str) -> bool:
+    """هل جدول FTS موجود (تم إنشاؤه في الترحيل)"""
+    return _table_exists(cur, fts_table)
+
+
+def fts_query(text: str, columns: Optional[Iterable[str]] = None) -> str:
+    """
+    نص المستخدم -> استعلام MATCH
+
+    كل كلمة تصبح phrase بين علامتي تنصيص مع * (prefix) فلا تُفسَّر
+    علامات FTS5 الخاصة (AND / OR / - / :) الموجودة في النص؛ الكلمات مرتبطة بـ AND.
+    "a@b.com" تصبح phrase من ثلاث كلمات (a b com) مثل النص المفهرس.
+
+    Args:
+        columns: حصر البحث في أعمدة FTS محددة
+
+    Returns:
+        "" إذا لم يبقَ في النص كلمات قابلة للبحث
+    """
+    phrases = [
+        '"' + term.replace('"', '""') + '"*'
+        for term in normalize_text(text).split()
+        if any(ch.isalnum() for ch in term)
+    ]
+    if not phrases:
+        return ""
+    query = " ".join(phrases)
+    if columns:
+        query = "{" + " ".join(columns) + "} : (" + query + ")"
+    return query
+
+
+def snippet_sql(fts_table: str, column: int = -1) -> str:
+    """snippet() لجدول FTS (column=-1: أفضل عمود مطابق)"""
+    return (
+        f"snippet({fts_table}, {column}, '{SNIPPET_OPEN}', '{SNIPPET_CLOSE}', "
+        f"'{SNIPPET_ELLIPSIS}', {SNIPPET_TOKENS})"
+    )
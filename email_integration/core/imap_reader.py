@@ -2,15 +2,22 @@
 قراءة الإيميلات من حسابات IMAP (cPanel)
 Reading emails from IMAP accounts (cPanel)
 """
+import base64
 import imaplib
 import email
+import quopri
+import re
 from email.header import decode_header
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import ssl
 import socket
 
 
+# عدد الرسائل في كل UID FETCH (طلب واحد لكل دفعة بدلاً من طلب لكل رسالة)
+FETCH_BATCH_SIZE = 100
+
+
 def read_messages_from_imap(imap_server: str, imap_port: int, username: str, password: str,
                            use_ssl: bool = True, folder: str = "INBOX", max_messages: Optional[int] = None,
                            timeout: int = 30) -> List[Dict]:
@@ -29,128 +36,375 @@ def read_messages_from_imap(imap_server: str, imap_port: int, username: str, pas
     Returns:
         List of message dictionaries
     """
+    messages, _state = read_new_messages_from_imap(
+        imap_server, imap_port, username, password,
+        use_ssl=use_ssl, folder=folder, max_messages=max_messages, timeout=timeout
+    )
+    return messages
+
+
+def read_new_messages_from_imap(imap_server: str, imap_port: int, username: str, password: str,
+                                use_ssl: bool = True, folder: str = "INBOX",
+                                uidvalidity: Optional[int] = None, last_uid: int = 0,
+                                max_messages: Optional[int] = None,
+                                timeout: int = 30) -> Tuple[List[Dict], Tuple[int, int]]:
+    """
+    قراءة الرسائل الجديدة فقط (UID أكبر من last_uid) من مجلد IMAP
+
+    - UID SEARCH UID n:* بدلاً من SEARCH ALL
+    - UID FETCH على دفعات (message sets) بدلاً من FETCH لكل رسالة
+    - BODY.PEEK[HEADER] + جزء النص فقط (بدون المرفقات ولا يغيّر حالة "مقروءة")
+    - إذا تغيّر UIDVALIDITY (أُعيد إنشاء المجلد) تبدأ القراءة من جديد
+
+    Args:
+        uidvalidity / last_uid: الحالة المحفوظة من المزامنة السابقة (None / 0 = أول مرة)
+        max_messages: في أول مزامنة فقط: آخر N رسالة (None = الكل)
+
+    Returns:
+        (messages, (uidvalidity, last_uid)) - تُحفظ الحالة الجديدة بعد نجاح المعالجة
+    """
     messages = []
-    
+
     try:
-        # منع تعليق الاتصال/القراءة بلا نهاية
+        mail = _connect(imap_server, imap_port, use_ssl, timeout)
         try:
-            socket.setdefaulttimeout(timeout)
-        except Exception:
-            pass
+            # تسجيل الدخول
+            mail.login(username, password)
 
-        # الاتصال بخادم IMAP
-        if use_ssl:
-            # SSL connection (port 993)
-            # بعض إصدارات بايثون تدعم timeout كـ keyword arg
-            try:
-                mail = imaplib.IMAP4_SSL(imap_server, imap_port, timeout=timeout)
-            except TypeError:
-                mail = imaplib.IMAP4_SSL(imap_server, imap_port)
-        else:
-            # TLS connection (port 143)
-            try:
-                mail = imaplib.IMAP4(imap_server, imap_port, timeout=timeout)
-            except TypeError:
-                mail = imaplib.IMAP4(imap_server, imap_port)
-            mail.starttls()
-        
-        # تسجيل الدخول
-        mail.login(username, password)
-        
-        # اختيار المجلد
-        status, messages_count = mail.select(folder)
-        if status != "OK":
-            raise Exception(f"Failed to select folder {folder}")
-        
-        # الحصول على عدد الرسائل
-        num_messages = int(messages_count[0])
-        if max_messages:
-            num_messages = min(num_messages, max_messages)
-        
-        # البحث عن الرسائل (الحديثة أولاً)
-        status, message_ids = mail.search(None, "ALL")
-        if status != "OK":
-            raise Exception("Failed to search messages")
-        
-        email_ids = message_ids[0].split()
-        # أخذ آخر الرسائل (الأحدث)
-        email_ids = email_ids[-num_messages:] if num_messages else email_ids
-        
-        # قراءة كل رسالة
-        for email_id in email_ids:
-            try:
-                # جلب الرسالة
-                status, msg_data = mail.fetch(email_id, "(RFC822)")
+            # readonly: لا تتغير حالة الرسائل على الخادم
+            status, _count = mail.select(folder, readonly=True)
+            if status != "OK":
+                raise Exception(f"Failed to select folder {folder}")
+
+            current_validity = _select_response_int(mail, "UIDVALIDITY")
+            if uidvalidity is None or current_validity != uidvalidity:
+                last_uid = 0
+            last_uid = last_uid or 0
+
+            # المجلد لم يتغير منذ آخر مزامنة: لا بحث ولا تحميل
+            uid_next = _select_response_int(mail, "UIDNEXT")
+            if last_uid and uid_next and uid_next - 1 <= last_uid:
+                uids = []
+            else:
+                status, data = mail.uid("SEARCH", None, f"UID {last_uid + 1}:*")
                 if status != "OK":
-                    continue
-                
-                # تحليل الرسالة
-                email_body = msg_data[0][1]
-                email_message = email.message_from_bytes(email_body)
-                
-                # استخراج المعلومات
-                subject = _decode_header(email_message["Subject"])
-                from_address = _decode_header(email_message["From"])
-                to_address = _decode_header(email_message["To"])
-                date_str = email_message["Date"]
-                
-                # تحويل التاريخ إلى تنسيق dd/mm/yyyy
-                received_date = None
-                actual_date_str = None
-                try:
-                    date_tuple = email.utils.parsedate_tz(date_str)
-                    if date_tuple:
-                        received_date = email.utils.mktime_tz(date_tuple)
-                        date_obj = datetime.fromtimestamp(received_date)
-                        actual_date_str = date_obj.strftime("%d/%m/%Y")
-                        received_date = date_obj.isoformat()
-                except:
-                    received_date = date_str
-                
-                # استخراج البريد الإلكتروني من "From"
-                sender_email = _extract_email(from_address)
-                sender_name = _extract_name(from_address)
-                
-                # استخراج محتوى الرسالة
-                body = _get_email_body(email_message)
-                
-                # تحويل إلى تنسيق مشابه لـ Microsoft Graph
-                message_dict = {
-                    "id": email_id.decode(),
-                    "subject": subject or "",
-                    "body": {
-                        "content": body,
-                        "contentType": "HTML" if _is_html(body) else "Text"
-                    },
-                    "from": {
-                        "emailAddress": {
-                            "name": sender_name or "",
-                            "address": sender_email or ""
-                        }
-                    },
-                    "receivedDateTime": received_date or "",
-                    "date": actual_date_str or date_str,  # التاريخ الفعلي بتنسيق dd/mm/yyyy
-                    "isRead": False  # IMAP لا يعطي هذه المعلومات مباشرة
-                }
-                
-                messages.append(message_dict)
-                
-            except Exception as e:
-                print(f"Error reading message {email_id}: {str(e)}")
-                continue
-        
-        # إغلاق الاتصال
-        mail.close()
-        mail.logout()
-        
+                    raise Exception("Failed to search messages")
+                # n:* يعيد دائماً آخر UID حتى لو كان أصغر من n
+                uids = sorted(int(u) for u in (data[0] or b"").split() if int(u) > last_uid)
+
+            if not last_uid and max_messages:
+                uids = uids[-max_messages:]
+
+            for i in range(0, len(uids), FETCH_BATCH_SIZE):
+                messages.extend(_fetch_batch(mail, uids[i:i + FETCH_BATCH_SIZE]))
+
+            if uids:
+                last_uid = uids[-1]
+
+            mail.close()
+        finally:
+            try:
+                mail.logout()
+            except Exception:
+                pass
+
     except imaplib.IMAP4.error as e:
         raise Exception(f"IMAP error: {str(e)}")
     except Exception as e:
         raise Exception(f"Error reading IMAP messages: {str(e)}")
-    
+
+    # الأحدث أولاً كما في Graph
+    messages.reverse()
+    return messages, (current_validity, last_uid)
+
+
+def _connect(imap_server: str, imap_port: int, use_ssl: bool, timeout: int):
+    # منع تعليق الاتصال/القراءة بلا نهاية
+    try:
+        socket.setdefaulttimeout(timeout)
+    except Exception:
+        pass
+
+    # الاتصال بخادم IMAP
+    if use_ssl:
+        # SSL connection (port 993)
+        # بعض إصدارات بايثون تدعم timeout كـ keyword arg
+        try:
+            return imaplib.IMAP4_SSL(imap_server, imap_port, timeout=timeout)
+        except TypeError:
+            return imaplib.IMAP4_SSL(imap_server, imap_port)
+
+    # TLS connection (port 143)
+    try:
+        mail = imaplib.IMAP4(imap_server, imap_port, timeout=timeout)
+    except TypeError:
+        mail = imaplib.IMAP4(imap_server, imap_port)
+    mail.starttls()
+    return mail
+
+
+def _select_response_int(mail, name: str) -> Optional[int]:
+    """قيمة UIDVALIDITY / UIDNEXT من رد SELECT (أو STATUS إذا لم ترسلها الخادم)"""
+    _typ, data = mail.response(name)
+    values = [v for v in (data or []) if v]
+    if values:
+        try:
+            return int(values[-1])
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+def _message_set(uids: List[int]) -> str:
+    """[1,2,3,7,9,10] -> "1:3,7,9:10" """
+    ranges = []
+    start = prev = uids[0]
+    for uid in uids[1:]:
+        if uid == prev + 1:
+            prev = uid
+            continue
+        ranges.append(f"{start}:{prev}" if start != prev else str(start))
+        start = prev = uid
+    ranges.append(f"{start}:{prev}" if start != prev else str(start))
+    return ",".join(ranges)
+
+
+def _fetch_batch(mail, uids: List[int]) -> List[Dict]:
+    """
+    دفعة واحدة: UID FETCH للرؤوس + BODYSTRUCTURE، ثم UID FETCH لجزء النص
+    مجمّعاً حسب رقم الجزء (غالباً "1" أو "1.1") - أي طلبان أو ثلاثة لكل دفعة
+    """
+    status, data = mail.uid("FETCH", _message_set(uids), "(UID BODYSTRUCTURE BODY.PEEK[HEADER])")
+    if status != "OK":
+        return []
+
+    items = {}
+    for fields in _fetch_responses(data):
+        uid = fields.get("UID")
+        header = fields.get("BODY[HEADER]")
+        if uid is None or header is None:
+            continue
+        items[int(uid)] = {
+            "header": header,
+            "part": _find_text_part(fields.get("BODYSTRUCTURE")),
+            "body": "",
+        }
+
+    # تجميع الرسائل حسب رقم جزء النص
+    by_section = {}
+    for uid, item in items.items():
+        if item["part"]:
+            by_section.setdefault(item["part"]["section"], []).append(uid)
+
+    for section, section_uids in by_section.items():
+        key = f"BODY[{section}]"
+        status, data = mail.uid("FETCH", _message_set(sorted(section_uids)), f"(UID BODY.PEEK[{section}])")
+        if status != "OK":
+            continue
+        for fields in _fetch_responses(data):
+            uid = fields.get("UID")
+            raw = fields.get(key)
+            if uid is None or int(uid) not in items or raw is None:
+                continue
+            item = items[int(uid)]
+            item["body"] = _decode_part(raw, item["part"])
+
+    messages = []
+    for uid in sorted(items):
+        item = items[uid]
+        try:
+            header_message = email.message_from_bytes(item["header"])
+            messages.append(_message_dict(str(uid), header_message, item["body"]))
+        except Exception as e:
+            print(f"Error reading message {uid}: {str(e)}")
     return messages
 
 
+def _message_dict(message_id: str, email_message, body: str) -> Dict:
+    """تحويل رؤوس الرسالة + النص إلى تنسيق مشابه لـ Microsoft Graph"""
+    # استخراج المعلومات
+    subject = _decode_header(email_message["Subject"])
+    from_address = _decode_header(email_message["From"])
+    date_str = email_message["Date"]
+    
+    # تحويل التاريخ إلى تنسيق dd/mm/yyyy
+    received_date = None
+    actual_date_str = None
+    try:
+        date_tuple = email.utils.parsedate_tz(date_str)
+        if date_tuple:
+            received_date = email.utils.mktime_tz(date_tuple)
+            date_obj = datetime.fromtimestamp(received_date)
+            actual_date_str = date_obj.strftime("%d/%m/%Y")
+            received_date = date_obj.isoformat()
+    except:
+        received_date = date_str
+    
+    # استخراج البريد الإلكتروني من "From"
+    sender_email = _extract_email(from_address)
+    sender_name = _extract_name(from_address)
+    
+    return {
+        "id": message_id,
+        "subject": subject or "",
+        "body": {
+            "content": body,
+            "contentType": "HTML" if _is_html(body) else "Text"
+        },
+        "from": {
+            "emailAddress": {
+                "name": sender_name or "",
+                "address": sender_email or ""
+            }
+        },
+        "receivedDateTime": received_date or "",
+        "internetMessageId": (email_message["Message-ID"] or "").strip(),
+        "date": actual_date_str or date_str,  # التاريخ الفعلي بتنسيق dd/mm/yyyy
+        "isRead": False  # IMAP لا يعطي هذه المعلومات مباشرة
+    }
+
+
+# =========================
+# FETCH response parsing
+# =========================
+_TOKEN_RE = re.compile(rb'\(|\)|"(?:[^"\\]|\\.)*"|[^\s()"]+')
+_LITERAL_RE = re.compile(rb'\{(\d+)\}\s*$')
+
+
+def _tokenize(data) -> list:
+    """
+    تحويل رد imaplib (bytes و tuples للـ literals) إلى قائمة tokens
+    الـ literal يبقى bytes كما هو
+    """
+    tokens = []
+    for chunk in data:
+        if isinstance(chunk, tuple):
+            prefix, literal = chunk[0], chunk[1]
+            prefix = _LITERAL_RE.sub(b"", prefix)
+            tokens.extend(_TOKEN_RE.findall(prefix))
+            tokens.append(("literal", literal))
+        elif isinstance(chunk, bytes):
+            tokens.extend(_TOKEN_RE.findall(chunk))
+    return tokens
+
+
+def _parse_tokens(tokens, pos=0):
+    """بناء قوائم متداخلة من tokens؛ يعيد (القائمة, الموضع التالي)"""
+    result = []
+    while pos < len(tokens):
+        token = tokens[pos]
+        pos += 1
+        if isinstance(token, tuple):
+            result.append(token[1])
+        elif token == b"(":
+            nested, pos = _parse_tokens(tokens, pos)
+            result.append(nested)
+        elif token == b")":
+            return result, pos
+        elif token.startswith(b'"'):
+            result.append(token[1:-1].replace(b'\\"', b'"').replace(b"\\\\", b"\\").decode("utf-8", "ignore"))
+        elif token.upper() == b"NIL":
+            result.append(None)
+        else:
+            result.append(token.decode("utf-8", "ignore"))
+    return result, pos
+
+
+def _fetch_responses(data) -> List[Dict]:
+    """رد UID FETCH -> قائمة dict لكل رسالة: {"UID": "5", "BODY[HEADER]": b"...", ...}"""
+    parsed, _ = _parse_tokens(_tokenize(data))
+    responses = []
+    for item in parsed:
+        if not isinstance(item, list):
+            continue  # رقم التسلسل
+        fields = {}
+        for i in range(0, len(item) - 1, 2):
+            name = item[i]
+            if isinstance(name, str):
+                fields[name.upper()] = item[i + 1]
+        responses.append(fields)
+    return responses
+
+
+def _find_text_part(structure, section: str = "") -> Optional[Dict]:
+    """
+    أول جزء text/plain (أو text/html إن لم يوجد) ليس مرفقاً من BODYSTRUCTURE
+
+    Returns:
+        {"section", "subtype", "encoding", "charset"} أو None
+    """
+    plain, html = _collect_text_parts(structure, section)
+    return plain or html
+
+
+def _collect_text_parts(structure, section: str):
+    if not isinstance(structure, list) or not structure:
+        return None, None
+
+    # multipart: الأجزاء هي القوائم الأولى ثم subtype
+    if isinstance(structure[0], list):
+        plain = html = None
+        index = 0
+        for part in structure:
+            if not isinstance(part, list):
+                break
+            index += 1
+            part_section = f"{section}.{index}" if section else str(index)
+            p, h = _collect_text_parts(part, part_section)
+            plain = plain or p
+            html = html or h
+            if plain:
+                break
+        return plain, html
+
+    main_type = (structure[0] or "").lower()
+    sub_type = (structure[1] or "").lower() if len(structure) > 1 else ""
+    if main_type != "text":
+        return None, None
+
+    # text: type, subtype, params, id, desc, encoding, size, lines, md5, disposition
+    disposition = structure[9] if len(structure) > 9 else None
+    if isinstance(disposition, list) and disposition and \
+            str(disposition[0] or "").lower() == "attachment":
+        return None, None
+
+    params = structure[2] if isinstance(structure[2], list) else []
+    charset = None
+    for i in range(0, len(params) - 1, 2):
+        if str(params[i]).lower() == "charset":
+            charset = params[i + 1]
+    part = {
+        # رسالة بسيطة (ليست multipart): الجزء "1" هو المحتوى
+        "section": section or "1",
+        "subtype": sub_type,
+        "encoding": (structure[5] or "7bit").lower() if len(structure) > 5 else "7bit",
+        "charset": charset or "utf-8",
+    }
+    if sub_type == "plain":
+        return part, None
+    if sub_type == "html":
+        return None, part
+    return None, None
+
+
+def _decode_part(raw: bytes, part: Dict) -> str:
+    """فك ترميز جزء النص (base64 / quoted-printable) ثم charset"""
+    if not isinstance(raw, bytes):
+        raw = (raw or "").encode("utf-8", "ignore")
+    encoding = part.get("encoding")
+    try:
+        if encoding == "base64":
+            raw = base64.b64decode(raw)
+        elif encoding == "quoted-printable":
+            raw = quopri.decodestring(raw)
+    except Exception:
+        pass
+    try:
+        return raw.decode(part.get("charset") or "utf-8", errors="ignore")
+    except LookupError:
+        return raw.decode("utf-8", errors="ignore")
+
+
 def _decode_header(header):
     """فك تشفير رأس البريد الإلكتروني"""
     if not header:
@@ -199,50 +453,6 @@ def _extract_name(address_string):
     return ""
 
 
-def _get_email_body(email_message):
-    """استخراج محتوى الرسالة (HTML أو نص عادي)"""
-    body = ""
-    
-    if email_message.is_multipart():
-        for part in email_message.walk():
-            content_type = part.get_content_type()
-            content_disposition = str(part.get("Content-Disposition"))
-            
-            # تخطي المرفقات
-            if "attachment" in content_disposition:
-                continue
-            
-            # محاولة استخراج النص أو HTML
-            if content_type == "text/plain":
-                try:
-                    payload = part.get_payload(decode=True)
-                    if payload:
-                        charset = part.get_content_charset() or 'utf-8'
-                        body = payload.decode(charset, errors='ignore')
-                except:
-                    pass
-            elif content_type == "text/html" and not body:
-                # استخدام HTML كبديل إذا لم يوجد نص عادي
-                try:
-                    payload = part.get_payload(decode=True)
-                    if payload:
-                        charset = part.get_content_charset() or 'utf-8'
-                        body = payload.decode(charset, errors='ignore')
-                except:
-                    pass
-    else:
-        # رسالة بسيطة (ليست متعددة الأجزاء)
-        try:
-            payload = email_message.get_payload(decode=True)
-            if payload:
-                charset = email_message.get_content_charset() or 'utf-8'
-                body = payload.decode(charset, errors='ignore')
-        except:
-            pass
-    
-    return body or ""
-
-
 def _is_html(text):
     """التحقق مما إذا كان النص HTML"""
     if not text:
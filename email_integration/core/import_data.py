@@ -1,11 +1,20 @@
 """
 نظام استيراد البيانات من CSV و Excel
 Data Import System from CSV and Excel
+
+- ربط الأعمدة يُحسب مرة واحدة من صف الرؤوس (resolve_column_mapping):
+  المطابقة التامة أولاً ثم الجزئية، وكل حقل يأخذ أول عمود مطابق
+- الصفوف تُقرأ كتدفق (csv.reader / openpyxl read_only) وتُعالج على دفعات
+  من IMPORT_BATCH_SIZE: التحقق عموداً عموداً (validate_records) ثم
+  executemany، والملف كله في معاملة واحدة (commit واحد أو rollback)
+- العملاء مفتاحهم LOWER(email) (أو اسم الشركة إذا لم يوجد بريد): الموجود
+  مسبقاً أو المكرر داخل الملف يُعالج حسب on_conflict: skip / update / fill
+- النتيجة: success / updated / failed / skipped + errors (سطر لكل صف مرفوض)
+  و warnings (قيم مشكوك فيها لم تمنع الاستيراد)
 """
 import csv
-import os
-from typing import List, Dict, Optional, Tuple
-from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from datetime import datetime, date
 
 try:
     import openpyxl
@@ -14,497 +23,614 @@ except ImportError:
     EXCEL_AVAILABLE = False
     openpyxl = None
 
-from .db import (
-    get_connection, add_client, add_message,
-    find_client_by_email, get_client_by_id
+from .db import get_connection, ingest_messages
+from .models import classify_client
+from .sales import init_sales_table, STAGE_PROBABILITY
+from .validation import validate_email, validate_phone, validate_url, validate_records
+
+# عدد الصفوف في الدفعة الواحدة (تحقق + executemany)
+IMPORT_BATCH_SIZE = 1000
+
+# معالجة العميل الموجود مسبقاً (نفس البريد أو نفس اسم الشركة بدون بريد)
+ON_CONFLICT_SKIP = "skip"      # تخطي الصف (السلوك الافتراضي)
+ON_CONFLICT_UPDATE = "update"  # استبدال الحقول بقيم الملف غير الفارغة
+ON_CONFLICT_FILL = "fill"      # ملء الحقول الفارغة فقط
+CONFLICT_MODES = (ON_CONFLICT_SKIP, ON_CONFLICT_UPDATE, ON_CONFLICT_FILL)
+
+# (الحقل, كلمات رأس العمود) - الترتيب مهم: "Contact Name" قبل company/name
+# و "Deal Value" / "Product Name" قبل deal/name
+CLIENT_COLUMNS = (
+    ("email", ("email", "e-mail", "بريد")),
+    ("contact_person", ("contact", "جهة الاتصال", "مسؤول")),
+    ("company_name", ("company", "اسم", "name", "شركة")),
+    ("phone", ("phone", "هاتف", "tel", "mobile", "جوال")),
+    ("country", ("country", "بلد", "دولة")),
+    ("website", ("website", "موقع", "url")),
+    ("classification", ("classification", "تصنيف")),
+    ("seriousness_score", ("score", "نقاط")),
+    ("status", ("status", "حالة")),
+    ("date_added", ("date", "تاريخ")),
+    ("is_focus", ("focus", "تركيز")),
 )
-from .sales import add_sale_deal, init_sales_table
-from .validation import validate_email, validate_phone, validate_url
 
+MESSAGE_COLUMNS = (
+    ("client", ("client", "عميل")),
+    ("sender_email", ("email", "بريد")),
+    ("subject", ("subject", "موضوع")),
+    ("body", ("body", "content", "محتوى")),
+    ("date", ("date", "تاريخ")),
+    ("channel", ("channel", "قناة")),
+)
 
-def import_clients_from_csv(file_path: str) -> Dict[str, int]:
-    """
-    استيراد العملاء من ملف CSV
-    
-    Args:
-        file_path: مسار ملف CSV
-    
-    Returns:
-        Dict containing: {'success': count, 'failed': count, 'skipped': count, 'errors': list}
-    """
-    results = {
+DEAL_COLUMNS = (
+    ("client", ("client", "عميل")),
+    ("expected_close_date", ("expected", "متوقع", "close")),
+    ("value", ("value", "قيمة")),
+    ("stage", ("stage", "مرحلة")),
+    ("product_name", ("product", "منتج")),
+    ("currency", ("currency", "عملة")),
+    ("probability", ("probability", "احتمال")),
+    ("deal_name", ("deal", "صفقة", "name")),
+)
+
+# حقول العميل التي يمكن تحديثها عند التعارض (البريد هو المفتاح وتاريخ الإضافة يبقى)
+_CLIENT_TEXT_FIELDS = ("company_name", "country", "contact_person", "phone", "website",
+                       "status", "classification")
+_CLIENT_INT_FIELDS = ("seriousness_score", "is_focus")
+
+
+def _new_results() -> Dict:
+    return {
         'success': 0,
+        'updated': 0,
         'failed': 0,
         'skipped': 0,
-        'errors': []
+        'errors': [],
+        'warnings': []
     }
-    
+
+
+def _cell_text(value) -> str:
+    """قيمة خلية CSV / Excel -> نص (أرقام Excel الصحيحة بدون .0 والتواريخ dd/mm/YYYY)"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (datetime, date)):
+        return value.strftime("%d/%m/%Y")
+    return str(value).strip()
+
+
+def _to_int(value: str) -> Optional[int]:
+    if not value:
+        return None
     try:
-        with open(file_path, 'r', encoding='utf-8-sig') as f:
-            # محاولة اكتشاف الفواصل تلقائياً
-            sample = f.read(1024)
-            f.seek(0)
-            sniffer = csv.Sniffer()
-            delimiter = sniffer.sniff(sample).delimiter
-            
-            reader = csv.DictReader(f, delimiter=delimiter)
-            
-            # قراءة الصف الأول كرؤوس
-            headers = reader.fieldnames
-            if not headers:
-                results['errors'].append("الملف فارغ أو لا يحتوي على رؤوس")
-                return results
-            
-            # تحويل الرؤوس إلى lowercase للتوافق
-            headers_lower = [h.lower().strip() if h else '' for h in headers]
-            
-            for row_num, row in enumerate(reader, start=2):  # start=2 لأن الصف الأول هو الرؤوس
-                try:
-                    # إنشاء قاموس للبيانات
-                    client_data = {}
-                    
-                    # البحث عن الأعمدة المطلوبة
-                    for i, header in enumerate(headers):
-                        header_lower = headers_lower[i]
-                        value = row.get(header, '').strip() if header else ''
-                        
-                        # تعيين القيم حسب اسم العمود
-                        if 'company' in header_lower or 'اسم' in header_lower or 'name' in header_lower:
-                            client_data['company_name'] = value
-                        elif 'email' in header_lower or 'بريد' in header_lower:
-                            client_data['email'] = value
-                        elif 'phone' in header_lower or 'هاتف' in header_lower or 'tel' in header_lower:
-                            client_data['phone'] = value
-                        elif 'country' in header_lower or 'بلد' in header_lower:
-                            client_data['country'] = value
-                        elif 'website' in header_lower or 'موقع' in header_lower or 'url' in header_lower:
-                            client_data['website'] = value
-                        elif 'classification' in header_lower or 'تصنيف' in header_lower:
-                            client_data['classification'] = value
-                        elif 'score' in header_lower or 'نقاط' in header_lower:
-                            try:
-                                client_data['score'] = float(value) if value else 0
-                            except:
-                                client_data['score'] = 0
-                    
-                    # التحقق من البيانات الأساسية
-                    if not client_data.get('company_name'):
-                        results['skipped'] += 1
-                        results['errors'].append(f"الصف {row_num}: اسم الشركة مطلوب")
-                        continue
-                    
-                    # التحقق من البريد الإلكتروني
-                    email = client_data.get('email', '')
-                    if email:
-                        if not validate_email(email):
-                            results['skipped'] += 1
-                            results['errors'].append(f"الصف {row_num}: بريد إلكتروني غير صحيح: {email}")
-                            continue
-                        
-                        # التحقق من وجود العميل
-                        existing = find_client_by_email(email)
-                        if existing:
-                            results['skipped'] += 1
-                            results['errors'].append(f"الصف {row_num}: العميل موجود بالفعل: {email}")
-                            continue
-                    
-                    # التحقق من الهاتف
-                    phone = client_data.get('phone', '')
-                    if phone and not validate_phone(phone):
-                        # تحذير فقط، لا نوقف الاستيراد
-                        pass
-                    
-                    # التحقق من الموقع
-                    website = client_data.get('website', '')
-                    if website and not validate_url(website):
-                        # تحذير فقط
-                        pass
-                    
-                    # إضافة العميل
-                    client_id = add_client(client_data)
-                    if client_id:
-                        results['success'] += 1
-                    else:
-                        results['failed'] += 1
-                        results['errors'].append(f"الصف {row_num}: فشل إضافة العميل")
-                
-                except Exception as e:
-                    results['failed'] += 1
-                    results['errors'].append(f"الصف {row_num}: {str(e)}")
-    
-    except Exception as e:
-        results['errors'].append(f"خطأ في قراءة الملف: {str(e)}")
-    
-    return results
+        return int(float(value))
+    except ValueError:
+        return None
+
+
+def _to_float(value: str, default: float) -> float:
+    try:
+        return float(value) if value else default
+    except ValueError:
+        return default
 
 
-def import_clients_from_excel(file_path: str, sheet_name: Optional[str] = None) -> Dict[str, int]:
+def _to_flag(value: str) -> Optional[int]:
+    if not value:
+        return None
+    return 1 if value.strip().lower() in ("1", "yes", "true", "y", "نعم", "⭐") else 0
+
+
+def _batched(items: Iterable, size: int) -> Iterator[List]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# =========================
+# Column Mapping
+# =========================
+def resolve_column_mapping(headers: Sequence, columns: Sequence[Tuple[str, Sequence[str]]]) -> Dict[str, int]:
     """
-    استيراد العملاء من ملف Excel
-    
+    ربط رؤوس الأعمدة بالحقول مرة واحدة لكل ملف
+
     Args:
-        file_path: مسار ملف Excel
-        sheet_name: اسم الورقة (إذا كان None، يتم استخدام الورقة الأولى)
-    
+        headers: صف الرؤوس كما قُرئ من الملف
+        columns: ((الحقل, كلمات مفتاحية), ...) مثل CLIENT_COLUMNS
+
     Returns:
-        Dict containing: {'success': count, 'failed': count, 'skipped': count, 'errors': list}
+        Dict[str, int]: {الحقل: رقم العمود} - المطابقة التامة للرأس أولاً ثم
+        احتواء الكلمة، وكل عمود يُربط بحقل واحد وكل حقل بأول عمود مطابق
     """
-    if not EXCEL_AVAILABLE:
-        return {
-            'success': 0,
-            'failed': 0,
-            'skipped': 0,
-            'errors': ['openpyxl غير مثبت. قم بتثبيته باستخدام: pip install openpyxl']
-        }
-    
-    results = {
-        'success': 0,
-        'failed': 0,
-        'skipped': 0,
-        'errors': []
+    normalized = [_cell_text(h).lower() for h in headers]
+    mapping: Dict[str, int] = {}
+    used = set()
+    for exact in (True, False):
+        for index, header in enumerate(normalized):
+            if not header or index in used:
+                continue
+            for field, keywords in columns:
+                if field in mapping:
+                    continue
+                if any(header == k if exact else k in header for k in keywords):
+                    mapping[field] = index
+                    used.add(index)
+                    break
+    return mapping
+
+
+def _row_values(row: Sequence, mapping: Dict[str, int]) -> Dict[str, str]:
+    return {
+        field: _cell_text(row[index]) if index < len(row) else ''
+        for field, index in mapping.items()
     }
-    
+
+
+# =========================
+# Readers
+# =========================
+def _iter_csv_rows(file_path: str) -> Iterator[List[str]]:
+    """صفوف ملف CSV (الأول هو الرؤوس) مع اكتشاف الفاصل تلقائياً"""
+    with open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            delimiter = csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+        except csv.Error:
+            delimiter = ','
+        yield from csv.reader(f, delimiter=delimiter)
+
+
+def _iter_excel_rows(file_path: str, sheet_name: Optional[str] = None) -> Iterator[tuple]:
+    """صفوف ورقة Excel (الأول هو الرؤوس) بوضع القراءة فقط - بدون تحميل الخلايا كلها"""
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
     try:
-        workbook = openpyxl.load_workbook(file_path, data_only=True)
-        
-        # اختيار الورقة
         if sheet_name:
             if sheet_name not in workbook.sheetnames:
-                results['errors'].append(f"الورقة '{sheet_name}' غير موجودة")
-                return results
+                raise ValueError(f"الورقة '{sheet_name}' غير موجودة")
             sheet = workbook[sheet_name]
         else:
             sheet = workbook.active
-        
-        # قراءة الرؤوس من الصف الأول
-        headers = []
-        for cell in sheet[1]:
-            headers.append(cell.value if cell.value else '')
-        
-        if not headers or all(not h for h in headers):
-            results['errors'].append("الملف فارغ أو لا يحتوي على رؤوس")
+        yield from sheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _read_header(rows: Iterator, results: Dict) -> Optional[Sequence]:
+    try:
+        headers = next(rows, None)
+    except Exception as e:
+        results['errors'].append(f"خطأ في قراءة الملف: {str(e)}")
+        return None
+    if not headers or all(not _cell_text(h) for h in headers):
+        results['errors'].append("الملف فارغ أو لا يحتوي على رؤوس")
+        return None
+    return headers
+
+
+def _data_rows(rows: Iterator) -> Iterator[Tuple[int, Sequence]]:
+    """(رقم الصف في الملف, الصف) مع تجاهل الصفوف الفارغة تماماً"""
+    for row_num, row in enumerate(rows, start=2):  # start=2 لأن الصف الأول هو الرؤوس
+        if any(_cell_text(v) for v in row):
+            yield row_num, row
+
+
+def _run_import(rows: Iterator, columns, required: str, missing_message: str, process) -> Dict:
+    """
+    الإطار المشترك: الرؤوس -> الربط -> process(cur, mapping, rows, results)
+    داخل معاملة واحدة؛ عند أي خطأ يُلغى الاستيراد كاملاً (rollback)
+    """
+    results = _new_results()
+    try:
+        headers = _read_header(rows, results)
+        if headers is None:
+            return results
+
+        mapping = resolve_column_mapping(headers, columns)
+        if required not in mapping:
+            results['errors'].append(missing_message)
             return results
-        
-        # تحويل الرؤوس إلى lowercase
-        headers_lower = [str(h).lower().strip() if h else '' for h in headers]
-        
-        # قراءة البيانات
-        for row_num, row in enumerate(sheet.iter_rows(min_row=2, values_only=False), start=2):
-            try:
-                # إنشاء قاموس للبيانات
-                client_data = {}
-                
-                # استخراج القيم
-                for i, cell in enumerate(row):
-                    if i >= len(headers):
-                        break
-                    
-                    header_lower = headers_lower[i]
-                    value = str(cell.value).strip() if cell.value else ''
-                    
-                    # تعيين القيم حسب اسم العمود
-                    if 'company' in header_lower or 'اسم' in header_lower or 'name' in header_lower:
-                        client_data['company_name'] = value
-                    elif 'email' in header_lower or 'بريد' in header_lower:
-                        client_data['email'] = value
-                    elif 'phone' in header_lower or 'هاتف' in header_lower or 'tel' in header_lower:
-                        client_data['phone'] = value
-                    elif 'country' in header_lower or 'بلد' in header_lower:
-                        client_data['country'] = value
-                    elif 'website' in header_lower or 'موقع' in header_lower or 'url' in header_lower:
-                        client_data['website'] = value
-                    elif 'classification' in header_lower or 'تصنيف' in header_lower:
-                        client_data['classification'] = value
-                    elif 'score' in header_lower or 'نقاط' in header_lower:
-                        try:
-                            client_data['score'] = float(value) if value else 0
-                        except:
-                            client_data['score'] = 0
-                
-                # التحقق من البيانات الأساسية
-                if not client_data.get('company_name'):
+
+        conn = get_connection()
+        cur = conn.cursor()
+        try:
+            process(cur, mapping, _data_rows(rows), results)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            results['failed'] += results['success'] + results['updated']
+            results['success'] = 0
+            results['updated'] = 0
+            results['errors'].append(f"خطأ في الاستيراد (لم يُحفظ أي سجل): {str(e)}")
+        finally:
+            conn.close()
+        return results
+    finally:
+        rows.close()  # إغلاق الملف حتى لو توقفت القراءة مبكراً
+
+
+def _load_client_index(cur) -> Tuple[Dict[int, str], Dict[str, int], Dict[str, int]]:
+    """id -> email، LOWER(email) -> id، LOWER(company_name) -> id (أقدم عميل يفوز)"""
+    by_id, by_email, by_name = {}, {}, {}
+    cur.execute("SELECT id, LOWER(email), LOWER(company_name) FROM clients ORDER BY id")
+    for client_id, email, name in cur.fetchall():
+        by_id[client_id] = email or ''
+        if email:
+            by_email.setdefault(email.strip(), client_id)
+        if name:
+            by_name.setdefault(name.strip(), client_id)
+    return by_id, by_email, by_name
+
+
+def _resolve_client(value: str, index) -> Optional[int]:
+    """قيمة عمود العميل (ID أو بريد أو اسم الشركة) -> client_id"""
+    by_id, by_email, by_name = index
+    value = value.strip()
+    if not value:
+        return None
+    if value.isdigit():
+        client_id = int(value)
+        return client_id if client_id in by_id else None
+    if '@' in value:
+        return by_email.get(value.lower())
+    return by_name.get(value.lower())
+
+
+# =========================
+# Clients
+# =========================
+def _client_update_sql(mapping: Dict[str, int], on_conflict: str) -> Tuple[str, List[str]]:
+    fields = [f for f in _CLIENT_TEXT_FIELDS + _CLIENT_INT_FIELDS
+              if f in mapping or (f == "classification" and "seriousness_score" in mapping)]
+    assignments = []
+    for field in fields:
+        if on_conflict == ON_CONFLICT_FILL:
+            empty = "0" if field in _CLIENT_INT_FIELDS else "''"
+            assignments.append(f"{field} = COALESCE(NULLIF({field}, {empty}), ?)")
+        else:
+            assignments.append(f"{field} = COALESCE(?, {field})")
+    if not assignments:
+        return "", []
+    return f"UPDATE clients SET {', '.join(assignments)} WHERE id = ?", fields
+
+
+def _client_values(data: Dict[str, str]) -> Dict:
+    """قيم الصف بعد التحويل (None = فارغ في الملف)"""
+    score = _to_int(data.get("seriousness_score"))
+    classification = data.get("classification") or None
+    if classification is None and score is not None:
+        classification = classify_client(score)
+    values = {field: data.get(field) or None for field in _CLIENT_TEXT_FIELDS}
+    values.update({
+        "email": data.get("email") or None,
+        "date_added": data.get("date_added") or None,
+        "seriousness_score": score,
+        "classification": classification,
+        "is_focus": _to_flag(data.get("is_focus")),
+    })
+    return values
+
+
+def _client_key(email: Optional[str], company_name: Optional[str]) -> Tuple[str, str]:
+    """مفتاح التعارض: البريد (بدون حساسية لحالة الأحرف) وإلا اسم الشركة"""
+    if email:
+        return ("email", email.strip().lower())
+    return ("name", (company_name or '').strip().lower())
+
+
+def _merge_pending(pending: Dict, values: Dict, on_conflict: str):
+    """صف مكرر داخل الملف لعميل لم يُحفظ بعد: دمجه مع الصف الأول"""
+    for field, value in values.items():
+        if value is None:
+            continue
+        if on_conflict == ON_CONFLICT_UPDATE or pending.get(field) in (None, '', 0):
+            pending[field] = value
+
+
+def _import_clients(rows: Iterator, on_conflict: str) -> Dict:
+    if on_conflict not in CONFLICT_MODES:
+        raise ValueError(f"on_conflict غير معروف: {on_conflict}")
+
+    def process(cur, mapping, data_rows, results):
+        today_str = datetime.now().strftime("%d/%m/%Y")
+        update_sql, update_fields = _client_update_sql(mapping, on_conflict)
+        existing = {}  # _client_key -> client_id (أقدم عميل يفوز)
+
+        def load_existing(after_id: int = 0):
+            cur.execute("SELECT id, email, company_name FROM clients WHERE id > ? ORDER BY id", (after_id,))
+            for client_id, email, company_name in cur.fetchall():
+                if email:
+                    existing.setdefault(_client_key(email, None), client_id)
+                if company_name:
+                    existing.setdefault(_client_key(None, company_name), client_id)
+
+        load_existing()
+
+        for batch in _batched(data_rows, IMPORT_BATCH_SIZE):
+            records, row_nums = [], []
+            errors, warnings = [], []  # (رقم الصف, الرسالة) - تُرتب قبل الإضافة للنتيجة
+            for row_num, row in batch:
+                data = _row_values(row, mapping)
+                if not data.get("company_name"):
                     results['skipped'] += 1
-                    results['errors'].append(f"الصف {row_num}: اسم الشركة مطلوب")
+                    errors.append((row_num, "اسم الشركة مطلوب"))
                     continue
-                
-                # التحقق من البريد الإلكتروني
-                email = client_data.get('email', '')
-                if email:
-                    if not validate_email(email):
-                        results['skipped'] += 1
-                        results['errors'].append(f"الصف {row_num}: بريد إلكتروني غير صحيح: {email}")
-                        continue
-                    
-                    # التحقق من وجود العميل
-                    existing = find_client_by_email(email)
-                    if existing:
+                records.append(data)
+                row_nums.append(row_num)
+
+            invalid = validate_records(records, {"email": validate_email})
+            suspicious = validate_records(records, {"phone": validate_phone, "website": validate_url})
+            for index, problems in suspicious.items():
+                for field, message in problems:
+                    warnings.append((row_nums[index], message))
+
+            inserts = {}   # _client_key -> القيم
+            updates = []
+            for index, data in enumerate(records):
+                row_num = row_nums[index]
+                if index in invalid:
+                    results['skipped'] += 1
+                    errors.append((row_num, f"بريد إلكتروني غير صحيح: {data['email']}"))
+                    continue
+
+                values = _client_values(data)
+                key = _client_key(values["email"], values["company_name"])
+                label = values["email"] or values["company_name"]
+
+                if key in inserts:
+                    if on_conflict == ON_CONFLICT_SKIP:
                         results['skipped'] += 1
-                        results['errors'].append(f"الصف {row_num}: العميل موجود بالفعل: {email}")
-                        continue
-                
-                # إضافة العميل
-                client_id = add_client(client_data)
-                if client_id:
-                    results['success'] += 1
+                        errors.append((row_num, f"مكرر في الملف: {label}"))
+                    else:
+                        _merge_pending(inserts[key], values, on_conflict)
+                        results['updated'] += 1
+                    continue
+
+                client_id = existing.get(key)
+                if client_id is None:
+                    inserts[key] = values
+                elif on_conflict == ON_CONFLICT_SKIP or not update_sql:
+                    results['skipped'] += 1
+                    errors.append((row_num, f"العميل موجود بالفعل: {label}"))
                 else:
-                    results['failed'] += 1
-                    results['errors'].append(f"الصف {row_num}: فشل إضافة العميل")
-            
-            except Exception as e:
-                results['failed'] += 1
-                results['errors'].append(f"الصف {row_num}: {str(e)}")
-        
-        workbook.close()
-    
-    except Exception as e:
-        results['errors'].append(f"خطأ في قراءة الملف: {str(e)}")
-    
-    return results
+                    updates.append(tuple(values[f] for f in update_fields) + (client_id,))
+
+            results['errors'].extend(f"الصف {n}: {m}" for n, m in sorted(errors))
+            results['warnings'].extend(f"الصف {n}: {m}" for n, m in sorted(warnings))
+
+            if inserts:
+                cur.execute("SELECT COALESCE(MAX(id), 0) FROM clients")
+                last_id = cur.fetchone()[0]
+                cur.executemany("""
+                    INSERT INTO clients (
+                        company_name, country, contact_person,
+                        email, phone, website,
+                        date_added, status,
+                        seriousness_score, classification, is_focus
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, [
+                    (
+                        v["company_name"], v["country"], v["contact_person"],
+                        v["email"], v["phone"], v["website"],
+                        v["date_added"] or today_str, v["status"] or "New",
+                        v["seriousness_score"] or 0,
+                        v["classification"] or classify_client(v["seriousness_score"] or 0),
+                        v["is_focus"] or 0,
+                    )
+                    for v in inserts.values()
+                ])
+                results['success'] += len(inserts)
+                # العملاء الجدد في هذه الدفعة (للمكرر في الدفعات التالية)
+                load_existing(last_id)
+
+            if updates:
+                cur.executemany(update_sql, updates)
+                results['updated'] += len(updates)
+
+    return _run_import(
+        rows, CLIENT_COLUMNS, "company_name",
+        "لم يتم العثور على عمود اسم الشركة (Company Name / اسم الشركة)",
+        process
+    )
+
+
+def import_clients_from_csv(file_path: str, on_conflict: str = ON_CONFLICT_SKIP) -> Dict[str, int]:
+    """
+    استيراد العملاء من ملف CSV
+
+    Args:
+        file_path: مسار ملف CSV
+        on_conflict: ماذا نفعل بالعميل الموجود (نفس البريد): skip / update / fill
+
+    Returns:
+        Dict containing: {'success': count, 'updated': count, 'failed': count,
+                          'skipped': count, 'errors': list, 'warnings': list}
+    """
+    return _import_clients(_iter_csv_rows(file_path), on_conflict)
+
+
+def import_clients_from_excel(file_path: str, sheet_name: Optional[str] = None,
+                              on_conflict: str = ON_CONFLICT_SKIP) -> Dict[str, int]:
+    """
+    استيراد العملاء من ملف Excel
+
+    Args:
+        file_path: مسار ملف Excel
+        sheet_name: اسم الورقة (إذا كان None، يتم استخدام الورقة الأولى)
+        on_conflict: ماذا نفعل بالعميل الموجود (نفس البريد): skip / update / fill
+
+    Returns:
+        Dict containing: {'success': count, 'updated': count, 'failed': count,
+                          'skipped': count, 'errors': list, 'warnings': list}
+    """
+    if not EXCEL_AVAILABLE:
+        results = _new_results()
+        results['errors'].append('openpyxl غير مثبت. قم بتثبيته باستخدام: pip install openpyxl')
+        return results
+
+    return _import_clients(_iter_excel_rows(file_path, sheet_name), on_conflict)
+
+
+# =========================
+# Messages
+# =========================
+def _guess_message_type(subject: str, body: str) -> str:
+    """تحديد نوع الرسالة من الكلمات المفتاحية"""
+    content_lower = f"{body.lower()} {subject.lower()}"
+    if any(word in content_lower for word in ['price', 'cost', 'سعر', 'تكلفة']):
+        return "price_request"
+    if any(word in content_lower for word in ['sample', 'عينة']):
+        return "sample_request"
+    if any(word in content_lower for word in ['spec', 'specification', 'مواصفات']):
+        return "spec_request"
+    if any(word in content_lower for word in ['moq', 'minimum', 'أقل', 'حد أدنى']):
+        return "moq_request"
+    return "inquiry"
 
 
 def import_messages_from_csv(file_path: str) -> Dict[str, int]:
     """
     استيراد الرسائل من ملف CSV
-    
+
+    عمود العميل يقبل ID أو البريد أو اسم الشركة (وإلا يُستخدم عمود البريد)؛
+    الرسائل تُحفظ دفعة واحدة عبر ingest_messages على cursor ومعاملة الاستيراد نفسها
+    (تحليل، منع التكرار، النقاط)
+
     Args:
         file_path: مسار ملف CSV
-    
+
     Returns:
         Dict containing: {'success': count, 'failed': count, 'skipped': count, 'errors': list}
     """
-    results = {
-        'success': 0,
-        'failed': 0,
-        'skipped': 0,
-        'errors': []
-    }
-    
-    try:
-        with open(file_path, 'r', encoding='utf-8-sig') as f:
-            sample = f.read(1024)
-            f.seek(0)
-            sniffer = csv.Sniffer()
-            delimiter = sniffer.sniff(sample).delimiter
-            
-            reader = csv.DictReader(f, delimiter=delimiter)
-            headers = reader.fieldnames
-            
-            if not headers:
-                results['errors'].append("الملف فارغ أو لا يحتوي على رؤوس")
-                return results
-            
-            headers_lower = [h.lower().strip() if h else '' for h in headers]
-            
-            for row_num, row in enumerate(reader, start=2):
-                try:
-                    message_data = {}
-                    client_id = None
-                    
-                    # استخراج البيانات
-                    for i, header in enumerate(headers):
-                        header_lower = headers_lower[i]
-                        value = row.get(header, '').strip() if header else ''
-                        
-                        if 'client' in header_lower or 'عميل' in header_lower:
-                            # يمكن أن يكون ID أو email أو company name
-                            if value.isdigit():
-                                client_id = int(value)
-                            else:
-                                # البحث بالبريد أو الاسم
-                                if '@' in value:
-                                    client = find_client_by_email(value)
-                                    if client:
-                                        client_id = client[0]
-                                else:
-                                    # البحث بالاسم
-                                    from .db import get_all_clients
-                                    clients = get_all_clients()
-                                    for c in clients:
-                                        if c.get('company_name', '').lower() == value.lower():
-                                            client_id = c.get('id')
-                                            break
-                        
-                        elif 'email' in header_lower or 'بريد' in header_lower:
-                            message_data['sender_email'] = value
-                        elif 'subject' in header_lower or 'موضوع' in header_lower:
-                            message_data['subject'] = value
-                        elif 'body' in header_lower or 'content' in header_lower or 'محتوى' in header_lower:
-                            message_data['body'] = value
-                        elif 'date' in header_lower or 'تاريخ' in header_lower:
-                            message_data['date'] = value
-                        elif 'channel' in header_lower or 'قناة' in header_lower:
-                            message_data['channel'] = value
-                    
-                    # التحقق من العميل
-                    if not client_id:
-                        results['skipped'] += 1
-                        results['errors'].append(f"الصف {row_num}: لم يتم العثور على العميل")
-                        continue
-                    
-                    # التحقق من البيانات الأساسية
-                    body = message_data.get('body', '')
-                    subject = message_data.get('subject', '')
-                    if not subject and not body:
-                        results['skipped'] += 1
-                        results['errors'].append(f"الصف {row_num}: الموضوع أو المحتوى مطلوب")
-                        continue
-                    
-                    # إضافة الرسالة
-                    # تحضير البيانات للرسالة
-                    message_date = message_data.get('date')
-                    if not message_date:
-                        message_date = datetime.now().strftime("%d/%m/%Y")
-                    
-                    # تحديد نوع الرسالة
-                    message_type = "inquiry"
-                    body_lower = body.lower() if body else ''
-                    subject_lower = subject.lower() if subject else ''
-                    content_lower = body_lower + ' ' + subject_lower
-                    
-                    if any(word in content_lower for word in ['price', 'cost', 'سعر', 'تكلفة']):
-                        message_type = "price_request"
-                    elif any(word in content_lower for word in ['sample', 'عينة']):
-                        message_type = "sample_request"
-                    elif any(word in content_lower for word in ['spec', 'specification', 'مواصفات']):
-                        message_type = "spec_request"
-                    elif any(word in content_lower for word in ['moq', 'minimum', 'أقل', 'حد أدنى']):
-                        message_type = "moq_request"
-                    
-                    # حساب تأثير النقاط
-                    score_effect = 0
-                    if message_type in ["price_request", "sample_request", "spec_request", "moq_request"]:
-                        score_effect = 5  # طلب = +5 نقاط
-                    
-                    message_id = add_message({
-                        'client_id': client_id,
-                        'message_date': message_date,
-                        'message_type': message_type,
-                        'channel': message_data.get('channel', 'email'),
-                        'client_response': body,
-                        'notes': subject,
-                        'score_effect': score_effect
-                    })
-                    
-                    if message_id:
-                        results['success'] += 1
-                    else:
-                        results['failed'] += 1
-                        results['errors'].append(f"الصف {row_num}: فشل إضافة الرسالة")
-                
-                except Exception as e:
-                    results['failed'] += 1
-                    results['errors'].append(f"الصف {row_num}: {str(e)}")
-    
-    except Exception as e:
-        results['errors'].append(f"خطأ في قراءة الملف: {str(e)}")
-    
-    return results
+    def process(cur, mapping, data_rows, results):
+        index = _load_client_index(cur)
+        today_str = datetime.now().strftime("%d/%m/%Y")
+        items = []
+        for row_num, row in data_rows:
+            data = _row_values(row, mapping)
+            client_id = _resolve_client(data.get("client", ''), index)
+            if client_id is None:
+                client_id = _resolve_client(data.get("sender_email", ''), index)
+            if client_id is None:
+                results['skipped'] += 1
+                results['errors'].append(f"الصف {row_num}: لم يتم العثور على العميل")
+                continue
+
+            subject = data.get("subject", '')
+            body = data.get("body", '')
+            if not subject and not body:
+                results['skipped'] += 1
+                results['errors'].append(f"الصف {row_num}: الموضوع أو المحتوى مطلوب")
+                continue
+
+            message_type = _guess_message_type(subject, body)
+            items.append({
+                # client_id المحلول يُستخدم مباشرة (حتى للعملاء بدون بريد)
+                'client_id': client_id,
+                'email': index[0][client_id],
+                'message_date': data.get("date") or today_str,
+                'message_type': message_type,
+                'channel': data.get("channel") or 'email',
+                'client_response': body,
+                'notes': subject,
+                # طلب = +5 نقاط
+                'score_effect': 5 if message_type != "inquiry" else 0,
+            })
+
+        # الحفظ المجمع على نفس cursor ومعاملة الاستيراد
+        stats = ingest_messages(items, cur=cur)
+        results['success'] += stats["inserted"]
+        if stats["duplicates"]:
+            results['skipped'] += stats["duplicates"]
+            results['errors'].append(f"{stats['duplicates']} رسالة موجودة مسبقاً (مكررة)")
+
+    return _run_import(
+        _iter_csv_rows(file_path), MESSAGE_COLUMNS, "client",
+        "لم يتم العثور على عمود العميل (Client / عميل)",
+        process
+    )
 
 
+# =========================
+# Deals
+# =========================
 def import_deals_from_csv(file_path: str) -> Dict[str, int]:
     """
     استيراد الصفقات من ملف CSV
-    
+
     Args:
         file_path: مسار ملف CSV
-    
+
     Returns:
         Dict containing: {'success': count, 'failed': count, 'skipped': count, 'errors': list}
     """
-    results = {
-        'success': 0,
-        'failed': 0,
-        'skipped': 0,
-        'errors': []
-    }
-    
-    try:
-        init_sales_table()
-        
-        with open(file_path, 'r', encoding='utf-8-sig') as f:
-            sample = f.read(1024)
-            f.seek(0)
-            sniffer = csv.Sniffer()
-            delimiter = sniffer.sniff(sample).delimiter
-            
-            reader = csv.DictReader(f, delimiter=delimiter)
-            headers = reader.fieldnames
-            
-            if not headers:
-                results['errors'].append("الملف فارغ أو لا يحتوي على رؤوس")
-                return results
-            
-            headers_lower = [h.lower().strip() if h else '' for h in headers]
-            
-            for row_num, row in enumerate(reader, start=2):
-                try:
-                    deal_data = {}
-                    client_id = None
-                    
-                    # استخراج البيانات
-                    for i, header in enumerate(headers):
-                        header_lower = headers_lower[i]
-                        value = row.get(header, '').strip() if header else ''
-                        
-                        if 'client' in header_lower or 'عميل' in header_lower:
-                            if value.isdigit():
-                                client_id = int(value)
-                            else:
-                                if '@' in value:
-                                    client = find_client_by_email(value)
-                                    if client:
-                                        client_id = client[0]
-                        
-                        elif 'deal' in header_lower or 'صفقة' in header_lower or 'name' in header_lower:
-                            deal_data['deal_name'] = value
-                        elif 'product' in header_lower or 'منتج' in header_lower:
-                            deal_data['product_name'] = value
-                        elif 'stage' in header_lower or 'مرحلة' in header_lower:
-                            deal_data['stage'] = value
-                        elif 'value' in header_lower or 'قيمة' in header_lower:
-                            try:
-                                deal_data['value'] = float(value) if value else 0
-                            except:
-                                deal_data['value'] = 0
-                        elif 'currency' in header_lower or 'عملة' in header_lower:
-                            deal_data['currency'] = value or 'USD'
-                        elif 'probability' in header_lower or 'احتمال' in header_lower:
-                            try:
-                                deal_data['probability'] = float(value) if value else 0.1
-                            except:
-                                deal_data['probability'] = 0.1
-                        elif 'expected' in header_lower or 'متوقع' in header_lower or 'close' in header_lower:
-                            deal_data['expected_close_date'] = value
-                    
-                    # التحقق من العميل
-                    if not client_id:
-                        results['skipped'] += 1
-                        results['errors'].append(f"الصف {row_num}: لم يتم العثور على العميل")
-                        continue
-                    
-                    # التحقق من البيانات الأساسية
-                    if not deal_data.get('deal_name'):
-                        results['skipped'] += 1
-                        results['errors'].append(f"الصف {row_num}: اسم الصفقة مطلوب")
-                        continue
-                    
-                    # إضافة الصفقة
-                    deal_id = add_sale_deal({
-                        'client_id': client_id,
-                        **deal_data
-                    })
-                    
-                    if deal_id:
-                        results['success'] += 1
-                    else:
-                        results['failed'] += 1
-                        results['errors'].append(f"الصف {row_num}: فشل إضافة الصفقة")
-                
-                except Exception as e:
-                    results['failed'] += 1
-                    results['errors'].append(f"الصف {row_num}: {str(e)}")
-    
-    except Exception as e:
-        results['errors'].append(f"خطأ في قراءة الملف: {str(e)}")
-    
-    return results
+    init_sales_table()
+
+    def process(cur, mapping, data_rows, results):
+        index = _load_client_index(cur)
+        for batch in _batched(data_rows, IMPORT_BATCH_SIZE):
+            deal_rows = []
+            now_str = datetime.now().strftime("%d/%m/%Y %H:%M")
+            for row_num, row in batch:
+                data = _row_values(row, mapping)
+                client_id = _resolve_client(data.get("client", ''), index)
+                if client_id is None:
+                    results['skipped'] += 1
+                    results['errors'].append(f"الصف {row_num}: لم يتم العثور على العميل")
+                    continue
+                if not data.get("deal_name"):
+                    results['skipped'] += 1
+                    results['errors'].append(f"الصف {row_num}: اسم الصفقة مطلوب")
+                    continue
+
+                stage = data.get("stage") or "Lead"
+                deal_rows.append((
+                    client_id,
+                    data["deal_name"],
+                    data.get("product_name") or None,
+                    stage,
+                    _to_float(data.get("value"), 0),
+                    data.get("currency") or "USD",
+                    _to_float(data.get("probability"), STAGE_PROBABILITY.get(stage, 0.1)),
+                    data.get("expected_close_date") or None,
+                    "active",
+                    now_str,
+                    now_str,
+                    "User",
+                ))
+
+            if not deal_rows:
+                continue
+            cur.execute("SELECT COALESCE(MAX(id), 0) FROM sales_deals")
+            last_id = cur.fetchone()[0]
+            cur.executemany("""
+                INSERT INTO sales_deals (
+                    client_id, deal_name, product_name, stage, value, currency,
+                    probability, expected_close_date,
+                    status, created_date, updated_date, created_by
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, deal_rows)
+            # تسجيل المرحلة الأولية في التاريخ (نفس add_sale_deal)
+            cur.execute("""
+                INSERT INTO deal_stage_history (
+                    deal_id, from_stage, to_stage, changed_date, changed_by
+                )
+                SELECT id, NULL, stage, created_date, created_by
+                FROM sales_deals WHERE id > ?
+            """, (last_id,))
+            results['success'] += len(deal_rows)
+
+    return _run_import(
+        _iter_csv_rows(file_path), DEAL_COLUMNS, "client",
+        "لم يتم العثور على عمود العميل (Client / عميل)",
+        process
+    )
@@ -0,0 +1,402 @@
+"""
+قياس الأداء في المسارات الساخنة (المزامنة، التحليل، قاعدة البيانات)
+Lightweight hot-path instrumentation
+
+- timed(name): decorator يسجل زمن كل استدعاء في هيستوغرام باسم الدالة؛
+  instrument_module() يلف كل الدوال العامة في core.db (db.add_message ...)
+- sync_run(kind): جولة مزامنة واحدة؛ داخلها phase("fetch" | "parse" |
+  "filter" | "score" | "db_write" | "commit") يجمع الزمن والعدد لكل مرحلة
+  (الزمن الذاتي: المرحلة المتداخلة مثل commit داخل db_write تُطرح من الأب
+  فلا يتجاوز مجموع المراحل مدة الجولة)، واستدعاءات قاعدة البيانات في نفس الخيط تُنسب للجولة أيضاً
+- خارج أي جولة phase() لا تفعل شيئاً (كائن ثابت بدون قياس)
+- الجولة المنتهية تُحفظ سطر JSON في logs/performance.jsonl وتعرض
+  PerformanceWindow آخر الجولات؛ اختيارياً (performance.profile_sync /
+  performance.trace_memory في الإعدادات) ملخص cProfile / tracemalloc للجولة
+"""
+import cProfile
+import functools
+import inspect
+import io
+import json
+import os
+import pstats
+import threading
+import tracemalloc
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+from time import perf_counter
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+# حدود فئات الهيستوغرام بالميلي ثانية (الفئة الأخيرة = أكبر من آخر حد)
+HISTOGRAM_BOUNDS_MS = (0.1, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+# مراحل المزامنة بترتيب العرض
+SYNC_PHASES = ("fetch", "parse", "filter", "score", "db_write", "commit")
+
+# عدد الجولات المعروضة / المحفوظة
+PERF_MAX_RUNS = 100
+# عند تجاوز الحجم يُعاد كتابة الملف بآخر PERF_MAX_RUNS جولة فقط
+PERF_FILE_MAX_BYTES = 5 * 1024 * 1024
+
+# عدد الدوال في ملخص cProfile ومواقع الذاكرة في ملخص tracemalloc
+PROFILE_TOP_FUNCTIONS = 25
+MEMORY_TOP_SITES = 10
+
+_local = threading.local()
+_lock = threading.Lock()
+_histograms: Dict[str, "Histogram"] = {}
+
+
+# =========================
+# Histograms
+# =========================
+class Histogram:
+    """توزيع أزمنة الاستدعاء على فئات ثابتة (بدون تخزين كل قيمة)"""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        ms = seconds * 1000.0
+        self.counts[bisect_left(HISTOGRAM_BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, p: float) -> float:
+        """النسبة المئوية التقريبية (الحد الأعلى للفئة) بالميلي ثانية"""
+        if not self.count:
+            return 0.0
+        target = p * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target:
+                if index < len(HISTOGRAM_BOUNDS_MS):
+                    return min(HISTOGRAM_BOUNDS_MS[index], self.max)
+                return self.max
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "calls": self.count,
+            "total_ms": round(self.total, 2),
+            "avg_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.50), 3),
+            "p95_ms": round(self.percentile(0.95), 3),
+            "max_ms": round(self.max, 2),
+        }
+
+
+def record_timing(name: str, seconds: float):
+    """تسجيل زمن استدعاء في الهيستوغرام العام وفي الجولة الحالية (إن وجدت)"""
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.observe(seconds)
+    run = getattr(_local, "run", None)
+    if run is not None:
+        run.observe_call(name, seconds)
+
+
+def get_timings() -> Dict[str, Dict[str, float]]:
+    """ملخص الهيستوغرامات منذ بدء البرنامج -> {الاسم: calls / total_ms / p50_ms ...}"""
+    with _lock:
+        return {name: histogram.summary() for name, histogram in _histograms.items()}
+
+
+def reset_timings():
+    with _lock:
+        _histograms.clear()
+
+
+def timed(name: Optional[str] = None) -> Callable:
+    """
+    decorator لقياس زمن الدالة
+
+    Args:
+        name: اسم الهيستوغرام (افتراضياً module.function)
+    """
+    def decorator(func):
+        label = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record_timing(label, perf_counter() - start)
+
+        return wrapper
+    return decorator
+
+
+def instrument_module(namespace: Dict, prefix: str, exclude: Iterable[str] = ()):
+    """
+    لف كل الدوال العامة المعرَّفة في الوحدة نفسها بـ timed()
+    (تُستدعى في آخر الوحدة: instrument_module(globals(), "db."))
+
+    الدوال المستوردة من وحدات أخرى والـ generators (يُقاس إنشاؤها فقط) تُتجاهل
+    """
+    module_name = namespace["__name__"]
+    exclude = set(exclude)
+    for attr, value in list(namespace.items()):
+        if attr.startswith("_") or attr in exclude:
+            continue
+        if (inspect.isfunction(value) and value.__module__ == module_name
+                and not inspect.isgeneratorfunction(value)):
+            namespace[attr] = timed(f"{prefix}{attr}")(value)
+
+
+# =========================
+# Sync runs & phases
+# =========================
+class SyncRun:
+    """قياسات جولة مزامنة واحدة"""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.started_at = datetime.now()
+        self.duration = 0.0
+        self.phases: Dict[str, List[float]] = {}    # phase -> [seconds, calls]
+        self.calls: Dict[str, List[float]] = {}     # db.func -> [calls, total_ms, max_ms]
+        self.counters: Dict[str, int] = {}
+        self.error: Optional[str] = None
+        self.profile: Optional[str] = None
+        self.memory: Optional[Dict] = None
+        self._external = 0.0
+        self._open_phases: List["_Phase"] = []  # المراحل المفتوحة (للتداخل)
+
+    def add_phase(self, name: str, seconds: float, calls: int = 1):
+        entry = self.phases.get(name)
+        if entry is None:
+            self.phases[name] = [seconds, calls]
+        else:
+            entry[0] += seconds
+            entry[1] += calls
+
+    def add_external_phase(self, name: str, seconds: float):
+        """مرحلة تمت قبل الجولة في خيط آخر (مثل تحميل الرسائل) - تُضاف للمدة الكلية"""
+        self.add_phase(name, seconds)
+        self._external += seconds
+
+    def observe_call(self, name: str, seconds: float):
+        ms = seconds * 1000.0
+        entry = self.calls.get(name)
+        if entry is None:
+            self.calls[name] = [1, ms, ms]
+        else:
+            entry[0] += 1
+            entry[1] += ms
+            if ms > entry[2]:
+                entry[2] = ms
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def as_dict(self) -> Dict:
+        return {
+            "ts": self.started_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "kind": self.kind,
+            "duration": round(self.duration, 4),
+            "error": self.error,
+            "phases": {
+                name: {"seconds": round(seconds, 4), "calls": int(calls)}
+                for name, (seconds, calls) in self.phases.items()
+            },
+            "counters": dict(self.counters),
+            "db": {
+                name: {"calls": int(calls), "total_ms": round(total, 2), "max_ms": round(peak, 2)}
+                for name, (calls, total, peak) in sorted(
+                    self.calls.items(), key=lambda item: item[1][1], reverse=True
+                )
+            },
+            "profile": self.profile,
+            "memory": self.memory,
+        }
+
+
+class _Phase:
+    __slots__ = ("run", "name", "start", "nested")
+
+    def __init__(self, run: SyncRun, name: str):
+        self.run = run
+        self.name = name
+        self.nested = 0.0
+
+    def __enter__(self):
+        self.run._open_phases.append(self)
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = perf_counter() - self.start
+        open_phases = self.run._open_phases
+        if open_phases and open_phases[-1] is self:
+            open_phases.pop()
+        # الزمن الذاتي فقط؛ الزمن الكلي يُطرح من المرحلة الأب
+        self.run.add_phase(self.name, elapsed - self.nested)
+        if open_phases:
+            open_phases[-1].nested += elapsed
+        return False
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+def current_run() -> Optional[SyncRun]:
+    """الجولة النشطة في الخيط الحالي (أو None)"""
+    return getattr(_local, "run", None)
+
+
+def phase(name: str):
+    """
+    with phase("parse"): ...
+
+    يجمع زمن المرحلة في الجولة النشطة؛ بدون جولة لا يقيس شيئاً
+    """
+    run = getattr(_local, "run", None)
+    if run is None:
+        return _NULL_PHASE
+    return _Phase(run, name)
+
+
+def timed_iter(iterable: Iterable, name: str) -> Iterator:
+    """
+    يقيس زمن انتظار كل عنصر من iterable كمرحلة (مثل انتظار نتائج الجلب المتوازي)
+    """
+    iterator = iter(iterable)
+    while True:
+        with phase(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def _profile_summary(profiler: cProfile.Profile) -> str:
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.strip_dirs().sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+    return stream.getvalue()
+
+
+def _memory_summary(snapshot: tracemalloc.Snapshot, peak: int) -> Dict:
+    top = snapshot.statistics("lineno")[:MEMORY_TOP_SITES]
+    return {
+        "peak_mb": round(peak / (1024 * 1024), 2),
+        "top": [f"{stat.traceback[0].filename}:{stat.traceback[0].lineno} - "
+                f"{stat.size / 1024:.1f} KB ({stat.count} blocks)" for stat in top],
+    }
+
+
+@contextmanager
+def sync_run(kind: str, profile: Optional[bool] = None, trace_memory: Optional[bool] = None,
+             store: bool = True):
+    """
+    with sync_run("outlook") as run: ...
+
+    Args:
+        kind: نوع الجولة (يظهر في نافذة الأداء)
+        profile: تشغيل cProfile للجولة (None = الإعداد performance.profile_sync)
+        trace_memory: tracemalloc للجولة (None = الإعداد performance.trace_memory)
+        store: حفظ الجولة في performance.jsonl (أداة القياس لا تحفظ)
+    """
+    if profile is None or trace_memory is None:
+        from .settings import get_bool_setting
+        if profile is None:
+            profile = get_bool_setting("performance.profile_sync", False)
+        if trace_memory is None:
+            trace_memory = get_bool_setting("performance.trace_memory", False)
+
+    run = SyncRun(kind)
+    previous = getattr(_local, "run", None)
+    _local.run = run
+
+    profiler = None
+    if profile:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            profiler = None  # مُحلل آخر نشط
+    tracing = bool(trace_memory) and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start(1)
+
+    start = perf_counter()
+    try:
+        yield run
+    except BaseException as e:
+        run.error = str(e) or type(e).__name__
+        raise
+    finally:
+        run.duration = perf_counter() - start + run._external
+        if profiler is not None:
+            profiler.disable()
+            run.profile = _profile_summary(profiler)
+        if tracing:
+            _, peak = tracemalloc.get_traced_memory()
+            run.memory = _memory_summary(tracemalloc.take_snapshot(), peak)
+            tracemalloc.stop()
+        _local.run = previous
+        if store:
+            _store_run(run)
+
+
+# =========================
+# Storage
+# =========================
+def _runs_file() -> str:
+    from .logging_system import LOGS_DIR
+    return os.path.join(LOGS_DIR, "performance.jsonl")
+
+
+def _store_run(run: SyncRun):
+    """إضافة الجولة كسطر JSON (لا نريد أن يُفشل القياس المزامنة نفسها)"""
+    try:
+        path = _runs_file()
+        line = json.dumps(run.as_dict(), ensure_ascii=False)
+        with _lock:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            if os.path.getsize(path) > PERF_FILE_MAX_BYTES:
+                from .log_index import tail_lines, invalidate_tail_cache
+                keep = tail_lines(path, PERF_MAX_RUNS)
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write("\n".join(keep) + "\n")
+                invalidate_tail_cache(path)
+    except Exception as e:
+        print(f"Error saving performance run: {e}")
+
+
+def load_runs(limit: int = PERF_MAX_RUNS) -> List[Dict]:
+    """آخر الجولات المحفوظة (الأحدث أولاً)"""
+    from .log_index import tail_lines
+    runs = []
+    for line in reversed(tail_lines(_runs_file(), limit)):
+        try:
+            runs.append(json.loads(line))
+        except ValueError:
+            continue
+    return runs
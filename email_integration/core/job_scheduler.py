@@ -0,0 +1,80 @@
+"""
+تشغيل المهام الدورية في خيط خلفي
+Background job scheduler (off the Qt event loop)
+
+- QTimer في الواجهة يستدعي submit() فقط؛ المهمة نفسها (قاعدة البيانات،
+  Graph، النسخ الاحتياطي ...) تعمل في خيط JobScheduler فلا تتجمد النافذة
+- دمج المؤقتات المتداخلة: إذا كانت مهمة بنفس الاسم في الانتظار أو قيد
+  التشغيل يُتجاهل الطلب الجديد (لا تتراكم نسخ من نفس الفحص)
+- النتيجة تعود للواجهة عبر الإشارة job_finished(name, result) أو
+  job_failed(name, error)؛ الإشارات عبر الخيوط تصل في خيط الواجهة
+- المهام لا تلمس عناصر الواجهة؛ كل ما يخص Qt Widgets يتم في معالج الإشارة
+"""
+import queue
+import threading
+from typing import Callable
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+# علامة إيقاف الخيط
+_STOP = object()
+
+
+class JobScheduler(QThread):
+    """خيط واحد ينفذ المهام الدورية بالتتابع"""
+
+    job_finished = pyqtSignal(str, object)
+    job_failed = pyqtSignal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._active = set()  # المهام في الانتظار أو قيد التشغيل
+
+    def submit(self, name: str, func: Callable, *args, **kwargs) -> bool:
+        """
+        جدولة مهمة
+
+        Returns:
+            False إذا كانت مهمة بنفس الاسم مجدولة أو قيد التشغيل (تم الدمج)
+        """
+        with self._lock:
+            if name in self._active:
+                return False
+            self._active.add(name)
+        self._queue.put((name, func, args, kwargs))
+        return True
+
+    def is_pending(self, name: str) -> bool:
+        with self._lock:
+            return name in self._active
+
+    def run(self):
+        while True:
+            job = self._queue.get()
+            if job is _STOP:
+                break
+            name, func, args, kwargs = job
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                with self._lock:
+                    self._active.discard(name)
+                self.job_failed.emit(name, str(e))
+                continue
+            with self._lock:
+                self._active.discard(name)
+            self.job_finished.emit(name, result)
+
+    def stop(self, timeout_ms: int = 5000):
+        """إيقاف الخيط بعد انتهاء المهمة الحالية (المهام المنتظرة تُلغى)"""
+        with self._lock:
+            self._active.clear()
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        self._queue.put(_STOP)
+        self.wait(timeout_ms)
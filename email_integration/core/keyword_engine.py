@@ -0,0 +1,170 @@
+"""
+محرك الكلمات المفتاحية (مرور واحد على نص الرسالة)
+Single-pass multi-pattern keyword engine
+
+- جداول الكلمات (فلترة الرسائل، نوع الطلب، تقييم الرد، auto_linker) تُسجَّل
+  عبر register_keywords() وتُجمع كلها في automaton واحد (Aho-Corasick)
+- scan_message() تمر على subject + body مرة واحدة وتعيد MessageHits
+  تستخدمه كل دوال التقييم بدلاً من `keyword in text` لكل كلمة
+- النتيجة مطابقة تماماً لـ `keyword in text` بما في ذلك الكلمات المتداخلة
+  (مثل "not interested" و "interested" أو "dehydrated onion" و "onion")
+- بدون pyahocorasick: بحث واحد لكل كلمة فريدة (rfind) بدلاً من تكرار الفحص
+  في كل دالة - أبطأ لكن بنفس النتيجة
+- النص والكلمات يمران بنفس التطبيع (fold_for_matching: NFKC + حذف التشكيل
+  والتطويل) فتتطابق "حسناً" و "حسنا"
+"""
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Set
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+from .text_normalize import fold_for_matching
+
+# اسم الجدول -> الكلمات بالترتيب الأصلي (الترتيب مهم لـ first())
+_tables: Dict[str, tuple] = {}
+# اسم الجدول -> عدد مرات تكرار كل كلمة في الجدول (count() يعدّ التكرار كما كان)
+_table_counts: Dict[str, Counter] = {}
+_engine = None
+_lock = threading.Lock()
+
+
+def register_keywords(tables: Dict[str, Sequence[str]]):
+    """تسجيل جداول كلمات (تُستدعى عند استيراد كل وحدة تقييم)"""
+    global _engine
+    with _lock:
+        for name, keywords in tables.items():
+            _tables[name] = tuple(fold_for_matching(k) for k in keywords)
+            _table_counts[name] = Counter(_tables[name])
+        _engine = None  # يُعاد البناء عند أول scan
+
+
+class KeywordEngine:
+    """automaton واحد لكل الكلمات المسجلة"""
+
+    def __init__(self, keywords, table_names: Sequence[str] = ()):
+        self.keywords = frozenset(k for k in keywords if k)
+        # ترتيب الجداول المعروف لهذا المحرك (لـ MessageHits.tables())
+        self.table_names = tuple(table_names)
+        self._automaton = None
+        if AHOCORASICK_AVAILABLE and self.keywords:
+            automaton = ahocorasick.Automaton()
+            for word in self.keywords:
+                automaton.add_word(word, (word, len(word) - 1))
+            automaton.make_automaton()
+            self._automaton = automaton
+
+    def find(self, text: str) -> Dict[str, int]:
+        """كل الكلمات الموجودة في text -> آخر موضع بداية لكل كلمة"""
+        positions: Dict[str, int] = {}
+        if self._automaton is not None:
+            for end, (word, length) in self._automaton.iter(text):
+                positions[word] = end - length
+            return positions
+
+        rfind = text.rfind
+        for word in self.keywords:
+            index = rfind(word)
+            if index >= 0:
+                positions[word] = index
+        return positions
+
+
+def get_engine() -> KeywordEngine:
+    global _engine
+    with _lock:
+        if _engine is None:
+            _engine = KeywordEngine((k for words in _tables.values() for k in words), list(_tables))
+        return _engine
+
+
+class MessageHits:
+    """
+    نتيجة مرور واحد على رسالة
+
+    scope = "all": subject + " " + body (مثل الفلترة ونوع الطلب)
+    scope = "body": المحتوى فقط (مثل تقييم الرد)
+
+    normalized=True: النص مطبّع مسبقاً (normalize_text) فيكفي lower()
+    """
+
+    def __init__(self, subject: str, body: str, normalized: bool = False):
+        if normalized:
+            subject = (subject or "").lower()
+            body = (body or "").lower()
+        else:
+            subject = fold_for_matching(subject)
+            body = fold_for_matching(body)
+        self.text = subject + " " + body
+        self.body_offset = len(subject) + 1
+        self._engine = get_engine()
+        self._positions = self._engine.find(self.text)
+        self._found_all: Set[str] = set(self._positions)
+        self._found_body: Optional[Set[str]] = None
+        self._cache: Dict[tuple, Set[str]] = {}
+
+    @property
+    def body_text(self) -> str:
+        return self.text[self.body_offset:]
+
+    def _found(self, scope: str) -> Set[str]:
+        if scope != "body":
+            return self._found_all
+        if self._found_body is None:
+            offset = self.body_offset
+            self._found_body = {k for k, pos in self._positions.items() if pos >= offset}
+        return self._found_body
+
+    def _matches(self, table: str, scope: str) -> Set[str]:
+        """كلمات الجدول الموجودة في النص"""
+        cached = self._cache.get((table, scope))
+        if cached is not None:
+            return cached
+        words = _table_counts[table].keys()
+        found = words & self._found(scope)
+        if not words <= self._engine.keywords:
+            # جدول سُجل بعد إنشاء هذه النتيجة: فحص مباشر للكلمات الجديدة
+            text = self.body_text if scope == "body" else self.text
+            found |= {k for k in words - self._engine.keywords if k in text}
+        self._cache[(table, scope)] = found
+        return found
+
+    def contains(self, keyword: str, scope: str = "all") -> bool:
+        keyword = fold_for_matching(keyword)
+        if keyword in self._engine.keywords:
+            return keyword in self._found(scope)
+        return keyword in (self.body_text if scope == "body" else self.text)
+
+    def has(self, table: str, scope: str = "all") -> bool:
+        return bool(self._matches(table, scope))
+
+    def count(self, table: str, scope: str = "all") -> int:
+        """عدد عناصر الجدول الموجودة (مثل sum(1 for k in table if k in text))"""
+        counts = _table_counts[table]
+        return sum(counts[k] for k in self._matches(table, scope))
+
+    def first(self, table: str, scope: str = "all") -> Optional[str]:
+        """أول كلمة من الجدول (بترتيب الجدول) موجودة في النص"""
+        found = self._matches(table, scope)
+        if found:
+            for keyword in _tables[table]:
+                if keyword in found:
+                    return keyword
+        return None
+
+    def tables(self, scope: str = "all") -> List[str]:
+        """أسماء الجداول التي وُجدت منها كلمة واحدة على الأقل (بترتيب التسجيل)"""
+        found = self._found(scope)
+        if not found:
+            return []
+        return [name for name in self._engine.table_names
+                if not found.isdisjoint(_table_counts[name])]
+
+
+def scan_message(subject: str, body: str, normalized: bool = False) -> MessageHits:
+    """مرور واحد على الرسالة لكل جداول الكلمات"""
+    return MessageHits(subject, body, normalized)
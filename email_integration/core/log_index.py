@@ -0,0 +1,443 @@
+"""
+قراءة ملفات السجل (tail) وفهرستها
+Log tail reader and structured log index
+
+- tail_lines(): آخر N سطر بالقراءة العكسية من نهاية الملف على كتل
+  (TAIL_BLOCK_SIZE) بدلاً من readlines() للملف كله؛ النتيجة تُخزن مؤقتاً
+  وعند الطلب التالي يُقرأ الجزء المضاف فقط (نفس الملف = نفس inode)
+- السجلات الجديدة سطر JSON لكل سجل (JsonLinesFormatter في logging_system)؛
+  parse_log_line() تقرأ أيضاً الصيغة النصية القديمة
+  "YYYY-MM-DD HH:MM:SS - [name -] LEVEL - [context] message"
+- LogIndex: قاعدة SQLite صغيرة (log_index.db بجانب ملفات السجل) فيها سجل
+  لكل record مع level / context / ts وفهارس عليها؛ refresh() تقرأ الإضافات
+  فقط وتتابع الملف بعد التدوير (sync.log -> sync.log.1) عن طريق بصمة السطر
+  الأول، والسجلات تبقى في الفهرس بعد حذف الملفات القديمة حتى INDEX_RETENTION_DAYS
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# حجم الكتلة في القراءة العكسية
+TAIL_BLOCK_SIZE = 64 * 1024
+
+# مدة الاحتفاظ بالسجلات في الفهرس (بعد حذف ملفات التدوير القديمة)
+INDEX_RETENTION_DAYS = 365
+
+# عدد السجلات في executemany الواحد أثناء الفهرسة
+INDEX_BATCH_SIZE = 5000
+
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+
+_LEGACY_LINE_RE = re.compile(
+    r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})(?:,\d+)? - (?:(\S+) - )?'
+    r'(DEBUG|INFO|WARNING|ERROR|CRITICAL) - (.*)$'
+)
+_CONTEXT_RE = re.compile(r'^\[([^\]]+)\] ?(.*)$', re.DOTALL)
+
+
+# =========================
+# Parsing
+# =========================
+def parse_log_line(line: str) -> Optional[Dict]:
+    """
+    سطر سجل -> dict (ts, level, logger, context, message, exc)
+
+    Returns:
+        None إذا لم يكن السطر بداية سجل (مثل أسطر traceback في الصيغة القديمة)
+    """
+    line = line.rstrip("\r\n")
+    if not line.strip():
+        return None
+
+    if line.startswith("{"):
+        try:
+            data = json.loads(line)
+        except ValueError:
+            data = None
+        if isinstance(data, dict) and "level" in data:
+            return {
+                "ts": data.get("ts", ""),
+                "level": data.get("level", ""),
+                "logger": data.get("logger", ""),
+                "context": data.get("context") or "",
+                "message": data.get("message", ""),
+                "exc": data.get("exc") or "",
+            }
+
+    match = _LEGACY_LINE_RE.match(line)
+    if not match:
+        return None
+    ts, logger_name, level, message = match.groups()
+    context = ""
+    context_match = _CONTEXT_RE.match(message)
+    if context_match:
+        context, message = context_match.groups()
+    return {
+        "ts": ts,
+        "level": level,
+        "logger": logger_name or "",
+        "context": context,
+        "message": message,
+        "exc": "",
+    }
+
+
+def format_log_record(record: Dict) -> str:
+    """سجل -> نص العرض بنفس شكل الصيغة النصية القديمة"""
+    message = record.get("message", "")
+    if record.get("context"):
+        message = f"[{record['context']}] {message}"
+    text = f"{record.get('ts', '')} - {record.get('level', '')} - {message}"
+    if record.get("exc"):
+        text += "\n" + record["exc"]
+    return text
+
+
+def format_log_line(line: str) -> str:
+    """سطر من الملف -> نص العرض (الأسطر غير المفهومة تُعاد كما هي)"""
+    record = parse_log_line(line)
+    if record is None:
+        return line.rstrip("\r\n")
+    return format_log_record(record)
+
+
+def parse_log_lines(lines: Iterator[str]) -> Iterator[Dict]:
+    """
+    تحويل أسطر متتالية إلى سجلات؛ أسطر الصيغة القديمة التي ليست بداية سجل
+    (traceback) تُضاف إلى exc للسجل السابق
+    """
+    current = None
+    for line in lines:
+        record = parse_log_line(line)
+        if record is not None:
+            if current is not None:
+                yield current
+            current = record
+        elif current is not None and line.strip():
+            current["exc"] = (current["exc"] + "\n" if current["exc"] else "") + line.rstrip("\r\n")
+    if current is not None:
+        yield current
+
+
+# =========================
+# Tail
+# =========================
+class _TailState:
+    __slots__ = ("identity", "end", "lines")
+
+    def __init__(self, identity, end: int, lines: deque):
+        self.identity = identity
+        self.end = end          # موضع بعد آخر سطر كامل مقروء
+        self.lines = lines
+
+
+_tail_cache: Dict[str, _TailState] = {}
+_tail_lock = threading.Lock()
+
+
+def _file_identity(st: os.stat_result):
+    return (st.st_dev, st.st_ino)
+
+
+def _read_tail(path: str, size: int, limit: int) -> Tuple[List[str], int]:
+    """آخر limit سطر كامل بالقراءة العكسية على كتل -> (الأسطر, موضع نهاية آخر سطر كامل)"""
+    with open(path, 'rb') as f:
+        position = size
+        data = b""
+        end = None
+        while position > 0:
+            step = min(TAIL_BLOCK_SIZE, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+            if end is None:
+                last_newline = data.rfind(b"\n")
+                if last_newline == -1:
+                    if position == 0:
+                        return [], 0
+                    continue
+                # السطر الأخير غير المكتمل (قيد الكتابة) لا يُحسب
+                end = position + last_newline + 1
+                data = data[:last_newline + 1]
+            if data.count(b"\n") > limit:
+                break
+    if end is None:
+        return [], 0
+    lines = data.decode("utf-8", errors="replace").splitlines()
+    if position > 0:
+        lines = lines[1:]  # السطر الأول قد يكون مقطوعاً
+    return lines[-limit:], end
+
+
+def tail_lines(path, limit: int = 200) -> List[str]:
+    """
+    آخر limit سطر من ملف نصي (بدون الأسطر الفارغة)
+
+    الاستدعاء المتكرر لنفس الملف يقرأ الجزء المضاف منذ آخر مرة فقط؛
+    تدوير الملف (inode جديد) أو تقصيره يعيد القراءة العكسية من النهاية
+    """
+    path = os.fspath(path)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return []
+
+    with _tail_lock:
+        state = _tail_cache.get(path)
+        identity = _file_identity(st)
+        if (state is None or state.identity != identity or st.st_size < state.end
+                or state.lines.maxlen < limit):
+            lines, end = _read_tail(path, st.st_size, limit)
+            state = _TailState(identity, end, deque((l for l in lines if l.strip()), maxlen=limit))
+            _tail_cache[path] = state
+        elif st.st_size > state.end:
+            with open(path, 'rb') as f:
+                f.seek(state.end)
+                data = f.read(st.st_size - state.end)
+            last_newline = data.rfind(b"\n")
+            if last_newline != -1:
+                state.end += last_newline + 1
+                for line in data[:last_newline + 1].decode("utf-8", errors="replace").splitlines():
+                    if line.strip():
+                        state.lines.append(line)
+        return list(state.lines)[-limit:]
+
+
+def invalidate_tail_cache(path=None):
+    """حذف النتيجة المخزنة (بعد مسح ملف السجل)"""
+    with _tail_lock:
+        if path is None:
+            _tail_cache.clear()
+        else:
+            _tail_cache.pop(os.fspath(path), None)
+
+
+# =========================
+# Index
+# =========================
+def _head_signature(path: str) -> Optional[str]:
+    """بصمة السطر الأول الكامل (تبقى ثابتة عند التدوير لأن الملف يُعاد تسميته فقط)"""
+    try:
+        with open(path, 'rb') as f:
+            first = f.readline(64 * 1024)
+    except OSError:
+        return None
+    if not first.endswith(b"\n"):
+        return None
+    return hashlib.sha1(first).hexdigest()
+
+
+class LogIndex:
+    """
+    فهرس SQLite لسجلات عدة ملفات مُدوَّرة
+
+    Args:
+        db_path: مسار قاعدة الفهرس
+        sources: {نوع السجل: مسار الملف الحالي} مثل {"sync": ".../sync.log"}
+        backup_count: عدد ملفات التدوير (sync.log.1 ... sync.log.N)
+    """
+
+    def __init__(self, db_path, sources: Dict[str, object], backup_count: int):
+        self.db_path = os.fspath(db_path)
+        self.sources = {name: os.fspath(path) for name, path in sources.items()}
+        self.backup_count = backup_count
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=15)
+        if not self._ready:
+            cur = conn.cursor()
+            cur.execute("PRAGMA journal_mode = WAL")
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS log_records (
+                    id INTEGER PRIMARY KEY,
+                    log_type TEXT NOT NULL,
+                    ts TEXT NOT NULL,
+                    level TEXT NOT NULL,
+                    context TEXT NOT NULL DEFAULT '',
+                    message TEXT NOT NULL,
+                    exc TEXT NOT NULL DEFAULT ''
+                )
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_log_records_ts ON log_records(ts)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_log_records_type_ts ON log_records(log_type, ts)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_log_records_level ON log_records(level, ts)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_log_records_context ON log_records(context, ts)")
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS log_index_state (
+                    log_type TEXT PRIMARY KEY,
+                    head TEXT NOT NULL,
+                    offset INTEGER NOT NULL
+                )
+            """)
+            conn.commit()
+            self._ready = True
+        return conn
+
+    def _segments(self, log_type: str) -> List[str]:
+        """الملفات من الأقدم للأحدث: sync.log.N ... sync.log.1, sync.log"""
+        base = self.sources[log_type]
+        rotated = [f"{base}.{i}" for i in range(self.backup_count, 0, -1)]
+        return [path for path in rotated + [base] if os.path.exists(path)]
+
+    @staticmethod
+    def _read_from(path: str, offset: int) -> Tuple[List[str], int]:
+        """الأسطر الكاملة من offset -> (الأسطر, الموضع الجديد)"""
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        last_newline = data.rfind(b"\n")
+        if last_newline == -1:
+            return [], offset
+        return data[:last_newline + 1].decode("utf-8", errors="replace").splitlines(), offset + last_newline + 1
+
+    def _index_type(self, cur, log_type: str) -> int:
+        cur.execute("SELECT head, offset FROM log_index_state WHERE log_type=?", (log_type,))
+        state = cur.fetchone()
+        segments = self._segments(log_type)
+        signatures = [_head_signature(path) for path in segments]
+
+        # أين توقفنا: نفس الملف (أو بعد تدويره) حسب بصمة السطر الأول
+        start, offset = 0, 0
+        if state is not None:
+            head, last_offset = state
+            if head in signatures:
+                start = signatures.index(head)
+                offset = last_offset
+
+        added = 0
+        last_head, last_offset = (state if state is not None else (None, 0))
+        for position in range(start, len(segments)):
+            path, signature = segments[position], signatures[position]
+            if signature is None:
+                continue  # ملف فارغ أو السطر الأول لم يكتمل بعد
+            lines, end = self._read_from(path, offset if position == start else 0)
+            rows = [
+                (log_type, r["ts"], r["level"], r["context"], r["message"], r["exc"])
+                for r in parse_log_lines(lines)
+            ]
+            for i in range(0, len(rows), INDEX_BATCH_SIZE):
+                cur.executemany("""
+                    INSERT INTO log_records (log_type, ts, level, context, message, exc)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, rows[i:i + INDEX_BATCH_SIZE])
+            added += len(rows)
+            last_head, last_offset = signature, end
+
+        if last_head is not None:
+            cur.execute("""
+                INSERT INTO log_index_state (log_type, head, offset) VALUES (?, ?, ?)
+                ON CONFLICT(log_type) DO UPDATE SET head=excluded.head, offset=excluded.offset
+            """, (log_type, last_head, last_offset))
+        return added
+
+    def refresh(self, log_types: Optional[Sequence[str]] = None) -> int:
+        """
+        فهرسة السجلات الجديدة فقط
+
+        Returns:
+            عدد السجلات المضافة
+        """
+        with self._lock:
+            conn = self._connect()
+            try:
+                cur = conn.cursor()
+                added = 0
+                for log_type in log_types or self.sources:
+                    added += self._index_type(cur, log_type)
+                cutoff = (datetime.now() - timedelta(days=INDEX_RETENTION_DAYS)).strftime("%Y-%m-%d")
+                cur.execute("DELETE FROM log_records WHERE ts < ?", (cutoff,))
+                conn.commit()
+                return added
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+
+    def clear(self, log_types: Optional[Sequence[str]] = None):
+        """حذف سجلات نوع (أو كل الأنواع) من الفهرس"""
+        with self._lock:
+            conn = self._connect()
+            try:
+                cur = conn.cursor()
+                for log_type in log_types or self.sources:
+                    cur.execute("DELETE FROM log_records WHERE log_type=?", (log_type,))
+                    cur.execute("DELETE FROM log_index_state WHERE log_type=?", (log_type,))
+                conn.commit()
+            finally:
+                conn.close()
+
+    @staticmethod
+    def _where(log_types, level, context, search, since, until) -> Tuple[str, list]:
+        clauses, params = [], []
+        if log_types:
+            clauses.append(f"log_type IN ({','.join('?' * len(log_types))})")
+            params.extend(log_types)
+        if level:
+            clauses.append("level = ?")
+            params.append(level)
+        if context:
+            clauses.append("context = ?")
+            params.append(context)
+        if search:
+            clauses.append("(message LIKE ? OR exc LIKE ?)")
+            params.extend([f"%{search}%"] * 2)
+        if since:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until:
+            clauses.append("ts < ?")
+            params.append(until)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, log_types: Optional[Sequence[str]] = None, level: str = None,
+              context: str = None, search: str = None, since: str = None,
+              until: str = None, limit: int = 200, offset: int = 0) -> Tuple[List[Dict], int]:
+        """
+        السجلات المطابقة (الأحدث أولاً) مع العدد الكلي للتصفح
+
+        Args:
+            since / until: "YYYY-MM-DD" أو "YYYY-MM-DD HH:MM:SS" (until غير شامل)
+
+        Returns:
+            (السجلات, العدد الكلي)
+        """
+        where, params = self._where(log_types, level, context, search, since, until)
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            cur.execute(f"SELECT COUNT(*) FROM log_records{where}", params)
+            total = cur.fetchone()[0]
+            cur.execute(f"""
+                SELECT log_type, ts, level, context, message, exc
+                FROM log_records{where}
+                ORDER BY ts DESC, id DESC
+                LIMIT ? OFFSET ?
+            """, params + [limit, offset])
+            records = [
+                {"log_type": t, "ts": ts, "level": lv, "context": ctx, "message": msg, "exc": exc}
+                for t, ts, lv, ctx, msg, exc in cur.fetchall()
+            ]
+            return records, total
+        finally:
+            conn.close()
+
+    def contexts(self, log_types: Optional[Sequence[str]] = None) -> List[str]:
+        """قيم context الموجودة (لقائمة الفلتر)"""
+        where, params = self._where(log_types, None, None, None, None, None)
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            extra = " AND " if where else " WHERE "
+            cur.execute(f"SELECT DISTINCT context FROM log_records{where}{extra}context != '' ORDER BY context", params)
+            return [row[0] for row in cur.fetchall()]
+        finally:
+            conn.close()
@@ -1,7 +1,13 @@
 """
 نظام Logging شامل للبرنامج
 Comprehensive Logging System for EFM
+
+- كل سجل سطر JSON واحد (ts, level, logger, context, message, exc) حتى
+  يُقرأ من نهاية الملف ويُفهرس بدون تحليل أسطر traceback المتعددة
+- get_*_logs تقرأ آخر الأسطر فقط (tail_lines) والبحث / التصفح عبر
+  get_log_index() (core/log_index.py) ويشمل ملفات التدوير
 """
+import json
 import logging
 import os
 from datetime import datetime
@@ -9,6 +15,8 @@ from pathlib import Path
 from logging.handlers import RotatingFileHandler
 from typing import Optional
 
+from .log_index import LogIndex, format_log_line, invalidate_tail_cache, tail_lines
+
 # مسار ملفات الـ Log
 BASE_DIR = Path(__file__).parent.parent
 LOGS_DIR = BASE_DIR / "logs"
@@ -22,6 +30,31 @@ SYNC_LOG_FILE = LOGS_DIR / "sync.log"
 # إعدادات الـ Logging
 MAX_LOG_SIZE = 10 * 1024 * 1024  # 10 MB
 BACKUP_COUNT = 5  # عدد ملفات النسخ الاحتياطي
+LOG_DATEFMT = '%Y-%m-%d %H:%M:%S'
+
+# فهرس السجلات (SQLite) بجانب ملفات الـ Log
+LOG_INDEX_FILE = LOGS_DIR / "log_index.db"
+LOG_FILES = {
+    "error": ERROR_LOG_FILE,
+    "app": APP_LOG_FILE,
+    "sync": SYNC_LOG_FILE,
+}
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """سجل واحد = سطر JSON واحد (الـ traceback داخل الحقل exc)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": self.formatTime(record, LOG_DATEFMT),
+            "level": record.levelname,
+            "logger": record.name,
+            "context": getattr(record, "context", "") or "",
+            "message": record.getMessage(),
+        }
+        if record.exc_info and record.exc_info[0] is not None:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
 
 
 class EFMLogger:
@@ -30,12 +63,19 @@ class EFMLogger:
     def __init__(self):
         self.setup_loggers()
     
+    @staticmethod
+    def _close_handlers(logger: logging.Logger):
+        """إغلاق الملفات المفتوحة قبل إعادة الإعداد (وإلا يفشل التدوير على Windows)"""
+        for handler in logger.handlers:
+            handler.close()
+        logger.handlers.clear()
+    
     def setup_loggers(self):
         """إعداد Loggers المختلفة"""
         # 1. Logger للأخطاء
         self.error_logger = logging.getLogger("EFM_Error")
         self.error_logger.setLevel(logging.ERROR)
-        self.error_logger.handlers.clear()
+        self._close_handlers(self.error_logger)
         
         error_handler = RotatingFileHandler(
             ERROR_LOG_FILE,
@@ -43,17 +83,13 @@ class EFMLogger:
             backupCount=BACKUP_COUNT,
             encoding='utf-8'
         )
-        error_formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        error_handler.setFormatter(error_formatter)
+        error_handler.setFormatter(JsonLinesFormatter())
         self.error_logger.addHandler(error_handler)
         
         # 2. Logger للتطبيق العام
         self.app_logger = logging.getLogger("EFM_App")
         self.app_logger.setLevel(logging.INFO)
-        self.app_logger.handlers.clear()
+        self._close_handlers(self.app_logger)
         
         app_handler = RotatingFileHandler(
             APP_LOG_FILE,
@@ -61,17 +97,13 @@ class EFMLogger:
             backupCount=BACKUP_COUNT,
             encoding='utf-8'
         )
-        app_formatter = logging.Formatter(
-            '%(asctime)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        app_handler.setFormatter(app_formatter)
+        app_handler.setFormatter(JsonLinesFormatter())
         self.app_logger.addHandler(app_handler)
         
         # 3. Logger للمزامنة
         self.sync_logger = logging.getLogger("EFM_Sync")
         self.sync_logger.setLevel(logging.INFO)
-        self.sync_logger.handlers.clear()
+        self._close_handlers(self.sync_logger)
         
         sync_handler = RotatingFileHandler(
             SYNC_LOG_FILE,
@@ -79,41 +111,36 @@ class EFMLogger:
             backupCount=BACKUP_COUNT,
             encoding='utf-8'
         )
-        sync_formatter = logging.Formatter(
-            '%(asctime)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        sync_handler.setFormatter(sync_formatter)
+        sync_handler.setFormatter(JsonLinesFormatter())
         self.sync_logger.addHandler(sync_handler)
     
     def log_error(self, error: Exception, context: str = "", additional_info: dict = None):
         """تسجيل خطأ"""
         try:
-            message = f"[{context}] {str(error)}"
+            message = str(error)
             if additional_info:
                 info_str = ", ".join([f"{k}={v}" for k, v in additional_info.items()])
                 message += f" | {info_str}"
             
-            self.error_logger.error(message, exc_info=True)
+            extra = {"context": context}
+            self.error_logger.error(message, exc_info=True, extra=extra)
             
             # أيضاً في ملف التطبيق العام
-            self.app_logger.error(message)
+            self.app_logger.error(message, extra=extra)
         except Exception:
             pass  # لا نريد أن يفشل Logging نفسه
     
     def log_warning(self, message: str, context: str = ""):
         """تسجيل تحذير"""
         try:
-            log_message = f"[{context}] {message}" if context else message
-            self.app_logger.warning(log_message)
+            self.app_logger.warning(message, extra={"context": context})
         except Exception:
             pass
     
     def log_info(self, message: str, context: str = ""):
         """تسجيل معلومات"""
         try:
-            log_message = f"[{context}] {message}" if context else message
-            self.app_logger.info(log_message)
+            self.app_logger.info(message, extra={"context": context})
         except Exception:
             pass
     
@@ -122,7 +149,7 @@ class EFMLogger:
         try:
             if level == "error":
                 self.sync_logger.error(message)
-                self.error_logger.error(f"[Sync] {message}")
+                self.error_logger.error(message, extra={"context": "Sync"})
             elif level == "warning":
                 self.sync_logger.warning(message)
             else:
@@ -130,67 +157,47 @@ class EFMLogger:
         except Exception:
             pass
     
-    def get_error_logs(self, limit: int = 100) -> list:
-        """الحصول على آخر الأخطاء"""
+    def _tail_logs(self, log_type: str, limit: int) -> list:
+        """آخر limit سجل من الملف الحالي (قراءة عكسية من النهاية، بدون readlines)"""
         try:
-            if not ERROR_LOG_FILE.exists():
-                return []
-            
-            logs = []
-            with open(ERROR_LOG_FILE, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-                # أخذ آخر limit سطر
-                recent_lines = lines[-limit:] if len(lines) > limit else lines
-                
-                for line in recent_lines:
-                    if line.strip():
-                        logs.append(line.strip())
-            
-            return logs
+            return [format_log_line(line) for line in tail_lines(LOG_FILES[log_type], limit)]
         except Exception:
             return []
     
+    def get_error_logs(self, limit: int = 100) -> list:
+        """الحصول على آخر الأخطاء"""
+        return self._tail_logs("error", limit)
+    
     def get_app_logs(self, limit: int = 100) -> list:
         """الحصول على آخر Logs التطبيق"""
-        try:
-            if not APP_LOG_FILE.exists():
-                return []
-            
-            logs = []
-            with open(APP_LOG_FILE, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-                recent_lines = lines[-limit:] if len(lines) > limit else lines
-                
-                for line in recent_lines:
-                    if line.strip():
-                        logs.append(line.strip())
-            
-            return logs
-        except Exception:
-            return []
+        return self._tail_logs("app", limit)
+    
+    def get_sync_logs(self, limit: int = 100) -> list:
+        """الحصول على آخر Logs المزامنة"""
+        return self._tail_logs("sync", limit)
     
     def clear_logs(self, log_type: str = "all"):
-        """مسح الـ Logs"""
+        """مسح الـ Logs مع ملفات التدوير والفهرس الخاص بها"""
         try:
-            if log_type == "all" or log_type == "error":
-                if ERROR_LOG_FILE.exists():
-                    ERROR_LOG_FILE.unlink()
-                    self.error_logger.handlers.clear()
-                    self.setup_loggers()
+            log_types = list(LOG_FILES) if log_type == "all" else [log_type]
+            loggers = {"error": self.error_logger, "app": self.app_logger, "sync": self.sync_logger}
             
-            if log_type == "all" or log_type == "app":
-                if APP_LOG_FILE.exists():
-                    APP_LOG_FILE.unlink()
-                    self.app_logger.handlers.clear()
-                    self.setup_loggers()
+            # إغلاق الملفات أولاً (Windows لا يسمح بحذف ملف مفتوح)
+            for name in log_types:
+                self._close_handlers(loggers[name])
             
-            if log_type == "all" or log_type == "sync":
-                if SYNC_LOG_FILE.exists():
-                    SYNC_LOG_FILE.unlink()
-                    self.sync_logger.handlers.clear()
-                    self.setup_loggers()
+            for name in log_types:
+                base = LOG_FILES[name]
+                for path in [base] + [Path(f"{base}.{i}") for i in range(1, BACKUP_COUNT + 1)]:
+                    if path.exists():
+                        path.unlink()
+                invalidate_tail_cache(base)
+            
+            get_log_index().clear(log_types)
         except Exception:
             pass
+        finally:
+            self.setup_loggers()
     
     def get_log_file_size(self, log_type: str = "error") -> int:
         """الحصول على حجم ملف الـ Log"""
@@ -208,6 +215,7 @@ class EFMLogger:
 
 # Global logger instance
 _logger_instance: Optional[EFMLogger] = None
+_log_index: Optional[LogIndex] = None
 
 
 def get_logger() -> EFMLogger:
@@ -218,6 +226,14 @@ def get_logger() -> EFMLogger:
     return _logger_instance
 
 
+def get_log_index() -> LogIndex:
+    """فهرس السجلات العام (error / app / sync مع ملفات التدوير)"""
+    global _log_index
+    if _log_index is None:
+        _log_index = LogIndex(LOG_INDEX_FILE, LOG_FILES, BACKUP_COUNT)
+    return _log_index
+
+
 def log_error(error: Exception, context: str = "", additional_info: dict = None):
     """تسجيل خطأ (وظيفة مساعدة)"""
     get_logger().log_error(error, context, additional_info)
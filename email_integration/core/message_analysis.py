@@ -0,0 +1,227 @@
+"""
+تحليل الرسالة مرة واحدة وتخزين النتائج مع الرسالة
+Single-pass message analysis with persisted features
+
+analyze_message(subject, body) تنفذ كل المعالجة مرة واحدة:
+HTML -> نص، تطبيع Unicode/عربي، اكتشاف اللغة، الكلمات المفتاحية،
+نوع الطلب ونقاطه، تقييم الرد، وقرار الاستيراد.
+
+النتائج تُحفظ في أعمدة جدول messages (MESSAGE_ANALYSIS_COLUMNS) فتقرأها
+صفحة Timeline والبحث والإحصائيات مباشرة بدلاً من إعادة الحساب.
+عند تغيير قواعد التحليل يُرفع ANALYSIS_VERSION ويُعاد تحليل الرسائل
+القديمة عبر reanalyze_messages() (من body_text المخزن بدون HTML).
+"""
+import hashlib
+import json
+import re
+from typing import Dict, List, Optional
+
+from .ai_reply_scoring import detect_positive_reply
+from .dates import to_iso_date
+from .db import get_connection
+from .instrumentation import phase
+from .keyword_engine import scan_message
+from .message_filter import detect_request_type, should_import_message
+from .reply_templates import detect_language
+from .text_normalize import html_to_text, normalize_text
+
+# يُرفع عند تغيير قواعد التحليل حتى يُعاد تحليل الرسائل المخزنة
+ANALYSIS_VERSION = 1
+
+# أعمدة messages التي تُملأ من التحليل (بنفس ترتيب MessageAnalysis.columns())
+MESSAGE_ANALYSIS_COLUMNS = (
+    "body_text",
+    "language",
+    "request_type",
+    "request_tags",
+    "keyword_hits",
+    "request_score",
+    "reply_score",
+    "analysis_version",
+)
+
+# أنواع الطلبات المعروضة في Timeline (price / sample / moq) - كلمات كاملة
+REQUEST_TAG_PATTERNS = {
+    "price": [r"price", r"quotation", r"quote", r"cost", r"usd", r"fob", r"cif"],
+    "sample": [r"sample", r"sampling", r"test"],
+    "moq": [r"moq", r"minimum order", r"min\.?\s*order"],
+}
+_REQUEST_TAG_RES = {
+    tag: re.compile(r"\b(?:" + "|".join(patterns) + r")\b")
+    for tag, patterns in REQUEST_TAG_PATTERNS.items()
+}
+# فحص سريع (substring) قبل regex: معظم الرسائل لا تحتوي أياً منها
+_REQUEST_TAG_HINTS = {
+    "price": ("price", "quot", "cost", "usd", "fob", "cif"),
+    "sample": ("sampl", "test"),
+    "moq": ("moq", "min"),
+}
+
+# تقييم الرد يُحسب فقط للمحتوى الأطول من هذا الحد (كما في حلقات المزامنة)
+MIN_REPLY_SCORING_LENGTH = 50
+
+
+def detect_request_tags(text: str) -> List[str]:
+    """أنواع الطلب (price, sample, moq) الموجودة في النص بالترتيب"""
+    text = (text or "").lower()
+    return [
+        tag for tag, pattern in _REQUEST_TAG_RES.items()
+        if any(hint in text for hint in _REQUEST_TAG_HINTS[tag]) and pattern.search(text)
+    ]
+
+
+class MessageAnalysis:
+    """نتيجة تحليل رسالة واحدة"""
+
+    def __init__(self, subject: str, body: str, is_plain_text: bool = False,
+                 sender_email: str = ""):
+        with phase("parse"):
+            self.subject = normalize_text(subject)
+            self.text = normalize_text(body if is_plain_text else html_to_text(body))
+            self.hits = scan_message(self.subject, self.text, normalized=True)
+
+        with phase("score"):
+            self.language = detect_language(self.text) if self.text else None
+            self.request_type, self.request_score = detect_request_type(
+                self.subject, self.text, self.hits
+            )
+            self.request_tags = detect_request_tags(self.text)
+
+            self.reply_score = 0
+            if len(self.text) > MIN_REPLY_SCORING_LENGTH:
+                try:
+                    self.reply_score = detect_positive_reply(self.text, self.hits)
+                except Exception:
+                    pass
+
+        with phase("filter"):
+            self.should_import, self.import_reason = should_import_message(
+                self.subject, self.text, sender_email or "", hits=self.hits
+            )
+
+    @property
+    def score_effect(self) -> int:
+        """تأثير الرسالة على نقاط العميل (تقييم الرد + نقاط نوع الطلب)"""
+        return self.reply_score + self.request_score
+
+    def columns(self) -> tuple:
+        """القيم بترتيب MESSAGE_ANALYSIS_COLUMNS"""
+        return (
+            self.text,
+            self.language,
+            self.request_type,
+            ",".join(self.request_tags),
+            json.dumps(self.hits.tables(), ensure_ascii=False),
+            self.request_score,
+            self.reply_score,
+            ANALYSIS_VERSION,
+        )
+
+    def as_dict(self) -> Dict:
+        return dict(zip(MESSAGE_ANALYSIS_COLUMNS, self.columns()))
+
+
+def analyze_message(subject: str, body: str, is_plain_text: bool = False,
+                    sender_email: str = "") -> MessageAnalysis:
+    """
+    تحليل الرسالة مرة واحدة
+
+    Args:
+        subject: موضوع الرسالة
+        body: المحتوى كما وصل (HTML أو نص)
+        is_plain_text: المحتوى نص مسبقاً (مثل body_text المخزن) فلا حاجة لإزالة HTML
+        sender_email: بريد المرسل لقواعد الاستيراد (should_import_message)
+    """
+    return MessageAnalysis(subject or "", body or "", is_plain_text, sender_email)
+
+
+def split_request_tags(value: Optional[str]) -> List[str]:
+    """قراءة عمود request_tags المخزن"""
+    return [tag for tag in (value or "").split(",") if tag]
+
+
+# =========================
+# Fingerprint (dedupe)
+# =========================
+def message_fingerprint(client_id: int, message_date: str, subject: str, body_text: str) -> str:
+    """
+    بصمة الرسالة لعمود messages.fingerprint (UNIQUE)
+
+    العميل (المرسل) + التاريخ + الموضوع المطبّع + hash للنص المطبّع
+    (body_text من التحليل، أي بعد إزالة HTML).
+    تعتمد على المحتوى فقط حتى تتطابق مع بصمات الرسائل القديمة التي لا تملك
+    Internet-Message-ID؛ المعرف نفسه يُخزن في messages.internet_message_id
+    (فهرس UNIQUE جزئي) ويُفحص بجانب البصمة.
+    """
+    body_digest = hashlib.sha1(normalize_text(body_text).lower().encode("utf-8")).hexdigest()
+    parts = (
+        "content",
+        str(client_id),
+        to_iso_date(message_date) or (message_date or "").strip(),
+        normalize_text(subject).lower(),
+        body_digest,
+    )
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def normalize_message_id(internet_message_id: Optional[str]) -> Optional[str]:
+    """تطبيع Internet-Message-ID (بدون <> وبأحرف صغيرة)؛ None إذا كان فارغاً"""
+    message_id = (internet_message_id or "").strip().strip("<>").strip().lower()
+    return message_id or None
+
+
+# =========================
+# Backfill / Re-analysis
+# =========================
+def backfill_message_analysis(cur, batch_size: int = 500) -> int:
+    """
+    تحليل الرسائل غير المحللة أو المحللة بإصدار أقدم باستخدام cursor موجود
+    (يُستخدم داخل الترحيل). لا يغير score_effect المطبق مسبقاً على العملاء.
+
+    Returns:
+        عدد الرسائل التي تم تحليلها
+    """
+    assignments = ", ".join(f"{col} = ?" for col in MESSAGE_ANALYSIS_COLUMNS)
+    updated = 0
+    last_id = 0
+    while True:
+        cur.execute("""
+            SELECT id, client_response, notes, body_text, analysis_version
+            FROM messages
+            WHERE id > ?
+              AND (analysis_version IS NULL OR analysis_version < ?)
+            ORDER BY id
+            LIMIT ?
+        """, (last_id, ANALYSIS_VERSION, batch_size))
+        rows = cur.fetchall()
+        if not rows:
+            break
+
+        updates = []
+        for message_id, subject, notes, body_text, version in rows:
+            # body_text المخزن جاهز (بدون HTML)؛ وإلا نحلل notes الأصلي
+            if version is not None and body_text is not None:
+                analysis = analyze_message(subject, body_text, is_plain_text=True)
+            else:
+                analysis = analyze_message(subject, notes)
+            updates.append(analysis.columns() + (message_id,))
+        cur.executemany(f"UPDATE messages SET {assignments} WHERE id = ?", updates)
+
+        updated += len(updates)
+        last_id = rows[-1][0]
+    return updated
+
+
+def reanalyze_messages() -> int:
+    """إعادة تحليل الرسائل المخزنة بعد تغيير قواعد التحليل"""
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        updated = backfill_message_analysis(cur)
+        conn.commit()
+        return updated
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
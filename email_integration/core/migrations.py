@@ -0,0 +1,416 @@
+"""
+ترحيل مخطط قاعدة البيانات بإصدارات (PRAGMA user_version)
+Versioned Schema Migrations
+
+كل ترحيل يُنفَّذ مرة واحدة فقط بالترتيب ثم يُحفظ رقم الإصدار داخل قاعدة البيانات.
+الترحيلات مكتوبة بحيث يمكن إعادة تشغيلها بأمان (IF NOT EXISTS / فحص الأعمدة).
+"""
+import sqlite3
+from typing import Callable, List, Tuple
+
+from .db import DELTA_LINK_COLUMNS, get_connection
+from .dates import iso_date_sql, iso_datetime_sql
+from .fulltext import ensure_fulltext_indexes
+from .models import classify_client, followup_days_sql
+from .message_analysis import (
+    MESSAGE_ANALYSIS_COLUMNS,
+    backfill_message_analysis,
+    message_fingerprint,
+)
+from .summary import ensure_summary_counts
+from .text_normalize import html_to_text
+
+
+# =========================
+# Helpers
+# =========================
+def _table_exists(cur, table: str) -> bool:
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,))
+    return cur.fetchone() is not None
+
+
+def _table_columns(cur, table: str) -> List[str]:
+    cur.execute(f"PRAGMA table_info({table})")
+    return [r[1] for r in cur.fetchall()]
+
+
+# =========================
+# 1) ISO date columns
+# =========================
+# الأعمدة النصية dd/mm/yyyy التي نضيف بجانبها عموداً <column>_iso
+ISO_DATE_COLUMNS = {
+    "messages": ["message_date", "actual_date"],
+    "clients": ["date_added"],
+    "tasks": ["due_date", "reminder_date"],
+    "sales_deals": ["expected_close_date", "actual_close_date"],
+}
+
+# أعمدة يُحفظ فيها الوقت أيضاً (YYYY-MM-DD HH:MM:SS): التذكير مستحق في وقته لا من منتصف الليل
+ISO_DATETIME_COLUMNS = {("tasks", "reminder_date")}
+
+ISO_DATE_INDEXES = [
+    ("idx_messages_client_sort_date", "messages", "client_id, sort_date_iso"),
+    ("idx_messages_sort_date", "messages", "sort_date_iso"),
+    ("idx_messages_message_date_iso", "messages", "message_date_iso"),
+    ("idx_clients_date_added_iso", "clients", "date_added_iso"),
+    ("idx_tasks_status_due_iso", "tasks", "status, due_date_iso"),
+    ("idx_tasks_status_reminder_iso", "tasks", "status, reminder_date_iso"),
+    ("idx_deals_expected_close_iso", "sales_deals", "expected_close_date_iso"),
+    ("idx_deals_actual_close_iso", "sales_deals", "actual_close_date_iso"),
+]
+
+
+def _iso_assignments(table: str, source: str) -> str:
+    """SET col_iso = <expr>(source.col), ... (+ sort_date_iso للرسائل)"""
+    parts = []
+    for col in ISO_DATE_COLUMNS[table]:
+        to_iso = iso_datetime_sql if (table, col) in ISO_DATETIME_COLUMNS else iso_date_sql
+        parts.append(f"{col}_iso = {to_iso(f'{source}.{col}' if source else col)}")
+    if table == "messages":
+        prefix = f"{source}." if source else ""
+        parts.append(
+            "sort_date_iso = COALESCE("
+            f"{iso_date_sql(prefix + 'actual_date')}, {iso_date_sql(prefix + 'message_date')})"
+        )
+    return ",\n            ".join(parts)
+
+
+def ensure_iso_date_columns(cur):
+    """إضافة أعمدة *_iso + triggers + فهارس لكل جدول موجود (آمن لإعادة التشغيل)"""
+    for table, columns in ISO_DATE_COLUMNS.items():
+        if not _table_exists(cur, table):
+            continue
+
+        existing = _table_columns(cur, table)
+        new_columns = [f"{c}_iso" for c in columns]
+        if table == "messages":
+            new_columns.append("sort_date_iso")
+
+        added = False
+        for col in new_columns:
+            if col not in existing:
+                cur.execute(f"ALTER TABLE {table} ADD COLUMN {col} TEXT")
+                added = True
+
+        # ملء الأعمدة الجديدة من البيانات الحالية (مرة واحدة)
+        if added:
+            cur.execute(f"UPDATE {table} SET {_iso_assignments(table, '')}")
+
+        # triggers تبقي الأعمدة محدثة مهما كان مصدر الكتابة
+        watched = ", ".join(columns)
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_iso_dates_insert
+            AFTER INSERT ON {table}
+            BEGIN
+                UPDATE {table} SET
+            {_iso_assignments(table, 'NEW')}
+                WHERE rowid = NEW.rowid;
+            END
+        """)
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_iso_dates_update
+            AFTER UPDATE OF {watched} ON {table}
+            BEGIN
+                UPDATE {table} SET
+            {_iso_assignments(table, 'NEW')}
+                WHERE rowid = NEW.rowid;
+            END
+        """)
+
+    for name, table, cols in ISO_DATE_INDEXES:
+        if _table_exists(cur, table):
+            cur.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({cols})")
+
+
+# =========================
+# 2) Graph delta links
+# =========================
+def ensure_delta_link_columns(cur):
+    """أعمدة رابط delta ووقت آخر جولة لكل نوع مزامنة في outlook_accounts"""
+    if not _table_exists(cur, "outlook_accounts"):
+        return
+    existing = _table_columns(cur, "outlook_accounts")
+    for columns in DELTA_LINK_COLUMNS.values():
+        for col in columns:
+            if col not in existing:
+                cur.execute(f"ALTER TABLE outlook_accounts ADD COLUMN {col} TEXT")
+
+
+# =========================
+# 3) IMAP UID state
+# =========================
+def ensure_imap_sync_state_table(cur):
+    """آخر UID و UIDVALIDITY لكل حساب/مجلد/نوع مزامنة"""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS imap_sync_state (
+            account_id INTEGER NOT NULL,
+            folder TEXT NOT NULL,
+            kind TEXT NOT NULL DEFAULT 'sync',
+            uidvalidity INTEGER,
+            last_uid INTEGER DEFAULT 0,
+            synced_at TEXT,
+            PRIMARY KEY (account_id, folder, kind)
+        )
+    """)
+
+
+# =========================
+# 4) Message analysis features
+# =========================
+MESSAGE_ANALYSIS_COLUMN_TYPES = {
+    "request_score": "INTEGER",
+    "reply_score": "INTEGER",
+    "analysis_version": "INTEGER",
+}
+
+
+def ensure_message_analysis_columns(cur):
+    """أعمدة نتائج التحليل في messages + تحليل الرسائل الموجودة مرة واحدة"""
+    if not _table_exists(cur, "messages"):
+        return
+    existing = _table_columns(cur, "messages")
+    for col in MESSAGE_ANALYSIS_COLUMNS:
+        if col not in existing:
+            col_type = MESSAGE_ANALYSIS_COLUMN_TYPES.get(col, "TEXT")
+            cur.execute(f"ALTER TABLE messages ADD COLUMN {col} {col_type}")
+
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_messages_request_type ON messages(request_type)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_messages_language ON messages(language)")
+
+    backfill_message_analysis(cur)
+
+
+# =========================
+# 5) Message fingerprint (dedupe)
+# =========================
+def ensure_message_fingerprints(cur, batch_size: int = 500):
+    """
+    عمود fingerprint (بصمة المحتوى) + فهرس UNIQUE عليه (يحل محل remove_duplicate_messages)،
+    وعمود internet_message_id + فهرس UNIQUE جزئي (client_id, internet_message_id)
+
+    تُحسب البصمة لكل رسالة موجودة، وتُحذف التكرارات مرة واحدة مع الاحتفاظ
+    بأقدم رسالة (نفس ما يفعله INSERT ... ON CONFLICT DO NOTHING لاحقاً)
+    ويُطرح score_effect الرسائل المحذوفة من نقاط العميل.
+    internet_message_id يُملأ من المزامنات التالية (لم يكن محفوظاً من قبل).
+    """
+    if not _table_exists(cur, "messages"):
+        return
+    existing = _table_columns(cur, "messages")
+    for col in ("fingerprint", "internet_message_id"):
+        if col not in existing:
+            cur.execute(f"ALTER TABLE messages ADD COLUMN {col} TEXT")
+
+    seen = set()
+    duplicates = []
+    score_deltas = {}
+    last_id = 0
+    while True:
+        cur.execute("""
+            SELECT id, client_id, COALESCE(actual_date, message_date),
+                   client_response, body_text, notes, fingerprint, score_effect
+            FROM messages
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+        """, (last_id, batch_size))
+        rows = cur.fetchall()
+        if not rows:
+            break
+
+        updates = []
+        for (message_id, client_id, date_value, subject, body_text,
+             notes, fingerprint, score_effect) in rows:
+            if fingerprint is None:
+                if body_text is None:
+                    body_text = html_to_text(notes or "")
+                fingerprint = message_fingerprint(client_id, date_value, subject, body_text)
+            if fingerprint in seen:
+                duplicates.append((message_id,))
+                if score_effect:
+                    score_deltas[client_id] = score_deltas.get(client_id, 0) - score_effect
+            else:
+                seen.add(fingerprint)
+                updates.append((fingerprint, message_id))
+        cur.executemany("UPDATE messages SET fingerprint = ? WHERE id = ?", updates)
+        last_id = rows[-1][0]
+
+    if duplicates:
+        cur.executemany("DELETE FROM messages WHERE id = ?", duplicates)
+    if score_deltas and _table_exists(cur, "clients"):
+        for client_id, delta in score_deltas.items():
+            cur.execute("SELECT seriousness_score FROM clients WHERE id = ?", (client_id,))
+            row = cur.fetchone()
+            if row is None:
+                continue
+            new_score = (row[0] or 0) + delta
+            cur.execute(
+                "UPDATE clients SET seriousness_score = ?, classification = ? WHERE id = ?",
+                (new_score, classify_client(new_score), client_id)
+            )
+
+    cur.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_messages_fingerprint ON messages(fingerprint)"
+    )
+    cur.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_messages_internet_message_id
+        ON messages(client_id, internet_message_id)
+        WHERE internet_message_id IS NOT NULL
+    """)
+
+
+# =========================
+# 8) Last contact / next follow-up on clients
+# =========================
+def _next_followup_sql(row: str) -> str:
+    """
+    تاريخ المتابعة التالية = آخر تواصل + أيام المتابعة حسب الحالة (أو التصنيف)
+    العميل بدون أي رسالة = '' (أقدم من أي تاريخ فيحتاج متابعة دائماً)
+    """
+    days = followup_days_sql(f"COALESCE(NULLIF({row}.status, ''), {row}.classification)")
+    return f"COALESCE(date({row}.last_contact_at, '+' || {days} || ' days'), '')"
+
+
+def ensure_followup_columns(cur):
+    """clients.last_contact_at / next_followup_at + triggers تحدّثهما عند إضافة الرسائل"""
+    if not _table_exists(cur, "clients") or not _table_exists(cur, "messages"):
+        return
+    existing = _table_columns(cur, "clients")
+    for col in ("last_contact_at", "next_followup_at"):
+        if col not in existing:
+            cur.execute(f"ALTER TABLE clients ADD COLUMN {col} TEXT")
+
+    recompute = """
+                UPDATE clients
+                SET last_contact_at = (
+                    SELECT MAX(message_date_iso) FROM messages WHERE client_id = clients.id
+                )"""
+
+    # رسالة جديدة أو تاريخ أحدث لنفس العميل: مقارنة واحدة بدون MAX
+    def forward_sql(value: str) -> str:
+        return f"""
+                UPDATE clients SET last_contact_at = {value}
+                WHERE id = NEW.client_id
+                  AND (last_contact_at IS NULL OR last_contact_at < {value});"""
+
+    forward = forward_sql("NEW.message_date_iso")
+    # عند الإدخال message_date_iso لم يُملأ بعد (trigger الترحيل 1 يملؤه لاحقاً)
+    # فيُحسب التاريخ هنا من message_date مباشرة
+    inserted_iso = iso_date_sql("NEW.message_date")
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_messages_last_contact_insert
+        AFTER INSERT ON messages
+        WHEN {inserted_iso} IS NOT NULL
+        BEGIN{forward_sql(inserted_iso)}
+        END
+    """)
+    moved_forward = """NEW.client_id IS OLD.client_id AND NEW.message_date_iso IS NOT NULL
+             AND (OLD.message_date_iso IS NULL OR NEW.message_date_iso >= OLD.message_date_iso)"""
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_messages_last_contact_update
+        AFTER UPDATE OF message_date_iso, client_id ON messages
+        WHEN {moved_forward}
+        BEGIN{forward}
+        END
+    """)
+    # تاريخ أقدم أو نقل الرسالة لعميل آخر: إعادة حساب MAX للعميلين
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_messages_last_contact_recompute
+        AFTER UPDATE OF message_date_iso, client_id ON messages
+        WHEN NOT ({moved_forward})
+        BEGIN{recompute}
+                WHERE id IN (OLD.client_id, NEW.client_id);
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_messages_last_contact_delete
+        AFTER DELETE ON messages
+        WHEN OLD.message_date_iso IS NOT NULL
+        BEGIN{recompute}
+                WHERE id = OLD.client_id AND last_contact_at = OLD.message_date_iso;
+        END
+    """)
+
+    for name, event in (("insert", "INSERT"),
+                        ("update", "UPDATE OF last_contact_at, status, classification")):
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_clients_next_followup_{name}
+            AFTER {event} ON clients
+            BEGIN
+                UPDATE clients SET next_followup_at = {_next_followup_sql("NEW")}
+                WHERE id = NEW.id;
+            END
+        """)
+
+    # ملء القيم الحالية (الـ trigger يحسب next_followup_at)
+    cur.execute(recompute)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_clients_next_followup ON clients(next_followup_at)")
+
+
+# =========================
+# 9) وقت التذكير في reminder_date_iso
+# =========================
+def ensure_reminder_datetimes(cur):
+    """
+    قواعد البيانات المرحّلة قبل ISO_DATETIME_COLUMNS تحمل triggers تحفظ التاريخ فقط؛
+    إعادة إنشائها ثم إعادة حساب reminder_date_iso للصفوف الحالية
+    """
+    if not _table_exists(cur, "tasks"):
+        return
+    cur.execute("DROP TRIGGER IF EXISTS trg_tasks_iso_dates_insert")
+    cur.execute("DROP TRIGGER IF EXISTS trg_tasks_iso_dates_update")
+    ensure_iso_date_columns(cur)
+    cur.execute(f"UPDATE tasks SET reminder_date_iso = {iso_datetime_sql('reminder_date')}")
+
+
+# =========================
+# Registry
+# =========================
+# (version, description, function(cur))
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, "ISO-8601 shadow date columns with triggers and indexes", ensure_iso_date_columns),
+    (2, "Graph delta links on outlook_accounts", ensure_delta_link_columns),
+    (3, "IMAP UID/UIDVALIDITY sync state", ensure_imap_sync_state_table),
+    (4, "Persisted message analysis features", ensure_message_analysis_columns),
+    (5, "Unique message fingerprints and Internet-Message-ID (one-time duplicate removal)", ensure_message_fingerprints),
+    (6, "FTS5 full-text indexes with sync triggers", ensure_fulltext_indexes),
+    (7, "Trigger-maintained dashboard summary counters", ensure_summary_counts),
+    (8, "Denormalized last contact and next follow-up dates on clients", ensure_followup_columns),
+    (9, "Reminder time kept in tasks.reminder_date_iso", ensure_reminder_datetimes),
+]
+
+
+def get_schema_version() -> int:
+    conn = get_connection()
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def run_migrations() -> int:
+    """
+    تنفيذ جميع الترحيلات غير المنفذة بالترتيب.
+    كل ترحيل في معاملة مستقلة؛ عند الفشل يتوقف التنفيذ ويبقى الإصدار كما هو.
+
+    Returns:
+        رقم إصدار المخطط بعد التنفيذ
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        current = cur.execute("PRAGMA user_version").fetchone()[0]
+        for version, description, migrate in MIGRATIONS:
+            if version <= current:
+                continue
+            try:
+                migrate(cur)
+                cur.execute(f"PRAGMA user_version = {int(version)}")
+                conn.commit()
+                current = version
+            except sqlite3.Error as e:
+                conn.rollback()
+                print(f"Migration {version} ({description}) failed: {e}")
+                break
+        return current
+    finally:
+        conn.close()
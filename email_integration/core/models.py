@@ -48,16 +48,31 @@ def suggested_status(message_type: str) -> str:
 
 
 # ===== Follow-up Logic =====
+# أيام الانتظار قبل المتابعة حسب الحالة (أو التصنيف إن لم تكن هناك حالة)
+# ملاحظة: القواعد مضمنة أيضاً في triggers عمود clients.next_followup_at
+# (followup_days_sql) - تغييرها يحتاج ترحيلاً يعيد إنشاء الـ triggers
+FOLLOWUP_RULES = {
+    "New": 7,
+    "No Reply": 7,
+    "Requested Price": 3,
+    "Samples Requested": 10,
+    "Replied": 5,
+    "🔥 Serious Buyer": 3
+}
+DEFAULT_FOLLOWUP_DAYS = 7
+
+
 def followup_days(status: str) -> int:
     """
     Returns suggested follow-up days based on status
     """
-    rules = {
-        "New": 7,
-        "No Reply": 7,
-        "Requested Price": 3,
-        "Samples Requested": 10,
-        "Replied": 5,
-        "🔥 Serious Buyer": 3
-    }
-    return rules.get(status, 7)
+    return FOLLOWUP_RULES.get(status, DEFAULT_FOLLOWUP_DAYS)
+
+
+def followup_days_sql(status_expr: str) -> str:
+    """نفس followup_days كتعبير CASE في SQL"""
+    cases = " ".join(
+        "WHEN '{}' THEN {}".format(status.replace("'", "''"), days)
+        for status, days in FOLLOWUP_RULES.items()
+    )
+    return f"(CASE {status_expr} {cases} ELSE {DEFAULT_FOLLOWUP_DAYS} END)"
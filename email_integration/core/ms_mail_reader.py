@@ -1,7 +1,25 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import quote, urlencode
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from .logging_system import log_warning
 
 GRAPH_BASE = "https://graph.microsoft.com/v1.0"
 
+# Outlook في Graph يسمح بـ 4 طلبات متزامنة فقط لكل صندوق بريد
+MAX_CONCURRENT_REQUESTS = 4
+MAX_RETRIES = 5
+_RETRY_STATUSES = (429, 503, 504)
+
+_session = None
+_session_lock = threading.Lock()
+_throttle_lock = threading.Lock()
+_throttled_until = 0.0
+
 
 def _headers(token):
     return {
@@ -10,13 +28,76 @@ def _headers(token):
     }
 
 
+def get_session():
+    """جلسة HTTP واحدة مشتركة (keep-alive) لكل طلبات Graph من كل الخيوط"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=MAX_CONCURRENT_REQUESTS,
+                pool_maxsize=MAX_CONCURRENT_REQUESTS * 2
+            )
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def _retry_after_seconds(response, attempt):
+    try:
+        return max(float(response.headers.get("Retry-After")), 0.0)
+    except (TypeError, ValueError):
+        return min(2 ** attempt, 60)
+
+
+def _graph_request(method, token, url, timeout=30, json_body=None, extra_headers=None):
+    """
+    طلب على Graph مع احترام التقييد (429 / 503 + Retry-After)
+
+    عند وصول 429 يتوقف كل الخيوط حتى انتهاء مدة Retry-After
+    لأن التقييد في Graph يكون على مستوى صندوق البريد وليس الطلب.
+    """
+    session = get_session()
+    headers = _headers(token)
+    if extra_headers:
+        headers.update(extra_headers)
+
+    for attempt in range(MAX_RETRIES + 1):
+        delay = _throttled_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+        r = session.request(method, url, headers=headers,
+                            json=json_body, timeout=timeout)
+        if r.status_code not in _RETRY_STATUSES or attempt == MAX_RETRIES:
+            r.raise_for_status()
+            return r
+
+        _throttle(_retry_after_seconds(r, attempt))
+
+
+def _throttle(seconds):
+    global _throttled_until
+    with _throttle_lock:
+        _throttled_until = max(_throttled_until, time.monotonic() + seconds)
+
+
+def graph_get(token, url, timeout=30, extra_headers=None):
+    """GET على Graph مع احترام 429/Retry-After"""
+    return _graph_request("GET", token, url, timeout=timeout, extra_headers=extra_headers)
+
+
+def graph_post(token, url, json_body, timeout=60):
+    """POST على Graph (مثل $batch) مع احترام 429/Retry-After"""
+    return _graph_request("POST", token, url, timeout=timeout, json_body=json_body)
+
+
 def _get_child_folders(token, parent_id):
     url = f"{GRAPH_BASE}/me/mailFolders/{parent_id}/childFolders"
     folders = []
 
     while url:
-        r = requests.get(url, headers=_headers(token), timeout=30)
-        r.raise_for_status()
+        r = graph_get(token, url)
         data = r.json()
         folders.extend(data.get("value", []))
         url = data.get("@odata.nextLink")
@@ -48,7 +129,126 @@ def get_folder_id(token, folder_name):
     return folder_id
 
 
-def read_messages_from_folder(token, folder_name="EFM_Clients", top=None, max_messages=None, sender_email=None):
+# الحقول المطلوبة فقط من كل رسالة ($select) - المحتوى الكامل يُطلب عند الحاجة
+MESSAGE_FIELDS = (
+    "id", "internetMessageId", "subject", "from", "toRecipients",
+    "receivedDateTime", "sentDateTime", "bodyPreview",
+)
+# الحد الأقصى للطلبات داخل طلب $batch واحد
+GRAPH_BATCH_LIMIT = 20
+
+
+def _iso_utc(value):
+    """datetime أو نص ISO -> صيغة Graph (YYYY-MM-DDTHH:MM:SSZ)"""
+    if hasattr(value, "strftime"):
+        return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+    return str(value)
+
+
+def build_messages_url(folder_id=None, page_size=100, sender_email=None,
+                       since=None, include_body=True):
+    """
+    بناء رابط قراءة الرسائل مع دفع الفلاتر إلى Graph
+
+    - sender_email: $search="participants:..." (المرسل أو المستلمين) على كل المجلدات
+      إذا كان folder_id = None
+    - since: receivedDateTime ge ... (أو received>= داخل $search)
+    - $select: الحقول المطلوبة فقط (body فقط إذا include_body)
+    """
+    fields = MESSAGE_FIELDS + (("body",) if include_body else ())
+    params = [
+        ("$top", str(page_size)),
+        ("$select", ",".join(fields)),
+    ]
+
+    if sender_email:
+        # $search لا يقبل $orderby أو $filter معه - النتائج مرتبة بالأحدث افتراضياً
+        query = f"participants:{sender_email.strip()}"
+        if since:
+            query += f" AND received>={_iso_utc(since)[:10]}"
+        params.append(("$search", f'"{query}"'))
+    else:
+        params.append(("$orderby", "receivedDateTime desc"))
+        if since:
+            params.append(("$filter", f"receivedDateTime ge {_iso_utc(since)}"))
+
+    if folder_id:
+        base = f"{GRAPH_BASE}/me/mailFolders/{folder_id}/messages"
+    else:
+        base = f"{GRAPH_BASE}/me/messages"
+    return f"{base}?{urlencode(params, quote_via=quote, safe='$,')}"
+
+
+def fetch_message_bodies(token, messages):
+    """
+    المرور الثاني: تحميل المحتوى الكامل (body) لرسائل محددة فقط
+    عبر JSON batching (حتى 20 رسالة في طلب واحد). يعدّل القواميس مباشرة.
+
+    ما يفشل في $batch يُعاد طلبه منفرداً؛ وما يفشل بعدها يبقى بدون body
+    ويُعلَّم bodyIncomplete=True (لا يُحلل bodyPreview كأنه المحتوى الكامل).
+    """
+    pending = [m for m in messages if m.get("id")]
+
+    for attempt in range(MAX_RETRIES + 1):
+        if not pending:
+            break
+        retry = []
+        retry_after = 0.0
+
+        for i in range(0, len(pending), GRAPH_BATCH_LIMIT):
+            chunk = pending[i:i + GRAPH_BATCH_LIMIT]
+            payload = {"requests": [
+                {"id": str(n), "method": "GET",
+                 "url": f"/me/messages/{m['id']}?$select=body"}
+                for n, m in enumerate(chunk)
+            ]}
+            try:
+                r = graph_post(token, f"{GRAPH_BASE}/$batch", payload)
+                responses = r.json().get("responses", [])
+            except Exception as e:
+                log_warning(f"Batch body request failed: {str(e)}", "Graph $batch")
+                continue
+
+            for resp in responses:
+                msg = chunk[int(resp.get("id", 0))]
+                status = resp.get("status")
+                if status == 200:
+                    msg["body"] = (resp.get("body") or {}).get("body", {})
+                elif status in _RETRY_STATUSES:
+                    retry.append(msg)
+                    retry_after = max(
+                        retry_after,
+                        _retry_after_seconds(_BatchItem(resp), attempt)
+                    )
+
+        pending = retry
+        if pending and attempt < MAX_RETRIES:
+            _throttle(retry_after)
+            time.sleep(retry_after)
+
+    # فشل الطلب المجمع أو رد غير 200: طلب منفرد لكل رسالة (graph_get يعيد المحاولة عند 429)
+    for msg in messages:
+        if not msg.get("id") or "body" in msg:
+            continue
+        try:
+            r = graph_get(token, f"{GRAPH_BASE}/me/messages/{msg['id']}?$select=body")
+            msg["body"] = r.json().get("body", {})
+        except Exception as e:
+            msg["bodyIncomplete"] = True
+            log_warning(f"Body fetch failed for message {msg['id']}: {str(e)}", "Graph $batch")
+
+    return messages
+
+
+class _BatchItem:
+    """غلاف بسيط حتى يعمل _retry_after_seconds مع ردود $batch"""
+
+    def __init__(self, resp):
+        self.headers = resp.get("headers") or {}
+
+
+def read_messages_from_folder(token, folder_name="EFM_Clients", top=None, max_messages=None,
+                              sender_email=None, since=None, body_filter=None):
     """
     قراءة الرسائل من مجلد معين (يدعم pagination لقراءة جميع الرسائل)
     
@@ -58,15 +258,20 @@ def read_messages_from_folder(token, folder_name="EFM_Clients", top=None, max_me
         top: عدد الرسائل في كل صفحة (افتراضي: 100 - قيمة آمنة لتجنب مشاكل JSON)
         max_messages: الحد الأقصى لعدد الرسائل (None = جميع الرسائل)
         sender_email: تصفية الرسائل حسب بريد المرسل (اختياري)
+        since: قراءة الرسائل المستلمة بعد هذا التاريخ فقط (datetime أو ISO)
+        body_filter: دالة (msg) -> bool تعمل على subject + bodyPreview؛ إذا أُعطيت
+                     يُحمَّل المحتوى الكامل فقط للرسائل التي تجتازها، والباقي
+                     يحمل bodyPreview في body
     
     Returns:
         List of messages
     """
     # إذا كان المطلوب صندوق الوارد، استخدم مسار خاص
-    # - في حالة وجود sender_email نقرأ من /me/messages (كل المجلدات)
+    # - في حالة وجود sender_email نبحث في /me/messages (كل المجلدات)
     # - غير ذلك نستخدم مجلد Inbox فقط
     use_global_messages = sender_email is not None and folder_name.lower() == "inbox"
 
+    folder_id = None
     if not use_global_messages:
         if folder_name.lower() == "inbox":
             folder_id = "inbox"
@@ -78,25 +283,15 @@ def read_messages_from_folder(token, folder_name="EFM_Clients", top=None, max_me
     
     all_messages = []
     
-    # بناء URL بدون فلتر (سنقوم بالتصفية محلياً)
-    # السبب: Microsoft Graph API قد لا يدعم الفلاتر المعقدة بشكل موثوق
-    query_params = [f"$top={page_size}", "$orderby=receivedDateTime desc"]
-    
-    # إذا كان هناك sender_email، نقرأ عدد أكبر من الرسائل للتصفية المحلية
-    if sender_email:
-        # زيادة عدد الرسائل للقراءة لتغطية احتمالية وجود رسائل في مجلدات مختلفة
-        page_size = min(page_size * 2, 200)  # حتى 200 رسالة للبحث
-        query_params[0] = f"$top={page_size}"
-    
-    if use_global_messages:
-        # البحث في جميع الرسائل داخل الحساب (كل المجلدات)
-        url = f"{GRAPH_BASE}/me/messages?{'&'.join(query_params)}"
-    else:
-        # البحث داخل مجلد محدد فقط
-        url = (
-            f"{GRAPH_BASE}/me/mailFolders/{folder_id}/messages"
-            f"?{'&'.join(query_params)}"
-        )
+    # الفلترة حسب المرسل والتاريخ تتم في Graph ($search / $filter)
+    # والحقول محددة بـ $select (بدون body إذا كان هناك مرور ثانٍ)
+    url = build_messages_url(
+        folder_id=folder_id,
+        page_size=page_size,
+        sender_email=sender_email,
+        since=since,
+        include_body=body_filter is None
+    )
 
     # قراءة جميع الرسائل باستخدام pagination
     page_count = 0
@@ -105,8 +300,7 @@ def read_messages_from_folder(token, folder_name="EFM_Clients", top=None, max_me
     while url and page_count < max_pages:
         try:
             # timeout أقوى (30 ثانية) لتجنب التعليق
-            r = requests.get(url, headers=_headers(token), timeout=30)
-            r.raise_for_status()
+            r = graph_get(token, url)
             
             # استخدام response.text بدلاً من response.json() مباشرة لتجنب مشاكل JSON
             try:
@@ -129,7 +323,7 @@ def read_messages_from_folder(token, folder_name="EFM_Clients", top=None, max_me
             if not messages:
                 break
             
-            # إذا كان هناك sender_email، نقوم بالتصفية محلياً
+            # participants في $search تشمل CC أيضاً: نُبقي فقط المرسل أو المستلمين
             if sender_email:
                 sender_email_lower = sender_email.lower().strip()
                 filtered_messages = []
@@ -169,9 +363,118 @@ def read_messages_from_folder(token, folder_name="EFM_Clients", top=None, max_me
             print(f"DEBUG: Unexpected error on page {page_count + 1}: {str(e)}")
             break
     
+    # المرور الثاني: المحتوى الكامل فقط للرسائل التي تجتاز الفلتر
+    if body_filter is not None:
+        _load_filtered_bodies(token, all_messages, body_filter)
+
     return all_messages
 
 
+def _load_filtered_bodies(token, messages, body_filter):
+    """
+    تحميل body للرسائل التي لا تحتويه وتجتاز body_filter،
+    والباقي يحمل bodyPreview في body (نفس الشكل الذي تتوقعه المعالجة).
+    الرسائل المطلوبة التي تعذّر تحميلها تُعلَّم bodyIncomplete=True بدون body
+    """
+    wanted = []
+    for msg in messages:
+        if "body" in msg:
+            continue
+        if body_filter(msg):
+            wanted.append(msg)
+        else:
+            msg["body"] = {"contentType": "text", "content": msg.get("bodyPreview", "")}
+    if not wanted:
+        return
+    try:
+        fetch_message_bodies(token, wanted)
+    except Exception as e:
+        log_warning(f"Body fetch error: {str(e)}", "Graph $batch")
+    for msg in wanted:
+        if "body" not in msg:
+            msg["bodyIncomplete"] = True
+
+
+# =========================
+# Delta sync
+# =========================
+# أول مزامنة delta (بدون رابط محفوظ) تبدأ من آخر N يوم فقط
+INITIAL_DELTA_DAYS = 30
+
+
+def build_delta_url(folder_id="inbox", since=None, include_body=True):
+    """
+    رابط الجولة الأولى من messages/delta
+
+    $select و $filter يُحفظان داخل deltaLink الناتج فلا حاجة لإعادتهما لاحقاً.
+    delta لا يقبل إلا receivedDateTime ge في $filter.
+    """
+    if since is None:
+        since = datetime.utcnow() - timedelta(days=INITIAL_DELTA_DAYS)
+    fields = MESSAGE_FIELDS + (("body",) if include_body else ())
+    params = [
+        ("$select", ",".join(fields)),
+        ("$filter", f"receivedDateTime ge {_iso_utc(since)}"),
+    ]
+    base = f"{GRAPH_BASE}/me/mailFolders/{folder_id}/messages/delta"
+    return f"{base}?{urlencode(params, quote_via=quote, safe='$,')}"
+
+
+def read_messages_delta(token, delta_link=None, folder_id="inbox", since=None,
+                        page_size=100, body_filter=None):
+    """
+    قراءة التغييرات فقط منذ آخر مزامنة (Graph messages/delta)
+
+    Args:
+        token: رمز الوصول
+        delta_link: رابط @odata.deltaLink المحفوظ من المزامنة السابقة
+                    (None = جولة أولية من since أو آخر INITIAL_DELTA_DAYS يوم)
+        folder_id: المجلد (افتراضي: inbox)
+        since: بداية الجولة الأولية فقط (datetime أو ISO)
+        page_size: عدد الرسائل في كل صفحة (Prefer: odata.maxpagesize)
+        body_filter: نفس معنى read_messages_from_folder (مرور ثانٍ للمحتوى)
+
+    Returns:
+        (messages, new_delta_link) - الرسائل المحذوفة (@removed) لا تُعاد.
+        يجب حفظ new_delta_link فقط بعد نجاح معالجة الرسائل.
+        إذا تعذّر تحميل محتوى بعض الرسائل (bodyIncomplete) يُعاد delta_link السابق
+        حتى تُقرأ مرة أخرى في المزامنة التالية (المحفوظ منها يُتجاهل كمكرر).
+    """
+    url = delta_link or build_delta_url(folder_id, since, include_body=body_filter is None)
+    prefer = {"Prefer": f"odata.maxpagesize={page_size}"}
+
+    messages = []
+    new_delta_link = None
+    while url:
+        try:
+            r = graph_get(token, url, extra_headers=prefer)
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            if delta_link and status == 410:
+                # الرابط منتهي (syncStateNotFound) - جولة أولية جديدة
+                return read_messages_delta(token, None, folder_id, since, page_size, body_filter)
+            raise
+
+        data = r.json()
+        for item in data.get("value", []):
+            if "@removed" not in item:
+                messages.append(item)
+        url = data.get("@odata.nextLink")
+        new_delta_link = data.get("@odata.deltaLink") or new_delta_link
+
+    if body_filter is not None:
+        _load_filtered_bodies(token, messages, body_filter)
+        incomplete = sum(1 for msg in messages if msg.get("bodyIncomplete"))
+        if incomplete:
+            log_warning(
+                f"{incomplete} message bodies could not be loaded; keeping the previous delta link",
+                "Graph $batch"
+            )
+            new_delta_link = delta_link
+
+    return messages, new_delta_link
+
+
 def read_new_messages_from_inbox(token, since_datetime=None, top=50):
     """
     قراءة الرسائل الجديدة من صندوق الوارد
@@ -187,13 +490,13 @@ def read_new_messages_from_inbox(token, since_datetime=None, top=50):
     url = f"{GRAPH_BASE}/me/mailFolders/inbox/messages"
     
     # بناء الاستعلام
-    query_params = [f"$top={top}", "$orderby=receivedDateTime desc"]
+    query_params = [f"$top={top}", "$orderby=receivedDateTime desc",
+                    "$select=" + ",".join(MESSAGE_FIELDS + ("body",))]
     
     if since_datetime:
         query_params.append(f"$filter=receivedDateTime ge {since_datetime}")
     
     url += "?" + "&".join(query_params)
     
-    r = requests.get(url, headers=_headers(token), timeout=30)
-    r.raise_for_status()
+    r = graph_get(token, url)
     return r.json().get("value", [])
@@ -142,9 +142,16 @@ class NotificationManager(QObject):
             pass  # إذا فشل الإشعار، لا نوقف العملية
     
     def check_and_show_notifications(self):
-        """التحقق من الإشعارات وعرضها"""
+        """التحقق من الإشعارات وعرضها (متزامن - الواجهة تستخدم JobScheduler)"""
+        self.show_notifications(self.collect_notifications())
+    
+    def collect_notifications(self) -> List[tuple]:
+        """
+        فحص قاعدة البيانات وإرجاع [(title, message), ...]
+        لا تلمس الواجهة فيمكن تشغيلها في خيط خلفي
+        """
         if not self.is_enabled():
-            return
+            return []
         
         notifications = []
         
@@ -168,8 +175,11 @@ class NotificationManager(QObject):
             deal_notifications = self.get_deals_closing_notifications()
             notifications.extend(deal_notifications)
         
-        # عرض الإشعارات
-        for title, message in notifications:
+        return notifications
+    
+    def show_notifications(self, notifications: List[tuple]):
+        """عرض الإشعارات (في خيط الواجهة)"""
+        for title, message in notifications or []:
             self.show_notification(title, message)
     
     def get_followup_notifications(self) -> List[tuple]:
@@ -203,19 +213,10 @@ class NotificationManager(QObject):
         notifications = []
         
         try:
-            from core.db import get_connection
+            from core.summary import get_summary_counts
             
-            conn = get_connection()
-            cur = conn.cursor()
-            
-            # الحصول على الطلبات المعلقة
-            cur.execute("""
-                SELECT COUNT(*) 
-                FROM requests 
-                WHERE reply_status = 'pending' AND status = 'open'
-            """)
-            count = cur.fetchone()[0]
-            conn.close()
+            # الطلبات المعلقة (عدّاد محدث بالـ triggers)
+            count = get_summary_counts().get('requests.pending_open', 0)
             
             if count > 0:
                 if count == 1:
@@ -236,23 +237,28 @@ class NotificationManager(QObject):
         notifications = []
         
         try:
-            from core.tasks import get_tasks_due_today, get_overdue_tasks
+            from core.db import get_connection
+            from core.dates import iso_today
+            from core.summary import sum_daily_counts
             
-            # المهام المتأخرة
-            overdue_tasks = get_overdue_tasks()
+            conn = get_connection()
+            cur = conn.cursor()
+            today = iso_today()
             
-            # المهام المستحقة اليوم
-            due_today_tasks = get_tasks_due_today()
+            # المهام المتأخرة (قبل اليوم) والمستحقة اليوم من العدّادات اليومية
+            overdue_count = sum_daily_counts(cur, 'tasks.pending_due', end=today)
+            due_today_count = sum_daily_counts(cur, 'tasks.pending_due', start=today, end=iso_today(1))
+            conn.close()
             
-            if overdue_tasks:
-                count = len(overdue_tasks)
+            if overdue_count:
+                count = overdue_count
                 title = "🚨 مهام متأخرة"
                 message = f"{count} مهام متأخرة تحتاج متابعة"
                 notifications.append((title, message))
             
-            if due_today_tasks:
-                count = len(due_today_tasks)
-                if not overdue_tasks:  # إذا لم تكن هناك مهام متأخرة، نعرض المهام المستحقة اليوم
+            if due_today_count:
+                count = due_today_count
+                if not overdue_count:  # إذا لم تكن هناك مهام متأخرة، نعرض المهام المستحقة اليوم
                     title = "📝 مهام مستحقة اليوم"
                     message = f"{count} مهام مستحقة اليوم"
                     notifications.append((title, message))
@@ -120,7 +120,7 @@ def export_client_report_to_pdf(client_id: int, file_path: str) -> bool:
             SELECT message_date, message_type, channel, client_response, score_effect
             FROM messages
             WHERE client_id = ?
-            ORDER BY message_date DESC
+            ORDER BY message_date_iso DESC
             LIMIT 50
         """, (client_id,))
         messages = cur.fetchall()
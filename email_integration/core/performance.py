@@ -84,6 +84,22 @@ def create_performance_indexes():
             ON requests(created_at)
         """)
         
+        # فهارس مركبة لفلاتر قائمة العملاء (EXISTS في build_client_filter_query)
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_clients_focus_score
+            ON clients(is_focus, seriousness_score)
+        """)
+
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_requests_client_status_type
+            ON requests(client_id, status, request_type)
+        """)
+
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_requests_client_reply_status
+            ON requests(client_id, reply_status)
+        """)
+
         # فهارس على جدول sales_deals
         try:
             cur.execute("""
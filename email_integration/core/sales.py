@@ -362,12 +362,11 @@ def get_sales_revenue_forecast(months: int = 12) -> Dict:
     # الصفقات المكتملة (Closed Won) حسب الشهر
     cur.execute("""
         SELECT 
-            SUBSTR(actual_close_date, 7, 4) || '-' || 
-            SUBSTR(actual_close_date, 4, 2) AS month,
+            SUBSTR(actual_close_date_iso, 1, 7) AS month,
             SUM(value) AS total
         FROM sales_deals
         WHERE status = 'active' AND stage = 'Closed Won' 
-          AND actual_close_date IS NOT NULL
+          AND actual_close_date_iso IS NOT NULL
         GROUP BY month
         ORDER BY month DESC
         LIMIT ?
@@ -381,15 +380,14 @@ def get_sales_revenue_forecast(months: int = 12) -> Dict:
     # الصفقات المتوقعة حسب expected_close_date
     cur.execute("""
         SELECT 
-            SUBSTR(expected_close_date, 7, 4) || '-' || 
-            SUBSTR(expected_close_date, 4, 2) AS month,
+            SUBSTR(expected_close_date_iso, 1, 7) AS month,
             SUM(value) AS total,
             SUM(value * probability) AS weighted
         FROM sales_deals
         WHERE status = 'active' 
           AND stage != 'Closed Won' 
           AND stage != 'Closed Lost'
-          AND expected_close_date IS NOT NULL
+          AND expected_close_date_iso IS NOT NULL
         GROUP BY month
         ORDER BY month DESC
         LIMIT ?
@@ -430,9 +428,9 @@ def get_sales_reports(period: str = "monthly") -> Dict:
     }
     
     if period == "monthly":
-        date_format = "SUBSTR(actual_close_date, 7, 4) || '-' || SUBSTR(actual_close_date, 4, 2)"
+        date_format = "SUBSTR(actual_close_date_iso, 1, 7)"
     else:  # yearly
-        date_format = "SUBSTR(actual_close_date, 7, 4)"
+        date_format = "SUBSTR(actual_close_date_iso, 1, 4)"
     
     # الصفقات المكتملة
     cur.execute(f"""
@@ -442,7 +440,7 @@ def get_sales_reports(period: str = "monthly") -> Dict:
             SUM(value) AS revenue
         FROM sales_deals
         WHERE stage = 'Closed Won' 
-          AND actual_close_date IS NOT NULL
+          AND actual_close_date_iso IS NOT NULL
           AND status = 'active'
         GROUP BY period
         ORDER BY period DESC
@@ -466,7 +464,7 @@ def get_sales_reports(period: str = "monthly") -> Dict:
             COUNT(*) AS count
         FROM sales_deals
         WHERE stage = 'Closed Lost'
-          AND actual_close_date IS NOT NULL
+          AND actual_close_date_iso IS NOT NULL
           AND status = 'active'
         GROUP BY period
         ORDER BY period DESC
@@ -1,12 +1,19 @@
 """
 نظام عوامل التقييم القابلة للتخصيص
 Customizable Scoring Factors System
+
+الإعدادات تُقرأ من الملف مرة واحدة وتُخزن في الذاكرة (CachedJsonFile)؛
+get_score_effect / classify_client_custom / is_ai_enabled ... تُستدعى لكل
+رسالة فتقرأ النسخة المخزنة بدون فتح الملف.
 """
+import copy
 import json
 import os
 from typing import Dict, List
 from datetime import datetime
 
+from .config_cache import CachedJsonFile
+
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 CONFIG_PATH = os.path.join(BASE_DIR, "database", "scoring_config.json")
 
@@ -33,33 +40,37 @@ DEFAULT_CLASSIFICATION_THRESHOLDS = {
 }
 
 
+def _build_scoring_config(config) -> Dict:
+    """محتوى الملف (أو None) -> إعدادات كاملة بكل المفاتيح المطلوبة"""
+    if not isinstance(config, dict):
+        # إنشاء إعدادات افتراضية
+        return {
+            "score_rules": copy.deepcopy(DEFAULT_SCORE_RULES),
+            "classification_thresholds": copy.deepcopy(DEFAULT_CLASSIFICATION_THRESHOLDS),
+            "ai_enabled": True,
+            "trend_analysis_enabled": True,
+            "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+
+    # تأكد من وجود جميع المفاتيح المطلوبة
+    config.setdefault("score_rules", copy.deepcopy(DEFAULT_SCORE_RULES))
+    config.setdefault("classification_thresholds", copy.deepcopy(DEFAULT_CLASSIFICATION_THRESHOLDS))
+    config.setdefault("ai_enabled", True)
+    config.setdefault("trend_analysis_enabled", True)
+    return config
+
+
+_config_cache = CachedJsonFile(CONFIG_PATH, _build_scoring_config)
+
+
+def _cached_config() -> Dict:
+    """الإعدادات المخزنة - للقراءة فقط"""
+    return _config_cache.get()
+
+
 def load_scoring_config() -> Dict:
-    """تحميل إعدادات التقييم من الملف"""
-    if os.path.exists(CONFIG_PATH):
-        try:
-            with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                # تأكد من وجود جميع المفاتيح المطلوبة
-                if "score_rules" not in config:
-                    config["score_rules"] = DEFAULT_SCORE_RULES
-                if "classification_thresholds" not in config:
-                    config["classification_thresholds"] = DEFAULT_CLASSIFICATION_THRESHOLDS
-                if "ai_enabled" not in config:
-                    config["ai_enabled"] = True
-                if "trend_analysis_enabled" not in config:
-                    config["trend_analysis_enabled"] = True
-                return config
-        except Exception:
-            pass
-    
-    # إنشاء إعدادات افتراضية
-    return {
-        "score_rules": DEFAULT_SCORE_RULES.copy(),
-        "classification_thresholds": DEFAULT_CLASSIFICATION_THRESHOLDS.copy(),
-        "ai_enabled": True,
-        "trend_analysis_enabled": True,
-        "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
+    """تحميل إعدادات التقييم (نسخة قابلة للتعديل ثم save_scoring_config)"""
+    return _config_cache.copy()
 
 
 def save_scoring_config(config: Dict):
@@ -68,12 +79,17 @@ def save_scoring_config(config: Dict):
     config["last_updated"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
         json.dump(config, f, ensure_ascii=False, indent=2)
+    _config_cache.store(config)
+
+
+def reload_scoring_config():
+    """إعادة قراءة الملف عند الطلب التالي (بعد تعديله يدوياً مثلاً)"""
+    _config_cache.invalidate()
 
 
 def get_score_effect(message_type: str) -> int:
     """حساب تأثير النقاط بناءً على نوع الرسالة مع مراعاة الإعدادات المخصصة"""
-    config = load_scoring_config()
-    rule = config["score_rules"].get(message_type)
+    rule = _cached_config()["score_rules"].get(message_type)
     
     if not rule or not rule.get("enabled", True):
         return 0
@@ -101,9 +117,8 @@ def update_score_rule(rule_name: str, score: int, enabled: bool = True, descript
 
 
 def get_classification_thresholds() -> Dict:
-    """الحصول على عتبات التصنيف"""
-    config = load_scoring_config()
-    return config.get("classification_thresholds", DEFAULT_CLASSIFICATION_THRESHOLDS)
+    """الحصول على عتبات التصنيف (للقراءة فقط)"""
+    return _cached_config().get("classification_thresholds", DEFAULT_CLASSIFICATION_THRESHOLDS)
 
 
 def classify_client_custom(score: int) -> tuple:
@@ -134,8 +149,7 @@ def classify_client_custom(score: int) -> tuple:
 
 def is_ai_enabled() -> bool:
     """فحص ما إذا كان التقييم بالذكاء الاصطناعي مفعّل"""
-    config = load_scoring_config()
-    return config.get("ai_enabled", True)
+    return bool(_cached_config().get("ai_enabled", True))
 
 
 def set_ai_enabled(enabled: bool):
@@ -147,8 +161,7 @@ def set_ai_enabled(enabled: bool):
 
 def is_trend_analysis_enabled() -> bool:
     """فحص ما إذا كان تتبع اتجاهات النقاط مفعّل"""
-    config = load_scoring_config()
-    return config.get("trend_analysis_enabled", True)
+    return bool(_cached_config().get("trend_analysis_enabled", True))
 
 
 def set_trend_analysis_enabled(enabled: bool):
@@ -1,11 +1,17 @@
 """
 إعدادات عامة للتطبيق
 General Application Settings
+
+الإعدادات المدمجة مع القيم الافتراضية تُخزن في الذاكرة (CachedJsonFile)
+فـ get_setting() مجرد بحث في قاموس؛ الملف يُقرأ من جديد فقط إذا تغير.
 """
+import copy
 import json
 import os
 from typing import Dict, Optional
 
+from .config_cache import CachedJsonFile
+
 SETTINGS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "database")
 SETTINGS_FILE = os.path.join(SETTINGS_DIR, "app_settings.json")
 
@@ -42,24 +48,28 @@ DEFAULT_SETTINGS = {
         "auto_backup": True,
         "backup_frequency": "daily",  # daily, weekly
         "backup_time": "02:00"
+    },
+    "performance": {
+        "profile_sync": False,  # cProfile لكل جولة مزامنة
+        "trace_memory": False   # tracemalloc لكل جولة مزامنة
     }
 }
 
 
+def _build_settings(user_settings) -> Dict:
+    """محتوى الملف (أو None) -> الإعدادات مدمجة مع القيم الافتراضية"""
+    settings = copy.deepcopy(DEFAULT_SETTINGS)
+    if isinstance(user_settings, dict):
+        _deep_update(settings, user_settings)
+    return settings
+
+
+_settings_cache = CachedJsonFile(SETTINGS_FILE, _build_settings)
+
+
 def load_settings() -> Dict:
-    """تحميل الإعدادات"""
-    if os.path.exists(SETTINGS_FILE):
-        try:
-            with open(SETTINGS_FILE, 'r', encoding='utf-8') as f:
-                user_settings = json.load(f)
-                # Merge with defaults
-                settings = DEFAULT_SETTINGS.copy()
-                _deep_update(settings, user_settings)
-                return settings
-        except Exception:
-            pass
-    
-    return DEFAULT_SETTINGS.copy()
+    """تحميل الإعدادات (نسخة قابلة للتعديل ثم save_settings)"""
+    return _settings_cache.copy()
 
 
 def save_settings(settings: Dict):
@@ -68,10 +78,16 @@ def save_settings(settings: Dict):
         os.makedirs(SETTINGS_DIR, exist_ok=True)
         with open(SETTINGS_FILE, 'w', encoding='utf-8') as f:
             json.dump(settings, f, indent=2, ensure_ascii=False)
+        _settings_cache.store(settings)
     except Exception as e:
         print(f"Error saving settings: {e}")
 
 
+def reload_settings():
+    """إعادة قراءة الملف عند الطلب التالي"""
+    _settings_cache.invalidate()
+
+
 def get_setting(path: str, default=None):
     """
     الحصول على إعداد محدد باستخدام مسار مثل 'dashboard.colors.total_clients'
@@ -83,19 +99,42 @@ def get_setting(path: str, default=None):
     Returns:
         قيمة الإعداد أو القيمة الافتراضية
     """
-    settings = load_settings()
-    keys = path.split('.')
-    value = settings
+    value = _settings_cache.get()
     
-    for key in keys:
+    for key in path.split('.'):
         if isinstance(value, dict) and key in value:
             value = value[key]
         else:
             return default
     
+    # القيم المركبة نسخة حتى لا يُعدَّل المخزن
+    if isinstance(value, (dict, list)):
+        return copy.deepcopy(value)
     return value
 
 
+def get_bool_setting(path: str, default: bool = False) -> bool:
+    """إعداد منطقي (True / False)"""
+    value = get_setting(path, default)
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def get_int_setting(path: str, default: int = 0) -> int:
+    """إعداد رقمي صحيح (القيمة الافتراضية إذا كانت القيمة غير صالحة)"""
+    try:
+        return int(get_setting(path, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def get_str_setting(path: str, default: str = "") -> str:
+    """إعداد نصي"""
+    value = get_setting(path, default)
+    return default if value is None else str(value)
+
+
 def set_setting(path: str, value):
     """
     تعيين إعداد محدد
@@ -131,4 +170,4 @@ def _deep_update(base_dict: Dict, update_dict: Dict):
 
 def reset_settings():
     """إعادة تعيين الإعدادات إلى القيم الافتراضية"""
-    save_settings(DEFAULT_SETTINGS.copy())
+    save_settings(copy.deepcopy(DEFAULT_SETTINGS))
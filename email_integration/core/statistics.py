@@ -6,246 +6,234 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Tuple
 from collections import defaultdict
 
-from .db import get_connection, get_all_clients
+from .db import get_connection
 
 
-def get_client_statistics() -> Dict:
+def _grouped_counts(cur, table: str, groups: List[Tuple]) -> Dict[str, List[Tuple]]:
+    """
+    عدة GROUP BY على نفس الجدول في استعلام واحد (UNION ALL)
+
+    Args:
+        groups: قائمة (key, expr, where, order_limit) حيث order_limit مثل
+                "ORDER BY value DESC LIMIT 12" أو "" 
+
+    Returns:
+        key -> [(value, count), ...]
+    """
+    parts = []
+    for key, expr, where, order_limit in groups:
+        where_sql = f"WHERE {where}" if where else ""
+        parts.append(f"""
+            SELECT * FROM (
+                SELECT '{key}' AS grp, {expr} AS value, COUNT(*) AS cnt
+                FROM {table} {where_sql}
+                GROUP BY value {order_limit}
+            )
+        """)
+    cur.execute(" UNION ALL ".join(parts))
+    result = {key: [] for key, _, _, _ in groups}
+    for grp, value, count in cur.fetchall():
+        result[grp].append((value, count))
+    return result
+
+
+def _with_cursor(compute):
+    """تشغيل compute(cur) باتصال جديد عند الاستدعاء المنفرد"""
+    conn = get_connection()
+    try:
+        return compute(conn.cursor())
+    finally:
+        conn.close()
+
+
+def get_client_statistics(cur=None) -> Dict:
     """
     الحصول على إحصائيات العملاء
     
     Returns:
         Dictionary containing various client statistics
     """
-    clients = get_all_clients()
+    if cur is None:
+        return _with_cursor(get_client_statistics)
+    
+    # التصنيف + Focus + نطاقات النقاط في مرور واحد
+    cur.execute("""
+        SELECT
+            COUNT(*),
+            SUM(CASE WHEN instr(COALESCE(classification, ''), '🔥') > 0 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN instr(COALESCE(classification, ''), '🔥') = 0
+                      AND instr(COALESCE(classification, ''), '👍') > 0 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN is_focus THEN 1 ELSE 0 END),
+            SUM(CASE WHEN COALESCE(seriousness_score, 0) <= 20 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN seriousness_score > 20 AND seriousness_score <= 40 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN seriousness_score > 40 AND seriousness_score <= 60 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN seriousness_score > 60 AND seriousness_score <= 80 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN seriousness_score > 80 AND seriousness_score <= 100 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN seriousness_score > 100 THEN 1 ELSE 0 END)
+        FROM clients
+    """)
+    (total, serious, potential, focus,
+     r0_20, r21_40, r41_60, r61_80, r81_100, r100_plus) = [v or 0 for v in cur.fetchone()]
     
     stats = {
-        'total': len(clients),
-        'serious': 0,
-        'potential': 0,
-        'not_serious': 0,
-        'focus': 0,
+        'total': total,
+        'serious': serious,
+        'potential': potential,
+        'not_serious': total - serious - potential,
+        'focus': focus,
         'by_status': defaultdict(int),
         'by_country': defaultdict(int),
         'by_score_range': {
-            '0-20': 0,
-            '21-40': 0,
-            '41-60': 0,
-            '61-80': 0,
-            '81-100': 0,
-            '100+': 0
+            '0-20': r0_20,
+            '21-40': r21_40,
+            '41-60': r41_60,
+            '61-80': r61_80,
+            '81-100': r81_100,
+            '100+': r100_plus
         }
     }
     
-    for client in clients:
-        (
-            client_id, company, country, contact, email,
-            phone, website, date_added, status, score,
-            classification, is_focus
-        ) = client
-        
-        # التصنيف
-        classification = classification or ""
-        if "🔥" in classification:
-            stats['serious'] += 1
-        elif "👍" in classification:
-            stats['potential'] += 1
-        else:
-            stats['not_serious'] += 1
-        
-        # Focus
-        if is_focus:
-            stats['focus'] += 1
-        
-        # الحالة
-        if status:
-            stats['by_status'][status] += 1
-        
-        # البلد
-        if country:
-            stats['by_country'][country] += 1
-        
-        # النطاق النقاط
-        score = score or 0
-        if score <= 20:
-            stats['by_score_range']['0-20'] += 1
-        elif score <= 40:
-            stats['by_score_range']['21-40'] += 1
-        elif score <= 60:
-            stats['by_score_range']['41-60'] += 1
-        elif score <= 80:
-            stats['by_score_range']['61-80'] += 1
-        elif score <= 100:
-            stats['by_score_range']['81-100'] += 1
-        else:
-            stats['by_score_range']['100+'] += 1
+    groups = _grouped_counts(cur, "clients", [
+        ("status", "status", "status IS NOT NULL AND status != ''", ""),
+        ("country", "country", "country IS NOT NULL AND country != ''", ""),
+    ])
+    stats['by_status'].update(groups['status'])
+    stats['by_country'].update(groups['country'])
     
     return stats
 
 
-def get_message_statistics() -> Dict:
+def get_message_statistics(cur=None) -> Dict:
     """
     الحصول على إحصائيات الرسائل
     
     Returns:
         Dictionary containing message statistics
     """
-    conn = get_connection()
-    cur = conn.cursor()
+    if cur is None:
+        return _with_cursor(get_message_statistics)
     
     stats = {
         'total': 0,
         'by_channel': defaultdict(int),
         'by_month': defaultdict(int),
         'by_type': defaultdict(int),
+        'by_language': defaultdict(int),
+        'by_request_type': defaultdict(int),
         'total_score_effect': 0
     }
     
-    # إجمالي الرسائل
-    cur.execute("SELECT COUNT(*) FROM messages")
-    stats['total'] = cur.fetchone()[0]
-    
-    # حسب القناة
-    cur.execute("SELECT channel, COUNT(*) FROM messages GROUP BY channel")
-    for channel, count in cur.fetchall():
+    # الإجمالي وتأثير النقاط
+    cur.execute("SELECT COUNT(*), SUM(score_effect) FROM messages")
+    total, total_score_effect = cur.fetchone()
+    stats['total'] = total or 0
+    stats['total_score_effect'] = total_score_effect or 0
+    
+    # القناة / النوع / اللغة / نوع الطلب / آخر 12 شهر في استعلام واحد
+    groups = _grouped_counts(cur, "messages", [
+        ("channel", "channel", "", ""),
+        ("type", "message_type", "", ""),
+        ("language", "language", "", ""),
+        ("request_type", "request_type", "request_type IS NOT NULL", ""),
+        ("month", "SUBSTR(message_date_iso, 1, 7)", "message_date_iso IS NOT NULL",
+         "ORDER BY value DESC LIMIT 12"),
+    ])
+    for channel, count in groups['channel']:
         stats['by_channel'][channel or 'Unknown'] = count
-    
-    # حسب النوع
-    cur.execute("SELECT message_type, COUNT(*) FROM messages GROUP BY message_type")
-    for msg_type, count in cur.fetchall():
+    for msg_type, count in groups['type']:
         stats['by_type'][msg_type or 'Unknown'] = count
-    
-    # حسب الشهر (آخر 12 شهر)
-    cur.execute("""
-        SELECT 
-            SUBSTR(message_date, 7, 4) || '-' || 
-            SUBSTR(message_date, 4, 2) AS month,
-            COUNT(*)
-        FROM messages
-        WHERE message_date IS NOT NULL
-        GROUP BY month
-        ORDER BY month DESC
-        LIMIT 12
-    """)
-    
-    for month, count in cur.fetchall():
+    # اللغة ونوع الطلب من نتائج التحليل المخزنة مع الرسالة
+    for language, count in groups['language']:
+        stats['by_language'][language or 'Unknown'] = count
+    for request_type, count in groups['request_type']:
+        for name in request_type.split(", "):
+            stats['by_request_type'][name] += count
+    for month, count in groups['month']:
         if month:
             stats['by_month'][month] = count
     
-    # إجمالي تأثير النقاط
-    cur.execute("SELECT SUM(score_effect) FROM messages")
-    result = cur.fetchone()
-    stats['total_score_effect'] = result[0] if result[0] else 0
-    
-    conn.close()
     return stats
 
 
-def get_request_statistics() -> Dict:
+def get_request_statistics(cur=None) -> Dict:
     """
     الحصول على إحصائيات الطلبات
     
     Returns:
         Dictionary containing request statistics
     """
-    conn = get_connection()
-    cur = conn.cursor()
+    if cur is None:
+        return _with_cursor(get_request_statistics)
+    
+    # الحالة وحالة الرد في مرور واحد
+    cur.execute("""
+        SELECT
+            COUNT(*),
+            SUM(CASE WHEN status = 'open' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN reply_status = 'pending' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN reply_status = 'replied' THEN 1 ELSE 0 END)
+        FROM requests
+    """)
+    total, open_count, pending_reply, replied = [v or 0 for v in cur.fetchone()]
     
     stats = {
-        'total': 0,
-        'open': 0,
-        'closed': 0,
-        'pending_reply': 0,
-        'replied': 0,
+        'total': total,
+        'open': open_count,
+        'closed': total - open_count,
+        'pending_reply': pending_reply,
+        'replied': replied,
         'by_type': defaultdict(int),
         'by_month': defaultdict(int)
     }
     
-    # إجمالي الطلبات
-    cur.execute("SELECT COUNT(*) FROM requests")
-    stats['total'] = cur.fetchone()[0]
-    
-    # حسب الحالة
-    cur.execute("SELECT status, COUNT(*) FROM requests GROUP BY status")
-    for status, count in cur.fetchall():
-        if status == 'open':
-            stats['open'] = count
-        else:
-            stats['closed'] += count
-    
-    # حسب حالة الرد
-    cur.execute("SELECT reply_status, COUNT(*) FROM requests GROUP BY reply_status")
-    for reply_status, count in cur.fetchall():
-        if reply_status == 'pending':
-            stats['pending_reply'] = count
-        elif reply_status == 'replied':
-            stats['replied'] = count
-    
-    # حسب النوع
-    cur.execute("SELECT request_type, COUNT(*) FROM requests GROUP BY request_type")
-    for req_type, count in cur.fetchall():
-        if req_type:
-            stats['by_type'][req_type] = count
-    
-    # حسب الشهر
-    cur.execute("""
-        SELECT 
-            SUBSTR(created_at, 7, 4) || '-' || 
-            SUBSTR(created_at, 4, 2) AS month,
-            COUNT(*)
-        FROM requests
-        WHERE created_at IS NOT NULL
-        GROUP BY month
-        ORDER BY month DESC
-        LIMIT 12
-    """)
-    
-    for month, count in cur.fetchall():
+    # النوع + الشهر (created_at بصيغة dd/mm/yyyy HH:MM)
+    groups = _grouped_counts(cur, "requests", [
+        ("type", "request_type", "request_type IS NOT NULL AND request_type != ''", ""),
+        ("month", "SUBSTR(created_at, 7, 4) || '-' || SUBSTR(created_at, 4, 2)",
+         "created_at IS NOT NULL", "ORDER BY value DESC LIMIT 12"),
+    ])
+    stats['by_type'].update(groups['type'])
+    for month, count in groups['month']:
         if month:
             stats['by_month'][month] = count
     
-    conn.close()
     return stats
 
 
-def get_client_growth_statistics() -> Dict:
+def get_client_growth_statistics(cur=None) -> Dict:
     """
     الحصول على إحصائيات نمو العملاء
     
     Returns:
-        Dictionary containing client growth statistics
+        Dictionary containing client growth statistics (yyyy-mm -> عدد)
     """
-    clients = get_all_clients()
-    
-    growth = defaultdict(int)
-    
-    for client in clients:
-        date_added = client[7]  # date_added
-        if date_added:
-            try:
-                # تحويل من dd/mm/yyyy إلى yyyy-mm
-                parts = date_added.split('/')
-                if len(parts) == 3:
-                    month_key = f"{parts[2]}-{parts[1].zfill(2)}"
-                    growth[month_key] += 1
-            except Exception:
-                pass
+    if cur is None:
+        return _with_cursor(get_client_growth_statistics)
     
-    # ترتيب حسب التاريخ
-    sorted_growth = dict(sorted(growth.items()))
-    return sorted_growth
+    # date_added_iso (YYYY-MM-DD) محسوب مسبقاً بالترحيل والـ triggers
+    cur.execute("""
+        SELECT SUBSTR(date_added_iso, 1, 7) AS month, COUNT(*)
+        FROM clients
+        WHERE date_added_iso IS NOT NULL
+        GROUP BY month
+        ORDER BY month
+    """)
+    return dict(cur.fetchall())
 
 
 def get_comprehensive_statistics() -> Dict:
     """
-    الحصول على إحصائيات شاملة
+    الحصول على إحصائيات شاملة (اتصال واحد لكل الإحصائيات)
     
     Returns:
         Dictionary containing all statistics
     """
-    return {
-        'clients': get_client_statistics(),
-        'messages': get_message_statistics(),
-        'requests': get_request_statistics(),
-        'growth': get_client_growth_statistics(),
-        'generated_at': datetime.now().isoformat()
-    }
+    def compute(cur):
+        return {
+            'clients': get_client_statistics(cur),
+            'messages': get_message_statistics(cur),
+            'requests': get_request_statistics(cur),
+            'growth': get_client_growth_statistics(cur),
+            'generated_at': datetime.now().isoformat()
+        }
+    return _with_cursor(compute)
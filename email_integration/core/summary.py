@@ -0,0 +1,178 @@
+"""
+جداول ملخص العدّادات (لوحة التحكم والإشعارات)
+Incrementally maintained summary counters
+
+- جدول واحد summary_counts(metric, day, count):
+  day = '' للعدّادات الإجمالية (عدد العملاء، الطلبات المفتوحة ...)
+  day = YYYY-MM-DD للعدّادات اليومية (عملاء جدد، رسائل، مهام مستحقة)
+- triggers على الجداول المصدر تضيف/تطرح مساهمة كل صف عند INSERT / DELETE /
+  UPDATE للأعمدة المراقبة، فتبقى العدّادات صحيحة مهما كان مسار الكتابة
+  (ingest_messages، add_message، الواجهة، الاستيراد ...)
+- لوحة التحكم تقرأ بضعة صفوف بدلاً من COUNT(*) على الجداول كاملة
+
+rebuild_summary_counts() تعيد الحساب من الصفر (تُستخدم في الترحيل أو للإصلاح).
+"""
+from typing import Dict, Iterable, Optional
+
+from .db import get_connection
+
+SUMMARY_TABLE = "summary_counts"
+
+# الجدول المصدر -> (الأعمدة المراقبة عند UPDATE, [(metric, الشرط, عمود اليوم أو None), ...])
+# {r} = NEW / OLD داخل trigger أو اسم مستعار للجدول عند إعادة البناء
+SUMMARY_COUNTERS = {
+    "clients": (
+        ("classification", "is_focus", "date_added_iso"),
+        [
+            ("clients", "1", None),
+            ("clients.serious", "{r}.classification LIKE '🔥%'", None),
+            ("clients.potential", "{r}.classification LIKE '👍%'", None),
+            ("clients.focus", "{r}.is_focus = 1", None),
+            ("clients.added", "{r}.date_added_iso IS NOT NULL", "{r}.date_added_iso"),
+        ],
+    ),
+    "messages": (
+        ("message_date_iso",),
+        [
+            ("messages", "1", None),
+            ("messages.daily", "{r}.message_date_iso IS NOT NULL", "{r}.message_date_iso"),
+        ],
+    ),
+    "requests": (
+        ("status", "reply_status"),
+        [
+            ("requests.open", "{r}.status = 'open'", None),
+            ("requests.pending", "{r}.reply_status = 'pending'", None),
+            ("requests.pending_open", "{r}.reply_status = 'pending' AND {r}.status = 'open'", None),
+        ],
+    ),
+    "tasks": (
+        ("status", "due_date_iso"),
+        [
+            ("tasks.pending", "{r}.status = 'pending'", None),
+            ("tasks.pending_due", "{r}.status = 'pending' AND {r}.due_date_iso IS NOT NULL",
+             "{r}.due_date_iso"),
+        ],
+    ),
+    "sales_deals": (
+        ("stage",),
+        [
+            ("deals.active", "{r}.stage != 'closed_won' AND {r}.stage != 'closed_lost'", None),
+        ],
+    ),
+}
+
+
+def _table_exists(cur, table: str) -> bool:
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,))
+    return cur.fetchone() is not None
+
+
+def _apply_sql(metric: str, condition: str, day_expr: Optional[str], row: str, sign: int) -> str:
+    """إضافة (sign=1) أو طرح (sign=-1) مساهمة صف واحد داخل trigger"""
+    day_sql = day_expr.format(r=row) if day_expr else "''"
+    return f"""
+            INSERT INTO {SUMMARY_TABLE}(metric, day, count)
+            SELECT '{metric}', {day_sql}, {sign} WHERE {condition.format(r=row)}
+            ON CONFLICT(metric, day) DO UPDATE SET count = count + excluded.count;"""
+
+
+def _create_triggers(cur, table: str):
+    watched, counters = SUMMARY_COUNTERS[table]
+
+    inserts = "".join(_apply_sql(m, c, d, "NEW", 1) for m, c, d in counters)
+    deletes = "".join(_apply_sql(m, c, d, "OLD", -1) for m, c, d in counters)
+    # العدّادات الثابتة (الشرط "1") لا تتغير عند UPDATE
+    changing = [(m, c, d) for m, c, d in counters if "{r}" in c or d]
+    updates = "".join(
+        _apply_sql(m, c, d, "OLD", -1) + _apply_sql(m, c, d, "NEW", 1)
+        for m, c, d in changing
+    )
+
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_summary_insert
+        AFTER INSERT ON {table}
+        BEGIN{inserts}
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_summary_delete
+        AFTER DELETE ON {table}
+        BEGIN{deletes}
+        END
+    """)
+    if changing:
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_summary_update
+            AFTER UPDATE OF {", ".join(watched)} ON {table}
+            BEGIN{updates}
+            END
+        """)
+
+
+def rebuild_summary_counts(cur, tables: Iterable[str] = None):
+    """إعادة حساب العدّادات من الجداول المصدر (GROUP BY واحد لكل عدّاد)"""
+    for table in tables or SUMMARY_COUNTERS:
+        _, counters = SUMMARY_COUNTERS[table]
+        metrics = [m for m, _, _ in counters]
+        placeholders = ",".join("?" * len(metrics))
+        cur.execute(f"DELETE FROM {SUMMARY_TABLE} WHERE metric IN ({placeholders})", metrics)
+        if not _table_exists(cur, table):
+            continue
+        for metric, condition, day_expr in counters:
+            day_sql = day_expr.format(r="t") if day_expr else "''"
+            cur.execute(f"""
+                INSERT INTO {SUMMARY_TABLE}(metric, day, count)
+                SELECT ?, {day_sql} AS day, COUNT(*)
+                FROM {table} t
+                WHERE {condition.format(r="t")}
+                GROUP BY day
+            """, (metric,))
+
+
+def ensure_summary_counts(cur):
+    """جدول العدّادات + triggers لكل جدول مصدر موجود + الحساب الأولي"""
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SUMMARY_TABLE} (
+            metric TEXT NOT NULL,
+            day TEXT NOT NULL DEFAULT '',
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (metric, day)
+        ) WITHOUT ROWID
+    """)
+    tables = [table for table in SUMMARY_COUNTERS if _table_exists(cur, table)]
+    for table in tables:
+        _create_triggers(cur, table)
+    rebuild_summary_counts(cur)
+
+
+# =========================
+# Reading
+# =========================
+def get_summary_counts(cur=None) -> Dict[str, int]:
+    """العدّادات الإجمالية (day = '') -> {metric: count}"""
+    if cur is None:
+        conn = get_connection()
+        try:
+            return get_summary_counts(conn.cursor())
+        finally:
+            conn.close()
+    cur.execute(f"SELECT metric, count FROM {SUMMARY_TABLE} WHERE day = ''")
+    return dict(cur.fetchall())
+
+
+def sum_daily_counts(cur, metric: str, start: str = None, end: str = None) -> int:
+    """
+    مجموع عدّاد يومي في النطاق [start, end) بصيغة YYYY-MM-DD
+    (start / end = None تعني بدون حد)
+    """
+    query = f"SELECT COALESCE(SUM(count), 0) FROM {SUMMARY_TABLE} WHERE metric = ? AND day != ''"
+    params = [metric]
+    if start:
+        query += " AND day >= ?"
+        params.append(start)
+    if end:
+        query += " AND day < ?"
+        params.append(end)
+    cur.execute(query, params)
+    return cur.fetchone()[0]
@@ -0,0 +1,233 @@
+"""
+محرك المزامنة المتوازية مع Microsoft Graph
+Concurrent per-client Graph sync
+
+- قراءة رسائل عدة عملاء في نفس الوقت عبر ThreadPoolExecutor محدود
+  (MAX_CONCURRENT_REQUESTS = حد Outlook للطلبات المتزامنة لكل صندوق بريد)
+- كل الخيوط تستخدم جلسة HTTP واحدة و graph_get الذي يحترم 429/Retry-After
+- النتائج تُعاد فور وصولها (generator) حتى يبدأ الحفظ في قاعدة البيانات
+  من خيط واحد بينما باقي العملاء ما زالوا قيد التحميل
+- process_messages: تحليل رسائل المزامنة وحفظها على دفعات (بدون واجهة،
+  تستخدمها ProcessMessagesThread وأداة القياس benchmarks)
+"""
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from .db import get_focus_emails, ingest_messages
+from .instrumentation import phase
+from .message_analysis import analyze_message
+from .message_filter import should_fetch_full_body
+from .ms_mail_reader import MAX_CONCURRENT_REQUESTS, read_messages_from_folder
+
+
+def _fetch_client_messages(token: str, email: str, max_messages: int) -> List[dict]:
+    return read_messages_from_folder(
+        token,
+        folder_name="Inbox",
+        sender_email=email,
+        top=50,
+        max_messages=max_messages,
+        body_filter=should_fetch_full_body
+    )
+
+
+def iter_client_messages(
+    token: str,
+    emails: Iterable[str],
+    max_messages: int = 50,
+    max_workers: int = MAX_CONCURRENT_REQUESTS,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> Iterator[Tuple[str, List[dict], Optional[Exception]]]:
+    """
+    جلب رسائل كل عميل بالتوازي وإعادتها بترتيب الانتهاء
+
+    Args:
+        token: رمز الوصول لـ Graph
+        emails: بريد العملاء المطلوب مزامنتهم
+        max_messages: الحد الأقصى للرسائل لكل عميل
+        max_workers: عدد الطلبات المتزامنة
+        should_stop: دالة اختيارية لإيقاف الجلب مبكراً
+
+    Yields:
+        (email, messages, error) - error يكون None عند النجاح
+    """
+    emails = iter(emails)
+    # عدد المهام المنتظرة محدود حتى لا تُحجز الذاكرة لكل العملاء مرة واحدة
+    max_pending = max_workers * 2
+
+    with ThreadPoolExecutor(max_workers=max_workers,
+                            thread_name_prefix="graph-sync") as pool:
+        pending = {}
+
+        def submit_next() -> bool:
+            for email in emails:
+                future = pool.submit(_fetch_client_messages, token, email, max_messages)
+                pending[future] = email
+                return True
+            return False
+
+        try:
+            while len(pending) < max_pending and submit_next():
+                pass
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    email = pending.pop(future)
+                    try:
+                        messages, error = future.result() or [], None
+                    except Exception as e:
+                        messages, error = [], e
+                    yield email, messages, error
+
+                    if should_stop and should_stop():
+                        return
+                    submit_next()
+        finally:
+            # عند الإيقاف المبكر: إلغاء ما لم يبدأ بعد
+            for future in pending:
+                future.cancel()
+
+
+# =========================
+# Processing
+# =========================
+# عدد الرسائل في كل معاملة (commit واحد لكل دفعة)
+INGEST_BATCH_SIZE = 200
+
+
+def process_messages(messages: List[dict], account_type: str, mode: str = "all",
+                     progress: Optional[Callable[[str], None]] = None) -> dict:
+    """
+    معالجة رسائل المزامنة (تحليل + فلترة + إنشاء/ربط العملاء + الحفظ على دفعات)
+
+    Args:
+        messages: الرسائل بتنسيق Graph (IMAP و cPanel تُحوَّل لنفس التنسيق)
+        account_type: "outlook" أو غيره (IMAP / cPanel)
+        mode: "all" أو "focus" (عملاء التركيز فقط)
+        progress: دالة اختيارية لرسائل التقدم
+
+    Returns:
+        {"created", "linked", "filtered", "incomplete", "focus_notifications", "total_messages"}
+        incomplete: رسائل تعذّر تحميل محتواها الكامل (bodyIncomplete) فلم تُحفظ
+    """
+    messages = messages or []
+    mode = mode or "all"
+    focus_emails = set(get_focus_emails()) if mode == "focus" else set()
+
+    created = 0
+    linked = 0
+    filtered = 0
+    incomplete = 0
+    focus_notifications = 0
+
+    total_messages = len(messages)
+    processed = 0
+    batch = []
+    today_str = datetime.now().strftime("%d/%m/%Y")
+    channel = "Outlook" if account_type == "outlook" else "IMAP"
+
+    for msg in messages:
+        processed += 1
+        if processed % 10 == 0 or processed == 1 or processed == total_messages:
+            if progress:
+                progress(f"⏳ جاري مزامنة الرسائل... ({processed}/{total_messages})")
+
+        # حفظ الدفعة في معاملة واحدة
+        if len(batch) >= INGEST_BATCH_SIZE:
+            with phase("db_write"):
+                created += ingest_messages(batch)["created_clients"]
+            batch = []
+
+        sender_info = msg.get("from", {}).get("emailAddress", {})
+        sender = sender_info.get("address", "")
+        sender_name = sender_info.get("name", "")
+
+        if not sender or "@" not in sender:
+            continue
+
+        # bodyPreview ليس المحتوى الكامل: لا تحليل ولا نقاط ولا بصمة (تُقرأ في المزامنة التالية)
+        if msg.get("bodyIncomplete"):
+            incomplete += 1
+            continue
+
+        subject = msg.get("subject", "")
+        body = msg.get("body", {}).get("content", "")
+
+        # استخراج التاريخ الفعلي للرسالة
+        actual_date = None
+        if account_type == "outlook":
+            received_date = msg.get("receivedDateTime") or msg.get("sentDateTime")
+            if received_date:
+                try:
+                    date_obj = datetime.fromisoformat(received_date.replace('Z', '+00:00'))
+                    actual_date = date_obj.strftime("%d/%m/%Y")
+                except Exception:
+                    pass
+        else:
+            actual_date = msg.get("date") or None
+            if not actual_date:
+                received_date = msg.get("receivedDateTime")
+                if received_date:
+                    try:
+                        if isinstance(received_date, str):
+                            if 'T' in received_date:
+                                date_obj = datetime.fromisoformat(received_date.replace('Z', '+00:00'))
+                            else:
+                                date_obj = datetime.fromisoformat(received_date)
+                            actual_date = date_obj.strftime("%d/%m/%Y")
+                    except Exception:
+                        pass
+
+        # تحليل واحد للرسالة (HTML -> نص، الكلمات، نوع الطلب، التقييم) يُحفظ معها
+        analysis = analyze_message(subject, body, sender_email=sender)
+
+        # فلترة الرسائل
+        if not analysis.should_import:
+            filtered += 1
+            continue
+
+        # focus only
+        if mode == "focus" and sender.lower() not in focus_emails:
+            filtered += 1
+            continue
+
+        is_focus_client = sender.lower() in focus_emails
+        if is_focus_client:
+            focus_notifications += 1  # تعرضها الواجهة بعد المعالجة
+
+        batch.append({
+            "email": sender,
+            "client": {
+                "company_name": sender_name or sender.split("@")[0],
+                "contact_person": sender_name,
+                "is_focus": 1 if is_focus_client else 0,
+            },
+            "message_date": today_str,
+            "actual_date": actual_date,
+            "message_type": "Email",
+            "channel": channel,
+            "client_response": subject,
+            "notes": body,
+            "score_effect": analysis.score_effect,
+            "request_type": analysis.request_type,
+            "extracted_text": analysis.text,
+            "analysis": analysis,
+            "internet_message_id": msg.get("internetMessageId"),
+        })
+
+        linked += 1
+
+    if batch:
+        with phase("db_write"):
+            created += ingest_messages(batch)["created_clients"]
+
+    return {
+        "created": created,
+        "linked": linked,
+        "filtered": filtered,
+        "incomplete": incomplete,
+        "focus_notifications": focus_notifications,
+        "total_messages": total_messages,
+    }
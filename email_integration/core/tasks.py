@@ -7,6 +7,7 @@ import calendar
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
 from .db import get_connection
+from .dates import iso_now, iso_today
 
 
 # ===== Task Priorities =====
@@ -332,7 +333,7 @@ def get_client_tasks(client_id: int, status: str = None) -> List[Dict]:
                 WHEN 'medium' THEN 3
                 WHEN 'low' THEN 4
             END,
-            t.due_date ASC
+            t.due_date_iso ASC
         """, (client_id, status))
     else:
         cur.execute("""
@@ -352,7 +353,7 @@ def get_client_tasks(client_id: int, status: str = None) -> List[Dict]:
                 WHEN 'medium' THEN 3
                 WHEN 'low' THEN 4
             END,
-            t.due_date ASC
+            t.due_date_iso ASC
         """, (client_id,))
     
     rows = cur.fetchall()
@@ -429,10 +430,8 @@ def get_all_tasks(status: str = None, priority: str = None, days_ahead: int = No
         params.append(priority)
     
     if days_ahead is not None:
-        today = datetime.now()
-        end_date = (today + timedelta(days=days_ahead)).strftime("%d/%m/%Y")
-        query += " AND t.due_date <= ?"
-        params.append(end_date)
+        query += " AND t.due_date_iso <= ?"
+        params.append(iso_today(days_ahead))
     
     query += """
     ORDER BY 
@@ -442,7 +441,7 @@ def get_all_tasks(status: str = None, priority: str = None, days_ahead: int = No
             WHEN 'medium' THEN 3
             WHEN 'low' THEN 4
         END,
-        t.due_date ASC
+        t.due_date_iso ASC
     """
     
     cur.execute(query, tuple(params))
@@ -488,7 +487,7 @@ def get_overdue_tasks() -> List[Dict]:
     conn = get_connection()
     cur = conn.cursor()
     
-    today_str = datetime.now().strftime("%d/%m/%Y")
+    today_str = iso_today()
     
     cur.execute("""
     SELECT 
@@ -499,8 +498,8 @@ def get_overdue_tasks() -> List[Dict]:
         c.company_name, c.email, c.phone
     FROM tasks t
     JOIN clients c ON t.client_id = c.id
-    WHERE t.status = 'pending' AND t.due_date < ?
-    ORDER BY t.due_date ASC
+    WHERE t.status = 'pending' AND t.due_date_iso < ?
+    ORDER BY t.due_date_iso ASC
     """, (today_str,))
     
     rows = cur.fetchall()
@@ -544,7 +543,7 @@ def get_overdue_tasks() -> List[Dict]:
 
 def get_tasks_due_today() -> List[Dict]:
     """الحصول على المهام المستحقة اليوم"""
-    today_str = datetime.now().strftime("%d/%m/%Y")
+    today_str = iso_today()
     
     init_tasks_table()
     
@@ -560,7 +559,7 @@ def get_tasks_due_today() -> List[Dict]:
         c.company_name, c.email, c.phone
     FROM tasks t
     JOIN clients c ON t.client_id = c.id
-    WHERE t.status = 'pending' AND t.due_date = ?
+    WHERE t.status = 'pending' AND t.due_date_iso = ?
     ORDER BY 
         CASE t.priority
             WHEN 'urgent' THEN 1
@@ -616,8 +615,8 @@ def get_reminders_due() -> List[Dict]:
     conn = get_connection()
     cur = conn.cursor()
     
-    today_str = datetime.now().strftime("%d/%m/%Y")
-    now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    # reminder_date_iso يحمل الوقت إن وُجد (YYYY-MM-DD HH:MM:SS) فالمقارنة مع الآن
+    now_str = iso_now()
     
     cur.execute("""
     SELECT 
@@ -628,10 +627,10 @@ def get_reminders_due() -> List[Dict]:
     FROM tasks t
     JOIN clients c ON t.client_id = c.id
     WHERE t.status = 'pending' 
-      AND t.reminder_date IS NOT NULL 
-      AND (t.reminder_date <= ? OR t.reminder_date <= ?)
-    ORDER BY t.reminder_date ASC
-    """, (today_str, now_str))
+      AND t.reminder_date_iso IS NOT NULL 
+      AND t.reminder_date_iso <= ?
+    ORDER BY t.reminder_date_iso ASC
+    """, (now_str,))
     
     rows = cur.fetchall()
     conn.close()
@@ -0,0 +1,79 @@
+"""
+تطبيع نص الرسائل: HTML إلى نص + Unicode/عربي
+Message text normalization (HTML to text, Unicode and Arabic folding)
+
+- html_to_text(): إزالة script/style/التعليقات والوسوم مع الحفاظ على فواصل
+  الأسطر (br, p, div, tr, li ...) ثم فك HTML entities
+- normalize_text(): NFKC + حذف التشكيل والتطويل والمحارف غير المرئية
+  + توحيد المسافات (النتيجة تُخزن في messages.body_text)
+- fold_for_matching(): نفس التطبيع بدون ترتيب المسافات + lower()
+  (يستخدمه محرك الكلمات للنص وللكلمات حتى يتطابق "حسناً" مع "حسنا")
+"""
+import re
+import unicodedata
+from html import unescape
+
+# التشكيل (الحركات والتنوين والشدة والسكون...) + علامات القرآن + الألف الخنجرية
+_ARABIC_MARKS = (
+    "\u0610-\u061A\u064B-\u065F\u0670"
+    "\u06D6-\u06DC\u06DF-\u06E4\u06E7\u06E8\u06EA-\u06ED"
+)
+_TATWEEL = "\u0640"
+# zero-width / اتجاه النص / soft hyphen / BOM
+_INVISIBLE = "\u00AD\u200B-\u200F\u202A-\u202E\u2060-\u2064\u2066-\u2069\uFEFF"
+
+_STRIP_RE = re.compile(f"[{_ARABIC_MARKS}{_TATWEEL}{_INVISIBLE}]")
+
+_HTML_HINT_RE = re.compile(r"<(?:[a-zA-Z][a-zA-Z0-9]*[\s/>]|/[a-zA-Z]|!)")
+_HTML_DROP_RE = re.compile(
+    r"<!--.*?-->|<(script|style|head|title|xml)\b[^>]*>.*?</\1\s*>",
+    re.DOTALL | re.IGNORECASE
+)
+_HTML_BREAK_RE = re.compile(
+    r"<br\s*/?>|</?(?:p|div|tr|li|ul|ol|table|h[1-6]|blockquote|hr)\b[^>]*>",
+    re.IGNORECASE
+)
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+def looks_like_html(text: str) -> bool:
+    return bool(text) and _HTML_HINT_RE.search(text) is not None
+
+
+def html_to_text(raw_html: str) -> str:
+    """تحويل محتوى HTML إلى نص (النص العادي يُعاد كما هو مع فك الـ entities)"""
+    if not raw_html:
+        return ""
+    text = raw_html
+    if looks_like_html(text):
+        text = _HTML_DROP_RE.sub("", text)
+        text = _HTML_BREAK_RE.sub("\n", text)
+        text = _HTML_TAG_RE.sub("", text)
+    return unescape(text)
+
+
+def _strip_marks(text: str) -> str:
+    return _STRIP_RE.sub("", unicodedata.normalize("NFKC", text))
+
+
+def normalize_text(text: str) -> str:
+    """
+    تطبيع Unicode/عربي + ترتيب المسافات والأسطر
+
+    لا يغير حالة الأحرف (النص المخزن يُعرض في الواجهة).
+    """
+    if not text:
+        return ""
+    text = _strip_marks(text.replace("\r\n", "\n").replace("\r", "\n"))
+    # split() بدون معامل يدمج كل المسافات (بما فيها \t و nbsp) بسرعة C
+    text = "\n".join(" ".join(line.split()) for line in text.split("\n"))
+    return _BLANK_LINES_RE.sub("\n\n", text).strip()
+
+
+def fold_for_matching(text: str) -> str:
+    """الصيغة المستخدمة لمطابقة الكلمات المفتاحية (تطبيع + lower)"""
+    if not text:
+        return ""
+    return _strip_marks(text).lower()
@@ -3,7 +3,7 @@
 Theme System (Dark/Light Mode)
 """
 from PyQt5.QtCore import QObject, pyqtSignal
-from core.settings import load_settings
+from core.settings import get_str_setting
 
 
 class ThemeManager(QObject):
@@ -17,8 +17,7 @@ class ThemeManager(QObject):
     
     def get_theme(self) -> str:
         """الحصول على الثيم الحالي"""
-        settings = load_settings()
-        return settings.get("ui", {}).get("theme", "light")
+        return get_str_setting("ui.theme", "light")
     
     def set_theme(self, theme: str):
         """تعيين الثيم (light أو dark)"""
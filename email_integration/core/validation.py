@@ -3,9 +3,13 @@
 Data Validation System
 """
 import re
-from typing import Tuple, Optional
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 from datetime import datetime
 
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_PHONE_STRIP_RE = re.compile(r'[\s\-\(\)\+]')
+_URL_RE = re.compile(r'^https?://[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}(/.*)?$')
+
 
 def validate_email(email: str) -> Tuple[bool, Optional[str]]:
     """
@@ -23,9 +27,7 @@ def validate_email(email: str) -> Tuple[bool, Optional[str]]:
     email = email.strip()
     
     # نمط بسيط للتحقق من صحة البريد الإلكتروني
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    
-    if not re.match(pattern, email):
+    if not _EMAIL_RE.match(email):
         return False, "البريد الإلكتروني غير صحيح. يجب أن يكون على شكل: name@example.com"
     
     # تحقق من الطول
@@ -51,7 +53,7 @@ def validate_phone(phone: str) -> Tuple[bool, Optional[str]]:
     phone = phone.strip()
     
     # إزالة المسافات والرموز للتحقق
-    cleaned = re.sub(r'[\s\-\(\)\+]', '', phone)
+    cleaned = _PHONE_STRIP_RE.sub('', phone)
     
     # يجب أن يحتوي على أرقام فقط وأن يكون طوله معقولاً (6-20 رقم)
     if not cleaned.isdigit():
@@ -83,9 +85,7 @@ def validate_url(url: str) -> Tuple[bool, Optional[str]]:
         url = 'https://' + url
     
     # نمط بسيط للتحقق من الرابط
-    pattern = r'^https?://[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}(/.*)?$'
-    
-    if not re.match(pattern, url):
+    if not _URL_RE.match(url):
         return False, "رابط الموقع غير صحيح. يجب أن يكون على شكل: https://example.com"
     
     return True, None
@@ -198,3 +198,36 @@ def validate_text(value: str, min_length: int = 0, max_length: Optional[int] = N
         return False, f"النص يجب أن يكون على الأكثر {max_length} حرف"
     
     return True, None
+
+
+def validate_records(
+    records: Sequence[Dict[str, str]],
+    validators: Dict[str, Callable[[str], Tuple[bool, Optional[str]]]]
+) -> Dict[int, List[Tuple[str, str]]]:
+    """
+    التحقق من دفعة سجلات عموداً عموداً (للاستيراد)
+    
+    كل دالة تحقق تُستدعى مرة واحدة لكل قيمة مختلفة في العمود
+    (الدول والنطاقات المتكررة لا يُعاد فحصها)
+    
+    Args:
+        records: قائمة قواميس {الحقل: القيمة}
+        validators: {الحقل: دالة validate_*}
+    
+    Returns:
+        Dict[int, List[Tuple[str, str]]]: {رقم السجل: [(الحقل, رسالة الخطأ), ...]} للسجلات غير الصحيحة فقط
+    """
+    problems: Dict[int, List[Tuple[str, str]]] = {}
+    for field, validator in validators.items():
+        checked: Dict[str, Optional[str]] = {}
+        for index, record in enumerate(records):
+            value = record.get(field)
+            if not value:
+                continue
+            if value not in checked:
+                _, message = validator(value)
+                checked[value] = message
+            message = checked[value]
+            if message:
+                problems.setdefault(index, []).append((field, message))
+    return problems
@@ -556,7 +556,7 @@ class AdvancedSearchWindow(QDialog):
         """عرض نتائج البحث في الرسائل"""
         headers = [
             "ID", "Company", "Date", "Type", "Channel",
-            "Subject", "Score Effect"
+            "Subject", "Score Effect", "Match"
         ]
         
         self.messages_results_table.setColumnCount(len(headers))
@@ -574,6 +574,7 @@ class AdvancedSearchWindow(QDialog):
             self.messages_results_table.setItem(row, 5, QTableWidgetItem(subject))
             
             self.messages_results_table.setItem(row, 6, QTableWidgetItem(str(msg['score_effect'])))
+            self.messages_results_table.setItem(row, 7, QTableWidgetItem(msg.get('snippet') or ""))
         
         self.messages_results_table.resizeColumnsToContents()
     
@@ -581,7 +582,7 @@ class AdvancedSearchWindow(QDialog):
         """عرض نتائج البحث في الطلبات"""
         headers = [
             "ID", "Company", "Email", "Type", "Status",
-            "Reply Status", "Created At"
+            "Reply Status", "Created At", "Match"
         ]
         
         self.requests_results_table.setColumnCount(len(headers))
@@ -596,6 +597,7 @@ class AdvancedSearchWindow(QDialog):
             self.requests_results_table.setItem(row, 4, QTableWidgetItem(req['status'] or ""))
             self.requests_results_table.setItem(row, 5, QTableWidgetItem(req['reply_status'] or ""))
             self.requests_results_table.setItem(row, 6, QTableWidgetItem(req['created_at'] or ""))
+            self.requests_results_table.setItem(row, 7, QTableWidgetItem(req.get('snippet') or ""))
         
         self.requests_results_table.resizeColumnsToContents()
     
@@ -9,16 +9,32 @@ from PyQt5.QtWidgets import (
     QSpinBox, QFormLayout, QSplitter, QWidget
 )
 from PyQt5.QtGui import QFont, QIcon
-from PyQt5.QtCore import Qt, QTime
+from PyQt5.QtCore import Qt, QTime, QThread, pyqtSignal
 
 from core.backup import (
     create_backup, list_backups, restore_backup,
+    delete_backup, export_backup,
     get_backup_config, save_backup_config,
     get_backup_statistics, BACKUP_DIR
 )
 import os
 
 
+class BackupThread(QThread):
+    """
+    إنشاء النسخة الاحتياطية في الخلفية (النسخ على دفعات + الضغط)
+    حتى لا تتجمد النافذة على قواعد البيانات الكبيرة.
+    """
+    finished = pyqtSignal(object)  # مسار النسخة أو None
+
+    def __init__(self, description: str, parent=None):
+        super().__init__(parent)
+        self.description = description
+
+    def run(self):
+        self.finished.emit(create_backup(self.description))
+
+
 class BackupWindow(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -284,21 +300,37 @@ class BackupWindow(QDialog):
         )
         
         if reply == QMessageBox.Yes:
-            backup_path = create_backup("نسخ احتياطي يدوي")
-            
-            if backup_path:
-                QMessageBox.information(
-                    self,
-                    "نجح",
-                    f"تم إنشاء النسخة الاحتياطية بنجاح!\n{os.path.basename(backup_path)}"
-                )
-                self.load_backups()
-            else:
-                QMessageBox.critical(
-                    self,
-                    "خطأ",
-                    "فشل إنشاء النسخة الاحتياطية!"
-                )
+            self.create_btn.setEnabled(False)
+            self.create_btn.setText("⏳ جاري النسخ...")
+            self.backup_thread = BackupThread("نسخ احتياطي يدوي", self)
+            self.backup_thread.finished.connect(self._on_backup_finished)
+            self.backup_thread.start()
+    
+    def _on_backup_finished(self, backup_path):
+        """نتيجة BackupThread"""
+        self.create_btn.setEnabled(True)
+        self.create_btn.setText("➕ نسخ احتياطي جديد")
+        
+        if backup_path:
+            QMessageBox.information(
+                self,
+                "نجح",
+                f"تم إنشاء النسخة الاحتياطية بنجاح!\n{os.path.basename(backup_path)}"
+            )
+            self.load_backups()
+        else:
+            QMessageBox.critical(
+                self,
+                "خطأ",
+                "فشل إنشاء النسخة الاحتياطية!"
+            )
+    
+    def done(self, result):
+        """انتظار انتهاء النسخ الجاري قبل إغلاق النافذة"""
+        thread = getattr(self, "backup_thread", None)
+        if thread is not None and thread.isRunning():
+            thread.wait()
+        super().done(result)
     
     def restore_selected_backup(self):
         """استعادة النسخة المحددة"""
@@ -360,14 +392,13 @@ class BackupWindow(QDialog):
         
         if reply == QMessageBox.Yes:
             try:
-                if os.path.exists(backup_path):
-                    os.remove(backup_path)
-                    
-                    # حذف ملف المعلومات
-                    info_path = backup_path.replace(".db", ".info")
-                    if os.path.exists(info_path):
-                        os.remove(info_path)
-                    
+                if not os.path.exists(backup_path):
+                    QMessageBox.warning(
+                        self,
+                        "تحذير",
+                        "الملف غير موجود!"
+                    )
+                elif delete_backup(backup_path):
                     QMessageBox.information(
                         self,
                         "نجح",
@@ -378,7 +409,7 @@ class BackupWindow(QDialog):
                     QMessageBox.warning(
                         self,
                         "تحذير",
-                        "الملف غير موجود!"
+                        "لا يمكن حذف هذه النسخة: نسخ تزايدية تعتمد عليها."
                     )
             except Exception as e:
                 QMessageBox.critical(
@@ -402,30 +433,26 @@ class BackupWindow(QDialog):
         file_path, _ = QFileDialog.getSaveFileName(
             self,
             "تصدير النسخة الاحتياطية",
-            os.path.join(os.path.expanduser("~"), "Desktop", os.path.basename(backup_path)),
+            os.path.join(
+                os.path.expanduser("~"), "Desktop",
+                os.path.basename(backup_path).split(".")[0] + ".db"
+            ),
             "Database Files (*.db);;All Files (*.*)"
         )
         
         if file_path:
-            try:
-                import shutil
-                shutil.copy2(backup_path, file_path)
-                
-                # نسخ ملف المعلومات أيضاً
-                info_path = backup_path.replace(".db", ".info")
-                if os.path.exists(info_path):
-                    shutil.copy2(info_path, file_path.replace(".db", ".info"))
-                
+            # النسخة تُفك وتُتحقق (SHA-256) وتُكتب كقاعدة بيانات عادية
+            if export_backup(backup_path, file_path):
                 QMessageBox.information(
                     self,
                     "نجح",
                     f"تم تصدير النسخة الاحتياطية بنجاح!\n{file_path}"
                 )
-            except Exception as e:
+            else:
                 QMessageBox.critical(
                     self,
                     "خطأ",
-                    f"فشل تصدير النسخة الاحتياطية:\n{str(e)}"
+                    "فشل تصدير النسخة الاحتياطية (الملف تالف أو النسخة الأساسية مفقودة)!"
                 )
     
     def import_backup(self):
@@ -45,7 +45,7 @@ class ClientReportWindow(QDialog):
             SELECT message_date, channel, client_response
             FROM messages
             WHERE client_id=?
-            ORDER BY message_date ASC
+            ORDER BY message_date_iso ASC
         """, (client_id,))
         report.append("\n=== MESSAGES ===")
         for m in cur.fetchall():
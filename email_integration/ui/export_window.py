@@ -5,10 +5,10 @@ Data Export Window
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
     QMessageBox, QFileDialog, QGroupBox, QRadioButton,
-    QButtonGroup, QTextEdit
+    QButtonGroup, QTextEdit, QProgressDialog
 )
 from PyQt5.QtGui import QFont
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 import os
 
 from core.export_data import (
@@ -16,6 +16,7 @@ from core.export_data import (
     export_messages_to_csv, export_messages_to_excel,
     export_requests_to_csv, export_requests_to_excel,
     export_full_report_to_excel,
+    ExportCancelled,
     EXCEL_AVAILABLE
 )
 try:
@@ -27,6 +28,38 @@ except ImportError:
     PDF_AVAILABLE = False
 
 
+class ExportThread(QThread):
+    """
+    تنفيذ التصدير في الخلفية: الصفوف تُقرأ وتُكتب على دفعات
+    والتقدم يصل عبر progress(done, total) والإلغاء بين الدفعات.
+    """
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(bool)
+    cancelled = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, export_call, parent=None):
+        super().__init__(parent)
+        self.export_call = export_call
+        self._cancel_requested = False
+
+    def cancel(self):
+        self._cancel_requested = True
+
+    def run(self):
+        try:
+            success = self.export_call(
+                progress=self.progress.emit,
+                is_cancelled=lambda: self._cancel_requested
+            )
+        except ExportCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.finished.emit(bool(success))
+
+
 class ExportWindow(QDialog):
     def __init__(self, parent=None, selected_client_id=None):
         super().__init__(parent)
@@ -188,14 +221,14 @@ class ExportWindow(QDialog):
             if not file_path.endswith(extension):
                 file_path += extension
             
-            # تنفيذ التصدير
-            success = False
+            # تنفيذ التصدير (في الخلفية مع شريط تقدم)
+            export_call = None
             message = ""
             
             if data_type == 1:  # العملاء
                 if is_pdf:
                     if self.selected_client_id:
-                        success = export_client_report_to_pdf(self.selected_client_id, file_path)
+                        export_call = lambda **kw: export_client_report_to_pdf(self.selected_client_id, file_path)
                         message = "تم تصدير تقرير العميل إلى PDF بنجاح!"
                     else:
                         QMessageBox.warning(
@@ -206,16 +239,16 @@ class ExportWindow(QDialog):
                         )
                         return
                 elif is_excel:
-                    success = export_clients_to_excel(file_path)
+                    export_call = lambda **kw: export_clients_to_excel(file_path, **kw)
                     message = "تم تصدير قائمة العملاء إلى Excel بنجاح!"
                 else:
-                    success = export_clients_to_csv(file_path)
+                    export_call = lambda **kw: export_clients_to_csv(file_path, **kw)
                     message = "تم تصدير قائمة العملاء إلى CSV بنجاح!"
             
             elif data_type == 2:  # الرسائل
                 if is_pdf:
                     if self.selected_client_id:
-                        success = export_client_report_to_pdf(self.selected_client_id, file_path)
+                        export_call = lambda **kw: export_client_report_to_pdf(self.selected_client_id, file_path)
                         message = "تم تصدير تقرير العميل (مع الرسائل) إلى PDF بنجاح!"
                     else:
                         QMessageBox.warning(
@@ -226,10 +259,10 @@ class ExportWindow(QDialog):
                         )
                         return
                 elif is_excel:
-                    success = export_messages_to_excel(file_path, self.selected_client_id)
+                    export_call = lambda **kw: export_messages_to_excel(file_path, self.selected_client_id, **kw)
                     message = "تم تصدير الرسائل إلى Excel بنجاح!"
                 else:
-                    success = export_messages_to_csv(file_path, self.selected_client_id)
+                    export_call = lambda **kw: export_messages_to_csv(file_path, self.selected_client_id, **kw)
                     message = "تم تصدير الرسائل إلى CSV بنجاح!"
             
             elif data_type == 3:  # الطلبات
@@ -242,18 +275,18 @@ class ExportWindow(QDialog):
                     )
                     return
                 elif is_excel:
-                    success = export_requests_to_excel(file_path)
+                    export_call = lambda **kw: export_requests_to_excel(file_path, **kw)
                     message = "تم تصدير الطلبات إلى Excel بنجاح!"
                 else:
-                    success = export_requests_to_csv(file_path)
+                    export_call = lambda **kw: export_requests_to_csv(file_path, **kw)
                     message = "تم تصدير الطلبات إلى CSV بنجاح!"
             
             elif data_type == 4:  # التقرير الشامل
                 if is_pdf:
-                    success = export_full_report_to_pdf(file_path)
+                    export_call = lambda **kw: export_full_report_to_pdf(file_path)
                     message = "تم تصدير التقرير الشامل إلى PDF بنجاح!"
                 elif is_excel:
-                    success = export_full_report_to_excel(file_path)
+                    export_call = lambda **kw: export_full_report_to_excel(file_path, **kw)
                     message = "تم تصدير التقرير الشامل إلى Excel بنجاح!"
                 else:
                     QMessageBox.warning(
@@ -263,19 +296,8 @@ class ExportWindow(QDialog):
                     )
                     return
             
-            if success:
-                QMessageBox.information(
-                    self,
-                    "نجح التصدير",
-                    f"{message}\n\nالموقع: {file_path}"
-                )
-                self.accept()
-            else:
-                QMessageBox.critical(
-                    self,
-                    "فشل التصدير",
-                    "حدث خطأ أثناء التصدير!\nيرجى المحاولة مرة أخرى."
-                )
+            if export_call:
+                self.start_export(export_call, message, file_path)
                 
         except Exception as e:
             QMessageBox.critical(
@@ -284,6 +306,73 @@ class ExportWindow(QDialog):
                 f"حدث خطأ أثناء التصدير:\n\n{str(e)}"
             )
     
+    def start_export(self, export_call, message: str, file_path: str):
+        """تشغيل التصدير في ExportThread مع نافذة تقدم وزر إلغاء"""
+        self._export_message = message
+        self._export_path = file_path
+        
+        self.progress_dialog = QProgressDialog("جاري التصدير...", "إلغاء - Cancel", 0, 0, self)
+        self.progress_dialog.setWindowTitle("📤 تصدير البيانات")
+        self.progress_dialog.setWindowModality(Qt.WindowModal)
+        self.progress_dialog.setMinimumDuration(0)
+        
+        self.export_thread = ExportThread(export_call, self)
+        self.export_thread.progress.connect(self._on_export_progress)
+        self.export_thread.finished.connect(self._on_export_finished)
+        self.export_thread.cancelled.connect(self._on_export_cancelled)
+        self.export_thread.failed.connect(self._on_export_failed)
+        self.progress_dialog.canceled.connect(self.export_thread.cancel)
+        
+        self.export_thread.start()
+        self.progress_dialog.show()
+    
+    def _on_export_progress(self, done: int, total: int):
+        if total:
+            self.progress_dialog.setMaximum(total)
+            self.progress_dialog.setValue(min(done, total))
+            self.progress_dialog.setLabelText(f"جاري التصدير... {done:,} / {total:,}")
+    
+    def _close_progress(self):
+        # إخفاء النافذة بدون إطلاق canceled
+        self.progress_dialog.canceled.disconnect()
+        self.progress_dialog.close()
+    
+    def _on_export_finished(self, success: bool):
+        self._close_progress()
+        if success:
+            QMessageBox.information(
+                self,
+                "نجح التصدير",
+                f"{self._export_message}\n\nالموقع: {self._export_path}"
+            )
+            self.accept()
+        else:
+            QMessageBox.critical(
+                self,
+                "فشل التصدير",
+                "حدث خطأ أثناء التصدير!\nيرجى المحاولة مرة أخرى."
+            )
+    
+    def _on_export_cancelled(self):
+        self._close_progress()
+        QMessageBox.information(self, "تم الإلغاء", "تم إلغاء التصدير.")
+    
+    def _on_export_failed(self, error: str):
+        self._close_progress()
+        QMessageBox.critical(
+            self,
+            "خطأ",
+            f"حدث خطأ أثناء التصدير:\n\n{error}"
+        )
+    
+    def done(self, result):
+        """إيقاف التصدير الجاري قبل إغلاق النافذة"""
+        thread = getattr(self, "export_thread", None)
+        if thread is not None and thread.isRunning():
+            thread.cancel()
+            thread.wait()
+        super().done(result)
+    
     def get_default_filename(self, data_type, is_excel, is_pdf=False):
         """الحصول على اسم الملف الافتراضي"""
         from datetime import datetime
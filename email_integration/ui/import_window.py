@@ -5,19 +5,37 @@ Data Import Window
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
     QMessageBox, QFileDialog, QGroupBox, QRadioButton,
-    QButtonGroup, QTextEdit, QProgressBar, QTabWidget, QWidget
+    QButtonGroup, QTextEdit, QProgressBar, QTabWidget, QWidget, QComboBox
 )
 from PyQt5.QtGui import QFont
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 import os
 
 from core.import_data import (
     import_clients_from_csv, import_clients_from_excel,
     import_messages_from_csv, import_deals_from_csv,
-    EXCEL_AVAILABLE
+    EXCEL_AVAILABLE, ON_CONFLICT_SKIP, ON_CONFLICT_UPDATE, ON_CONFLICT_FILL
 )
 
 
+class ImportThread(QThread):
+    """تنفيذ الاستيراد في الخلفية (الملف كله في معاملة واحدة)"""
+    finished = pyqtSignal(dict)
+    failed = pyqtSignal(str)
+
+    def __init__(self, import_call, parent=None):
+        super().__init__(parent)
+        self.import_call = import_call
+
+    def run(self):
+        try:
+            results = self.import_call()
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.finished.emit(results)
+
+
 class ImportWindow(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -51,6 +69,18 @@ class ImportWindow(QDialog):
         self.data_button_group.addButton(self.deals_radio, 2)
         data_layout.addWidget(self.deals_radio)
         
+        # العميل الموجود مسبقاً (نفس البريد أو اسم الشركة بدون بريد)
+        conflict_layout = QHBoxLayout()
+        conflict_layout.addWidget(QLabel("العميل الموجود (نفس البريد أو اسم الشركة):"))
+        self.conflict_combo = QComboBox()
+        self.conflict_combo.addItem("تخطي - Skip", ON_CONFLICT_SKIP)
+        self.conflict_combo.addItem("تحديث بقيم الملف - Update", ON_CONFLICT_UPDATE)
+        self.conflict_combo.addItem("ملء الحقول الفارغة فقط - Fill empty", ON_CONFLICT_FILL)
+        conflict_layout.addWidget(self.conflict_combo)
+        conflict_layout.addStretch()
+        data_layout.addLayout(conflict_layout)
+        self.clients_radio.toggled.connect(self.conflict_combo.setEnabled)
+        
         data_group.setLayout(data_layout)
         main_layout.addWidget(data_group)
         
@@ -102,7 +132,7 @@ class ImportWindow(QDialog):
         • للعملاء: يجب أن يحتوي على عمود "Company Name" أو "اسم الشركة"<br>
         • للرسائل: يجب أن يحتوي على عمود "Client" أو "عميل" و "Subject" أو "موضوع"<br>
         • للصفقات: يجب أن يحتوي على عمود "Client" أو "عميل" و "Deal Name" أو "اسم الصفقة"<br>
-        • سيتم تخطي السجلات المكررة تلقائياً<br>
+        • العملاء المكررون (نفس البريد أو اسم الشركة) يُعالجون حسب الخيار أعلاه، والرسائل المكررة تُتخطى<br>
         • سيتم التحقق من صحة البيانات قبل الاستيراد
         """)
         info_text.setWordWrap(True)
@@ -137,10 +167,10 @@ class ImportWindow(QDialog):
         cancel_btn.clicked.connect(self.reject)
         btn_layout.addWidget(cancel_btn)
         
-        import_btn = QPushButton("📥 استيراد")
-        import_btn.setStyleSheet("background-color: #4ECDC4; color: white; font-weight: bold; padding: 8px;")
-        import_btn.clicked.connect(self.do_import)
-        btn_layout.addWidget(import_btn)
+        self.import_btn = QPushButton("📥 استيراد")
+        self.import_btn.setStyleSheet("background-color: #4ECDC4; color: white; font-weight: bold; padding: 8px;")
+        self.import_btn.clicked.connect(self.do_import)
+        btn_layout.addWidget(self.import_btn)
         
         main_layout.addLayout(btn_layout)
         
@@ -191,98 +221,116 @@ class ImportWindow(QDialog):
         data_type = self.data_button_group.checkedId()
         format_type = self.format_button_group.checkedId()
         
+        # الرسائل والصفقات من Excel غير مدعومة بعد
+        if data_type in (1, 2) and format_type == 1:
+            data_label = "الرسائل" if data_type == 1 else "الصفقات"
+            QMessageBox.warning(
+                self,
+                "غير مدعوم",
+                f"استيراد {data_label} من Excel غير متاح حالياً. استخدم CSV."
+            )
+            return
+        
+        file_path = self.file_path
+        if data_type == 0:  # Clients
+            on_conflict = self.conflict_combo.currentData()
+            if format_type == 0:  # CSV
+                import_call = lambda: import_clients_from_csv(file_path, on_conflict=on_conflict)
+            else:  # Excel
+                import_call = lambda: import_clients_from_excel(file_path, on_conflict=on_conflict)
+            self._data_name = "العملاء"
+        elif data_type == 1:  # Messages
+            import_call = lambda: import_messages_from_csv(file_path)
+            self._data_name = "الرسائل"
+        else:  # Deals
+            import_call = lambda: import_deals_from_csv(file_path)
+            self._data_name = "الصفقات"
+        
         # إظهار شريط التقدم
         self.progress_bar.setVisible(True)
         self.progress_bar.setRange(0, 0)  # Indeterminate
         self.results_text.clear()
+        self.import_btn.setEnabled(False)
         
-        try:
-            # استيراد حسب النوع
-            if data_type == 0:  # Clients
-                if format_type == 0:  # CSV
-                    results = import_clients_from_csv(self.file_path)
-                else:  # Excel
-                    results = import_clients_from_excel(self.file_path)
-                data_name = "العملاء"
-            
-            elif data_type == 1:  # Messages
-                if format_type == 1:  # Excel not supported for messages yet
-                    QMessageBox.warning(
-                        self,
-                        "غير مدعوم",
-                        "استيراد الرسائل من Excel غير متاح حالياً. استخدم CSV."
-                    )
-                    self.progress_bar.setVisible(False)
-                    return
-                results = import_messages_from_csv(self.file_path)
-                data_name = "الرسائل"
-            
-            else:  # Deals
-                if format_type == 1:  # Excel not supported for deals yet
-                    QMessageBox.warning(
-                        self,
-                        "غير مدعوم",
-                        "استيراد الصفقات من Excel غير متاح حالياً. استخدم CSV."
-                    )
-                    self.progress_bar.setVisible(False)
-                    return
-                results = import_deals_from_csv(self.file_path)
-                data_name = "الصفقات"
-            
-            # عرض النتائج
-            self.progress_bar.setVisible(False)
-            
-            success_count = results.get('success', 0)
-            failed_count = results.get('failed', 0)
-            skipped_count = results.get('skipped', 0)
-            errors = results.get('errors', [])
-            
-            # رسالة النجاح
-            message = f"""
-            <b>تم الانتهاء من استيراد {data_name}</b><br><br>
-            ✅ نجح: {success_count}<br>
-            ⚠️ تم التخطي: {skipped_count}<br>
-            ❌ فشل: {failed_count}<br>
-            """
-            
-            if errors:
-                message += f"<br><b>الأخطاء ({min(len(errors), 10)} من {len(errors)}):</b><br>"
-                for error in errors[:10]:  # عرض أول 10 أخطاء فقط
-                    message += f"• {error}<br>"
-                if len(errors) > 10:
-                    message += f"<br>... و {len(errors) - 10} خطأ آخر"
-            
-            self.results_text.setHtml(message)
-            
-            # رسالة تأكيد
-            if success_count > 0:
-                QMessageBox.information(
-                    self,
-                    "نجح الاستيراد",
-                    f"تم استيراد {success_count} {data_name} بنجاح!\n\n"
-                    f"تم التخطي: {skipped_count}\n"
-                    f"فشل: {failed_count}"
-                )
-            elif skipped_count > 0 or failed_count > 0:
-                QMessageBox.warning(
-                    self,
-                    "استيراد جزئي",
-                    f"تم التخطي: {skipped_count}\n"
-                    f"فشل: {failed_count}\n\n"
-                    "راجع نتائج الاستيراد أدناه للتفاصيل."
-                )
-            else:
-                QMessageBox.warning(
-                    self,
-                    "لا توجد بيانات",
-                    "لم يتم استيراد أي بيانات. راجع نتائج الاستيراد أدناه."
-                )
-        
-        except Exception as e:
-            self.progress_bar.setVisible(False)
-            QMessageBox.critical(
+        self.import_thread = ImportThread(import_call, self)
+        self.import_thread.finished.connect(self._on_import_finished)
+        self.import_thread.failed.connect(self._on_import_failed)
+        self.import_thread.start()
+    
+    def _on_import_finished(self, results: dict):
+        """عرض نتائج الاستيراد"""
+        self.progress_bar.setVisible(False)
+        self.import_btn.setEnabled(True)
+        data_name = self._data_name
+        
+        success_count = results.get('success', 0)
+        updated_count = results.get('updated', 0)
+        failed_count = results.get('failed', 0)
+        skipped_count = results.get('skipped', 0)
+        errors = results.get('errors', [])
+        warnings = results.get('warnings', [])
+        
+        # رسالة النجاح
+        message = f"""
+        <b>تم الانتهاء من استيراد {data_name}</b><br><br>
+        ✅ نجح: {success_count}<br>
+        🔄 تم التحديث: {updated_count}<br>
+        ⚠️ تم التخطي: {skipped_count}<br>
+        ❌ فشل: {failed_count}<br>
+        """
+        
+        if errors:
+            message += f"<br><b>الأخطاء ({min(len(errors), 10)} من {len(errors)}):</b><br>"
+            for error in errors[:10]:  # عرض أول 10 أخطاء فقط
+                message += f"• {error}<br>"
+            if len(errors) > 10:
+                message += f"<br>... و {len(errors) - 10} خطأ آخر"
+        
+        if warnings:
+            message += f"<br><b>تحذيرات (تم الاستيراد) ({min(len(warnings), 10)} من {len(warnings)}):</b><br>"
+            for warning in warnings[:10]:
+                message += f"• {warning}<br>"
+        
+        self.results_text.setHtml(message)
+        
+        # رسالة تأكيد
+        if success_count > 0 or updated_count > 0:
+            QMessageBox.information(
                 self,
-                "خطأ في الاستيراد",
-                f"حدث خطأ أثناء الاستيراد:\n{str(e)}"
+                "نجح الاستيراد",
+                f"تم استيراد {success_count} {data_name} بنجاح!\n\n"
+                f"تم التحديث: {updated_count}\n"
+                f"تم التخطي: {skipped_count}\n"
+                f"فشل: {failed_count}"
             )
-            self.results_text.setPlainText(f"خطأ: {str(e)}")
+        elif skipped_count > 0 or failed_count > 0:
+            QMessageBox.warning(
+                self,
+                "استيراد جزئي",
+                f"تم التخطي: {skipped_count}\n"
+                f"فشل: {failed_count}\n\n"
+                "راجع نتائج الاستيراد أدناه للتفاصيل."
+            )
+        else:
+            QMessageBox.warning(
+                self,
+                "لا توجد بيانات",
+                "لم يتم استيراد أي بيانات. راجع نتائج الاستيراد أدناه."
+            )
+    
+    def _on_import_failed(self, error: str):
+        self.progress_bar.setVisible(False)
+        self.import_btn.setEnabled(True)
+        QMessageBox.critical(
+            self,
+            "خطأ في الاستيراد",
+            f"حدث خطأ أثناء الاستيراد:\n{error}"
+        )
+        self.results_text.setPlainText(f"خطأ: {error}")
+    
+    def done(self, result):
+        """انتظار انتهاء الاستيراد الجاري قبل إغلاق النافذة (لا يُقطع في منتصف المعاملة)"""
+        thread = getattr(self, "import_thread", None)
+        if thread is not None and thread.isRunning():
+            thread.wait()
+        super().done(result)
@@ -0,0 +1,290 @@
+"""
+نموذج جدول افتراضي يُحمِّل الصفوف عند الحاجة
+Lazily-fetching table model shared by the EFM client grid and the CRM pages
+
+- QTableView + LazyTableModel بدلاً من QTableWidget: لا يوجد QTableWidgetItem لكل خلية
+- الصفوف تُجلب على دفعات عبر canFetchMore / fetchMore عند التمرير فقط
+- الألوان والنصوص تُحسب داخل data() للصفوف الظاهرة فقط
+- الترتيب بالضغط على رأس العمود يتم على كل الصفوف (ORDER BY في SQLite)
+  وليس على الدفعة المحمّلة فقط
+"""
+from typing import Callable, List, Optional, Sequence
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+from PyQt5.QtGui import QBrush
+
+DEFAULT_BATCH_SIZE = 200
+
+
+# =========================
+# Row sources
+# =========================
+class ListRowSource:
+    """مصدر صفوف من قائمة موجودة في الذاكرة (مثل ذاكرة العملاء في MainWindow)"""
+
+    def __init__(self, rows: Sequence, sort_keys: Optional[dict] = None):
+        self._rows = list(rows)
+        self._sort_keys = sort_keys or {}
+
+    def count(self) -> int:
+        return len(self._rows)
+
+    def fetch(self, offset: int, limit: int) -> List:
+        return self._rows[offset:offset + limit]
+
+    def set_order(self, column: int, descending: bool):
+        key = self._sort_keys.get(column, lambda row: row[column])
+        # None يأتي دائماً في النهاية مهما كان اتجاه الترتيب
+        present = [r for r in self._rows if key(r) is not None]
+        missing = [r for r in self._rows if key(r) is None]
+        try:
+            present.sort(key=key, reverse=descending)
+        except TypeError:
+            present.sort(key=lambda r: str(key(r)), reverse=descending)
+        self._rows = present + missing
+
+
+class SqlRowSource:
+    """
+    مصدر صفوف من SQLite بصفحات LIMIT/OFFSET
+
+    Args:
+        connect: دالة تعيد اتصالاً (مثل connect_db أو get_connection)
+        sql: استعلام SELECT بدون ORDER BY
+        params: معاملات الاستعلام
+        order_by: الترتيب الافتراضي (بأسماء أعمدة الاستعلام) مثل "id DESC"
+        transform: دالة اختيارية تُطبَّق على كل دفعة (لإضافة أعمدة محسوبة
+                   باستعلام واحد للدفعة بدلاً من استعلام لكل صف)
+    """
+
+    def __init__(self, connect: Callable, sql: str, params: Sequence = (),
+                 order_by: str = "", transform: Optional[Callable] = None):
+        self._connect = connect
+        self._sql = sql
+        self._params = tuple(params)
+        self._default_order = order_by
+        self._order = order_by
+        self._transform = transform
+
+    def _run(self, sql: str, params: Sequence):
+        conn = self._connect()
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+        conn.close()
+        return rows
+
+    def count(self) -> int:
+        return self._run(f"SELECT COUNT(*) FROM ({self._sql})", self._params)[0][0]
+
+    def fetch(self, offset: int, limit: int) -> List:
+        sql = f"SELECT * FROM ({self._sql})"
+        if self._order:
+            sql += f" ORDER BY {self._order}"
+        sql += " LIMIT ? OFFSET ?"
+        rows = self._run(sql, self._params + (limit, offset))
+        if self._transform and rows:
+            rows = self._transform(rows)
+        return rows
+
+    def set_order(self, column: int, descending: bool):
+        # ORDER BY برقم العمود + الترتيب الافتراضي حتى تبقى الصفحات ثابتة
+        order = f"{column + 1} {'DESC' if descending else 'ASC'}"
+        if self._default_order:
+            order += f", {self._default_order}"
+        self._order = order
+
+
+# =========================
+# Model
+# =========================
+class LazyTableModel(QAbstractTableModel):
+    """
+    نموذج للقراءة فقط يجلب الصفوف من RowSource على دفعات
+
+    Args:
+        headers: عناوين الأعمدة
+        display: دالة (row, column) -> نص الخلية (الافتراضي str(row[column]))
+        background / foreground: دالة (row, row_number) -> QColor أو None
+        key_column: العمود الذي يُعاد مع Qt.UserRole (المعرف)
+        alignment: محاذاة النص في كل الخلايا
+    """
+
+    def __init__(self, headers: Sequence[str], source=None,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 display: Optional[Callable] = None,
+                 background: Optional[Callable] = None,
+                 foreground: Optional[Callable] = None,
+                 key_column: int = 0,
+                 alignment=None,
+                 parent=None):
+        super().__init__(parent)
+        self._headers = list(headers)
+        self._source = source
+        self._batch_size = batch_size
+        self._display = display
+        self._background = background
+        self._foreground = foreground
+        self._key_column = key_column
+        self._alignment = alignment
+        self._rows: List = []
+        self._exhausted = source is None
+        self._sort_order = None  # (column, Qt.SortOrder) آخر ترتيب من رأس الجدول
+
+    # ----- البيانات -----
+    def set_source(self, source):
+        """استبدال مصدر الصفوف (بعد تغيير الفلاتر مثلاً) مع الإبقاء على الترتيب الحالي"""
+        self._source = source
+        if source is not None and self._sort_order is not None:
+            column, order = self._sort_order
+            source.set_order(column, order == Qt.DescendingOrder)
+        self.refresh()
+
+    def refresh(self):
+        """إعادة التحميل من البداية مع جلب أول دفعة فوراً"""
+        self.beginResetModel()
+        self._rows = []
+        self._exhausted = self._source is None
+        self.endResetModel()
+        if not self._exhausted:
+            self.fetchMore(QModelIndex())
+
+    def row_data(self, row: int):
+        """الصف الأصلي (tuple) في موضع معيّن من النموذج"""
+        if 0 <= row < len(self._rows):
+            return self._rows[row]
+        return None
+
+    def total_count(self) -> int:
+        """عدد كل الصفوف في المصدر (وليس المحمّلة فقط)"""
+        return self._source.count() if self._source is not None else 0
+
+    # ----- Lazy fetching -----
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        batch = self._source.fetch(len(self._rows), self._batch_size)
+        if len(batch) < self._batch_size:
+            self._exhausted = True
+        if not batch:
+            return
+        start = len(self._rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(batch) - 1)
+        self._rows.extend(batch)
+        self.endInsertRows()
+
+    # ----- QAbstractTableModel -----
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            if 0 <= section < len(self._headers):
+                return self._headers[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+
+        if role == Qt.DisplayRole:
+            if self._display:
+                return self._display(row, index.column())
+            value = row[index.column()]
+            return "" if value is None else str(value)
+        if role == Qt.UserRole:
+            return row[self._key_column]
+        if role == Qt.BackgroundRole and self._background:
+            color = self._background(row, index.row())
+            return QBrush(color) if color is not None else None
+        if role == Qt.ForegroundRole and self._foreground:
+            color = self._foreground(row, index.row())
+            return QBrush(color) if color is not None else None
+        if role == Qt.TextAlignmentRole and self._alignment is not None:
+            return self._alignment
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self._sort_order = (column, order)
+        if self._source is None:
+            return
+        self._source.set_order(column, order == Qt.DescendingOrder)
+        self.refresh()
+
+
+class LazySortFilterProxyModel(QSortFilterProxyModel):
+    """
+    Proxy فوق LazyTableModel
+
+    - الترتيب يُمرَّر للمصدر (كل الصفوف) بدلاً من ترتيب الدفعة المحمّلة فقط
+    - set_row_filter(predicate) لفلترة سريعة على الصفوف المحمّلة (tuple -> bool)
+    - canFetchMore / fetchMore تُمرَّر تلقائياً من QSortFilterProxyModel
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._row_filter = None
+        self.setDynamicSortFilter(False)
+
+    def set_row_filter(self, predicate: Optional[Callable]):
+        self._row_filter = predicate
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if self._row_filter is None:
+            return True
+        row = self.sourceModel().row_data(source_row)
+        return row is not None and self._row_filter(row)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        source = self.sourceModel()
+        if source is not None:
+            source.sort(column, order)
+
+
+def create_lazy_view_model(view, model: LazyTableModel) -> LazySortFilterProxyModel:
+    """ربط النموذج مع QTableView عبر Proxy"""
+    proxy = LazySortFilterProxyModel(view)
+    proxy.setSourceModel(model)
+    view.setModel(proxy)
+    return proxy
+
+
+def selected_row_data(view) -> Optional[tuple]:
+    """الصف الحالي في QTableView (الصف الأصلي من المصدر) أو None"""
+    index = view.currentIndex()
+    if not index.isValid():
+        return None
+    return _source_row(view, index)
+
+
+def selected_rows_data(view) -> List[tuple]:
+    """كل الصفوف المحددة (تحديد متعدد) بترتيب ظهورها"""
+    indexes = sorted(view.selectionModel().selectedRows(), key=lambda i: i.row()) \
+        if view.selectionModel() else []
+    rows = []
+    for index in indexes:
+        row = _source_row(view, index)
+        if row is not None:
+            rows.append(row)
+    return rows
+
+
+def _source_row(view, index):
+    model = view.model()
+    if isinstance(model, QSortFilterProxyModel):
+        index = model.mapToSource(index)
+        model = model.sourceModel()
+    return model.row_data(index.row())
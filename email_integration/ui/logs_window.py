@@ -5,13 +5,38 @@ Application Logs Viewer Window
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel,
     QPushButton, QTextEdit, QComboBox, QMessageBox,
-    QGroupBox, QFileDialog
+    QGroupBox, QFileDialog, QLineEdit
 )
 from PyQt5.QtGui import QFont
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from pathlib import Path
 
-from core.logging_system import get_logger
+from core.logging_system import get_logger, get_log_index
+from core.log_index import format_log_record
+
+# عدد السجلات في الصفحة
+LOGS_PAGE_SIZE = 200
+
+# نوع العرض -> أنواع السجلات في الفهرس
+# (أخطاء التطبيق تُكتب في app.log أيضاً فـ All = app + sync بدون تكرار)
+LOG_TYPE_SOURCES = {
+    "Errors": ["error"],
+    "Application": ["app"],
+    "Sync": ["sync"],
+    "All": ["app", "sync"],
+}
+
+
+class LogIndexThread(QThread):
+    """فهرسة السجلات الجديدة (الإضافات فقط) في الخلفية"""
+    finished = pyqtSignal(int)
+    failed = pyqtSignal(str)
+
+    def run(self):
+        try:
+            self.finished.emit(get_log_index().refresh())
+        except Exception as e:
+            self.failed.emit(str(e))
 
 
 class LogsWindow(QDialog):
@@ -38,14 +63,31 @@ class LogsWindow(QDialog):
         
         self.log_type_combo = QComboBox()
         self.log_type_combo.addItems(["Errors", "Application", "Sync", "All"])
-        self.log_type_combo.currentIndexChanged.connect(self.load_logs)
+        self.log_type_combo.currentIndexChanged.connect(self.reload_filters)
         filter_layout.addWidget(self.log_type_combo)
         
+        filter_layout.addWidget(QLabel("Level:"))
+        self.level_combo = QComboBox()
+        self.level_combo.addItems(["All", "ERROR", "WARNING", "INFO"])
+        self.level_combo.currentIndexChanged.connect(self.first_page)
+        filter_layout.addWidget(self.level_combo)
+        
+        filter_layout.addWidget(QLabel("Context:"))
+        self.context_combo = QComboBox()
+        self.context_combo.setMinimumWidth(150)
+        self.context_combo.currentIndexChanged.connect(self.first_page)
+        filter_layout.addWidget(self.context_combo)
+        
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("🔍 بحث في الرسائل...")
+        self.search_edit.returnPressed.connect(self.first_page)
+        filter_layout.addWidget(self.search_edit)
+        
         filter_layout.addStretch()
         
         # Refresh button
         refresh_btn = QPushButton("🔄 Refresh")
-        refresh_btn.clicked.connect(self.load_logs)
+        refresh_btn.clicked.connect(self.refresh_logs)
         filter_layout.addWidget(refresh_btn)
         
         # Clear button
@@ -78,11 +120,25 @@ class LogsWindow(QDialog):
         """)
         logs_layout.addWidget(self.logs_text)
         
+        # Paging
+        paging_layout = QHBoxLayout()
+        self.newer_btn = QPushButton("◀ Newer")
+        self.newer_btn.clicked.connect(self.newer_page)
+        paging_layout.addWidget(self.newer_btn)
+        self.page_label = QLabel("")
+        self.page_label.setAlignment(Qt.AlignCenter)
+        paging_layout.addWidget(self.page_label, 1)
+        self.older_btn = QPushButton("Older ▶")
+        self.older_btn.clicked.connect(self.older_page)
+        paging_layout.addWidget(self.older_btn)
+        logs_layout.addLayout(paging_layout)
+        
         logs_group.setLayout(logs_layout)
         layout.addWidget(logs_group)
         
         # Info
-        info_label = QLabel("ℹ️ Logs are automatically rotated when they reach 10 MB. Last 5 backups are kept.")
+        info_label = QLabel("ℹ️ Logs are automatically rotated when they reach 10 MB. Last 5 backups are kept. "
+                            "The search index keeps records for 365 days.")
         info_label.setStyleSheet("color: #666666; font-size: 9px;")
         layout.addWidget(info_label)
         
@@ -91,36 +147,91 @@ class LogsWindow(QDialog):
         close_btn.clicked.connect(self.accept)
         layout.addWidget(close_btn)
         
+        self.page = 0
+        self.total_records = 0
+        self._index_thread = None
+        
         # Load initial logs
+        self.reload_filters()
+        self.refresh_logs()
+    
+    def refresh_logs(self):
+        """فهرسة الإضافات الجديدة في الخلفية ثم إعادة العرض"""
+        if self._index_thread is not None and self._index_thread.isRunning():
+            return
+        self.page_label.setText("⏳ Indexing logs...")
+        self._index_thread = LogIndexThread(self)
+        self._index_thread.finished.connect(self._on_index_refreshed)
+        self._index_thread.failed.connect(self._on_index_failed)
+        self._index_thread.start()
+    
+    def _on_index_refreshed(self, added: int):
+        self.reload_filters()
+    
+    def _on_index_failed(self, error: str):
+        QMessageBox.warning(self, "Logs Index", f"Failed to index logs:\n{error}")
         self.load_logs()
     
+    def _sources(self) -> list:
+        return LOG_TYPE_SOURCES.get(self.log_type_combo.currentText(), ["app"])
+    
+    def reload_filters(self):
+        """تحديث قائمة context حسب نوع السجل ثم عرض الصفحة الأولى"""
+        current = self.context_combo.currentData()
+        self.context_combo.blockSignals(True)
+        self.context_combo.clear()
+        self.context_combo.addItem("All", None)
+        try:
+            for context in get_log_index().contexts(self._sources()):
+                self.context_combo.addItem(context, context)
+        except Exception:
+            pass
+        index = self.context_combo.findData(current) if current else 0
+        self.context_combo.setCurrentIndex(max(index, 0))
+        self.context_combo.blockSignals(False)
+        self.first_page()
+    
+    def first_page(self):
+        self.page = 0
+        self.load_logs()
+    
+    def newer_page(self):
+        if self.page > 0:
+            self.page -= 1
+            self.load_logs()
+    
+    def older_page(self):
+        if (self.page + 1) * LOGS_PAGE_SIZE < self.total_records:
+            self.page += 1
+            self.load_logs()
+    
     def load_logs(self):
-        """تحميل Logs"""
+        """تحميل صفحة من السجلات من الفهرس حسب الفلاتر"""
         try:
-            log_type = self.log_type_combo.currentText()
+            level = self.level_combo.currentText()
+            records, self.total_records = get_log_index().query(
+                self._sources(),
+                level=None if level == "All" else level,
+                context=self.context_combo.currentData(),
+                search=self.search_edit.text().strip() or None,
+                limit=LOGS_PAGE_SIZE,
+                offset=self.page * LOGS_PAGE_SIZE,
+            )
             
             self.logs_text.clear()
             
-            if log_type == "Errors":
-                logs = self.logger.get_error_logs(limit=200)
-                content = "\n".join(logs)
-            elif log_type == "Application":
-                logs = self.logger.get_app_logs(limit=200)
-                content = "\n".join(logs)
-            elif log_type == "Sync":
-                logs = self.logger.get_app_logs(limit=200)  # Sync logs in app log
-                content = "\n".join([log for log in logs if "[Sync]" in log or "sync" in log.lower()])
-            else:  # All
-                error_logs = self.logger.get_error_logs(limit=100)
-                app_logs = self.logger.get_app_logs(limit=100)
-                content = "=== ERROR LOGS ===\n" + "\n".join(error_logs)
-                content += "\n\n=== APPLICATION LOGS ===\n" + "\n".join(app_logs)
-            
+            # الأقدم في الأعلى والأحدث في الأسفل
+            content = "\n".join(format_log_record(record) for record in reversed(records))
             if not content.strip():
                 content = "No logs available."
             
             self.logs_text.setPlainText(content)
             
+            pages = max(1, -(-self.total_records // LOGS_PAGE_SIZE))
+            self.page_label.setText(f"Page {self.page + 1} / {pages} — {self.total_records:,} records")
+            self.newer_btn.setEnabled(self.page > 0)
+            self.older_btn.setEnabled(self.page + 1 < pages)
+            
             # Scroll to bottom
             cursor = self.logs_text.textCursor()
             cursor.movePosition(cursor.End)
@@ -156,7 +267,7 @@ class LogsWindow(QDialog):
                 else:  # All
                     self.logger.clear_logs("all")
                 
-                self.load_logs()
+                self.reload_filters()
                 
                 QMessageBox.information(
                     self,
@@ -199,3 +310,9 @@ class LogsWindow(QDialog):
                 "Error",
                 f"Failed to export logs:\n{str(e)}"
             )
+    
+    def done(self, result):
+        """انتظار انتهاء الفهرسة الجارية قبل إغلاق النافذة"""
+        if self._index_thread is not None and self._index_thread.isRunning():
+            self._index_thread.wait()
+        super().done(result)
@@ -1,14 +1,15 @@
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QLabel, QPushButton, QTableWidget, QTableWidgetItem,
+    QLabel, QPushButton, QTableView, QAbstractItemView,
     QMessageBox, QLineEdit, QComboBox, QGroupBox,
     QGridLayout, QToolButton, QMenu, QAction, QDialog,
     QScrollArea, QFrame, QSystemTrayIcon
 )
-from PyQt5.QtGui import QColor, QBrush, QClipboard, QFont
+from PyQt5.QtGui import QColor, QClipboard, QFont
 from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal
 from PyQt5.QtWidgets import QApplication
-from datetime import datetime
+from datetime import datetime, timedelta
+from time import perf_counter
 from typing import List, Dict, Optional
 
 from core.db import (
@@ -16,6 +17,7 @@ from core.db import (
     ensure_focus_column,
     ensure_requests_reply_status_column,  # ✅ أضف هذا السطر
     get_all_clients,
+    get_filtered_client_ids,
     get_client_by_id,
     get_clients_needing_followup,
     find_client_by_email,
@@ -27,6 +29,12 @@ from core.db import (
     delete_client,
     save_request
 )
+from core.client_search import ClientSearchIndex
+from core.job_scheduler import JobScheduler
+from ui.lazy_table_model import (
+    LazyTableModel, ListRowSource, create_lazy_view_model,
+    selected_row_data, selected_rows_data
+)
 from core.dashboard import (
     get_dashboard_stats,
     get_actions_needed,
@@ -34,6 +42,7 @@ from core.dashboard import (
 )
 from core.settings import load_settings
 from core.logging_system import get_logger, log_error, log_info, log_warning, log_sync
+from core.instrumentation import sync_run
 from core.theme import get_theme_manager
 
 # 🔐 Outlook / Graph
@@ -62,6 +71,7 @@ from ui.products_window import ProductsWindow
 from ui.quotes_window import QuotesWindow
 from ui.settings_window import SettingsWindow
 from ui.logs_window import LogsWindow
+from ui.performance_window import PerformanceWindow
 from ui.sync_window import SyncWindow
 
 
@@ -99,53 +109,71 @@ class FetchMessagesThread(QThread):
     finished = pyqtSignal(list)
     failed = pyqtSignal(str)
 
-    def __init__(self, account_type: str, graph_token: str = None, imap_params: dict = None, cpanel_params: dict = None):
+    def __init__(self, account_type: str, graph_token: str = None, imap_params: dict = None, cpanel_params: dict = None,
+                 delta_link: str = None, imap_state: tuple = None):
         super().__init__()
         self.account_type = account_type
         self.graph_token = graph_token
         self.imap_params = imap_params or {}
         self.cpanel_params = cpanel_params or {}
+        # Outlook: رابط Graph delta المحفوظ (None = جولة أولية) والرابط الجديد بعد القراءة
+        self.delta_link = delta_link
+        self.new_delta_link = None
+        # IMAP: (uidvalidity, last_uid) المحفوظة والحالة الجديدة بعد القراءة
+        self.imap_state = imap_state or (None, 0)
+        self.new_imap_state = None
+        # زمن القراءة (مرحلة fetch في قياس جولة المزامنة)
+        self.fetch_seconds = 0.0
 
     def run(self):
+        started = perf_counter()
         try:
-            if self.account_type == "outlook":
-                from core.ms_mail_reader import read_messages_from_folder
-                messages = read_messages_from_folder(
-                    self.graph_token,
-                    folder_name="Inbox",
-                    top=100,
-                    max_messages=500
-                )
-                self.finished.emit(messages or [])
-                return
-
-            if self.account_type == "cpanel_api":
-                from core.cpanel_api_reader import read_messages_from_cpanel_api
-                messages = read_messages_from_cpanel_api(
-                    cpanel_host=self.cpanel_params.get("cpanel_host"),
-                    cpanel_username=self.cpanel_params.get("cpanel_username"),
-                    api_token=self.cpanel_params.get("cpanel_api_token"),
-                    email_account=self.cpanel_params.get("email_account"),
-                    max_messages=500
-                )
-                self.finished.emit(messages or [])
-                return
-
-            # default: IMAP
-            from core.imap_reader import read_messages_from_imap
-            messages = read_messages_from_imap(
-                imap_server=self.imap_params.get("imap_server"),
-                imap_port=self.imap_params.get("imap_port", 993),
-                username=self.imap_params.get("imap_username"),
-                password=self.imap_params.get("imap_password"),
-                use_ssl=self.imap_params.get("use_ssl", True),
-                folder="INBOX",
-                max_messages=500,
-                timeout=30
-            )
-            self.finished.emit(messages or [])
+            messages = self._fetch()
         except Exception as e:
             self.failed.emit(str(e))
+            return
+        self.fetch_seconds = perf_counter() - started
+        self.finished.emit(messages or [])
+
+    def _fetch(self) -> list:
+        if self.account_type == "outlook":
+            # التغييرات فقط منذ آخر مزامنة (messages/delta)
+            from core.ms_mail_reader import read_messages_delta
+            from core.message_filter import should_fetch_full_body
+            messages, self.new_delta_link = read_messages_delta(
+                self.graph_token,
+                delta_link=self.delta_link,
+                body_filter=should_fetch_full_body
+            )
+            return messages
+
+        if self.account_type == "cpanel_api":
+            from core.cpanel_api_reader import read_messages_from_cpanel_api
+            messages = read_messages_from_cpanel_api(
+                cpanel_host=self.cpanel_params.get("cpanel_host"),
+                cpanel_username=self.cpanel_params.get("cpanel_username"),
+                api_token=self.cpanel_params.get("cpanel_api_token"),
+                email_account=self.cpanel_params.get("email_account"),
+                max_messages=500
+            )
+            return messages
+
+        # default: IMAP - الرسائل ذات UID أكبر من آخر مزامنة فقط
+        from core.imap_reader import read_new_messages_from_imap
+        uidvalidity, last_uid = self.imap_state
+        messages, self.new_imap_state = read_new_messages_from_imap(
+            imap_server=self.imap_params.get("imap_server"),
+            imap_port=self.imap_params.get("imap_port", 993),
+            username=self.imap_params.get("imap_username"),
+            password=self.imap_params.get("imap_password"),
+            use_ssl=self.imap_params.get("use_ssl", True),
+            folder="INBOX",
+            uidvalidity=uidvalidity,
+            last_uid=last_uid,
+            max_messages=500,
+            timeout=30
+        )
+        return messages
 
 
 class ProcessMessagesThread(QThread):
@@ -157,141 +185,31 @@ class ProcessMessagesThread(QThread):
     finished = pyqtSignal(dict)
     failed = pyqtSignal(str)
 
-    def __init__(self, messages: list, account_type: str, mode: str):
+    def __init__(self, messages: list, account_type: str, mode: str, fetch_seconds: float = 0.0):
         super().__init__()
         self.messages = messages or []
         self.account_type = account_type  # "outlook" or others
         self.mode = mode or "all"
+        self.fetch_seconds = fetch_seconds
 
     def run(self):
-        try:
-            from core.message_filter import should_import_message, detect_request_type
-            from core.ai_reply_scoring import detect_positive_reply
-            from core.db import (
-                get_focus_emails, find_client_by_email, add_client, add_message, save_request
-            )
-            from datetime import datetime as dt
-
-            focus_emails = set(get_focus_emails()) if self.mode == "focus" else set()
-
-            created = 0
-            linked = 0
-            filtered = 0
-            focus_notifications = 0
-
-            total_messages = len(self.messages)
-            processed = 0
-
-            for msg in self.messages:
-                processed += 1
-                if processed % 10 == 0 or processed == 1 or processed == total_messages:
-                    self.progress.emit(f"⏳ جاري مزامنة الرسائل... ({processed}/{total_messages})")
-
-                sender_info = msg.get("from", {}).get("emailAddress", {})
-                sender = sender_info.get("address", "")
-                sender_name = sender_info.get("name", "")
-
-                if not sender or "@" not in sender:
-                    continue
-
-                subject = msg.get("subject", "")
-                body = msg.get("body", {}).get("content", "")
-
-                # استخراج التاريخ الفعلي للرسالة
-                actual_date = None
-                if self.account_type == "outlook":
-                    received_date = msg.get("receivedDateTime") or msg.get("sentDateTime")
-                    if received_date:
-                        try:
-                            date_obj = dt.fromisoformat(received_date.replace('Z', '+00:00'))
-                            actual_date = date_obj.strftime("%d/%m/%Y")
-                        except Exception:
-                            pass
-                else:
-                    actual_date = msg.get("date") or None
-                    if not actual_date:
-                        received_date = msg.get("receivedDateTime")
-                        if received_date:
-                            try:
-                                if isinstance(received_date, str):
-                                    if 'T' in received_date:
-                                        date_obj = dt.fromisoformat(received_date.replace('Z', '+00:00'))
-                                    else:
-                                        date_obj = dt.fromisoformat(received_date)
-                                    actual_date = date_obj.strftime("%d/%m/%Y")
-                            except Exception:
-                                pass
-
-                # فلترة الرسائل
-                should_import, _reason = should_import_message(subject, body, sender)
-                if not should_import:
-                    filtered += 1
-                    continue
+        # قياس الجولة (القراءة من FetchMessagesThread + المعالجة هنا) لنافذة الأداء
+        with sync_run(f"{self.account_type}_sync") as perf:
+            perf.add_external_phase("fetch", self.fetch_seconds)
+            self._process(perf)
 
-                # focus only
-                if self.mode == "focus" and sender.lower() not in focus_emails:
-                    filtered += 1
-                    continue
-
-                is_focus_client = sender.lower() in focus_emails
-                if is_focus_client:
-                    focus_notifications += 1  # سنعرضها لاحقاً من الواجهة
-
-                client = find_client_by_email(sender)
-                if not client:
-                    add_client({
-                        "company_name": sender_name or sender.split("@")[0],
-                        "country": None,
-                        "contact_person": sender_name,
-                        "email": sender,
-                        "phone": None,
-                        "website": None,
-                        "date_added": dt.now().strftime("%d/%m/%Y"),
-                        "status": "New",
-                        "seriousness_score": 0,
-                        "classification": None,
-                        "is_focus": 1 if is_focus_client else 0
-                    })
-                    client = find_client_by_email(sender)
-                    created += 1
-
-                # اكتشاف نوع الطلب
-                request_type, score = detect_request_type(subject, body)
-                if request_type != "General Inquiry":
-                    save_request(
-                        client_email=sender,
-                        request_type=request_type,
-                        extracted_text=body
-                    )
-
-                score_effect = 0
-                if len(body) > 50:
-                    try:
-                        score_effect = detect_positive_reply(body)
-                    except Exception:
-                        pass
-                score_effect += score
-
-                add_message({
-                    "client_id": client[0],
-                    "message_date": dt.now().strftime("%d/%m/%Y"),
-                    "actual_date": actual_date,
-                    "message_type": "Email",
-                    "channel": "Outlook" if self.account_type == "outlook" else "IMAP",
-                    "client_response": subject,
-                    "notes": body,
-                    "score_effect": score_effect
-                })
+    def _process(self, perf):
+        try:
+            from core.sync_engine import process_messages
+            result = process_messages(self.messages, self.account_type, self.mode,
+                                      progress=self.progress.emit)
 
-                linked += 1
+            perf.count("messages", result["total_messages"])
+            perf.count("saved", result["linked"])
+            perf.count("filtered", result["filtered"])
+            perf.count("incomplete", result["incomplete"])
 
-            self.finished.emit({
-                "created": created,
-                "linked": linked,
-                "filtered": filtered,
-                "focus_notifications": focus_notifications,
-                "total_messages": total_messages,
-            })
+            self.finished.emit(result)
         except Exception as e:
             self.failed.emit(str(e))
 
@@ -317,9 +235,18 @@ class MainWindow(QMainWindow):
             pass
 
         self.all_clients = []
+        self.client_search_index = ClientSearchIndex()
+        self._client_positions = {}
+        self._shown_client_ids = None
         self.graph_token = None
         self.current_account_id = None  # ID الحساب المحدد حالياً
         
+        # خيط المهام الدورية: المؤقتات تجدول فقط والفحص يتم في الخلفية
+        self.job_scheduler = JobScheduler(self)
+        self.job_scheduler.job_finished.connect(self._on_background_job_finished)
+        self.job_scheduler.job_failed.connect(self._on_background_job_failed)
+        self.job_scheduler.start()
+        
         # Timer للنسخ الاحتياطي التلقائي - التحقق كل ساعة
         self.backup_timer = QTimer(self)
         self.backup_timer.timeout.connect(self.check_scheduled_backup)
@@ -339,9 +266,6 @@ class MainWindow(QMainWindow):
         self.notification_manager = None
         self.notification_timer = None
         self.init_notifications()
-        
-        # تتبع آخر رسالة تم فحصها
-        self.last_checked_message_id = None
 
         central = QWidget()
         self.setCentralWidget(central)
@@ -361,7 +285,12 @@ class MainWindow(QMainWindow):
 
         self.search_box = QLineEdit()
         self.search_box.setPlaceholderText("🔍 Search company, country, email...")
-        self.search_box.textChanged.connect(self.apply_filters)
+        # تأخير البحث حتى يتوقف المستخدم عن الكتابة (debounce)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.apply_filters)
+        self.search_box.textChanged.connect(self.search_timer.start)
 
         self.class_filter = QComboBox()
         self.class_filter.addItems([
@@ -686,6 +615,13 @@ class MainWindow(QMainWindow):
         self.logs_btn.setStyleSheet("background-color: #34495E; color: white; font-weight: bold; border-radius: 5px;")
         data_group_layout.addWidget(self.logs_btn)
         
+        self.performance_btn = QPushButton("⏱️ Performance")
+        self.performance_btn.clicked.connect(self.open_performance)
+        self.performance_btn.setMinimumWidth(100)
+        self.performance_btn.setMinimumHeight(35)
+        self.performance_btn.setStyleSheet("background-color: #34495E; color: white; font-weight: bold; border-radius: 5px;")
+        data_group_layout.addWidget(self.performance_btn)
+        
         data_group_layout.addStretch()
         
         data_group.setLayout(data_group_layout)
@@ -699,15 +635,22 @@ class MainWindow(QMainWindow):
         main_layout.addWidget(buttons_container)
 
         # ===== Clients Table =====
-        self.table = QTableWidget()
-        self.table.setColumnCount(9)
-        self.table.setHorizontalHeaderLabels([
-            "Company", "Country", "Contact", "Email",
-            "Date Added", "Status", "Score", "Classification", "⭐"
-        ])
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.table.setSelectionMode(QTableWidget.ExtendedSelection)  # تفعيل تحديد متعدد
+        # جدول افتراضي: الصفوف تُجلب على دفعات والألوان تُحسب للصفوف الظاهرة فقط
+        self._grid_is_dark = False
+        self.table = QTableView()
+        self.client_model = LazyTableModel(
+            ["Company", "Country", "Contact", "Email",
+             "Date Added", "Status", "Score", "Classification", "⭐"],
+            display=self._client_cell_text,
+            background=self._client_row_background,
+            foreground=self._client_row_foreground,
+            alignment=int(Qt.AlignLeft | Qt.AlignVCenter),
+            parent=self
+        )
+        self.client_proxy = create_lazy_view_model(self.table, self.client_model)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.ExtendedSelection)  # تفعيل تحديد متعدد
         self.table.setSortingEnabled(True)
         self.table.horizontalHeader().setStretchLastSection(True)
         # تعطيل الألوان المتناوبة لأننا نطبقها يدوياً
@@ -731,12 +674,12 @@ class MainWindow(QMainWindow):
     # SAFE Edit Client
     # ==============================
     def edit_client_safe(self):
-        row = self.table.currentRow()
-        if row < 0:
+        selected = self.selected_client()
+        if selected is None:
             QMessageBox.warning(self, "Select Client", "Please select a client first.")
             return
 
-        client_id = self.table.item(row, 0).data(Qt.UserRole)
+        client_id = selected[0]
 
         dlg = EditClientPopup(client_id, self.load_clients)
         dlg.exec_()
@@ -746,12 +689,12 @@ class MainWindow(QMainWindow):
     # Toggle Focus
     # ==============================
     def toggle_focus(self):
-        row = self.table.currentRow()
-        if row < 0:
+        selected = self.selected_client()
+        if selected is None:
             QMessageBox.warning(self, "Select Client", "Please select a client first.")
             return
 
-        client_id = self.table.item(row, 0).data(Qt.UserRole)
+        client_id = selected[0]
         client = get_client_by_id(client_id)
 
         if not client:
@@ -783,9 +726,7 @@ class MainWindow(QMainWindow):
     # ==============================
     def delete_selected_client(self):
         # الحصول على جميع الصفوف المحددة
-        selected_rows = set()
-        for item in self.table.selectedItems():
-            selected_rows.add(item.row())
+        selected_rows = selected_rows_data(self.table)
         
         if not selected_rows:
             QMessageBox.warning(self, "تحديد عملاء", "يرجى تحديد عميل أو أكثر أولاً.")
@@ -793,9 +734,9 @@ class MainWindow(QMainWindow):
 
         # الحصول على معلومات العملاء المحددين
         selected_clients = []
-        for row in sorted(selected_rows):
-            client_id = self.table.item(row, 0).data(Qt.UserRole)
-            company = self.table.item(row, 0).text()
+        for selected in selected_rows:
+            client_id = selected[0]
+            company = selected[1] or ""
             selected_clients.append((client_id, company))
         
         # إعداد رسالة التأكيد
@@ -1138,12 +1079,26 @@ class MainWindow(QMainWindow):
                         "use_ssl": use_ssl,
                     }
 
+            # رابط delta المحفوظ: "all" و "focus" لكل منهما رابط مستقل
+            # لأن مزامنة Focus تتجاهل رسائل باقي العملاء
+            delta_kind = "focus" if mode == "focus" else "sync"
+            delta_link = None
+            imap_state = None
+            if fetch_type == "outlook":
+                from core.db import get_account_delta_state
+                delta_link, _synced_at = get_account_delta_state(account[0], delta_kind)
+            elif fetch_type == "imap":
+                from core.db import get_imap_sync_state
+                imap_state = get_imap_sync_state(account[0], "INBOX", delta_kind)
+
             # حفظ سياق المزامنة للمرحلة الثانية (المعالجة)
             self._sync_status_msg = status_msg
             self._sync_context = {
                 "account": account,
                 "account_type": account_type,
                 "mode": mode,
+                "delta_kind": delta_kind,
+                "started_at": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
             }
 
             # إيقاف أي thread سابق
@@ -1158,6 +1113,8 @@ class MainWindow(QMainWindow):
                 graph_token=graph_token,
                 imap_params=imap_params,
                 cpanel_params=cpanel_params,
+                delta_link=delta_link,
+                imap_state=imap_state,
             )
 
             self._sync_fetch_thread.finished.connect(self._on_fetch_messages_finished)
@@ -1226,9 +1183,12 @@ class MainWindow(QMainWindow):
                             except:
                                 pass
                 
+                # تحليل واحد للرسالة (HTML -> نص، الكلمات، نوع الطلب، التقييم) يُحفظ معها
+                from core.message_analysis import analyze_message
+                analysis = analyze_message(subject, body, sender_email=sender)
+
                 # فلترة الرسائل - استيراد فقط الرسائل المتعلقة بالعمل
-                should_import, reason = should_import_message(subject, body, sender)
-                if not should_import:
+                if not analysis.should_import:
                     filtered += 1
                     continue
 
@@ -1237,8 +1197,6 @@ class MainWindow(QMainWindow):
                     filtered += 1
                     continue
 
-                from core.ai_reply_scoring import detect_positive_reply
-
                 client = find_client_by_email(sender)
 
                 # التحقق إذا كان العميل من Focus Clients
@@ -1274,28 +1232,13 @@ class MainWindow(QMainWindow):
                     focus_notifications += 1
                     self.show_focus_client_notification(sender, subject, is_new=False)
 
-                # اكتشاف نوع الطلب
-                request_type, score = detect_request_type(subject, body)
-                
-                if request_type != "General Inquiry":
+                if analysis.request_type != "General Inquiry":
                     save_request(
                         client_email=sender,
-                        request_type=request_type,
-                        extracted_text=body
+                        request_type=analysis.request_type,
+                        extracted_text=analysis.text
                     )
 
-                score_effect = 0
-                # تحسين الأداء: تخطي detect_positive_reply للرسائل القصيرة جداً
-                is_client_reply = True
-                if is_client_reply and len(body) > 50:  # فقط للرسائل الطويلة
-                    try:
-                        score_effect = detect_positive_reply(body)
-                    except:
-                        pass  # تخطي في حالة الخطأ لتسريع المزامنة
-                
-                # إضافة النقاط من الطلبات
-                score_effect += score
-
                 add_message({
                     "client_id": client[0],
                     "message_date": datetime.now().strftime("%d/%m/%Y"),
@@ -1304,7 +1247,9 @@ class MainWindow(QMainWindow):
                     "channel": "Outlook" if account_type == "outlook" else "IMAP",
                     "client_response": subject,
                     "notes": body,
-                    "score_effect": score_effect
+                    "score_effect": analysis.score_effect,
+                    "analysis": analysis,
+                    "internet_message_id": msg.get("internetMessageId")
                 })
 
                 linked += 1
@@ -1389,6 +1334,7 @@ class MainWindow(QMainWindow):
                 QApplication.processEvents()
 
             if not messages:
+                self._save_sync_state()
                 if status_msg:
                     status_msg.close()
                 QMessageBox.information(self, "لا توجد رسائل", "لم يتم العثور على رسائل جديدة للمزامنة.")
@@ -1405,7 +1351,8 @@ class MainWindow(QMainWindow):
             self._sync_process_thread = ProcessMessagesThread(
                 messages=messages,
                 account_type=account_type,
-                mode=mode
+                mode=mode,
+                fetch_seconds=self._sync_fetch_thread.fetch_seconds if self._sync_fetch_thread else 0.0
             )
             self._sync_process_thread.progress.connect(self._on_process_messages_progress)
             self._sync_process_thread.finished.connect(self._on_process_messages_finished)
@@ -1442,10 +1389,34 @@ class MainWindow(QMainWindow):
             self._sync_cleanup()
 
 
+    def _save_sync_state(self):
+        """
+        حفظ رابط delta (Outlook) أو آخر UID (IMAP) بعد نجاح المعالجة فقط
+        حتى لا تضيع رسائل عند الفشل
+        """
+        thread = self._sync_fetch_thread
+        context = self._sync_context or {}
+        if not thread or not context.get("account"):
+            return
+        account_id = context["account"][0]
+        kind = context.get("delta_kind", "sync")
+        try:
+            from core.db import save_account_delta_state, save_imap_sync_state
+            if thread.new_delta_link:
+                save_account_delta_state(account_id, thread.new_delta_link,
+                                         context.get("started_at"), kind)
+            if thread.new_imap_state and thread.new_imap_state[0] is not None:
+                uidvalidity, last_uid = thread.new_imap_state
+                save_imap_sync_state(account_id, uidvalidity, last_uid, "INBOX", kind)
+        except Exception as e:
+            log_error(f"Save sync state error: {str(e)}", "Outlook Sync")
+
     def _on_process_messages_finished(self, stats: dict):
         try:
             from core.db import update_account_last_sync
 
+            self._save_sync_state()
+
             # تحديث البيانات بعد المعالجة
             self.load_clients()
             if self.current_account_id:
@@ -1477,214 +1448,120 @@ class MainWindow(QMainWindow):
 
     def load_clients(self):
         self.all_clients = get_all_clients()
+        self._client_positions = {c[0]: i for i, c in enumerate(self.all_clients)}
+        self.client_search_index.update(self.all_clients)
+        self._shown_client_ids = None
         self.apply_filters()
 
-    def client_has_reply_status(self, client_id: int, reply_status: str) -> bool:
-        """
-        Check if client has any request with a given reply_status
-        reply_status: 'pending' | 'replied'
-        """
-        from core.db import get_connection
-
-        conn = get_connection()
-        cur = conn.cursor()
-
-        cur.execute("""
-            SELECT 1
-            FROM requests
-            WHERE client_id = ?
-              AND reply_status = ?
-            LIMIT 1
-        """, (client_id, reply_status))
-
-        result = cur.fetchone()
-        conn.close()
-
-        return result is not None
-
     def open_client_report(self):
-        row = self.table.currentRow()
-        if row < 0:
+        selected = self.selected_client()
+        if selected is None:
             QMessageBox.warning(self, "Select Client", "Please select a client first.")
             return
 
-        client_id = self.table.item(row, 0).data(Qt.UserRole)
-        company = self.table.item(row, 0).text()
+        client_id = selected[0]
+        company = selected[1] or ""
 
         from ui.client_report_window import ClientReportWindow
         dlg = ClientReportWindow(client_id, company, self)
         dlg.exec_()
 
     def apply_filters(self):
-        search = self.search_box.text().lower()
-        class_filter = self.class_filter.currentText()
-        status_filter = self.status_filter.currentText()
-
-        filtered = []
-
-        for c in self.all_clients:
-            (
-                client_id, company, country, contact, email,
-                phone, website, date_added,
-                status, score, classification, is_focus
-            ) = c
-
-            classification = classification or ""
-
-            # ---------- Search ----------
-            search_ok = (
-                search in (company or "").lower()
-                or search in (country or "").lower()
-                or search in (email or "").lower()
-            )
-
-            # ---------- Classification ----------
-            class_ok = (
-                class_filter == "All Classifications"
-                or classification == class_filter
-                or (class_filter == "⭐ Focus" and is_focus)
-            )
-
-            # ---------- Status / Requests ----------
-            if status_filter == "All Status":
-                status_ok = True
+        self.search_timer.stop()
 
-            elif status_filter == "Requested Price":
-                status_ok = self.client_has_request(client_id, "Price Request")
+        # البحث النصي من الفهرس في الذاكرة (تضييق تزايدي مع كل حرف)
+        search_ids = self.client_search_index.search(self.search_box.text())
 
-            elif status_filter == "Samples Requested":
-                status_ok = self.client_has_request(client_id, "Sample Request")
-
-            elif status_filter == "Replied":
-                status_ok = self.client_has_reply_status(client_id, "replied")
-
-            elif status_filter == "No Reply":
-                status_ok = self.client_has_reply_status(client_id, "pending")
+        # فلتر التصنيف/الحالة: استعلام SQL واحد (بدون تخزين حتى تظهر تغييرات
+        # الطلبات وحالة الرد فوراً)
+        filter_ids = get_filtered_client_ids(
+            self.class_filter.currentText(), self.status_filter.currentText()
+        )
 
+        if search_ids is None and filter_ids is None:
+            filtered = self.all_clients
+        else:
+            if search_ids is None:
+                ids = filter_ids
+            elif filter_ids is None:
+                ids = search_ids
             else:
-                status_ok = (status == status_filter)
-
-            # ---------- Final ----------
-            if search_ok and class_ok and status_ok:
-                filtered.append(c)
-
+                ids = search_ids & filter_ids
+            positions = self._client_positions
+            ordered = sorted((positions[i] for i in ids if i in positions))
+            filtered = [self.all_clients[p] for p in ordered]
+
+        # لا داعي لإعادة بناء الجدول إذا لم تتغير النتيجة
+        shown = tuple(c[0] for c in filtered)
+        if shown == self._shown_client_ids:
+            return
+        self._shown_client_ids = shown
         self.populate_table(filtered)
 
-    def client_has_request(self, client_id: int, request_keyword: str) -> bool:
-        """
-        Check if client has an OPEN request that CONTAINS a keyword
-        (e.g. 'Price Request')
-        """
-        from core.db import get_connection
-
-        conn = get_connection()
-        cur = conn.cursor()
-
-        cur.execute("""
-            SELECT 1
-            FROM requests
-            WHERE client_id = ?
-              AND request_type LIKE ?
-              AND status = 'open'
-            LIMIT 1
-        """, (client_id, f"%{request_keyword}%"))
-
-        result = cur.fetchone()
-        conn.close()
-
-        return result is not None
+    # أعمدة الجدول -> مواضعها في صفوف get_all_clients()
+    CLIENT_GRID_COLUMNS = (1, 2, 3, 4, 7, 8, 9, 10, 11)
 
     def populate_table(self, data):
-        self.table.setRowCount(len(data))
-        serious = potential = weak = 0
-
-        for row, c in enumerate(data):
-            (
-                client_id, company, country, contact, email,
-                phone, website, date_added,
-                status, score, classification, is_focus
-            ) = c
-
-            classification = classification or ""
-
-            values = [
-                company, country, contact, email,
-                date_added, status, str(score),
-                classification, "⭐" if is_focus else ""
-            ]
-
-            # التحقق من الوضع الداكن - مرة واحدة لكل صف
-            from core.theme import get_theme_manager
-            theme_manager = get_theme_manager()
-            is_dark = theme_manager.get_theme() == "dark"
-            
-            # تحديد ألوان الصف حسب التصنيف
-            if is_dark:
-                # ألوان للوضع الداكن - خلفيات داكنة مع نصوص فاتحة واضحة
-                if is_focus:
-                    row_bg = QColor("#5A5A00")  # أصفر داكن
-                    row_fg = QColor("#FFD700")  # نص ذهبي فاتح وواضح
-                elif classification.startswith("🔥"):
-                    row_bg = QColor("#5A0000")  # أحمر داكن
-                    row_fg = QColor("#FFAAAA")  # نص أحمر فاتح وواضح
-                elif classification.startswith("👍"):
-                    row_bg = QColor("#5A5A00")  # أصفر داكن
-                    row_fg = QColor("#FFD700")  # نص ذهبي فاتح وواضح
-                else:
-                    # للصفوف العادية - خلفية داكنة مع نص أبيض واضح
-                    if row % 2 == 0:
-                        row_bg = QColor("#1E1E1E")  # خلفية داكنة جداً
-                    else:
-                        row_bg = QColor("#252525")  # خلفية داكنة أغمق قليلاً
-                    row_fg = QColor("#FFFFFF")  # نص أبيض واضح جداً
-            else:
-                # ألوان للوضع الفاتح (الأصلية)
-                if is_focus:
-                    row_bg = QColor("#FFF2CC")
-                    row_fg = QColor("#000000")
-                elif classification.startswith("🔥"):
-                    row_bg = QColor("#FFD6D6")
-                    row_fg = QColor("#000000")
-                elif classification.startswith("👍"):
-                    row_bg = QColor("#FFF4CC")
-                    row_fg = QColor("#000000")
-                else:
-                    row_bg = QColor("#E8E8E8")
-                    row_fg = QColor("#000000")
-            
-            # تطبيق الألوان على جميع أعمدة الصف
-            for col, val in enumerate(values):
-                item = QTableWidgetItem(str(val) if val else "")
-                item.setData(Qt.UserRole, client_id)
-                
-                # تطبيق الألوان بشكل صريح وقوي - إجبار التطبيق
-                item.setBackground(QBrush(row_bg))
-                item.setForeground(QBrush(row_fg))
-                
-                # التأكد من أن النص واضح
-                item.setTextAlignment(Qt.AlignLeft | Qt.AlignVCenter)
-                
-                # إضافة العنصر أولاً
-                self.table.setItem(row, col, item)
-                
-                # إعادة تطبيق الألوان بعد إضافة العنصر للتأكد من التطبيق
-                item = self.table.item(row, col)
-                if item:
-                    item.setBackground(QBrush(row_bg))
-                    item.setForeground(QBrush(row_fg))
-
+        # التحقق من الوضع الداكن - مرة واحدة للجدول كله
+        from core.theme import get_theme_manager
+        theme_manager = get_theme_manager()
+        self._grid_is_dark = theme_manager.get_theme() == "dark"
+
+        # الترتيب المختار من رأس الجدول يُعاد تطبيقه تلقائياً على المصدر الجديد
+        self.client_model.set_source(ListRowSource(data, sort_keys={
+            col: (lambda c, i=i: c[i]) for col, i in enumerate(self.CLIENT_GRID_COLUMNS)
+        }))
+
+    def selected_client(self):
+        """صف العميل المحدد حالياً (tuple من get_all_clients) أو None"""
+        return selected_row_data(self.table)
+
+    def _client_cell_text(self, c, col):
+        if col == 8:
+            return "⭐" if c[11] else ""
+        val = c[self.CLIENT_GRID_COLUMNS[col]]
+        if col == 6:
+            val = str(val)
+        return str(val) if val else ""
+
+    def _client_row_colors(self, c, row):
+        """(خلفية، نص) للصف حسب التصنيف والثيم"""
+        classification = c[10] or ""
+        is_focus = c[11]
+
+        # تحديد ألوان الصف حسب التصنيف
+        if self._grid_is_dark:
+            # ألوان للوضع الداكن - خلفيات داكنة مع نصوص فاتحة واضحة
+            if is_focus:
+                return QColor("#5A5A00"), QColor("#FFD700")  # أصفر داكن / نص ذهبي
             if classification.startswith("🔥"):
-                serious += 1
-            elif classification.startswith("👍"):
-                potential += 1
-            else:
-                weak += 1
+                return QColor("#5A0000"), QColor("#FFAAAA")  # أحمر داكن / نص أحمر فاتح
+            if classification.startswith("👍"):
+                return QColor("#5A5A00"), QColor("#FFD700")
+            # للصفوف العادية - خلفية داكنة مع نص أبيض واضح
+            row_bg = QColor("#1E1E1E") if row % 2 == 0 else QColor("#252525")
+            return row_bg, QColor("#FFFFFF")
+
+        # ألوان للوضع الفاتح (الأصلية)
+        if is_focus:
+            return QColor("#FFF2CC"), QColor("#000000")
+        if classification.startswith("🔥"):
+            return QColor("#FFD6D6"), QColor("#000000")
+        if classification.startswith("👍"):
+            return QColor("#FFF4CC"), QColor("#000000")
+        return QColor("#E8E8E8"), QColor("#000000")
+
+    def _client_row_background(self, c, row):
+        return self._client_row_colors(c, row)[0]
+
+    def _client_row_foreground(self, c, row):
+        return self._client_row_colors(c, row)[1]
 
     def open_add_client(self):
         AddClientPopup(self.load_clients).exec_()
 
     def open_add_message(self):
-        if self.table.currentRow() < 0:
+        if self.selected_client() is None:
             QMessageBox.warning(self, "Select Client", "Please select a client first.")
             return
         AddMessagePopup(self.load_clients).exec_()
@@ -1694,9 +1571,9 @@ class MainWindow(QMainWindow):
         try:
             # تحديد معرف العميل المحدد إن وجد
             client_id = None
-            row = self.table.currentRow()
-            if row >= 0:
-                client_id = self.table.item(row, 0).data(Qt.UserRole)
+            selected = self.selected_client()
+            if selected is not None:
+                client_id = selected[0]
             
             dlg = AdvancedMessagePopup(self, client_id=client_id)
             if dlg.exec_() == QDialog.Accepted:
@@ -1709,22 +1586,22 @@ class MainWindow(QMainWindow):
             )
 
     def open_timeline(self):
-        row = self.table.currentRow()
-        if row < 0:
+        selected = self.selected_client()
+        if selected is None:
             return
-        client_id = self.table.item(row, 0).data(Qt.UserRole)
-        company = self.table.item(row, 0).text()
+        client_id = selected[0]
+        company = selected[1] or ""
         TimelineWindow(client_id, company).exec_()
 
     def open_suggested_reply(self):
-        row = self.table.currentRow()
-        if row < 0:
+        selected = self.selected_client()
+        if selected is None:
             QMessageBox.warning(self, "Select Client", "Please select a client first.")
             return
         
-        client_id = self.table.item(row, 0).data(Qt.UserRole)
-        company = self.table.item(row, 0).text()
-        status = self.table.item(row, 5).text()
+        client_id = selected[0]
+        company = selected[1] or ""
+        status = selected[8] or ""
         
         # فتح نافذة الردود المقترحة مع معلومات العميل
         popup = SuggestedReplyPopup(
@@ -1790,23 +1667,10 @@ class MainWindow(QMainWindow):
 
     def check_auto_backup(self):
         """التحقق من النسخ التلقائي عند بدء التشغيل"""
-        try:
-            from core.backup import get_backup_config, run_auto_backup_if_needed, create_backup
-            
-            config = get_backup_config()
-            
-            # النسخ عند بدء التشغيل
-            if config.get("backup_on_startup", False):
-                create_backup("نسخ احتياطي عند بدء التشغيل")
-                log_info("Startup backup created", "Backup")
-            
-            # النسخ التلقائي المجدول
-            backup_path = run_auto_backup_if_needed()
-            if backup_path:
-                log_info(f"Scheduled backup created: {backup_path}", "Backup")
-                
-        except Exception as e:
-            log_error(e, "Auto Backup Check")
+        # النسخ عند بدء التشغيل + التلقائي إن لزم في الخلفية (النتيجة في _on_background_job_finished)
+        # اسم مستقل عن scheduled_backup حتى لا يُدمج (ويُتجاهل) مع مؤقت النسخ المجدول
+        from core.backup import run_startup_backup
+        self.job_scheduler.submit("startup_backup", run_startup_backup)
     
     def open_import_window(self):
         """فتح نافذة استيراد البيانات"""
@@ -1828,9 +1692,9 @@ class MainWindow(QMainWindow):
         try:
             # تحديد معرف العميل المحدد إن وجد
             client_id = None
-            row = self.table.currentRow()
-            if row >= 0:
-                client_id = self.table.item(row, 0).data(Qt.UserRole)
+            selected = self.selected_client()
+            if selected is not None:
+                client_id = selected[0]
             
             dlg = ExportWindow(self, selected_client_id=client_id)
             dlg.exec_()
@@ -1931,6 +1795,19 @@ class MainWindow(QMainWindow):
                 f"Failed to open Logs window:\n\n{e}"
             )
     
+    def open_performance(self):
+        """فتح نافذة قياسات الأداء (آخر جولات المزامنة + أزمنة قاعدة البيانات)"""
+        try:
+            dlg = PerformanceWindow(self)
+            dlg.exec_()
+        except Exception as e:
+            log_error(e, "Open Performance")
+            QMessageBox.critical(
+                self,
+                "Performance Error",
+                f"Failed to open Performance window:\n\n{e}"
+            )
+    
     def toggle_theme(self):
         """تبديل الوضع الداكن/الفاتح"""
         try:
@@ -1971,100 +1848,109 @@ class MainWindow(QMainWindow):
             pass
 
     def check_recurring_tasks(self):
-        """التحقق من المهام المتكررة وإنشاء المهام الجديدة"""
-        try:
-            from core.tasks import create_recurring_task_occurrences
-            created_count = create_recurring_task_occurrences()
-            if created_count > 0:
-                log_info(f"Created {created_count} recurring task(s) automatically")
-        except Exception as e:
-            log_error(f"Error checking recurring tasks: {str(e)}")
+        """التحقق من المهام المتكررة وإنشاء المهام الجديدة (في الخلفية)"""
+        from core.tasks import create_recurring_task_occurrences
+        self.job_scheduler.submit("recurring_tasks", create_recurring_task_occurrences)
     
     def check_focus_messages(self):
-        """التحقق من الرسائل الجديدة من عملاء Focus"""
-        try:
-            if not self.graph_token:
-                return
+        """التحقق من الرسائل الجديدة من عملاء Focus (في الخلفية)"""
+        if not self.graph_token or not self.current_account_id:
+            return
+        self.job_scheduler.submit(
+            "focus_messages",
+            self._fetch_focus_messages,
+            self.graph_token,
+            self.current_account_id
+        )
+    
+    @staticmethod
+    def _fetch_focus_messages(graph_token, account_id) -> List[tuple]:
+        """
+        قراءة رسائل عملاء Focus الجديدة وحفظها (يعمل في خيط JobScheduler)
+        
+        Returns:
+            [(sender, subject, client_name), ...] للإشعارات
+        """
+        from core.ms_mail_reader import read_messages_delta
+        from core.message_analysis import analyze_message
+        from core.db import get_account_delta_state, save_account_delta_state
+        
+        focus_emails = set(get_focus_emails())
+        if not focus_emails:
+            return []
+        
+        # التغييرات فقط منذ آخر فحص (الرابط محفوظ في outlook_accounts فيبقى بعد إعادة التشغيل)
+        started_at = datetime.utcnow()
+        delta_link, checked_at = get_account_delta_state(account_id, "focus")
+        messages, new_delta_link = read_messages_delta(
+            graph_token,
+            delta_link=delta_link,
+            since=started_at - timedelta(days=1)
+        )
+        
+        found = []
+        
+        for msg in messages:
+            # delta يعيد أيضاً الرسائل القديمة التي تغيّرت (قراءة/نقل): نتجاهلها
+            if checked_at and (msg.get("receivedDateTime") or "") < checked_at:
+                continue
             
-            from core.ms_mail_reader import read_new_messages_from_inbox
-            from core.message_filter import should_import_message, detect_request_type
-            from core.ai_reply_scoring import detect_positive_reply
+            sender_info = msg.get("from", {}).get("emailAddress", {})
+            sender = sender_info.get("address", "")
             
-            # قراءة آخر 20 رسالة
-            messages = read_new_messages_from_inbox(self.graph_token, top=20)
+            if not sender or sender.lower() not in focus_emails:
+                continue
             
-            focus_emails = set(get_focus_emails())
-            if not focus_emails:
-                return
+            subject = msg.get("subject", "")
+            body = msg.get("body", {}).get("content", "")
             
-            new_messages_count = 0
+            # فلترة الرسائل المتعلقة بالعمل
+            analysis = analyze_message(subject, body, sender_email=sender)
+            if not analysis.should_import:
+                continue
             
-            for msg in messages:
-                # تخطي إذا كانت نفس الرسالة الأخيرة
-                msg_id = msg.get("id")
-                if msg_id == self.last_checked_message_id:
-                    break
-                
-                sender_info = msg.get("from", {}).get("emailAddress", {})
-                sender = sender_info.get("address", "")
-                
-                if not sender or sender.lower() not in focus_emails:
-                    continue
-                
-                subject = msg.get("subject", "")
-                body = msg.get("body", {}).get("content", "")
-                
-                # فلترة الرسائل المتعلقة بالعمل
-                should_import, reason = should_import_message(subject, body, sender)
-                if not should_import:
-                    continue
-                
-                # إشعار فوري
-                self.show_focus_client_notification(sender, subject, is_new=False)
-                new_messages_count += 1
+            # معالجة الرسالة
+            client = find_client_by_email(sender)
+            found.append((sender, subject, client[1] if client else None))
+            if client:
+                add_message({
+                    "client_id": client[0],
+                    "message_date": datetime.now().strftime("%d/%m/%Y"),
+                    "message_type": "Email",
+                    "channel": "Outlook",
+                    "client_response": subject,
+                    "notes": body,
+                    "score_effect": analysis.score_effect,
+                    "analysis": analysis,
+                    "internet_message_id": msg.get("internetMessageId")
+                })
                 
-                # معالجة الرسالة
-                client = find_client_by_email(sender)
-                if client:
-                    request_type, score = detect_request_type(subject, body)
-                    score_effect = detect_positive_reply(body) + score
-                    
-                    add_message({
-                        "client_id": client[0],
-                        "message_date": datetime.now().strftime("%d/%m/%Y"),
-                        "message_type": "Email",
-                        "channel": "Outlook",
-                        "client_response": subject,
-                        "notes": body,
-                        "score_effect": score_effect
-                    })
-                    
-                    if request_type != "General Inquiry":
-                        save_request(
-                            client_email=sender,
-                            request_type=request_type,
-                            extracted_text=body
-                        )
-            
-            # تحديث آخر رسالة تم فحصها
-            if messages:
-                self.last_checked_message_id = messages[0].get("id")
-            
-            if new_messages_count > 0:
-                self.load_clients()
-                log_info(f"Found {new_messages_count} new message(s) from Focus clients")
+                if analysis.request_type != "General Inquiry":
+                    save_request(
+                        client_email=sender,
+                        request_type=analysis.request_type,
+                        extracted_text=analysis.text
+                    )
         
-        except Exception as e:
-            log_error(f"Error checking focus messages: {str(e)}", "Focus Messages Check")
+        # حفظ الرابط الجديد بعد معالجة الرسائل
+        if new_delta_link:
+            save_account_delta_state(
+                account_id, new_delta_link,
+                started_at.strftime("%Y-%m-%dT%H:%M:%SZ"), "focus"
+            )
+        
+        return found
     
-    def show_focus_client_notification(self, sender_email: str, subject: str, is_new: bool = False):
+    def show_focus_client_notification(self, sender_email: str, subject: str, is_new: bool = False,
+                                       client_name: str = None):
         """عرض إشعار عند استلام رسالة من عميل Focus"""
         try:
             if not self.notification_manager:
                 return
             
-            client = find_client_by_email(sender_email)
-            client_name = client[1] if client else sender_email.split("@")[0]
+            if not client_name:
+                client = find_client_by_email(sender_email)
+                client_name = client[1] if client else sender_email.split("@")[0]
             
             title = "🔔 رسالة جديدة من عميل Focus"
             if is_new:
@@ -2092,9 +1978,9 @@ class MainWindow(QMainWindow):
         try:
             # إذا كان هناك عميل محدد، فتح مهامه
             client_id = None
-            row = self.table.currentRow()
-            if row >= 0:
-                client_id = self.table.item(row, 0).data(Qt.UserRole)
+            selected = self.selected_client()
+            if selected is not None:
+                client_id = selected[0]
             
             dlg = TasksWindow(self, client_id=client_id)
             dlg.exec_()
@@ -2176,9 +2062,9 @@ class MainWindow(QMainWindow):
         try:
             # إذا كان هناك عميل محدد، فتح مستنداته
             client_id = None
-            row = self.table.currentRow()
-            if row >= 0:
-                client_id = self.table.item(row, 0).data(Qt.UserRole)
+            selected = self.selected_client()
+            if selected is not None:
+                client_id = selected[0]
             
             dlg = DocumentsWindow(self, client_id=client_id)
             dlg.exec_()
@@ -2206,9 +2092,9 @@ class MainWindow(QMainWindow):
         try:
             # إذا كان هناك عميل محدد، فتح عروضه
             client_id = None
-            row = self.table.currentRow()
-            if row >= 0:
-                client_id = self.table.item(row, 0).data(Qt.UserRole)
+            selected = self.selected_client()
+            if selected is not None:
+                client_id = selected[0]
             
             dlg = QuotesWindow(self, client_id=client_id)
             dlg.exec_()
@@ -2220,52 +2106,9 @@ class MainWindow(QMainWindow):
             )
 
     def check_scheduled_backup(self):
-        """التحقق من النسخ التلقائي المجدول (يتم استدعاؤه دورياً)"""
-        try:
-            from core.backup import get_backup_config, should_run_auto_backup, create_backup
-            from datetime import datetime
-            
-            config = get_backup_config()
-            
-            if not config.get("auto_backup_enabled", False):
-                return
-            
-            # التحقق من الوقت المحدد
-            backup_time_str = config.get("backup_time", "02:00")
-            try:
-                backup_hour, backup_minute = map(int, backup_time_str.split(":"))
-                now = datetime.now()
-                
-                # التحقق من التوقيت اليومي
-                if config.get("backup_frequency", "daily") == "daily":
-                    # التحقق كل 10 دقائق إذا كان الوقت الحالي في نفس ساعة النسخ
-                    if now.hour == backup_hour:
-                        # في نفس الساعة، تحقق من النسخ كل 10 دقائق
-                        if now.minute % 10 == 0:
-                            # التحقق من أننا لم نقم بالنسخ اليوم
-                            last_backup_str = config.get("last_backup")
-                            if last_backup_str:
-                                try:
-                                    last_backup = datetime.fromisoformat(last_backup_str)
-                                    # إذا كان آخر نسخ اليوم، لا نكرر
-                                    if last_backup.date() == now.date():
-                                        return
-                                except (ValueError, TypeError):
-                                    pass
-                            
-                            from core.backup import create_backup
-                            create_backup("نسخ احتياطي تلقائي مجدول")
-                
-            except Exception:
-                pass
-            
-            # التحقق من النسخ الأسبوعي
-            if config.get("backup_frequency", "daily") == "weekly":
-                if should_run_auto_backup():
-                    create_backup("نسخ احتياطي أسبوعي تلقائي")
-                    
-        except Exception as e:
-            print(f"خطأ في النسخ الاحتياطي التلقائي: {e}")
+        """التحقق من النسخ التلقائي المجدول (يتم استدعاؤه دورياً - في الخلفية)"""
+        from core.backup import run_scheduled_backup
+        self.job_scheduler.submit("scheduled_backup", run_scheduled_backup)
     
     def init_notifications(self):
         """تهيئة نظام الإشعارات"""
@@ -2294,9 +2137,43 @@ class MainWindow(QMainWindow):
             print(f"Failed to initialize notifications: {e}")
     
     def check_notifications(self):
-        """التحقق من الإشعارات وعرضها"""
+        """التحقق من الإشعارات (في الخلفية) ثم عرضها عند وصول النتيجة"""
         if self.notification_manager:
-            try:
-                self.notification_manager.check_and_show_notifications()
-            except Exception:
-                pass  # إذا فشل، لا نوقف التطبيق
+            self.job_scheduler.submit("notifications", self.notification_manager.collect_notifications)
+    
+    def _on_background_job_finished(self, name: str, result):
+        """نتيجة مهمة دورية من JobScheduler (في خيط الواجهة)"""
+        try:
+            if name == "notifications":
+                if self.notification_manager:
+                    self.notification_manager.show_notifications(result)
+            
+            elif name == "recurring_tasks":
+                if result:
+                    log_info(f"Created {result} recurring task(s) automatically")
+            
+            elif name == "focus_messages":
+                for sender, subject, client_name in result or []:
+                    self.show_focus_client_notification(sender, subject, client_name=client_name)
+                if result:
+                    self.load_clients()
+                    log_info(f"Found {len(result)} new message(s) from Focus clients")
+            
+            elif name == "startup_backup":
+                if result:
+                    log_info(f"Startup backup created: {result}", "Backup")
+            
+            elif name == "scheduled_backup":
+                if result:
+                    log_info(f"Scheduled backup created: {result}", "Backup")
+        except Exception as e:
+            log_error(e, f"Background Job: {name}")
+    
+    def _on_background_job_failed(self, name: str, error: str):
+        """فشل مهمة دورية - تسجيل فقط بدون إيقاف التطبيق"""
+        log_error(error, f"Background Job: {name}")
+    
+    def closeEvent(self, event):
+        """إيقاف خيط المهام الخلفية قبل إغلاق النافذة"""
+        self.job_scheduler.stop()
+        super().closeEvent(event)
@@ -0,0 +1,202 @@
+"""
+نافذة قياسات الأداء
+Performance Window - sync run phases, DB call timings, optional profiles
+"""
+from statistics import median
+
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+    QTableWidget, QTableWidgetItem, QTextEdit, QTabWidget,
+    QCheckBox, QSplitter, QAbstractItemView, QHeaderView
+)
+from PyQt5.QtGui import QFont, QColor, QBrush
+from PyQt5.QtCore import Qt
+
+from core.instrumentation import SYNC_PHASES, PERF_MAX_RUNS, load_runs, get_timings
+from core.settings import get_bool_setting, set_setting
+
+# جولة أبطأ من الوسيط للجولات السابقة من نفس النوع بهذه النسبة تُلوَّن كتراجع
+REGRESSION_FACTOR = 1.5
+# أقل عدد جولات سابقة لحساب الوسيط
+REGRESSION_MIN_RUNS = 3
+
+RUN_COLUMNS = ["Time", "Kind", "Duration (s)", "Messages"] + [p for p in SYNC_PHASES] + ["Status"]
+TIMING_COLUMNS = ["Function", "Calls", "Avg (ms)", "p50 (ms)", "p95 (ms)", "Max (ms)", "Total (ms)"]
+
+
+def _find_regressions(runs: list) -> set:
+    """فهارس الجولات الأبطأ بوضوح من الجولات السابقة من نفس النوع (runs: الأحدث أولاً)"""
+    regressions = set()
+    history = {}
+    for index in range(len(runs) - 1, -1, -1):
+        run = runs[index]
+        previous = history.setdefault(run.get("kind"), [])
+        if len(previous) >= REGRESSION_MIN_RUNS:
+            baseline = median(previous)
+            if baseline > 0 and run.get("duration", 0) > baseline * REGRESSION_FACTOR:
+                regressions.add(index)
+        previous.append(run.get("duration", 0))
+    return regressions
+
+
+class PerformanceWindow(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.setWindowTitle("⏱️ Performance - قياسات الأداء")
+        self.setMinimumSize(1000, 650)
+        self.runs = []
+
+        layout = QVBoxLayout(self)
+
+        title = QLabel("⏱️ Performance - قياسات الأداء")
+        title.setFont(QFont("Segoe UI", 14, QFont.Bold))
+        layout.addWidget(title)
+
+        # خيارات القياس الإضافي (تُطبق من الجولة التالية)
+        options_layout = QHBoxLayout()
+        self.profile_check = QCheckBox("cProfile لكل جولة مزامنة")
+        self.profile_check.setChecked(get_bool_setting("performance.profile_sync", False))
+        self.profile_check.toggled.connect(lambda checked: set_setting("performance.profile_sync", checked))
+        options_layout.addWidget(self.profile_check)
+
+        self.memory_check = QCheckBox("tracemalloc لكل جولة مزامنة")
+        self.memory_check.setChecked(get_bool_setting("performance.trace_memory", False))
+        self.memory_check.toggled.connect(lambda checked: set_setting("performance.trace_memory", checked))
+        options_layout.addWidget(self.memory_check)
+
+        options_layout.addStretch()
+
+        refresh_btn = QPushButton("🔄 Refresh")
+        refresh_btn.clicked.connect(self.refresh)
+        options_layout.addWidget(refresh_btn)
+        layout.addLayout(options_layout)
+
+        splitter = QSplitter(Qt.Vertical)
+
+        # آخر الجولات
+        self.runs_table = QTableWidget(0, len(RUN_COLUMNS))
+        self.runs_table.setHorizontalHeaderLabels(RUN_COLUMNS)
+        self.runs_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.runs_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.runs_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.runs_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.runs_table.itemSelectionChanged.connect(self.show_run_details)
+        splitter.addWidget(self.runs_table)
+
+        tabs = QTabWidget()
+
+        self.details_text = QTextEdit()
+        self.details_text.setReadOnly(True)
+        self.details_text.setFont(QFont("Courier", 9))
+        tabs.addTab(self.details_text, "تفاصيل الجولة")
+
+        self.timings_table = QTableWidget(0, len(TIMING_COLUMNS))
+        self.timings_table.setHorizontalHeaderLabels(TIMING_COLUMNS)
+        self.timings_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.timings_table.setSortingEnabled(True)
+        self.timings_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        tabs.addTab(self.timings_table, "أزمنة الدوال (هذه الجلسة)")
+
+        splitter.addWidget(tabs)
+        layout.addWidget(splitter)
+
+        self.info_label = QLabel("")
+        self.info_label.setStyleSheet("color: #666;")
+        layout.addWidget(self.info_label)
+
+        close_btn = QPushButton("إغلاق")
+        close_btn.clicked.connect(self.accept)
+        layout.addWidget(close_btn)
+
+        self.refresh()
+
+    def refresh(self):
+        """إعادة قراءة الجولات المحفوظة وأزمنة الدوال"""
+        self.runs = load_runs(PERF_MAX_RUNS)
+        regressions = _find_regressions(self.runs)
+
+        self.runs_table.setRowCount(len(self.runs))
+        for row, run in enumerate(self.runs):
+            phases = run.get("phases") or {}
+            values = [
+                run.get("ts", ""),
+                run.get("kind", ""),
+                f"{run.get('duration', 0):.2f}",
+                str((run.get("counters") or {}).get("messages", "")),
+            ]
+            values += [
+                f"{phases[name]['seconds']:.2f}" if name in phases else ""
+                for name in SYNC_PHASES
+            ]
+            values.append(f"❌ {run['error']}" if run.get("error") else "✅")
+
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if row in regressions:
+                    item.setBackground(QBrush(QColor("#FFD6D6")))
+                    item.setToolTip(f"أبطأ من {REGRESSION_FACTOR}x وسيط الجولات السابقة")
+                self.runs_table.setItem(row, column, item)
+
+        self.refresh_timings()
+        self.info_label.setText(
+            f"{len(self.runs)} جولة محفوظة - {len(regressions)} جولة أبطأ من المعتاد"
+        )
+        if self.runs:
+            self.runs_table.selectRow(0)
+        else:
+            self.details_text.setPlainText("لا توجد جولات مزامنة مسجلة بعد.")
+
+    def refresh_timings(self):
+        timings = get_timings()
+        self.timings_table.setSortingEnabled(False)
+        self.timings_table.setRowCount(len(timings))
+        ordered = sorted(timings.items(), key=lambda item: item[1]["total_ms"], reverse=True)
+        for row, (name, stats) in enumerate(ordered):
+            self.timings_table.setItem(row, 0, QTableWidgetItem(name))
+            for column, key in enumerate(("calls", "avg_ms", "p50_ms", "p95_ms", "max_ms", "total_ms"), 1):
+                item = QTableWidgetItem()
+                item.setData(Qt.DisplayRole, stats[key])
+                self.timings_table.setItem(row, column, item)
+        self.timings_table.setSortingEnabled(True)
+
+    def show_run_details(self):
+        rows = self.runs_table.selectionModel().selectedRows()
+        if not rows or rows[0].row() >= len(self.runs):
+            return
+        run = self.runs[rows[0].row()]
+
+        lines = [f"{run.get('ts', '')}  {run.get('kind', '')}  {run.get('duration', 0):.3f}s"]
+        if run.get("error"):
+            lines.append(f"Error: {run['error']}")
+
+        counters = run.get("counters") or {}
+        if counters:
+            lines.append("")
+            lines.append("  ".join(f"{name}={value}" for name, value in counters.items()))
+
+        phases = run.get("phases") or {}
+        if phases:
+            lines.append("")
+            lines.append(f"{'Phase':<12}{'Seconds':>10}{'Calls':>10}")
+            for name, stats in phases.items():
+                lines.append(f"{name:<12}{stats['seconds']:>10.3f}{stats['calls']:>10}")
+
+        db_calls = run.get("db") or {}
+        if db_calls:
+            lines.append("")
+            lines.append(f"{'DB function':<40}{'Calls':>8}{'Total ms':>12}{'Max ms':>10}")
+            for name, stats in db_calls.items():
+                lines.append(f"{name:<40}{stats['calls']:>8}{stats['total_ms']:>12.1f}{stats['max_ms']:>10.1f}")
+
+        memory = run.get("memory")
+        if memory:
+            lines.append("")
+            lines.append(f"Memory peak: {memory.get('peak_mb', 0)} MB")
+            lines.extend(f"  {site}" for site in memory.get("top", []))
+
+        if run.get("profile"):
+            lines.append("")
+            lines.append(run["profile"])
+
+        self.details_text.setPlainText("\n".join(lines))
@@ -7,7 +7,7 @@ from PyQt5.QtWidgets import (
     QTabWidget, QWidget, QMessageBox, QGroupBox, QGridLayout
 )
 from PyQt5.QtGui import QFont
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 import os
 
 # Try to import matplotlib
@@ -58,13 +58,22 @@ except ImportError:
     def prepare_arabic_text(text):
         return text
 
-from core.statistics import (
-    get_client_statistics,
-    get_message_statistics,
-    get_request_statistics,
-    get_client_growth_statistics,
-    get_comprehensive_statistics
-)
+from core.statistics import get_comprehensive_statistics
+
+
+class StatisticsThread(QThread):
+    """
+    حساب الإحصائيات (get_comprehensive_statistics) في الخلفية
+    لتجنب تجميد واجهة المستخدم على قواعد البيانات الكبيرة.
+    """
+    finished = pyqtSignal(dict)
+    failed = pyqtSignal(str)
+
+    def run(self):
+        try:
+            self.finished.emit(get_comprehensive_statistics())
+        except Exception as e:
+            self.failed.emit(str(e))
 
 
 class StatisticsWindow(QDialog):
@@ -122,9 +131,9 @@ class StatisticsWindow(QDialog):
         
         # الأزرار
         btn_layout = QHBoxLayout()
-        refresh_btn = QPushButton("🔄 تحديث - Refresh")
-        refresh_btn.clicked.connect(self.refresh_all)
-        btn_layout.addWidget(refresh_btn)
+        self.refresh_btn = QPushButton("🔄 تحديث - Refresh")
+        self.refresh_btn.clicked.connect(self.refresh_all)
+        btn_layout.addWidget(self.refresh_btn)
         
         close_btn = QPushButton("إغلاق - Close")
         close_btn.clicked.connect(self.accept)
@@ -547,13 +556,46 @@ class StatisticsWindow(QDialog):
         self.overview_canvas.draw()
     
     def refresh_all(self):
-        """تحديث جميع الرسوم البيانية"""
+        """تحديث جميع الرسوم البيانية (الإحصائيات تُحسب في الخلفية)"""
+        thread = getattr(self, "_stats_thread", None)
+        if thread is not None and thread.isRunning():
+            return
+        
+        self.refresh_btn.setEnabled(False)
+        self.refresh_btn.setText("⏳ جاري التحميل... - Loading")
+        
+        self._stats_thread = StatisticsThread(self)
+        self._stats_thread.finished.connect(self._on_statistics_ready)
+        self._stats_thread.failed.connect(self._on_statistics_failed)
+        self._stats_thread.start()
+    
+    def done(self, result):
+        # انتظار خيط الإحصائيات قبل إغلاق النافذة (الخيط تابع لها)
+        thread = getattr(self, "_stats_thread", None)
+        if thread is not None and thread.isRunning():
+            thread.wait()
+        super().done(result)
+    
+    def _reset_refresh_button(self):
+        self.refresh_btn.setEnabled(True)
+        self.refresh_btn.setText("🔄 تحديث - Refresh")
+    
+    def _on_statistics_failed(self, error: str):
+        self._reset_refresh_button()
+        QMessageBox.critical(
+            self,
+            "خطأ",
+            f"حدث خطأ أثناء تحديث الإحصائيات:\n\n{error}"
+        )
+    
+    def _on_statistics_ready(self, stats: dict):
+        """رسم النتائج بعد انتهاء الحساب في الخلفية"""
+        self._reset_refresh_button()
         try:
-            # Get statistics
-            client_stats = get_client_statistics()
-            message_stats = get_message_statistics()
-            request_stats = get_request_statistics()
-            growth_data = get_client_growth_statistics()
+            client_stats = stats['clients']
+            message_stats = stats['messages']
+            request_stats = stats['requests']
+            growth_data = stats['growth']
             
             # Plot clients charts
             self.plot_classification_distribution(client_stats)
@@ -19,9 +19,8 @@ from core.db import (
     find_custom_sync_client_by_email,
     find_client_by_email,
     get_client_messages,
-    remove_duplicate_messages,
 )
-from core.ms_mail_reader import read_messages_from_folder
+from core.instrumentation import phase, sync_run, timed_iter
 from core.logging_system import log_error, log_info
 
 
@@ -346,6 +345,9 @@ class SyncWorkerThread(QThread):
     progress = pyqtSignal(str)
     finished = pyqtSignal(bool, str)
     
+    # عدد الرسائل في كل معاملة (commit واحد لكل دفعة)
+    INGEST_BATCH_SIZE = 200
+    
     def __init__(self, graph_token, client_emails, account_id):
         super().__init__()
         self.graph_token = graph_token
@@ -353,13 +355,15 @@ class SyncWorkerThread(QThread):
         self.account_id = account_id
     
     def run(self):
+        # قياس الجولة (المراحل + استدعاءات قاعدة البيانات) لنافذة الأداء
+        with sync_run("outlook_clients") as perf:
+            self._sync(perf)
+    
+    def _sync(self, perf):
         try:
-            from core.message_filter import should_import_message, detect_request_type
-            from core.ai_reply_scoring import detect_positive_reply
-            from core.db import (
-                find_client_by_email, add_client, add_message, save_request,
-                find_custom_sync_client_by_email
-            )
+            from core.message_analysis import analyze_message
+            from core.db import ingest_messages, find_custom_sync_client_by_email
+            from core.sync_engine import iter_client_messages
             from datetime import datetime as dt
             
             total = len(self.client_emails)
@@ -368,25 +372,38 @@ class SyncWorkerThread(QThread):
             saved_messages = 0
             created_clients = 0
             linked_messages = 0
+            batch = []
+            today_str = dt.now().strftime("%d/%m/%Y")
+            client_info_cache = {}
+            
+            def flush_batch():
+                nonlocal batch, created_clients
+                if batch:
+                    with phase("db_write"):
+                        created_clients += ingest_messages(batch)["created_clients"]
+                    batch = []
             
-            for email in self.client_emails:
-                self.progress.emit(f"⏳ جاري مزامنة {email}... ({processed + 1}/{total})")
+            self.progress.emit(f"⏳ جاري مزامنة {total} عميل...")
+            
+            # قراءة رسائل العملاء بالتوازي (جلسة واحدة + احترام 429)
+            # والحفظ هنا في خيط واحد فور وصول رسائل كل عميل
+            # زمن انتظار نتائج الجلب = مرحلة fetch
+            for email, messages, fetch_error in timed_iter(iter_client_messages(
+                self.graph_token,
+                self.client_emails,
+                max_messages=50  # حد أقصى 50 رسالة لكل عميل
+            ), "fetch"):
+                self.progress.emit(f"⏳ تمت قراءة {email}... ({processed + 1}/{total})")
                 
-                # قراءة الرسائل للعميل المحدد مع timeout
                 try:
-                    messages = read_messages_from_folder(
-                        self.graph_token,
-                        folder_name="Inbox",
-                        sender_email=email,
-                        top=50,
-                        max_messages=50  # حد أقصى 50 رسالة لكل عميل
-                    )
+                    if fetch_error is not None:
+                        raise fetch_error
                     
                     if messages:
                         total_messages += len(messages)
                         log_info(f"Found {len(messages)} messages for {email}", "Sync")
                         
-                        # حفظ الرسائل في قاعدة البيانات
+                        # تجهيز الرسائل للحفظ المجمع في قاعدة البيانات
                         for msg in messages:
                             try:
                                 # استخراج معلومات المرسل
@@ -406,106 +423,83 @@ class SyncWorkerThread(QThread):
                                     # استخدام بريد المرسل الفعلي للبحث عن العميل
                                     search_email = sender_email_addr if sender_email_addr == target_email else target_email
                                     
-                                    # البحث عن العميل في الجدول الرئيسي
-                                    client = find_client_by_email(search_email)
-                                    
-                                    # إذا لم يوجد، إنشاء عميل جديد
-                                    if not client:
-                                        # محاولة الحصول على بيانات من custom_sync_clients
+                                    # بيانات إنشاء العميل إن لم يكن موجوداً (من custom_sync_clients إن وجدت)
+                                    if search_email not in client_info_cache:
                                         custom_client = find_custom_sync_client_by_email(search_email)
-                                        
                                         if custom_client:
-                                            # استخدام بيانات من custom_sync_clients
                                             (_, company, country, contact, email_addr, phone, website, _) = custom_client
-                                            add_client({
+                                            client_info_cache[search_email] = {
                                                 "company_name": company or sender_name or search_email.split("@")[0],
                                                 "country": country or None,
                                                 "contact_person": contact or sender_name,
                                                 "email": email_addr or search_email,
                                                 "phone": phone or None,
                                                 "website": website or None,
-                                                "date_added": dt.now().strftime("%d/%m/%Y"),
-                                                "status": "New",
-                                                "seriousness_score": 0,
-                                                "classification": None,
                                                 "is_focus": 0
-                                            })
-                                            client = find_client_by_email(search_email)
-                                            created_clients += 1
+                                            }
                                         else:
-                                            # إنشاء عميل جديد بدون بيانات
-                                            add_client({
+                                            client_info_cache[search_email] = {
                                                 "company_name": sender_name or search_email.split("@")[0],
-                                                "country": None,
                                                 "contact_person": sender_name,
                                                 "email": search_email,
-                                                "phone": None,
-                                                "website": None,
-                                                "date_added": dt.now().strftime("%d/%m/%Y"),
-                                                "status": "New",
-                                                "seriousness_score": 0,
-                                                "classification": None,
                                                 "is_focus": 0
-                                            })
-                                            client = find_client_by_email(search_email)
-                                            created_clients += 1
+                                            }
+                                    client_info = client_info_cache[search_email]
                                     
-                                    if client:
-                                        subject = msg.get("subject", "")
-                                        body = msg.get("body", {}).get("content", "")
-                                        
-                                        # فلترة الرسائل
-                                        should_import, _reason = should_import_message(subject, body, search_email)
-                                        if not should_import:
-                                            continue
-                                        
-                                        # استخراج التاريخ الفعلي
-                                        actual_date = None
-                                        received_date = msg.get("receivedDateTime") or msg.get("sentDateTime")
-                                        if received_date:
-                                            try:
-                                                date_obj = dt.fromisoformat(received_date.replace('Z', '+00:00'))
-                                                actual_date = date_obj.strftime("%d/%m/%Y")
-                                            except Exception:
-                                                pass
-                                        
-                                        # اكتشاف نوع الطلب
-                                        request_type, score = detect_request_type(subject, body)
-                                        if request_type != "General Inquiry":
-                                            save_request(
-                                                client_email=search_email,
-                                                request_type=request_type,
-                                                extracted_text=body
-                                            )
-                                        
-                                        # حساب التأثير على النقاط
-                                        score_effect = 0
-                                        if len(body) > 50:
-                                            try:
-                                                score_effect = detect_positive_reply(body)
-                                            except Exception:
-                                                pass
-                                        score_effect += score
-                                        
-                                        # حفظ الرسالة
-                                        add_message({
-                                            "client_id": client[0],
-                                            "message_date": dt.now().strftime("%d/%m/%Y"),
-                                            "actual_date": actual_date,
-                                            "message_type": "Email",
-                                            "channel": "Outlook",
-                                            "client_response": subject,
-                                            "notes": body,
-                                            "score_effect": score_effect
-                                        })
-                                        
-                                        saved_messages += 1
-                                        linked_messages += 1
+                                    # تعذّر تحميل المحتوى الكامل (bodyIncomplete): لا يُحلل bodyPreview
+                                    # كأنه الرسالة؛ العميل فقط، والرسالة تُقرأ في المزامنة التالية
+                                    if msg.get("bodyIncomplete"):
+                                        batch.append({"email": search_email, "client": client_info, "client_only": True})
+                                        continue
+                                    
+                                    subject = msg.get("subject", "")
+                                    body = msg.get("body", {}).get("content", "")
+                                    
+                                    # تحليل واحد للرسالة (HTML -> نص، الكلمات، نوع الطلب، التقييم)
+                                    analysis = analyze_message(subject, body, sender_email=search_email)
+                                    
+                                    # فلترة الرسائل (العميل يُنشأ حتى لو تمت فلترة الرسالة)
+                                    if not analysis.should_import:
+                                        batch.append({"email": search_email, "client": client_info, "client_only": True})
+                                        continue
+                                    
+                                    # استخراج التاريخ الفعلي
+                                    actual_date = None
+                                    received_date = msg.get("receivedDateTime") or msg.get("sentDateTime")
+                                    if received_date:
+                                        try:
+                                            date_obj = dt.fromisoformat(received_date.replace('Z', '+00:00'))
+                                            actual_date = date_obj.strftime("%d/%m/%Y")
+                                        except Exception:
+                                            pass
+                                    
+                                    batch.append({
+                                        "email": search_email,
+                                        "client": client_info,
+                                        "message_date": today_str,
+                                        "actual_date": actual_date,
+                                        "message_type": "Email",
+                                        "channel": "Outlook",
+                                        "client_response": subject,
+                                        "notes": body,
+                                        "score_effect": analysis.score_effect,
+                                        "request_type": analysis.request_type,
+                                        "extracted_text": analysis.text,
+                                        "analysis": analysis,
+                                        "internet_message_id": msg.get("internetMessageId"),
+                                    })
+                                    
+                                    saved_messages += 1
+                                    linked_messages += 1
                                         
                             except Exception as e:
                                 log_error(f"Error processing message for {email}: {str(e)}", "Sync")
                                 continue
                     
+                    # حفظ الدفعة في معاملة واحدة
+                    if len(batch) >= self.INGEST_BATCH_SIZE:
+                        flush_batch()
+                    
                 except Exception as e:
                     error_msg = str(e)
                     log_error(f"Error syncing {email}: {error_msg}", "Sync")
@@ -513,6 +507,12 @@ class SyncWorkerThread(QThread):
                 
                 processed += 1
             
+            flush_batch()
+            
+            perf.count("clients", processed)
+            perf.count("messages", total_messages)
+            perf.count("saved", saved_messages)
+            
             result_msg = (
                 f"تم مزامنة {total} عميل بنجاح!\n"
                 f"تم العثور على {total_messages} رسالة.\n"
@@ -660,12 +660,6 @@ class SyncWindow(QDialog):
         refresh_btn.setMinimumHeight(40)
         btn_layout.addWidget(refresh_btn)
         
-        remove_duplicates_btn = QPushButton("🗑️ إزالة الرسائل المكررة")
-        remove_duplicates_btn.clicked.connect(self.remove_duplicate_messages)
-        remove_duplicates_btn.setMinimumHeight(40)
-        remove_duplicates_btn.setToolTip("إزالة الرسائل المكررة للعملاء المحددين")
-        btn_layout.addWidget(remove_duplicates_btn)
-        
         btn_layout.addStretch()
         
         close_btn = QPushButton("إغلاق")
@@ -959,65 +953,6 @@ class SyncWindow(QDialog):
         
         # لا نقوم بتحديث قائمة العملاء الرئيسية لأن المزامنة الخاصة مستقلة
     
-    def remove_duplicate_messages(self):
-        """إزالة الرسائل المكررة للعملاء المحددين"""
-        selected_emails, _ = self.get_selected_clients()
-        
-        if not selected_emails:
-            QMessageBox.warning(
-                self,
-                "لا يوجد محدد",
-                "يرجى تحديد عميل واحد على الأقل لإزالة الرسائل المكررة."
-            )
-            return
-        
-        # تأكيد
-        reply = QMessageBox.question(
-            self,
-            "تأكيد إزالة التكرارات",
-            f"هل تريد إزالة الرسائل المكررة لـ {len(selected_emails)} عميل؟\n\n"
-            f"سيتم الاحتفاظ بأحدث رسالة لكل مجموعة مكررة.",
-            QMessageBox.Yes | QMessageBox.No,
-            QMessageBox.No
-        )
-        
-        if reply != QMessageBox.Yes:
-            return
-        
-        try:
-            total_deleted = 0
-            
-            for email in selected_emails:
-                client = find_client_by_email(email)
-                if client:
-                    client_id = client[0]
-                    deleted = remove_duplicate_messages(client_id)
-                    total_deleted += deleted
-            
-            if total_deleted > 0:
-                QMessageBox.information(
-                    self,
-                    "تم الإزالة",
-                    f"تم إزالة {total_deleted} رسالة مكررة بنجاح!"
-                )
-                # تحديث جدول الرسائل إذا كان مفتوحاً
-                if len(selected_emails) == 1:
-                    self.load_messages_for_email(selected_emails[0])
-            else:
-                QMessageBox.information(
-                    self,
-                    "لا توجد تكرارات",
-                    "لم يتم العثور على رسائل مكررة للعملاء المحددين."
-                )
-                
-        except Exception as e:
-            QMessageBox.critical(
-                self,
-                "خطأ",
-                f"حدث خطأ أثناء إزالة التكرارات:\n{str(e)}"
-            )
-            log_error(f"Error removing duplicates: {str(e)}", "Remove Duplicates")
-    
     def on_client_selection_changed(self):
         """عند تغيير اختيار العميل، عرض رسائله تلقائياً"""
         selected_rows = {item.row() for item in self.table.selectedItems()}
@@ -6,86 +6,20 @@ from PyQt5.QtGui import QFont, QColor
 from PyQt5.QtCore import Qt
 
 from core.db import get_client_messages, save_request  # ← (1) إضافة فقط
-
-import re
-from html import unescape
+from core.message_analysis import detect_request_tags, split_request_tags
+from core.text_normalize import html_to_text, normalize_text
 
 
 # ===============================
 # === EFM ADDITION – Detection ===
 # ===============================
-PRICE_PATTERNS = [
-    r"\bprice\b", r"\bquotation\b", r"\bquote\b",
-    r"\bcost\b", r"\bUSD\b", r"\bFOB\b", r"\bCIF\b"
-]
-
-SAMPLE_PATTERNS = [
-    r"\bsample\b", r"\bsampling\b", r"\btest\b"
-]
-
-MOQ_PATTERNS = [
-    r"\bMOQ\b", r"\bminimum order\b", r"\bmin\.?\s*order\b"
-]
-
-
-def detect_request_type(text: str):
-    text = text.lower()
-
-    for p in PRICE_PATTERNS:
-        if re.search(p, text):
-            return "price"
-
-    for p in SAMPLE_PATTERNS:
-        if re.search(p, text):
-            return "sample"
-
-    for p in MOQ_PATTERNS:
-        if re.search(p, text):
-            return "moq"
-
-    return None
-
-
+# الأنماط نفسها أصبحت في core.message_analysis وتُحسب مرة واحدة عند حفظ الرسالة
 def detect_request_types(text: str):
-    text = text.lower()
-    found = []
-
-    for p in PRICE_PATTERNS:
-        if re.search(p, text):
-            found.append("price")
-            break
-
-    for p in SAMPLE_PATTERNS:
-        if re.search(p, text):
-            found.append("sample")
-            break
-
-    for p in MOQ_PATTERNS:
-        if re.search(p, text):
-            found.append("moq")
-            break
-
-    return found
+    return detect_request_tags(text)
 
 
 def clean_html(raw_html: str) -> str:
-    if not raw_html:
-        return ""
-
-    raw_html = re.sub(
-        r"<(script|style|meta|head).*?>.*?</\1>",
-        "",
-        raw_html,
-        flags=re.DOTALL | re.IGNORECASE
-    )
-
-    text = re.sub(r"<[^>]+>", "", raw_html)
-    text = unescape(text)
-
-    text = re.sub(r"\r\n|\r", "\n", text)
-    text = re.sub(r"\n\s*\n\s*\n+", "\n\n", text)
-
-    return text.strip()
+    return normalize_text(html_to_text(raw_html))
 
 
 class TimelineWindow(QDialog):
@@ -124,37 +58,32 @@ class TimelineWindow(QDialog):
         sample_count = 0
         moq_count = 0
 
-        messages = get_client_messages(client_id)
+        # body_text و request_tags محفوظة مع الرسالة (core.message_analysis)
+        messages = get_client_messages(client_id, with_analysis=True)
 
         if not messages:
             layout.addWidget(QLabel("No messages found for this client."))
         else:
             for msg in messages:
-                # التعامل مع الرسائل القديمة (بدون actual_date) والجديدة (مع actual_date)
-                if len(msg) >= 7:
-                    (
-                        message_date,
-                        actual_date,
-                        message_type,
-                        channel,
-                        client_response,
-                        notes,
-                        score_effect
-                    ) = msg
+                (
+                    message_date,
+                    actual_date,
+                    message_type,
+                    channel,
+                    client_response,
+                    notes,
+                    score_effect,
+                    body_text,
+                    request_tags
+                ) = msg
+
+                if body_text is not None:
+                    clean_text = body_text
+                    types = split_request_tags(request_tags)
                 else:
-                    # رسائل قديمة بدون actual_date
-                    (
-                        message_date,
-                        message_type,
-                        channel,
-                        client_response,
-                        notes,
-                        score_effect
-                    ) = msg
-                    actual_date = None
-
-                clean_text = clean_html(notes or "")
-                types = detect_request_types(clean_text)
+                    # رسالة لم تُحلل بعد (مثلاً أُضيفت مباشرة عبر SQL)
+                    clean_text = clean_html(notes or "")
+                    types = detect_request_types(clean_text)
 
                 if "price" in types:
                     price_count += 1
@@ -163,7 +92,7 @@ class TimelineWindow(QDialog):
                 if "moq" in types:
                     moq_count += 1
 
-                request_type = detect_request_type(clean_text)
+                request_type = types[0] if types else None
 
                 # تحسين عرض التاريخ والتفاصيل
                 # عرض التاريخ الفعلي إذا كان موجوداً، وإلا عرض تاريخ الإضافة
@@ -4,8 +4,8 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtGui import QFont
 from PyQt5.QtCore import Qt, QTimer
-import sqlite3
 import os
+from pages.db_connection import connect_db
 
 DB = os.path.join(os.path.dirname(__file__), "..", "database", "crm.db")
 
@@ -107,7 +107,7 @@ class AIAssistantPage(QWidget):
     def db_conn(self):
         """الاتصال بقاعدة البيانات"""
         try:
-            return sqlite3.connect(DB)
+            return connect_db(DB)
         except:
             return None
 
@@ -5,8 +5,9 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtGui import QFont
 from PyQt5.QtCore import Qt
-import sqlite3, os
+import os
 from datetime import datetime
+from pages.db_connection import connect_db
 
 DB = os.path.join(os.path.dirname(__file__), "..", "database", "crm.db")
 
@@ -115,7 +116,7 @@ class AddProductDialog(QDialog):
             return
 
         try:
-            conn = sqlite3.connect(DB)
+            conn = connect_db(DB)
             cur = conn.cursor()
 
             # استخدام نفس مخطط جدول المنتجات الموجود
@@ -1,13 +1,16 @@
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
-    QPushButton, QTableWidget, QTableWidgetItem,
+    QPushButton, QTableView, QAbstractItemView,
     QMessageBox, QHeaderView, QComboBox
 )
 from PyQt5.QtGui import QFont, QColor
 from PyQt5.QtCore import Qt
-import sqlite3
 import os
 from datetime import datetime
+from pages.db_connection import connect_db
+from ui.lazy_table_model import (
+    LazyTableModel, SqlRowSource, create_lazy_view_model, selected_row_data
+)
 
 
 DB = os.path.join(os.path.dirname(__file__), "..", "database", "crm.db")
@@ -119,15 +122,33 @@ class CustomersPage(QWidget):
         main_layout.addLayout(buttons_layout)
 
         # ==================== الجدول ====================
-        self.table = QTableWidget()
-        self.table.setColumnCount(8)
-        self.table.setHorizontalHeaderLabels([
-            "ID", "الاسم", "الدولة", "الشركة",
-            "الإيميل", "الهاتف", "التقييم", "تاريخ الإضافة"
-        ])
+        # الصفوف تُجلب من قاعدة البيانات على دفعات عند التمرير
+        self.model = LazyTableModel(
+            [
+                "ID", "الاسم", "الدولة", "الشركة",
+                "الإيميل", "الهاتف", "التقييم", "تاريخ الإضافة"
+            ],
+            source=SqlRowSource(
+                self.connect_db,
+                """
+                SELECT id, name, country, company, email, phone, rating, created_at
+                FROM customers
+                """,
+                order_by="id DESC"
+            ),
+            background=self.rating_color,
+            alignment=int(Qt.AlignCenter),
+            parent=self
+        )
+        self.table = QTableView()
+        create_lazy_view_model(self.table, self.model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSortingEnabled(True)
+        self.table.sortByColumn(0, Qt.DescendingOrder)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 margin-top: 10px;
                 gridline-color: #ddd;
             }
@@ -141,48 +162,28 @@ class CustomersPage(QWidget):
         self.edit_btn.clicked.connect(self.edit_customer)
         self.delete_btn.clicked.connect(self.delete_customer)
         self.clear_btn.clicked.connect(self.clear_fields)
-        self.table.itemSelectionChanged.connect(self.fill_inputs)
+        self.table.selectionModel().selectionChanged.connect(self.fill_inputs)
 
         self.load_data()
 
     # ==================== Database ====================
     def connect_db(self):
-        return sqlite3.connect(DB)
+        return connect_db(DB)
 
     # ==================== تحميل البيانات ====================
     def load_data(self):
-        self.table.setRowCount(0)
-        conn = self.connect_db()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT id, name, country, company, email, phone, rating, created_at
-            FROM customers
-            ORDER BY id DESC
-        """)
-        rows = cur.fetchall()
-        conn.close()
-
-        for row_data in rows:
-            row = self.table.rowCount()
-            self.table.insertRow(row)
-
-            for col, value in enumerate(row_data):
-                item = QTableWidgetItem(str(value))
-                item.setTextAlignment(Qt.AlignCenter)
-                self.table.setItem(row, col, item)
-
-            rating = str(row_data[6]).lower()
-            if rating == "hot":
-                bg = QColor("#C8E6C9")
-            elif rating == "warm":
-                bg = QColor("#FFF9C4")
-            elif rating == "cold":
-                bg = QColor("#BBDEFB")
-            else:
-                bg = QColor("#FFCDD2")
-
-            for col in range(8):
-                self.table.item(row, col).setBackground(bg)
+        self.model.refresh()
+
+    @staticmethod
+    def rating_color(row_data, row):
+        rating = str(row_data[6]).lower()
+        if rating == "hot":
+            return QColor("#C8E6C9")
+        elif rating == "warm":
+            return QColor("#FFF9C4")
+        elif rating == "cold":
+            return QColor("#BBDEFB")
+        return QColor("#FFCDD2")
 
     # ==================== إضافة عميل ====================
     def add_customer(self):
@@ -214,11 +215,11 @@ class CustomersPage(QWidget):
 
     # ==================== تعديل عميل ====================
     def edit_customer(self):
-        row = self.table.currentRow()
-        if row < 0:
+        row_data = selected_row_data(self.table)
+        if row_data is None:
             return
 
-        customer_id = int(self.table.item(row, 0).text())
+        customer_id = int(row_data[0])
 
         conn = self.connect_db()
         cur = conn.cursor()
@@ -242,11 +243,11 @@ class CustomersPage(QWidget):
 
     # ==================== حذف عميل ====================
     def delete_customer(self):
-        row = self.table.currentRow()
-        if row < 0:
+        row_data = selected_row_data(self.table)
+        if row_data is None:
             return
 
-        customer_id = int(self.table.item(row, 0).text())
+        customer_id = int(row_data[0])
         confirm = QMessageBox.question(self, "تأكيد", "هل تريد حذف العميل؟")
         if confirm != QMessageBox.Yes:
             return
@@ -261,16 +262,17 @@ class CustomersPage(QWidget):
 
     # ==================== تعبئة الحقول ====================
     def fill_inputs(self):
-        row = self.table.currentRow()
-        if row < 0:
+        row_data = selected_row_data(self.table)
+        if row_data is None:
             return
 
-        self.name_input.setText(self.table.item(row, 1).text())
-        self.country_input.setText(self.table.item(row, 2).text())
-        self.company_input.setText(self.table.item(row, 3).text())
-        self.email_input.setText(self.table.item(row, 4).text())
-        self.phone_input.setText(self.table.item(row, 5).text())
-        self.rating_combo.setCurrentText(self.table.item(row, 6).text())
+        values = ["" if v is None else str(v) for v in row_data]
+        self.name_input.setText(values[1])
+        self.country_input.setText(values[2])
+        self.company_input.setText(values[3])
+        self.email_input.setText(values[4])
+        self.phone_input.setText(values[5])
+        self.rating_combo.setCurrentText(values[6])
 
     # ==================== مسح الحقول ====================
     def clear_fields(self):
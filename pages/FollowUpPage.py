@@ -7,9 +7,9 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtGui import QFont, QColor, QBrush
 from PyQt5.QtCore import Qt, QDate
-import sqlite3
 import os
 from datetime import datetime
+from pages.db_connection import connect_db
 
 DB = os.path.join(os.path.dirname(__file__), "..", "database", "crm.db")
 
@@ -34,7 +34,7 @@ class FollowUpManagerWindow(QMainWindow):
 
     def ensure_db(self):
         """التأكد من وجود جدول متابعة الصادرات"""
-        conn = sqlite3.connect(DB)
+        conn = connect_db(DB)
         cur = conn.cursor()
         cur.execute("""
             CREATE TABLE IF NOT EXISTS export_followup (
@@ -282,7 +282,7 @@ class FollowUpManagerWindow(QMainWindow):
         """تحميل قائمة العملاء"""
         self.customer_combo.clear()
         try:
-            conn = sqlite3.connect(DB)
+            conn = connect_db(DB)
             cur = conn.cursor()
             cur.execute("SELECT DISTINCT name FROM customers ORDER BY name")
             rows = cur.fetchall()
@@ -293,7 +293,7 @@ class FollowUpManagerWindow(QMainWindow):
             print(f"خطأ في تحميل العملاء: {e}")
 
     def connect_db(self):
-        return sqlite3.connect(DB)
+        return connect_db(DB)
 
     def load_data(self):
         """تحميل البيانات"""
@@ -622,7 +622,7 @@ class FollowUpPage(QWidget):
 
     def ensure_db(self):
         """التأكد من وجود جدول متابعة الصادرات"""
-        conn = sqlite3.connect(DB)
+        conn = connect_db(DB)
         cur = conn.cursor()
         cur.execute("""
             CREATE TABLE IF NOT EXISTS export_followup (
@@ -831,7 +831,7 @@ class FollowUpPage(QWidget):
         """تحميل قائمة العملاء"""
         self.customer_combo.clear()
         try:
-            conn = sqlite3.connect(DB)
+            conn = connect_db(DB)
             cur = conn.cursor()
             cur.execute("SELECT DISTINCT name FROM customers ORDER BY name")
             rows = cur.fetchall()
@@ -842,7 +842,7 @@ class FollowUpPage(QWidget):
             print(f"خطأ في تحميل العملاء: {e}")
 
     def connect_db(self):
-        return sqlite3.connect(DB)
+        return connect_db(DB)
 
     def load_data(self):
         """تحميل البيانات"""
@@ -4,8 +4,9 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtGui import QFont, QColor
 from PyQt5.QtCore import Qt
-import sqlite3, os
+import os
 from fpdf import FPDF
+from pages.db_connection import connect_db
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "..", "database", "crm.db")
 
@@ -76,7 +77,7 @@ class InventoryPage(QWidget):
     # =============================
     def load_data(self):
         self.table.setRowCount(0)
-        conn = sqlite3.connect(DB_PATH)
+        conn = connect_db(DB_PATH)
         c = conn.cursor()
         c.execute("SELECT id, name, description, quantity, unit FROM products")
         rows = c.fetchall()
@@ -119,7 +120,7 @@ class InventoryPage(QWidget):
     # 📄 تصدير تقرير PDF
     # =============================
     def export_to_pdf(self):
-        conn = sqlite3.connect(DB_PATH)
+        conn = connect_db(DB_PATH)
         c = conn.cursor()
         c.execute("SELECT name, description, quantity, unit FROM products")
         rows = c.fetchall()
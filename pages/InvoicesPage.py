@@ -5,8 +5,9 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtGui import QFont
 from PyQt5.QtCore import Qt, QDateTime
-import sqlite3, os
+import os
 import locale
+from pages.db_connection import connect_db
 
 # محاولة استيراد مكتبة docx (اختيارية)
 try:
@@ -172,7 +173,7 @@ class InvoicesPage(QWidget):
         self.setLayout(main)
 
     def db_conn(self):
-        return sqlite3.connect(DB)
+        return connect_db(DB)
 
     def choose_save_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Choose Save Folder", self.save_folder)
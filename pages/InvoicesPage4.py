@@ -12,6 +12,7 @@ from docx.shared import Pt, Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.oxml import OxmlElement
 from docx.oxml.ns import qn
+from pages.db_connection import connect_db
 
 try:
     from num2words import num2words
@@ -150,7 +151,7 @@ class InvoicesPage(QWidget):
 
     # ============ DATABASE ============
     def db_conn(self):
-        return sqlite3.connect(DB)
+        return connect_db(DB)
 
     def choose_save_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Choose Save Folder", self.save_folder)
@@ -4,7 +4,8 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtGui import QFont, QColor
 from PyQt5.QtCore import Qt
-import sqlite3, os
+import os
+from pages.db_connection import connect_db
 
 DB = os.path.join(os.path.dirname(__file__), "..", "database", "crm.db")
 
@@ -38,7 +39,7 @@ class NotificationsPage(QWidget):
         self.load_notifications()
 
     def connect_db(self):
-        return sqlite3.connect(DB)
+        return connect_db(DB)
 
     def add_notification(self, n_type, desc, status):
         r = self.table.rowCount()
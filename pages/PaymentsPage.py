@@ -1,13 +1,17 @@
 # PaymentsPage.py
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QPushButton,
-    QTableWidget, QTableWidgetItem, QLineEdit, QMessageBox, QHeaderView,
+    QTableWidget, QTableWidgetItem, QTableView, QLineEdit, QMessageBox, QHeaderView,
     QCheckBox, QDateEdit, QTextEdit, QFormLayout, QSizePolicy, QAbstractItemView
 )
-from PyQt5.QtGui import QFont, QColor, QBrush
+from PyQt5.QtGui import QFont, QColor
 from PyQt5.QtCore import Qt, QDate
 import sqlite3
 import os
+from pages.db_connection import connect_db
+from ui.lazy_table_model import (
+    LazyTableModel, SqlRowSource, create_lazy_view_model, selected_row_data
+)
 
 DB = os.path.join(os.path.dirname(__file__), "..", "database", "crm.db")
 
@@ -31,11 +35,11 @@ class PaymentsPage(QWidget):
         self.load_payments()
 
     def db_conn(self):
-        return sqlite3.connect(DB)
+        return connect_db(DB)
 
     def _ensure_db(self):
         os.makedirs(os.path.join(os.path.dirname(__file__), "..", "database"), exist_ok=True)
-        conn = sqlite3.connect(DB)
+        conn = connect_db(DB)
         cur = conn.cursor()
         cur.execute("""
             CREATE TABLE IF NOT EXISTS payments (
@@ -173,10 +177,20 @@ class PaymentsPage(QWidget):
         right_col.addWidget(QLabel("سجل الدفعات"))
 
         # ---------- جدول سجل الدفعات مع تحسينات العرض ----------
-        self.payments_table = QTableWidget(0, 8)
-        self.payments_table.setHorizontalHeaderLabels(
-            ["ID", "Customer", "Sale IDs", "Amount", "Remaining", "Receipt", "Date", "Note"]
+        # الصفوف تُجلب من قاعدة البيانات على دفعات عند التمرير
+        self.payments_model = LazyTableModel(
+            ["ID", "Customer", "Sale IDs", "Amount", "Remaining", "Receipt", "Date", "Note"],
+            display=self._payment_cell_text,
+            background=self._payment_row_color,
+            alignment=int(Qt.AlignCenter),
+            parent=self
         )
+        self.payments_table = QTableView()
+        create_lazy_view_model(self.payments_table, self.payments_model)
+        self.payments_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.payments_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.payments_table.setSortingEnabled(True)
+        self.payments_table.sortByColumn(0, Qt.DescendingOrder)
 
         # مهم جداً: لا نجعل جميع الأعمدة تمتد دائماً (لإظهار scrollbar أفقي عند الحاجة)
         # سنعطي الجدول سياسة حجم تسمح له بأن يكون واسعاً، ونضع ScrollBar عند الحاجة
@@ -188,7 +202,7 @@ class PaymentsPage(QWidget):
         self.payments_table.setMinimumWidth(780)    # عرض مبدئي كافٍ للعرض السليم
         self.payments_table.verticalHeader().setDefaultSectionSize(36)
         self.payments_table.setFont(QFont("Amiri", 11))
-        self.payments_table.itemSelectionChanged.connect(self.on_payments_selection_changed)
+        self.payments_table.selectionModel().selectionChanged.connect(self.on_payments_selection_changed)
 
         # اجعل آخر عمود قابل للتمدد أقل من بقية الأعمدة لكي تظهر المسطرة بشكل أفضل
         try:
@@ -389,77 +403,98 @@ class PaymentsPage(QWidget):
     # ---------------- سجل الدفعات ----------------
     def load_payments(self):
         query = self.search_input.text().strip() if hasattr(self, 'search_input') else ""
-        self.payments_table.setRowCount(0)
         try:
-            conn = self.db_conn()
-            cur = conn.cursor()
             cols = self._table_columns("payments")
-            select_cols = []
-            for c in ["id", "customer_name", "sale_ids", "sale_id", "amount", "remaining", "receipt", "created_at", "note"]:
-                if c in cols:
-                    select_cols.append(c)
-            if not select_cols:
-                conn.close()
+            if not cols:
+                self.payments_model.set_source(None)
                 return
-            select_clause = ", ".join(select_cols)
+
+            def col(name, fallback="''"):
+                return name if name in cols else f"{fallback} AS {name}"
+
+            if "sale_ids" in cols:
+                sale_ids_col = "sale_ids"
+            elif "sale_id" in cols:
+                sale_ids_col = "sale_id AS sale_ids"
+            else:
+                sale_ids_col = "'' AS sale_ids"
+
+            select_clause = ", ".join([
+                col("id"), col("customer_name"), sale_ids_col, col("amount", "0.0"),
+                col("remaining"), col("receipt"), col("created_at"), col("note")
+            ])
+            where_clause = ""
+            params = []
             if query:
                 q = f"%{query}%"
                 where_parts = []
-                params = []
-                if "customer_name" in select_cols:
-                    where_parts.append("customer_name LIKE ?"); params.append(q)
-                if "receipt" in select_cols:
-                    where_parts.append("receipt LIKE ?"); params.append(q)
-                if "sale_ids" in select_cols:
-                    where_parts.append("sale_ids LIKE ?"); params.append(q)
-                if "sale_id" in select_cols:
-                    where_parts.append("sale_id LIKE ?"); params.append(q)
-                where_clause = " OR ".join(where_parts) if where_parts else "1=1"
-                cur.execute(f"SELECT {select_clause} FROM payments WHERE {where_clause} ORDER BY id DESC", params)
-            else:
-                cur.execute(f"SELECT {select_clause} FROM payments ORDER BY id DESC")
-            rows = cur.fetchall()
-            conn.close()
-
-            for r in rows:
-                data = dict(zip(select_cols, r))
-                pid = str(data.get("id", ""))
-                cust = data.get("customer_name", "")
-                sale_ids = data.get("sale_ids", data.get("sale_id", ""))
-                amount = data.get("amount", 0.0)
-                remaining = data.get("remaining", "")
-                receipt = data.get("receipt", "")
-                created_at = data.get("created_at", "")
-                note = data.get("note", "")
-                self._append_payment_row((pid, cust, sale_ids, amount, remaining, receipt, created_at, note))
+                for name in ("customer_name", "receipt", "sale_ids", "sale_id"):
+                    if name in cols:
+                        where_parts.append(f"{name} LIKE ?")
+                        params.append(q)
+                if where_parts:
+                    where_clause = " WHERE " + " OR ".join(where_parts)
+
+            self.payments_model.set_source(SqlRowSource(
+                self.db_conn,
+                f"SELECT {select_clause} FROM payments{where_clause}",
+                params,
+                order_by="id DESC",
+                transform=self._with_sales_totals
+            ))
         except Exception as e:
             QMessageBox.critical(self, "DB Error", str(e))
 
-    def _append_payment_row(self, payment_row):
-        pid, cust, sale_ids, amount, remaining, receipt, created_at, note = payment_row
-        r = self.payments_table.rowCount()
-        self.payments_table.insertRow(r)
-
-        self.payments_table.setItem(r, 0, QTableWidgetItem(str(pid)))
-        self.payments_table.setItem(r, 1, QTableWidgetItem(str(cust)))
-        self.payments_table.setItem(r, 2, QTableWidgetItem(str(sale_ids)))
-        self.payments_table.setItem(r, 3, QTableWidgetItem(self._format_numeric_display(amount)))
-        self.payments_table.setItem(r, 4, QTableWidgetItem(self._format_numeric_display(remaining) if remaining != "" else ""))
-        self.payments_table.setItem(r, 5, QTableWidgetItem(receipt or ""))
-        self.payments_table.setItem(r, 6, QTableWidgetItem(created_at or ""))
-        self.payments_table.setItem(r, 7, QTableWidgetItem(note or ""))
-
-        for c in range(self.payments_table.columnCount()):
-            it = self.payments_table.item(r, c)
-            if it:
-                it.setTextAlignment(Qt.AlignCenter)
-
-        total_sales_value = self._sum_sales_value_by_ids(sale_ids)
+    def _payment_cell_text(self, payment_row, col):
+        value = payment_row[col]
+        if col == 3:
+            return self._format_numeric_display(value)
+        if col == 4:
+            return self._format_numeric_display(value) if value != "" else ""
+        if col in (5, 6, 7):
+            return value or ""
+        return str(value)
+
+    def _payment_row_color(self, payment_row, row):
+        # العمود الأخير (غير ظاهر) هو مجموع قيمة المبيعات المرتبطة بالدفعة
         try:
-            paid_value = float(amount or 0)
+            paid_value = float(payment_row[3] or 0)
         except:
             paid_value = 0.0
-        self._color_payment_row(r, paid_value, total_sales_value)
+        return self._payment_color(paid_value, payment_row[8])
+
+    def _with_sales_totals(self, rows):
+        """إضافة مجموع قيمة المبيعات لكل دفعة باستعلام واحد للدفعة كلها"""
+        parsed = []
+        all_ids = set()
+        for r in rows:
+            try:
+                ids = {int(x.strip()) for x in str(r[2] or "").split(',') if x.strip()}
+            except:
+                ids = set()
+            parsed.append(ids)
+            all_ids.update(ids)
+
+        values = {}
+        if all_ids:
+            try:
+                conn = self.db_conn()
+                cur = conn.cursor()
+                id_list = list(all_ids)
+                for i in range(0, len(id_list), 500):
+                    chunk = id_list[i:i + 500]
+                    placeholders = ','.join('?' for _ in chunk)
+                    cur.execute(f"SELECT id, COALESCE(quantity,0), COALESCE(price_usd,0) FROM sales WHERE id IN ({placeholders})", chunk)
+                    for sid, q, p in cur.fetchall():
+                        try:
+                            values[sid] = float(q or 0) * float(p or 0)
+                        except:
+                            values[sid] = 0.0
+                conn.close()
+            except:
+                values = {}
+
+        return [tuple(r) + (sum(values.get(i, 0.0) for i in ids),) for r, ids in zip(rows, parsed)]
 
     def _sum_sales_value_by_ids(self, sale_ids_str):
         if not sale_ids_str or str(sale_ids_str).strip() == "":
@@ -487,33 +522,26 @@ class PaymentsPage(QWidget):
         except:
             return 0.0
 
-    def _color_payment_row(self, row_index, paid, total):
+    def _payment_color(self, paid, total):
         try:
             paid = float(paid)
             total = float(total)
         except:
-            return
+            return None
         if total <= 0:
-            color = QColor(200, 200, 200, 40)
+            return QColor(200, 200, 200, 40)
         elif paid >= total:
-            color = QColor(0, 180, 0, 60)
+            return QColor(0, 180, 0, 60)
         elif paid > 0:
-            color = QColor(255, 215, 0, 80)
-        else:
-            color = QColor(255, 0, 0, 40)
-        for col in range(self.payments_table.columnCount()):
-            it = self.payments_table.item(row_index, col)
-            if it:
-                it.setBackground(QBrush(color))
+            return QColor(255, 215, 0, 80)
+        return QColor(255, 0, 0, 40)
 
     def on_payments_selection_changed(self):
-        items = self.payments_table.selectedItems()
-        if not items:
+        payment_row = selected_row_data(self.payments_table)
+        if payment_row is None:
             return
-        row = items[0].row()
-        pid_item = self.payments_table.item(row, 0)
-        if pid_item:
-            pid = pid_item.text()
+        if payment_row[0] is not None:
+            pid = str(payment_row[0])
             try:
                 conn = self.db_conn()
                 cur = conn.cursor()
@@ -560,12 +588,11 @@ class PaymentsPage(QWidget):
                 pass
 
     def edit_selected_payment(self):
-        items = self.payments_table.selectedItems()
-        if not items:
+        payment_row = selected_row_data(self.payments_table)
+        if payment_row is None:
             QMessageBox.warning(self, "تنبيه", "اختر دفعة من السجل لتعديلها.")
             return
-        row = items[0].row()
-        pid = self.payments_table.item(row, 0).text()
+        pid = str(payment_row[0])
         try:
             amount = float(self.pay_amount_input.text().strip())
         except:
@@ -604,12 +631,11 @@ class PaymentsPage(QWidget):
             QMessageBox.critical(self, "خطأ", str(e))
 
     def delete_selected_payment(self):
-        items = self.payments_table.selectedItems()
-        if not items:
+        payment_row = selected_row_data(self.payments_table)
+        if payment_row is None:
             QMessageBox.warning(self, "تنبيه", "اختر دفعة من السجل لحذفها.")
             return
-        row = items[0].row()
-        pid = self.payments_table.item(row, 0).text()
+        pid = str(payment_row[0])
         confirm = QMessageBox.question(self, "تأكيد حذف", f"هل تريد حذف الدفعة رقم {pid}؟", QMessageBox.Yes | QMessageBox.No)
         if confirm != QMessageBox.Yes:
             return
@@ -4,7 +4,8 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtGui import QFont, QColor, QBrush
 from PyQt5.QtCore import Qt
-import sqlite3, os
+import os
+from pages.db_connection import connect_db
 
 DB = os.path.join(os.path.dirname(__file__), "..", "database", "crm.db")
 
@@ -120,7 +121,7 @@ class ProductsPage(QWidget):
     # ===================== الوظائف =====================
 
     def connect_db(self):
-        return sqlite3.connect(DB)
+        return connect_db(DB)
     
     def ensure_columns(self):
         """التأكد من وجود جميع الأعمدة المطلوبة"""
@@ -5,9 +5,10 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtGui import QFont
 from PyQt5.QtCore import Qt
-import sqlite3, os
+import os
 from datetime import datetime
 from pages.AddProductDialog import AddProductDialog
+from pages.db_connection import connect_db
 
 DB = os.path.join(os.path.dirname(__file__), "..", "database", "crm.db")
 
@@ -37,7 +38,7 @@ class PurchasesPage(QWidget):
     #                      Database Ensure
     # ===================================================================
     def db_conn(self):
-        return sqlite3.connect(DB)
+        return connect_db(DB)
 
     def _ensure_db(self):
         conn = self.db_conn()
@@ -5,7 +5,8 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtGui import QFont, QColor
 from PyQt5.QtCore import Qt
-import sqlite3, os
+import os
+from pages.db_connection import connect_db
 
 DB = os.path.join(os.path.dirname(__file__), "..", "database", "crm.db")
 
@@ -88,7 +89,7 @@ class ReportsPage(QWidget):
 
     # ================== DB ==================
     def connect_db(self):
-        return sqlite3.connect(DB)
+        return connect_db(DB)
 
     # ================== تحميل التقرير ==================
     def load_report(self):
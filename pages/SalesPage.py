@@ -1,10 +1,14 @@
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton,
-    QComboBox, QTableWidget, QTableWidgetItem, QMessageBox, QHeaderView
+    QComboBox, QTableView, QAbstractItemView, QMessageBox, QHeaderView
 )
-from PyQt5.QtGui import QFont, QColor, QBrush
+from PyQt5.QtGui import QFont, QColor
 from PyQt5.QtCore import Qt, QDateTime
-import sqlite3, os
+import os
+from pages.db_connection import connect_db
+from ui.lazy_table_model import (
+    LazyTableModel, SqlRowSource, create_lazy_view_model, selected_row_data
+)
 
 DB = os.path.join(os.path.dirname(__file__), "..", "database", "crm.db")
 
@@ -78,13 +82,34 @@ class SalesPage(QWidget):
         layout.addLayout(btn_layout)
 
         # ================== الجدول ==================
-        self.table = QTableWidget()
-        self.table.setColumnCount(14)
-        self.table.setHorizontalHeaderLabels([
-            "ID", "كود العميل", "اسم العميل", "كود المنتج", "اسم المنتج",
-            "الوحدة", "الكمية", "سعر جنيه", "سعر دولار",
-            "سعر الصرف", "إجمالي جنيه", "إجمالي دولار", "مرتجع", "التاريخ"
-        ])
+        # الصفوف تُجلب من قاعدة البيانات على دفعات عند التمرير
+        self.model = LazyTableModel(
+            [
+                "ID", "كود العميل", "اسم العميل", "كود المنتج", "اسم المنتج",
+                "الوحدة", "الكمية", "سعر جنيه", "سعر دولار",
+                "سعر الصرف", "إجمالي جنيه", "إجمالي دولار", "مرتجع", "التاريخ"
+            ],
+            source=SqlRowSource(
+                self.connect_db,
+                """
+                SELECT
+                    id, customer_id, customer_name, product_code, product_name,
+                    unit, quantity, price_egp, price_usd, exchange_rate,
+                    total_egp, total_usd, return_qty, sale_date
+                FROM sales
+                """,
+                order_by="id DESC"
+            ),
+            background=self.return_color,
+            alignment=int(Qt.AlignCenter),
+            parent=self
+        )
+        self.table = QTableView()
+        create_lazy_view_model(self.table, self.model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSortingEnabled(True)
+        self.table.sortByColumn(0, Qt.DescendingOrder)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.table.setAlternatingRowColors(True)
         layout.addWidget(self.table)
@@ -97,14 +122,14 @@ class SalesPage(QWidget):
         self.delete_btn.clicked.connect(self.delete_sale)
         self.refresh_btn.clicked.connect(self.refresh_all)
         self.clear_btn.clicked.connect(self.clear_fields)
-        self.table.itemSelectionChanged.connect(self.fill_inputs_from_table)
+        self.table.selectionModel().selectionChanged.connect(self.fill_inputs_from_table)
 
         # تحميل مبدئي
         self.refresh_all()
 
     # ================== DB ==================
     def connect_db(self):
-        return sqlite3.connect(DB)
+        return connect_db(DB)
 
     # ================== تحميل العملاء ==================
     def load_customers(self):
@@ -148,54 +173,43 @@ class SalesPage(QWidget):
 
     # ================== تحميل المبيعات ==================
     def load_sales(self):
-        self.table.setRowCount(0)
-        conn = self.connect_db()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT 
-                id, customer_id, customer_name, product_code, product_name,
-                unit, quantity, price_egp, price_usd, exchange_rate,
-                total_egp, total_usd, return_qty, sale_date
-            FROM sales
-            ORDER BY id DESC
-        """)
-        rows = cur.fetchall()
-        conn.close()
-
-        for row_data in rows:
-            r = self.table.rowCount()
-            self.table.insertRow(r)
-            for c, val in enumerate(row_data):
-                item = QTableWidgetItem(str(val))
-                item.setTextAlignment(Qt.AlignCenter)
-                self.table.setItem(r, c, item)
+        self.model.refresh()
 
+    @staticmethod
+    def return_color(row_data, row):
+        # تمييز عمليات البيع التي بها مرتجع
+        try:
             if float(row_data[12] or 0) > 0:
-                for c in range(len(row_data)):
-                    self.table.item(r, c).setBackground(QBrush(QColor("#E8F5E9")))
+                return QColor("#E8F5E9")
+        except (TypeError, ValueError):
+            pass
+        return None
+
+    def selected_sale_values(self):
+        """قيم الصف المحدد كنصوص (نفس ما يظهر في الجدول) أو None"""
+        row_data = selected_row_data(self.table)
+        if row_data is None:
+            return None
+        return ["" if v is None else str(v) for v in row_data]
 
     # ================== تعبئة الحقول ==================
     def fill_inputs_from_table(self):
         try:
-            r = self.table.currentRow()
-            if r < 0:
-                return
-            
-            # التحقق من وجود العناصر
-            if not all(self.table.item(r, col) for col in [5, 6, 9, 12]):
+            values = self.selected_sale_values()
+            if values is None:
                 return
             
             # تعبئة الحقول الأساسية
-            self.qty_input.setText(self.table.item(r, 6).text() or "0")
-            self.return_input.setText(self.table.item(r, 12).text() or "0")
-            self.exchange_input.setText(self.table.item(r, 9).text() or "0")
-            self.unit_combo.setCurrentText(self.table.item(r, 5).text() or "طن")
+            self.qty_input.setText(values[6] or "0")
+            self.return_input.setText(values[12] or "0")
+            self.exchange_input.setText(values[9] or "0")
+            self.unit_combo.setCurrentText(values[5] or "طن")
             
             # محاولة تحديد العميل في القائمة المنسدلة
             try:
-                customer_id_item = self.table.item(r, 1)  # customer_id في العمود 1
-                if customer_id_item and customer_id_item.text():
-                    customer_id = int(customer_id_item.text())
+                customer_id_text = values[1]  # customer_id في العمود 1
+                if customer_id_text:
+                    customer_id = int(customer_id_text)
                     for i in range(self.customer_combo.count()):
                         if self.customer_combo.itemData(i) == customer_id:
                             self.customer_combo.setCurrentIndex(i)
@@ -206,9 +220,8 @@ class SalesPage(QWidget):
             # محاولة تحديد المنتج في القائمة المنسدلة
             try:
                 # نستخدم اسم المنتج أو كود المنتج
-                product_name_item = self.table.item(r, 4)  # product_name في العمود 4
-                if product_name_item and product_name_item.text():
-                    product_name = product_name_item.text()
+                product_name = values[4]  # product_name في العمود 4
+                if product_name:
                     for i in range(self.product_combo.count()):
                         combo_text = self.product_combo.itemText(i)
                         if product_name in combo_text or combo_text.startswith(product_name):
@@ -291,17 +304,16 @@ class SalesPage(QWidget):
     # ================== تعديل ==================
     def edit_sale(self):
         try:
-            r = self.table.currentRow()
-            if r < 0:
+            values = self.selected_sale_values()
+            if values is None:
                 QMessageBox.warning(self, "تنبيه", "اختر عملية بيع لتعديلها.")
                 return
 
-            sale_id_item = self.table.item(r, 0)
-            if not sale_id_item:
+            if not values[0]:
                 QMessageBox.warning(self, "تنبيه", "لا يمكن قراءة رقم عملية البيع.")
                 return
                 
-            sale_id = int(sale_id_item.text())
+            sale_id = int(values[0])
 
             if self.customer_combo.currentIndex() < 0 or self.product_combo.currentIndex() < 0:
                 QMessageBox.warning(self, "تنبيه", "اختر عميل ومنتج.")
@@ -373,17 +385,16 @@ class SalesPage(QWidget):
     # ================== حذف ==================
     def delete_sale(self):
         try:
-            r = self.table.currentRow()
-            if r < 0:
+            values = self.selected_sale_values()
+            if values is None:
                 QMessageBox.warning(self, "تنبيه", "اختر عملية بيع لحذفها.")
                 return
                 
-            sale_id_item = self.table.item(r, 0)
-            if not sale_id_item:
+            if not values[0]:
                 QMessageBox.warning(self, "تنبيه", "لا يمكن قراءة رقم عملية البيع.")
                 return
                 
-            sale_id = int(sale_id_item.text())
+            sale_id = int(values[0])
             
             if QMessageBox.question(self, "تأكيد", f"هل تريد حذف عملية البيع رقم {sale_id}؟",
                                    QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
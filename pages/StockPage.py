@@ -5,8 +5,9 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtGui import QFont, QColor
 from PyQt5.QtCore import Qt
-import sqlite3, os
+import os
 from fpdf import FPDF
+from pages.db_connection import connect_db
 
 DB = os.path.join(os.path.dirname(__file__), "..", "database", "crm.db")
 
@@ -26,7 +27,7 @@ class StockPage(QWidget):
         self.load_stock()
 
     def db_conn(self):
-        return sqlite3.connect(DB)
+        return connect_db(DB)
 
     def _table_columns(self, table_name):
         conn = self.db_conn()
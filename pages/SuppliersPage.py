@@ -5,7 +5,8 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtGui import QFont, QColor
 from PyQt5.QtCore import Qt
-import sqlite3, os
+import os
+from pages.db_connection import connect_db
 
 DB = os.path.join(os.path.dirname(__file__), "..", "database", "crm.db")
 
@@ -28,7 +29,7 @@ class SuppliersPage(QWidget):
     #   إنشاء جدول الموردين لو مش موجود
     # --------------------------------------------------------
     def create_table_if_not_exists(self):
-        conn = sqlite3.connect(DB)
+        conn = connect_db(DB)
         cur = conn.cursor()
 
         cur.execute("""
@@ -45,7 +46,7 @@ class SuppliersPage(QWidget):
         conn.close()
 
     def db_conn(self):
-        return sqlite3.connect(DB)
+        return connect_db(DB)
 
     # --------------------------------------------------------
     #                  واجهة المستخدم
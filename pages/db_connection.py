@@ -0,0 +1,19 @@
+# pages/db_connection.py
+# اتصال مشترك بقاعدة بيانات CRM لجميع الصفحات
+# يستخدم نفس مجمّع الاتصالات (WAL + اتصال واحد لكل خيط) الموجود في email_integration/core
+import os
+import sys
+
+# إضافة مسار email_integration إلى sys.path (نفس المسار المستخدم في EmailIntegrationPage)
+email_integration_path = os.path.join(os.path.dirname(__file__), "..", "email_integration")
+if email_integration_path not in sys.path:
+    sys.path.insert(0, email_integration_path)
+
+from core.connection_pool import get_pooled_connection
+
+DB = os.path.join(os.path.dirname(__file__), "..", "database", "crm.db")
+
+
+def connect_db(db_path=DB):
+    """اتصال من المجمّع المشترك - conn.close() يعيده للمجمّع ولا يغلقه"""
+    return get_pooled_connection(db_path)